@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Mede a inferência das florestas UCI e OULAD: sklearn × floresta compilada em vetores planos
+Treina (ou reutiliza do registro) os modelos, compara tempo e previsões no conjunto de teste
+em lotes de vários tamanhos e acrescenta o resultado em artefatos/benchmark_floresta_compilada.json
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Adicionar o diretório src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'webapp', 'src'))
+
+import pandas as pd
+
+from carregar_dados import carregar_uci_dados, carregar_oulad_dados
+from armazenamento import versao_artefato
+from floresta_compilada import medir_inferencia
+from modelos import preparar_dados, treinar_modelo
+
+CAMINHO_RESULTADOS = Path(__file__).parent / 'artefatos' / 'benchmark_floresta_compilada.json'
+CARREGADORES = {'uci': carregar_uci_dados, 'oulad': carregar_oulad_dados}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a inferência do sklearn com a floresta compilada")
+    parser.add_argument('--modelos', nargs='+', choices=sorted(CARREGADORES), default=sorted(CARREGADORES),
+                        help="Modelos a medir")
+    parser.add_argument('--lotes', nargs='+', type=int, default=[1, 100, 1_000, 10_000, 100_000],
+                        help="Tamanhos de lote (limitados ao tamanho do teste)")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Medições por lote (vale a mediana)")
+    args = parser.parse_args()
+
+    print("🚀 Medindo a inferência das florestas compiladas...")
+    print("=" * 50)
+
+    try:
+        entrada = {'momento': time.strftime('%Y-%m-%dT%H:%M:%S'), 'modelos': {}}
+        for nome in args.modelos:
+            X_train, X_test, y_train, _ = preparar_dados(nome, CARREGADORES[nome]())
+            modelo = treinar_modelo(nome, X_train, y_train)
+            print(f"📊 {nome.upper()}: {len(X_test):,} linhas de teste")
+
+            resultados = medir_inferencia(modelo, X_test, args.lotes, args.repeticoes)
+            with pd.option_context('display.width', 200, 'display.max_columns', 20):
+                print(resultados.to_string(index=False))
+            entrada['modelos'][nome] = {
+                'versao_dados': versao_artefato(nome),
+                'resultados': resultados.to_dict(orient='records'),
+            }
+
+        # Histórico das medições (uma entrada por execução)
+        historico = []
+        if CAMINHO_RESULTADOS.is_file():
+            with open(CAMINHO_RESULTADOS, encoding='utf-8') as f:
+                historico = json.load(f)
+        historico.append(entrada)
+        CAMINHO_RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+        with open(CAMINHO_RESULTADOS, 'w', encoding='utf-8') as f:
+            json.dump(historico, f, indent=2, ensure_ascii=False, default=str)
+
+        print("=" * 50)
+        print(f"💾 Resultados registrados em {CAMINHO_RESULTADOS}")
+
+    except Exception as e:
+        print(f"❌ Erro durante a medição: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compara os motores do modelo OULAD (floresta aleatória × gradient boosting por histogramas)
+Mede tempo de treino, tempo de inferência, tamanho e qualidade no mesmo conjunto de teste
+e acrescenta o resultado em artefatos/comparacao_motores_oulad.json
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Adicionar o diretório src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'webapp', 'src'))
+
+from carregar_dados import carregar_oulad_dados
+from armazenamento import versao_artefato
+from modelos import MOTORES, comparar_motores
+
+CAMINHO_RESULTADOS = Path(__file__).parent / 'artefatos' / 'comparacao_motores_oulad.json'
+
+def main():
+    motores = [m for m, parametros in MOTORES.items() if 'oulad' in parametros]
+    parser = argparse.ArgumentParser(description="Compara os motores do modelo OULAD")
+    parser.add_argument('--motores', nargs='+', choices=motores, default=motores,
+                        help="Motores a comparar")
+    parser.add_argument('--linhas', type=int, default=None,
+                        help="Usa apenas uma amostra do conjunto (padrão: conjunto completo)")
+    args = parser.parse_args()
+    
+    print("🚀 Comparando motores do modelo OULAD...")
+    print("=" * 50)
+    
+    try:
+        df_oulad = carregar_oulad_dados()
+        if args.linhas and len(df_oulad) > args.linhas:
+            df_oulad = df_oulad.sample(n=args.linhas, random_state=42)
+        print(f"📊 Shape do dataset: {df_oulad.shape}")
+        
+        resultados = comparar_motores('oulad', df_oulad, args.motores)
+        print(resultados.to_string(index=False))
+        
+        # Histórico das comparações (uma entrada por execução)
+        historico = []
+        if CAMINHO_RESULTADOS.is_file():
+            with open(CAMINHO_RESULTADOS, encoding='utf-8') as f:
+                historico = json.load(f)
+        historico.append({
+            'momento': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'versao_dados': versao_artefato('oulad'),
+            'linhas_dataset': len(df_oulad),
+            'resultados': resultados.to_dict(orient='records'),
+        })
+        CAMINHO_RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+        with open(CAMINHO_RESULTADOS, 'w', encoding='utf-8') as f:
+            json.dump(historico, f, indent=2, ensure_ascii=False, default=str)
+        
+        print("=" * 50)
+        print(f"💾 Resultados registrados em {CAMINHO_RESULTADOS}")
+        print("💡 Para usar o gradient boosting no app: SIDA_MOTOR_OULAD=hgb")
+        
+    except Exception as e:
+        print(f"❌ Erro durante a comparação: {e}")
+        return 1
+    
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -18,6 +18,7 @@ sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "webapp"))
 
 from webapp.src.unificar_datasets import unificar_datasets, salvar_dataset_unificado, validar_imputacao
+from webapp.src.instrumentacao import imprimir_resumo_etapas
 import pandas as pd
 import numpy as np
 
@@ -126,23 +127,23 @@ def exibir_estatisticas_detalhadas(df: pd.DataFrame, validacao: dict):
             print(f"  ⚠️ origem_dado: Apenas {', '.join(origens)} presente")
 
 
-def exibir_informacoes_arquivos(pickle_path: Path, csv_path: Path):
+def exibir_informacoes_arquivos(parquet_path: Path, csv_path: Path):
     """
     Exibe informações sobre os arquivos gerados.
     
     Args:
-        pickle_path: Caminho do arquivo pickle
+        parquet_path: Caminho do artefato Parquet
         csv_path: Caminho do arquivo CSV
     """
     print("\n" + "=" * 70)
     print("💾 INFORMAÇÕES DOS ARQUIVOS GERADOS")
     print("=" * 70)
     
-    if pickle_path.exists():
-        size_mb = pickle_path.stat().st_size / (1024 * 1024)
-        print(f"\n📦 Pickle: {pickle_path}")
+    if parquet_path.exists():
+        size_mb = parquet_path.stat().st_size / (1024 * 1024)
+        print(f"\n📦 Parquet: {parquet_path}")
         print(f"  - Tamanho: {size_mb:.2f} MB")
-        print(f"  - Formato: Binário (protocol 4)")
+        print(f"  - Formato: Colunar (zstd, categorias por dicionário)")
     
     if csv_path.exists():
         size_mb = csv_path.stat().st_size / (1024 * 1024)
@@ -168,7 +169,7 @@ def main():
     print("  5. Tratar dados ausentes")
     print("  6. Tratar outliers")
     print("  7. Validar dados")
-    print("  8. Salvar arquivos (pickle e CSV)")
+    print("  8. Salvar arquivos (Parquet e CSV)")
     
     try:
         # Executar unificação
@@ -178,20 +179,23 @@ def main():
         validacao = validar_imputacao(df_unificado)
         
         # Salvar arquivos
-        pickle_path, csv_path = salvar_dataset_unificado(df_unificado)
+        parquet_path, csv_path = salvar_dataset_unificado(df_unificado)
         
         # Exibir estatísticas detalhadas
         exibir_estatisticas_detalhadas(df_unificado, validacao)
         
         # Exibir informações dos arquivos
-        exibir_informacoes_arquivos(pickle_path, csv_path)
+        exibir_informacoes_arquivos(parquet_path, csv_path)
+        
+        # Tempo, CPU e memória de cada etapa (SIDA_PERFIL_MEMORIA=1 para medir memória)
+        imprimir_resumo_etapas()
         
         # Resumo final
         print("\n" + "=" * 70)
         print("✅ PROCESSO CONCLUÍDO COM SUCESSO!")
         print("=" * 70)
         print(f"\n📁 Arquivos gerados:")
-        print(f"  - {pickle_path}")
+        print(f"  - {parquet_path}")
         print(f"  - {csv_path}")
         print(f"\n📊 Dataset final:")
         print(f"  - Shape: {df_unificado.shape}")
@@ -1,49 +1,72 @@
 #!/usr/bin/env python3
 """
-Script para gerar pickle otimizado dos dados OULAD
-Execute este script para criar o arquivo oulad_data.pkl otimizado
+Script para gerar o artefato otimizado dos dados OULAD
+Execute este script para criar o arquivo artefatos/oulad.parquet
 """
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # Adicionar o diretório src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'webapp', 'src'))
 
-from carregar_dados import carregar_dados_oulad_raw, processar_dados_oulad
-import pickle
+from carregar_dados import MODO_PADRAO_OULAD, carregar_dados_oulad_raw, processar_dados_oulad, manifesto_oulad
+from armazenamento import salvar_artefato
+from instrumentacao import configurar_instrumentacao, imprimir_resumo_etapas
 
 def main():
-    print("🚀 Iniciando geração do pickle otimizado OULAD...")
+    parser = argparse.ArgumentParser(description="Gera o artefato Parquet otimizado dos dados OULAD")
+    parser.add_argument('--modo', choices=['legado', 'agregado'], default=MODO_PADRAO_OULAD,
+                        help="'agregado' (padrão) lê o studentVle completo em blocos e agrega os fatos ao grão "
+                             "estudante-módulo antes das junções; 'legado' usa só as primeiras 50.000 linhas")
+    parser.add_argument('--paralelo', choices=['threads', 'processos'], default=None,
+                        help="Lê os CSVs ao mesmo tempo em um pool de threads ou de processos")
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default='c',
+                        help="Parser de CSV do pandas ('pyarrow' usa o leitor multithread do Arrow)")
+    parser.add_argument('--perfil-memoria', action='store_true',
+                        help="Mede o pico de memória de cada etapa com tracemalloc (mais lento)")
+    args = parser.parse_args()
+    if args.perfil_memoria:
+        configurar_instrumentacao(memoria=True)
+    
+    print("🚀 Iniciando geração do artefato otimizado OULAD...")
     print("=" * 50)
     
     try:
+        # Manifesto calculado antes da leitura, descrevendo os CSVs efetivamente usados
+        manifesto = manifesto_oulad(args.modo)
+        
         # Carregar dados brutos
         print("📂 Carregando dados brutos...")
-        dataframes_oulad = carregar_dados_oulad_raw()
+        # No modo agregado o studentVle é lido em blocos e nunca fica inteiro na memória
+        dataframes_oulad = carregar_dados_oulad_raw(
+            streaming_vle=(args.modo == 'agregado'),
+            paralelo=args.paralelo,
+            engine=None if args.engine == 'c' else args.engine,
+        )
         
         # Processar dados
         print("⚙️ Processando dados...")
-        df_oulad = processar_dados_oulad(dataframes_oulad)
+        df_oulad = processar_dados_oulad(dataframes_oulad, modo=args.modo)
         
-        # Salvar pickle otimizado
-        print("💾 Salvando pickle otimizado...")
-        pickle_path = Path("oulad_data.pkl")
-        
-        with open(pickle_path, 'wb') as f:
-            pickle.dump(df_oulad, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Salvar artefato Parquet
+        print("💾 Salvando artefato Parquet...")
+        artefato_path = salvar_artefato(df_oulad, 'oulad', manifesto=manifesto)
         
         # Verificar tamanho do arquivo
-        file_size = pickle_path.stat().st_size / (1024 * 1024)  # MB
-        print(f"✅ Pickle salvo: {pickle_path}")
+        file_size = artefato_path.stat().st_size / (1024 * 1024)  # MB
+        print(f"✅ Artefato salvo: {artefato_path}")
         print(f"📊 Tamanho do arquivo: {file_size:.2f} MB")
         print(f"📊 Shape do dataset: {df_oulad.shape}")
         print(f"💾 Uso de memória: {df_oulad.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
         
+        imprimir_resumo_etapas()
+        
         print("=" * 50)
         print("🎉 Processo concluído com sucesso!")
-        print("💡 O arquivo oulad_data.pkl foi criado e pode ser usado pelo aplicativo.")
+        print(f"💡 O arquivo {artefato_path.name} foi criado e pode ser usado pelo aplicativo.")
         
     except Exception as e:
         print(f"❌ Erro durante o processamento: {e}")
@@ -1,106 +1,166 @@
 #!/usr/bin/env python3
 """
-Script de manutenção para arquivos pickle
-Regenera os arquivos pickle quando necessário
+Script de manutenção para os artefatos de dados
+Verifica os artefatos Parquet (uci, oulad) contra o manifesto das fontes,
+regenera apenas os que ficaram desatualizados, grava o resumo de métricas
+do painel e o cubo de estudantes do OULAD que faltarem e migra os arquivos
+pickle legados com a opção --migrar
 """
 
 import pandas as pd
-import pickle
 import os
+import argparse
 from pathlib import Path
 import sys
 
 # Adicionar o diretório webapp/src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'webapp', 'src'))
 
-def verificar_pickles():
-    """Verifica se os arquivos pickle existem e estão íntegros"""
-    print("🔍 Verificando arquivos pickle...")
-    
-    arquivos = ['uci_dataframe.pkl', 'oulad_dataframe.pkl']
+from armazenamento import caminho_artefato, carregar_artefato, diferencas_manifesto, ler_manifesto, migrar_pickles
+from bloqueio import bloqueio_exclusivo
+from memoria_compartilhada import caminho_ipc, publicar_conjunto
+from carregar_dados import manifesto_uci, manifesto_oulad, construir_artefato_uci, construir_artefato_oulad
+from resumo_metricas import gravar_resumo, ler_resumo
+from cubo_estudantes import gravar_cubo, ler_cubo
+
+# Artefato -> (manifesto esperado, função que o reconstrói a partir dos CSVs)
+ARTEFATOS = {
+    'uci': (manifesto_uci, construir_artefato_uci),
+    'oulad': (manifesto_oulad, construir_artefato_oulad),
+}
+
+def verificar_artefatos():
+    """Verifica se os artefatos Parquet existem, estão íntegros e batem com as fontes atuais"""
+    print("🔍 Verificando artefatos...")
+
     status = {}
-    
-    for arquivo in arquivos:
-        if os.path.exists(arquivo):
+
+    for nome, (manifesto, _) in ARTEFATOS.items():
+        arquivo = caminho_artefato(nome)
+        if arquivo.is_file():
             try:
-                with open(arquivo, 'rb') as f:
-                    df = pickle.load(f)
-                if isinstance(df, pd.DataFrame):
-                    status[arquivo] = {
-                        'existe': True,
-                        'integro': True,
-                        'shape': df.shape,
-                        'tamanho_mb': os.path.getsize(arquivo) / 1024 / 1024
-                    }
-                    print(f"✅ {arquivo}: {df.shape} ({status[arquivo]['tamanho_mb']:.2f} MB)")
-                else:
-                    status[arquivo] = {'existe': True, 'integro': False}
-                    print(f"❌ {arquivo}: Arquivo corrompido")
+                df = carregar_artefato(nome)
+                motivos = diferencas_manifesto(ler_manifesto(nome), manifesto())
+                status[nome] = {
+                    'existe': True,
+                    'integro': True,
+                    'atualizado': not motivos,
+                    'motivos': motivos,
+                    'shape': df.shape,
+                    'tamanho_mb': os.path.getsize(arquivo) / 1024 / 1024
+                }
+                print(f"✅ {arquivo.name}: {df.shape} ({status[nome]['tamanho_mb']:.2f} MB)")
+                if motivos:
+                    print(f"   ♻️ Desatualizado: {'; '.join(motivos)}")
             except Exception as e:
-                status[arquivo] = {'existe': True, 'integro': False}
-                print(f"❌ {arquivo}: Erro ao carregar - {e}")
+                status[nome] = {'existe': True, 'integro': False, 'atualizado': False}
+                print(f"❌ {arquivo.name}: Erro ao carregar - {e}")
         else:
-            status[arquivo] = {'existe': False, 'integro': False}
-            print(f"❌ {arquivo}: Arquivo não encontrado")
-    
+            status[nome] = {'existe': False, 'integro': False, 'atualizado': False}
+            print(f"❌ {arquivo.name}: Arquivo não encontrado")
+
     return status
 
-def regenerar_pickles():
-    """Regenera os arquivos pickle"""
-    print("🔄 Regenerando arquivos pickle...")
-    
+def regenerar_artefatos(nomes):
+    """Regenera os artefatos indicados a partir dos CSVs, gravando o manifesto das fontes"""
+    print(f"🔄 Regenerando artefatos: {', '.join(nomes)}")
+
+    sucesso = True
+    for nome in nomes:
+        manifesto, construir = ARTEFATOS[nome]
+        try:
+            print(f"📊 Processando {nome.upper()}...")
+            # Mesmo bloqueio usado pelos carregadores do app, evitando reconstruções simultâneas
+            with bloqueio_exclusivo(caminho_artefato(nome)):
+                df = construir(manifesto())
+            print(f"✅ {nome.upper()} salvo: {df.shape}")
+        except Exception as e:
+            print(f"❌ Erro ao regenerar {nome}: {e}")
+            sucesso = False
+
+    return sucesso
+
+def gravar_resumos_metricas():
+    """Grava o resumo de métricas do painel dos artefatos que ainda não têm um para a versão atual"""
+    for nome in ARTEFATOS:
+        if not caminho_artefato(nome).is_file() or ler_resumo(nome) is not None:
+            continue
+        try:
+            print(f"📈 Calculando o resumo de métricas de {nome.upper()}...")
+            gravar_resumo(nome, carregar_artefato(nome))
+        except Exception as e:
+            print(f"❌ Erro ao gravar o resumo de métricas de {nome}: {e}")
+
+def gravar_cubo_oulad():
+    """Grava o cubo de estudantes do OULAD se ainda não houver um para a versão atual do artefato"""
+    if not caminho_artefato('oulad').is_file() or ler_cubo('oulad') is not None:
+        return
     try:
-        from carregar_dados import carregar_dados_uci_raw, carregar_dados_oulad_raw, processar_dados_oulad
-        
-        # Regenerar UCI
-        print("📊 Processando UCI...")
-        df_uci = carregar_dados_uci_raw()
-        with open('uci_dataframe.pkl', 'wb') as f:
-            pickle.dump(df_uci, f)
-        print(f"✅ UCI salvo: {df_uci.shape}")
-        
-        # Regenerar OULAD
-        print("📊 Processando OULAD...")
-        dataframes_oulad = carregar_dados_oulad_raw()
-        df_oulad = processar_dados_oulad(dataframes_oulad)
-        with open('oulad_dataframe.pkl', 'wb') as f:
-            pickle.dump(df_oulad, f)
-        print(f"✅ OULAD salvo: {df_oulad.shape}")
-        
-        return True
-        
+        print("🧊 Construindo o cubo de estudantes do OULAD...")
+        gravar_cubo('oulad', carregar_artefato('oulad'))
     except Exception as e:
-        print(f"❌ Erro ao regenerar: {e}")
-        return False
+        print(f"❌ Erro ao gravar o cubo de estudantes: {e}")
+
+def publicar_artefatos():
+    """Publica os artefatos atualizados como Arrow IPC em memória compartilhada"""
+    print("📡 Publicando artefatos em memória compartilhada...")
+
+    for nome, (manifesto, _) in ARTEFATOS.items():
+        try:
+            with bloqueio_exclusivo(caminho_ipc(nome)):
+                publicar_conjunto(carregar_artefato(nome), nome, manifesto=manifesto())
+        except Exception as e:
+            print(f"❌ Erro ao publicar {nome}: {e}")
 
 def main():
     """Função principal"""
-    print("🛠️ Manutenção de Arquivos Pickle")
+    parser = argparse.ArgumentParser(description="Manutenção dos artefatos de dados")
+    parser.add_argument('--migrar', action='store_true',
+                        help="Converte os pickles legados (uci_dataframe.pkl, oulad_data.pkl, ...) para Parquet")
+    parser.add_argument('--publicar', action='store_true',
+                        help="Publica os artefatos como Arrow IPC em /dev/shm para os processos do Streamlit "
+                             "(usado com SIDA_MEMORIA_COMPARTILHADA=1)")
+    args = parser.parse_args()
+
+    print("🛠️ Manutenção de Artefatos")
     print("=" * 40)
-    
+
+    if args.migrar:
+        print("\n📦 Migrando pickles legados para Parquet...")
+        migrados = migrar_pickles()
+        print(f"✅ {len(migrados)} artefato(s) migrado(s)")
+
     # Verificar status atual
-    status = verificar_pickles()
-    
-    # Verificar se precisa regenerar
-    precisa_regenerar = any(not info.get('integro', False) for info in status.values())
-    
-    if precisa_regenerar:
+    status = verificar_artefatos()
+
+    # Regenerar apenas os artefatos cujas entradas mudaram
+    desatualizados = [nome for nome, info in status.items() if not info.get('atualizado', False)]
+
+    if desatualizados:
         print("\n🔄 Regeneração necessária...")
-        if regenerar_pickles():
+        if regenerar_artefatos(desatualizados):
             print("\n✅ Regeneração concluída!")
             print("\n🔍 Verificação final:")
-            verificar_pickles()
+            status = verificar_artefatos()
         else:
             print("\n❌ Falha na regeneração!")
     else:
-        print("\n✅ Todos os arquivos estão íntegros!")
-    
+        print("\n✅ Todos os artefatos estão íntegros e atualizados!")
+
+    # Artefatos migrados ou gerados antes do resumo de métricas e do cubo
+    gravar_resumos_metricas()
+    gravar_cubo_oulad()
+
     print("\n📋 Resumo:")
-    for arquivo, info in status.items():
-        if info.get('existe') and info.get('integro'):
-            print(f"✅ {arquivo}: OK")
+    for nome, info in status.items():
+        if info.get('existe') and info.get('integro') and info.get('atualizado'):
+            print(f"✅ {nome}: OK")
         else:
-            print(f"❌ {arquivo}: Problema")
+            print(f"❌ {nome}: Problema")
+
+    if args.publicar:
+        print()
+        publicar_artefatos()
 
 if __name__ == "__main__":
     main()
@@ -17,7 +17,9 @@ import numpy as np
 from src.utilidades import (
     obter_metricas_principais_uci,
     obter_metricas_principais_oulad,
-    exibir_cartoes_informativos
+    exibir_cartoes_informativos,
+    obter_resumo_metricas,
+    exibir_painel_depuracao
 )
 from src.openai_interpreter import criar_sidebar_padrao
 
@@ -68,24 +70,20 @@ with col2:
 st.markdown("## 📊 Estatísticas dos Datasets")
 
 try:
-    # Carregar dados para estatísticas
-    from src.carregar_dados import carregar_uci_dados, carregar_oulad_dados
-    
+    # Estatísticas do resumo gravado junto dos artefatos (os dados não são carregados)
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 📚 Dataset UCI")
         try:
-            df_uci = carregar_uci_dados()
-            if not df_uci.empty:
-                st.markdown(f"**Total de registros:** {len(df_uci)}")
-                st.markdown(f"**Features:** {len(df_uci.columns)}")
+            resumo_uci = obter_resumo_metricas('uci')
+            if resumo_uci['registros']:
+                st.markdown(f"**Total de registros:** {resumo_uci['registros']}")
+                st.markdown(f"**Features:** {resumo_uci['colunas']}")
                 st.markdown(f"**Período:** Dados históricos de escolas portuguesas")
                 
                 # Estatísticas básicas
-                if 'G3' in df_uci.columns:
-                    media_notas = df_uci['G3'].mean()
-                    st.metric("Média das Notas Finais", f"{media_notas:.2f}")
+                st.metric("Média das Notas Finais", f"{resumo_uci['principais']['media_nota_final']:.2f}")
             else:
                 st.warning("Dataset UCI não disponível")
         except Exception as e:
@@ -94,16 +92,14 @@ try:
     with col2:
         st.markdown("### 🌐 Dataset OULAD")
         try:
-            df_oulad = carregar_oulad_dados()
-            if not df_oulad.empty:
-                st.markdown(f"**Total de registros:** {len(df_oulad)}")
-                st.markdown(f"**Features:** {len(df_oulad.columns)}")
+            resumo_oulad = obter_resumo_metricas('oulad')
+            if resumo_oulad['registros']:
+                st.markdown(f"**Total de registros:** {resumo_oulad['registros']}")
+                st.markdown(f"**Features:** {resumo_oulad['colunas']}")
                 st.markdown(f"**Período:** Dados de plataforma online")
                 
                 # Estatísticas básicas
-                if 'final_result' in df_oulad.columns:
-                    taxa_aprovacao = (df_oulad['final_result'] == 'Pass').mean() * 100
-                    st.metric("Taxa de Aprovação", f"{taxa_aprovacao:.1f}%")
+                st.metric("Taxa de Aprovação", f"{resumo_oulad['principais']['taxa_aprovacao']:.1f}%")
             else:
                 st.warning("Dataset OULAD não disponível")
         except Exception as e:
@@ -147,6 +143,10 @@ st.markdown("""
    - Integração com outras APIs
 """)
 
+# Painel de depuração (abrir a página com ?debug=1)
+if st.query_params.get("debug") == "1":
+    exibir_painel_depuracao()
+
 # Rodapé
 st.markdown("---")
 st.markdown("### ℹ️ Sobre o Sistema")
@@ -8,12 +8,16 @@ if str(webapp_dir) not in sys.path:
 
 import streamlit as st
 import pandas as pd
-import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import pickle
 from src.openai_interpreter import criar_rodape_sidebar
+from src.cache_impressao import cache_por_impressao
+from src.floresta_compilada import compilar_modelo
+from src.modelos import chave_registrada, impressao_divisao, preparar_dados
+from src.registro_modelos import RegistroModelos, impressao_dataframe
+from src.tarefas import gerenciador_tarefas
+from src.utilidades import acompanhar_tarefa, carregar_dados_uci_cached, criar_grafico_feature_importance_uci
 
 st.set_page_config(
     page_title="Análise Exploratória dos Dados - UCI",
@@ -29,35 +33,10 @@ st.divider()
 O UCI Machine Learning Repository é uma fonte valiosa de conjuntos de dados para a comunidade de aprendizado de máquina, promovendo a pesquisa e o avanço na área de ciência de dados.
 """
 
-datasets_uci_path = Path(__file__).parent.parents[1] / 'datasets' / 'uci_data'
-#st.write(f"Path dos datasets: {datasets_uci_path}")
-
-# Português
-por_path = os.path.join(datasets_uci_path, 'student-por.csv')
-por = pd.read_csv(por_path, sep=';')
-# Matemática
-mat_path = os.path.join(datasets_uci_path, 'student-mat.csv')
-mat = pd.read_csv(mat_path, sep=';')
-
-# Adicionando coluna com o conjunto de dados de origem
-mat['origem'] = 'mat'
-por['origem'] = 'por'
-
-# Concatenando os dataframes
-
-@st.cache_data(ttl=3600)  # Cache por 1 hora
-def concat():
-    df = pd.concat([mat, por])
-    return df
-
-df = concat()
-
+# Dados UCI já processados (concatenação, mapeamentos e tipos do esquema) vindos
+# da camada de dados compartilhada: reruns não releem os CSVs
+df = carregar_dados_uci_cached()
 st.session_state['df_uci'] = df
-# Transformando valores e tipos de dados
-df['traveltime'] = df['traveltime'].map({1: '<15m', 2: '15-30m', 3: '30-1h', 4: '>1h'}).astype(str)
-df['studytime'] = df['studytime'].map({1: '<2h', 2: '2-5h', 3: '5-10h', 4: '>10h'}).astype(str)
-df[['Medu','Fedu','famrel','goout','Dalc','Walc','health']] = \
-df[['Medu','Fedu','famrel','goout','Dalc','Walc','health']].astype('object')
 
 st.markdown("## Explorando os valores numéricos")
 numeric_df = df.select_dtypes('number')
@@ -80,7 +59,7 @@ with st.sidebar:
     st.write(f"**Número de Estudantes Únicos:** {estudantes_unicos}")
     st.write(f"**Número de Atributos:** {df.shape[1]}")
     st.write(f"**Número de Atributos Numéricos:** {numeric_df.shape[1]}")
-    st.write(f"**Número de Atributos Categóricos:** {df.select_dtypes('object').shape[1]}")
+    st.write(f"**Número de Atributos Categóricos:** {df.select_dtypes(['object', 'category']).shape[1]}")
     st.write(f"**Número de Valores Ausentes:** {df.isnull().sum().sum()}")
     st.write(f"**Número de Valores Duplicados:** {df.duplicated().sum()}")
     st.markdown("---")
@@ -200,7 +179,7 @@ O diagrama exibe uma distribuição bimodal das notas finais, sinalizando a pres
 st.markdown('## Explorando os valores categóricos')
 
 # Criar tabela com distribuição de valores categóricos
-cat_columns = df.select_dtypes('object').columns
+cat_columns = df.select_dtypes(['object', 'category']).columns
 cat_distribution = []
 
 for col in cat_columns:
@@ -378,117 +357,97 @@ O gráfico indica uma ligeira tendência de queda na nota final conforme o núme
 """
 
 st.markdown("Preparação dos dados para modelos de ML...")
-Y = df['G3']
-X = df.drop('G3', axis=1)
-
-from sklearn.model_selection import train_test_split
-
-X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-
-"""
-Treinando o modelo...
-"""
-
-@st.cache_data(ttl=7200)  # Cache por 2 horas
-def treinar_modelo_uci(X_train, y_train):
-    """Treina o modelo UCI com cache"""
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.preprocessing import OneHotEncoder
-    from sklearn.compose import ColumnTransformer
-    from sklearn.pipeline import Pipeline
-    
-    # Identify categorical columns
-    categorical_features = X_train.select_dtypes(include=['object']).columns
-    
-    # Create a column transformer to apply one-hot encoding
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-        ],
-        remainder='passthrough' # Keep other columns (numerical)
-    )
-    
-    # Create a pipeline with the preprocessor and the model
-    model = Pipeline(steps=[('preprocessor', preprocessor),
-                          ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))])
-    
-    # Convert the target variable to integers
-    y_train = y_train.astype(float) # Convert to float for regression
-    
-    model.fit(X_train, y_train)
-    return model
+# Chave dos caches abaixo: manifesto do artefato + parâmetros da divisão, sem hashear os DataFrames
+# (sem manifesto, o hash do conjunto)
+impressao = impressao_divisao('uci') or impressao_dataframe(df)
+
+@cache_por_impressao()
+def dividir_dados_uci(impressao, df):
+    """Mesma divisão do modelo registrado (src/modelos.py)"""
+    return preparar_dados('uci', df)
+
+@cache_por_impressao()
+def modelo_uci(chave):
+    """Modelo registrado (mmap), compilado; a chave identifica o modelo"""
+    return compilar_modelo(RegistroModelos().carregar('uci', chave))
+
+# O fit roda no pool de tarefas, fora da thread do script: enquanto treina,
+# a página mostra o andamento e pula a avaliação
+chave_uci = chave_registrada('uci')
+if chave_uci is None:
+    tarefas = gerenciador_tarefas()
+    identificador = tarefas.submeter('treino', 'uci')
+    if tarefas.concluida(identificador):
+        chave_uci = tarefas.resultado(identificador)['chave']
+    else:
+        st.info("📦 Modelo UCI não encontrado no registro. Treinando em segundo plano...")
+        acompanhar_tarefa(identificador)
 
-model = treinar_modelo_uci(X_train, y_train)
+if chave_uci is not None:
+    X_train, X_test, y_train, y_test = dividir_dados_uci(impressao, df)
+    model = modelo_uci(chave_uci)
 
-"""
-## Avaliação do modelo
-"""
+    st.markdown("## Avaliação do modelo")
 
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.metrics import confusion_matrix, classification_report
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    from sklearn.metrics import confusion_matrix, classification_report
 
-import numpy as np
+    import numpy as np
 
-# Make predictions on the test data
-try:
-    predictions = model.predict(X_test)
+    # Make predictions on the test data
+    try:
+        predictions = model.predict(X_test)
     
-    # Debug: Verificar tipos e formas
-    st.markdown("### Debug do Modelo")
-    st.write(f"**y_test type:** {type(y_test)}, **shape:** {y_test.shape if hasattr(y_test, 'shape') else 'N/A'}")
-    st.write(f"**predictions type:** {type(predictions)}, **shape:** {predictions.shape if hasattr(predictions, 'shape') else 'N/A'}")
+        # Debug: Verificar tipos e formas
+        st.markdown("### Debug do Modelo")
+        st.write(f"**y_test type:** {type(y_test)}, **shape:** {y_test.shape if hasattr(y_test, 'shape') else 'N/A'}")
+        st.write(f"**predictions type:** {type(predictions)}, **shape:** {predictions.shape if hasattr(predictions, 'shape') else 'N/A'}")
     
-    # Verificar valores NaN e infinitos
-    y_test_nan = pd.isna(y_test).sum() if hasattr(y_test, 'sum') else 0
-    predictions_nan = pd.isna(predictions).sum() if hasattr(predictions, 'sum') else 0
-    st.write(f"**y_test NaN count:** {y_test_nan}")
-    st.write(f"**predictions NaN count:** {predictions_nan}")
+        # Verificar valores NaN e infinitos
+        y_test_nan = pd.isna(y_test).sum() if hasattr(y_test, 'sum') else 0
+        predictions_nan = pd.isna(predictions).sum() if hasattr(predictions, 'sum') else 0
+        st.write(f"**y_test NaN count:** {y_test_nan}")
+        st.write(f"**predictions NaN count:** {predictions_nan}")
     
-    # Evaluate the model using regression metrics with data cleaning
-    try:
-        # Garantir que os dados são arrays numpy
-        y_test_clean = np.asarray(y_test, dtype=float)
-        predictions_clean = np.asarray(predictions, dtype=float)
+        # Evaluate the model using regression metrics with data cleaning
+        try:
+            # Garantir que os dados são arrays numpy
+            y_test_clean = np.asarray(y_test, dtype=float)
+            predictions_clean = np.asarray(predictions, dtype=float)
         
-        # Remover valores NaN e infinitos
-        mask = np.isfinite(y_test_clean) & np.isfinite(predictions_clean)
-        y_test_clean = y_test_clean[mask]
-        predictions_clean = predictions_clean[mask]
+            # Remover valores NaN e infinitos
+            mask = np.isfinite(y_test_clean) & np.isfinite(predictions_clean)
+            y_test_clean = y_test_clean[mask]
+            predictions_clean = predictions_clean[mask]
         
-        st.write(f"**Dados limpos - y_test shape:** {y_test_clean.shape}, **predictions shape:** {predictions_clean.shape}")
+            st.write(f"**Dados limpos - y_test shape:** {y_test_clean.shape}, **predictions shape:** {predictions_clean.shape}")
         
-        # Calcular métricas
-        mae = mean_absolute_error(y_test_clean, predictions_clean)
-        rmse = np.sqrt(mean_squared_error(y_test_clean, predictions_clean))
-        r2 = r2_score(y_test_clean, predictions_clean)
+            # Calcular métricas
+            mae = mean_absolute_error(y_test_clean, predictions_clean)
+            rmse = np.sqrt(mean_squared_error(y_test_clean, predictions_clean))
+            r2 = r2_score(y_test_clean, predictions_clean)
         
-        st.markdown("### Métricas do Modelo")
-        st.markdown(f"**Mean Absolute Error (MAE):** {mae:.2f}")
-        st.markdown(f"**Root Mean Squared Error (RMSE):** {rmse:.2f}")
-        st.markdown(f"**R-squared (R2):** {r2:.2f}")
+            st.markdown("### Métricas do Modelo")
+            st.markdown(f"**Mean Absolute Error (MAE):** {mae:.2f}")
+            st.markdown(f"**Root Mean Squared Error (RMSE):** {rmse:.2f}")
+            st.markdown(f"**R-squared (R2):** {r2:.2f}")
         
-    except Exception as e:
-        st.error(f"Erro ao calcular métricas: {e}")
-        st.markdown("**Dados de debug:**")
-        st.write(f"y_test sample: {y_test.head() if hasattr(y_test, 'head') else y_test}")
-        st.write(f"predictions sample: {predictions[:5] if hasattr(predictions, '__len__') else predictions}")
+        except Exception as e:
+            st.error(f"Erro ao calcular métricas: {e}")
+            st.markdown("**Dados de debug:**")
+            st.write(f"y_test sample: {y_test.head() if hasattr(y_test, 'head') else y_test}")
+            st.write(f"predictions sample: {predictions[:5] if hasattr(predictions, '__len__') else predictions}")
         
-except Exception as e:
-    st.error(f"Erro na previsão do modelo: {e}")
-    import traceback
-    st.code(traceback.format_exc())
-
-from sklearn.inspection import permutation_importance
-
-result = permutation_importance(model, X_test, y_test, n_repeats=10, random_state=42, n_jobs=2)
-sorted_idx = result.importances_mean.argsort()
-
-fig, ax = plt.subplots(figsize=(12, 10))
-ax.boxplot(result.importances[sorted_idx].T,
-           vert=False, labels=X_test.columns[sorted_idx])
-ax.set_title("Importância das classes")
-fig.tight_layout()
-st.pyplot(fig)
+    except Exception as e:
+        st.error(f"Erro na previsão do modelo: {e}")
+        import traceback
+        st.code(traceback.format_exc())
+
+# Importância por permutação calculada pela tarefa 'importancia' e publicada junto
+# do modelo no registro: enquanto calcula, a página mostra o andamento
+fig = criar_grafico_feature_importance_uci()
+if fig is not None:
+    st.pyplot(fig)
 
 """
 Foi possível observar que a notal final (G3) é fortemente influenciada, em termos absolutos, pelas notas anteriores e a quantidade de faltas.
@@ -499,10 +458,6 @@ Foi possível observar que a notal final (G3) é fortemente influenciada, em ter
 A análise dos dados mostra que a maioria dos estudantes tem entre 15 e 19 anos, com uma média de horas semanais livres um pouco acima de 3h, e a maior parte das faltas concentra-se próximo a zero. As notas finais estão concentradas acima da mediana com dispersão aceitável, tendo coeficiente de variação em torno de 27%. O gráfico indica uma ligeira tendência de queda na nota final conforme o número de faltas aumenta, especialmente a partir da faixa de 11-15 faltas, onde estudantes com menos de 10 faltas alcançam notas máximas e concentram-se entre 10 e 14 pontos  . A correlação entre horas de estudo e pontuação final revela que 75% dos alunos que dedicam menos de 2 horas por semana obtêm pontuação inferior a 13, enquanto aqueles que estudam de 5 a 10h têm concentração de notas mais altas  . Uma análise das notas finais por gênero mostra que, apesar da distribuição e variabilidade serem parecidas, a mediana das notas femininas é um pouco mais alta que a dos homens  .
 '''
 
-# Salvando os resultados no formato pickle
-with open('uci.pkl', 'wb') as f:
-    pickle.dump(model, f)
-    f.close()
 
 # Seção de análise interativa (PyGWalker movido para o dashboard principal)
 st.markdown("---")
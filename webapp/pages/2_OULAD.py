@@ -1,13 +1,18 @@
 from pathlib import Path
 import streamlit as st
 import pandas as pd
-import os
 import seaborn as sns
 import matplotlib.pyplot as plt
 import missingno as msno
 import numpy as np
-import pickle
 from src.openai_interpreter import criar_rodape_sidebar
+from src.cache_impressao import cache_por_impressao
+from src.floresta_compilada import compilar_modelo
+from src.importancia import importancia_permutacao_agrupada
+from src.modelos import chave_registrada, impressao_divisao, motor_modelo, preparar_dados
+from src.registro_modelos import RegistroModelos, impressao_dataframe
+from src.tarefas import gerenciador_tarefas
+from src.utilidades import acompanhar_tarefa, carregar_dados_oulad_cached, obter_cubo_oulad
 
 
 st.set_page_config(
@@ -20,59 +25,12 @@ st.set_page_config(
 #st.markdown('# Informações Básicas dos Dados do OULAD')
 #st.divider()
 
-datasets_oulad_path = Path(__file__).parent.parents[1] / 'datasets' / 'oulad_data'
-#st.write(f"Path dos datasets: {datasets_oulad_path}")
-
-dataframes_oulad = {}
-
-for filename in os.listdir(datasets_oulad_path):
-    if filename.endswith('.csv'):
-        file_path = os.path.join(datasets_oulad_path, filename)
-        df_name = os.path.splitext(filename)[0] # Nome do dataframe será o nome do arquivo sem a extensão
-        try:
-            dataframes_oulad[df_name] = pd.read_csv(file_path, sep=',', encoding='ISO-8859-1')
-            print(f"Arquivo '{filename}' carregado com sucesso como dataframe '{df_name}'.")
-        except Exception as e:
-            print(f"Erro ao carregar o arquivo '{filename}': {e}")
-
-
-df_assessments = dataframes_oulad['assessments'].head(10_000)
-df_courses = dataframes_oulad['courses'].head(10_000)
-df_vle = dataframes_oulad['vle'].head(10_000)
-df_studentinfo = dataframes_oulad['studentInfo'].head(10_000)
-df_studentregistration = dataframes_oulad['studentRegistration'].head(10_000)
-df_studentassessment = dataframes_oulad['studentAssessment'].head(10_000)
-df_studentvle = dataframes_oulad['studentVle'].head(10_000)
-
-#function to display basic info for a given dataframe
-def show_basic_info(df):
-    print("========================================================================================================")
-    print("HEAD:")
-    print(df.head(3))
-    print("--------------------------------------------------------------------------------------------------------")
-    print("SHAPE:")
-    print(df.shape)
-    print("--------------------------------------------------------------------------------------------------------")
-    print("INFO:")
-    print(df.info())
-    print("--------------------------------------------------------------------------------------------------------")
-    print("DESCRIBE:")
-    print(df.describe().T.round(2))
-    print("--------------------------------------------------------------------------------------------------------")
-    print("NULL VALUES:")
-    print(df.isnull().sum())
-    print("--------------------------------------------------------------------------------------------------------")
-    print("UNIQUE VALUES:")
-    print(df.nunique())
-    print("--------------------------------------------------------------------------------------------------------")
-    print("DUPLICATED VALUES:")
-    print(df.duplicated().sum())
-    print("--------------------------------------------------------------------------------------------------------")
-    print("VALUE COUNTS:")
-    print(df.select_dtypes(include=['object']).nunique())
-    print("--------------------------------------------------------------------------------------------------------")
-    print("========================================================================================================")
-
+# Dados OULAD já processados (junções, imputação e tipos do esquema) vindos da
+# camada de dados compartilhada: reruns não releem CSVs nem refazem a imputação
+merged_df = carregar_dados_oulad_cached()
+st.session_state['merged_df'] = merged_df
+# Estudantes distintos por faixa etária, gênero, região e resultado: fatias do cubo pré-agregado
+cubo_estudantes = obter_cubo_oulad()
 
 # st.sidebar.selectbox('Escolha o dataframe para visualizar informações básicas:', 
 #              options=list(dataframes_oulad.keys()),
@@ -125,62 +83,6 @@ def show_basic_info(df):
 # st.pyplot(fig)
 
 
-new_vle = df_vle.drop(['week_from','week_to'],axis=1)
-show_basic_info(new_vle)
-
-# Imputação com os valores mais frequentes por região
-dataframes_oulad['studentInfo']['imd_band_2'] = dataframes_oulad['studentInfo'].apply(lambda x: dataframes_oulad['studentInfo'][dataframes_oulad['studentInfo']['region']==x['region']]['imd_band'].mode()[0] \
-    if pd.isna(x['imd_band']) else x['imd_band'], axis=1)
-new_studentInfo = df_studentinfo.drop(['imd_band'], axis=1)
-show_basic_info(new_studentInfo)
-
-# Imputando valores ausentes em 'date_registration' e 'date_unregistration'
-# Criar uma cópia explícita do dataframe para evitar SettingWithCopyWarning
-df_student_registration_copy = df_studentregistration.copy()
-
-# Criar variável binária indicando se o estudante cancelou o registro
-df_student_registration_copy['cancelou'] = df_student_registration_copy['date_unregistration'].notna().astype(int)
-
-# Preencher date_unregistration com valor alto quando ausente (para diferenciar de valores reais)
-# Usar max + 1000 para garantir que seja claramente distinto de qualquer data real
-max_date_unregistration = df_student_registration_copy['date_unregistration'].max()
-if pd.notna(max_date_unregistration):
-    valor_nao_cancelou = max_date_unregistration + 1000
-else:
-    # Se todos os valores forem NaN, usar um valor padrão alto
-    valor_nao_cancelou = 999999
-df_student_registration_copy['date_unregistration'] = df_student_registration_copy['date_unregistration'].fillna(valor_nao_cancelou)
-
-# Preencher date_registration com a média quando ausente
-mean_date_registration = df_student_registration_copy['date_registration'].mean()
-df_student_registration_copy['date_registration'] = df_student_registration_copy['date_registration'].fillna(mean_date_registration)
-
-# Junção dos dados
-@st.cache_data(ttl=3600)  # Cache por 1 hora
-def merge_dataframes():
-    vle_activities = pd.merge(df_studentvle, new_vle, on=['code_module','code_presentation','id_site'], how='inner')
-    assessments_activities = pd.merge(df_studentassessment, df_assessments, on='id_assessment', how='inner')
-    studentinfo_activities = pd.merge(vle_activities, new_studentInfo, on=['code_module','code_presentation','id_student'], how='inner')
-    merged_df = pd.merge(studentinfo_activities, assessments_activities, on=['code_module','code_presentation','id_student'], how='inner')
-    return merged_df
-
-merged_df = merge_dataframes()
-st.session_state['merged_df'] = merged_df
-
-# Merge with courses dataframe
-merged_df = pd.merge(merged_df, df_courses, on=['code_presentation'], how='inner')
-
-# Merge with studentRegistration dataframe (usando a versão processada com variável cancelou)
-merged_df = pd.merge(merged_df, df_student_registration_copy, on=['code_presentation','id_student'], how='inner')
-
-# Imputing missing values for numerical columns with the mean
-for col in merged_df.select_dtypes(include=np.number).columns:
-    merged_df[col].fillna(merged_df[col].mean(), inplace=True)
-
-# Imputing missing values for categorical columns with the most frequent value
-for col in merged_df.select_dtypes(include='object').columns:
-    merged_df[col].fillna(merged_df[col].mode()[0], inplace=True)
-
 # st.write("Merged DataFrame after handling missing values:")
 # st.dataframe(merged_df.isnull().sum())
 
@@ -275,7 +177,7 @@ A atividade mais realizada é a 'Conteúdo Externo' com quase o dobro de execuç
 
 st.markdown('## Explorando valores categóricos')
 ## Explorando valores categóricos
-st.dataframe(merged_df.select_dtypes('object').describe().T)
+st.dataframe(merged_df.select_dtypes(['object', 'category']).describe().T)
 
 """
 Por meio da análise dos dados categóricos, os estudantes são, na sua maioria, do gênero masculino, até 35 anos, que realizaram a atividade do tipo fórum na plataforma e foram aprovados.
@@ -286,7 +188,7 @@ col1, col2 = st.columns(2)
 with col1:
     st.write('## Distribuição de Estudantes por Idade')
     # Contar estudantes únicos por faixa etária
-    idade_counts = merged_df.groupby('age_band')['id_student'].nunique()
+    idade_counts = cubo_estudantes.estudantes(['age_band'])
     fig_idade, ax_idade = plt.subplots(figsize=(6, 4))
     sns.barplot(x=idade_counts.index, y=idade_counts.values, ax=ax_idade)
     ax_idade.set_title('Distribuição de Estudantes por Idade')
@@ -302,7 +204,7 @@ with col1:
 with col2:
     st.write('## Distribuição de Estudantes por Gênero')
     # Contar estudantes únicos por gênero
-    genero_counts = merged_df.groupby('gender')['id_student'].nunique()
+    genero_counts = cubo_estudantes.estudantes(['gender'])
     fig_genero, ax_genero = plt.subplots(figsize=(6, 4))
     sns.barplot(x=genero_counts.index, y=genero_counts.values, ax=ax_genero)
     ax_genero.set_title('Distribuição de Estudantes por Gênero')
@@ -340,7 +242,7 @@ traducao_regioes = {
 }
 
 # Contar estudantes únicos por região
-regiao_counts = merged_df.groupby('region')['id_student'].nunique().sort_values(ascending=False)
+regiao_counts = cubo_estudantes.estudantes(['region']).sort_values(ascending=False)
 # Traduzir os índices (regiões) - criar novo Series com índices traduzidos
 regioes_traduzidas = [traducao_regioes.get(x, x) for x in regiao_counts.index]
 regiao_counts_traduzido = pd.Series(regiao_counts.values, index=regioes_traduzidas)
@@ -369,7 +271,7 @@ traducao_resultados = {
 }
 
 # Contar estudantes únicos por resultado final
-resultado_counts = merged_df.groupby('final_result')['id_student'].nunique().sort_values(ascending=False)
+resultado_counts = cubo_estudantes.estudantes(['final_result']).sort_values(ascending=False)
 # Traduzir os índices (resultados) - criar novo Series com índices traduzidos
 resultados_traduzidos = [traducao_resultados.get(x, x) for x in resultado_counts.index]
 resultado_counts_traduzido = pd.Series(resultado_counts.values, index=resultados_traduzidos)
@@ -386,138 +288,132 @@ A grande maioria dos estudantes obteve o resultado "Aprovado", superando vastame
 st.markdown('## Analisando  a importância das classes (feature importance)')
 
 st.markdown("Preparação dos dados para modelos de ML...")
-Y = merged_df['final_result']
-X = merged_df.loc[:, merged_df.columns != 'final_result']
+MOTORES_OULAD = {
+    'floresta': 'Floresta aleatória (amostra de 50k registros)',
+    'hgb': 'Gradient boosting por histogramas (conjunto completo, categorias nativas)',
+}
+motor = st.radio(
+    "Motor do modelo", list(MOTORES_OULAD), format_func=MOTORES_OULAD.get, horizontal=True,
+    index=list(MOTORES_OULAD).index(motor_modelo('oulad')),
+)
 
 st.markdown('Removendo as classes irrelevantes ou com alta cardinalidade...')
-X = X.drop(['id_student', 'id_site', 'id_assessment', 'code_module', 'code_presentation', 'code_module_y', 'code_module_x'], axis=1)
-
-from sklearn.model_selection import train_test_split
-
-X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-
-@st.cache_data(ttl=7200)  # Cache por 2 horas
-def treinar_modelo_oulad(X_train, y_train):
-    """Treina o modelo OULAD com cache"""
-    from sklearn.ensemble import RandomForestClassifier
-    from sklearn.preprocessing import OneHotEncoder
-    from sklearn.compose import ColumnTransformer
-    from sklearn.pipeline import Pipeline
-    from sklearn.impute import SimpleImputer
-    import pandas as pd
-    
-    # Drop rows with NaN in y_train
-    nan_rows_train = y_train.isnull()
-    X_train_cleaned = X_train[~nan_rows_train].copy()
-    y_train_cleaned = y_train[~nan_rows_train].copy()
-    
-    # Identify categorical and numerical columns
-    categorical_cols = X_train_cleaned.select_dtypes(include='object').columns
-    numerical_cols = X_train_cleaned.select_dtypes(include=np.number).columns
-    
-    # Create a column transformer to apply different preprocessing steps to different column types
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', SimpleImputer(strategy='mean'), numerical_cols),
-            ('cat', Pipeline(steps=[
-                ('imputer', SimpleImputer(strategy='most_frequent')),
-                ('onehot', OneHotEncoder(handle_unknown='ignore'))]), categorical_cols)
-        ],
-        remainder='passthrough' # Keep other columns (numeric) as they are
+# Chave dos caches abaixo: manifesto do artefato + parâmetros da divisão e do motor, sem hashear
+# o DataFrame mesclado a cada rerun (sem manifesto, o hash do conjunto)
+impressao = impressao_divisao('oulad', motor) or f"{impressao_dataframe(merged_df)}:{motor}"
+
+@cache_por_impressao()
+def dividir_dados_oulad(impressao, merged_df, motor):
+    """Mesma amostra, colunas e divisão do modelo registrado (src/modelos.py)"""
+    return preparar_dados('oulad', merged_df, motor=motor)
+
+@cache_por_impressao()
+def modelo_oulad(chave):
+    """Modelo registrado (mmap), compilado; a chave identifica o modelo"""
+    return compilar_modelo(RegistroModelos().carregar('oulad', chave))
+
+# O fit (no conjunto completo, com o motor 'hgb') roda no pool de tarefas, fora da thread do script:
+# enquanto treina, a página mostra o andamento e pula a avaliação
+chave_oulad = chave_registrada('oulad', motor=motor)
+if chave_oulad is None:
+    tarefas = gerenciador_tarefas()
+    identificador = tarefas.submeter('treino', 'oulad', motor=motor)
+    if tarefas.concluida(identificador):
+        chave_oulad = tarefas.resultado(identificador)['chave']
+    else:
+        st.info(f"📦 Modelo OULAD ({MOTORES_OULAD[motor]}) não encontrado no registro. Treinando em segundo plano...")
+        acompanhar_tarefa(identificador)
+
+if chave_oulad is not None:
+    X_train, X_test, y_train, y_test = dividir_dados_oulad(impressao, merged_df, motor)
+    ml_model = modelo_oulad(chave_oulad)
+
+    st.markdown("Modelo carregado do registro!")
+    st.markdown("Avaliando do modelo...")
+
+    predictions = ml_model.predict(X_test)
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+    # Drop rows with NaN in y_test
+    nan_rows_test = y_test.isnull()
+    X_test_cleaned = X_test[~nan_rows_test].copy()
+    y_test_cleaned = y_test[~nan_rows_test].copy()
+    predictions_cleaned = ml_model.predict(X_test_cleaned)
+
+    # Exibir métricas do modelo
+    st.markdown("### Métricas de Avaliação do Modelo")
+
+    # Calcular métricas individuais
+    accuracy = accuracy_score(y_test_cleaned, predictions_cleaned)
+    precision = precision_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
+    recall = recall_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
+    f1 = f1_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
+
+    # Criar tabela com as métricas
+    metricas_df = pd.DataFrame({
+        'Métrica': ['Acurácia', 'Precisão (weighted)', 'Recall (weighted)', 'F1-Score (weighted)'],
+        'Valor': [accuracy, precision, recall, f1]
+    })
+    metricas_df['Valor'] = metricas_df['Valor'].round(4)
+    st.dataframe(metricas_df, use_container_width=True, hide_index=True)
+
+    # Com o conjunto completo (motor 'hgb') o teste é grande: a importância usa no máximo 50k linhas
+    X_importancia, y_importancia = X_test_cleaned, y_test_cleaned
+    if len(X_importancia) > 50_000:
+        X_importancia = X_importancia.sample(n=50_000, random_state=42)
+        y_importancia = y_importancia.loc[X_importancia.index]
+    @cache_por_impressao()
+    def importancia_modelo_oulad(chave, ml_model, X_importancia, y_importancia):
+        """Transforma o teste uma vez e permuta os blocos codificados de cada coluna original"""
+        return importancia_permutacao_agrupada(ml_model, X_importancia, y_importancia, n_repeats=10, random_state=42)
+
+    result = importancia_modelo_oulad(chave_oulad, ml_model, X_importancia, y_importancia)
+    sorted_idx = result.importances_mean.argsort()
+
+    # Pegar apenas as top 5 features mais importantes (ordenadas da mais importante para a menos importante)
+    top_5_idx = sorted_idx[-5:][::-1]  # Reverter para ter a mais importante primeiro
+    top_5_features = X_test_cleaned.columns[top_5_idx]
+    top_5_importances = result.importances_mean[top_5_idx]
+
+    # Traduzir nomes das variáveis para exibição
+    feature_translation = {
+        'date_unregistration': 'Data de cancelamento',
+        'date_registration': 'Data de registro',
+        'age_band': 'Faixa etária',
+        'studied_credits': 'Créditos cursados',
+        'studied_credits_x': 'Créditos cursados',
+        'studied_credits_y': 'Créditos cursados',
+        'score': 'Nota',
+        'score_x': 'Nota',
+        'score_y': 'Nota',
+        'activity_type': 'Tipo de atividade',
+        'clicks': 'Cliques',
+        'gender': 'Gênero',
+        'region': 'Região',
+        'disability': 'Deficiência',
+        'highest_education': 'Escolaridade',
+        'imd_band': 'Faixa IMD',
+        'num_of_prev_attempts': 'Tentativas anteriores',
+        'module_presentation_length': 'Duração do módulo',
+        'cancelou': 'Cancelou',
+    }
+    top_5_features_pt = [feature_translation.get(f, f) for f in top_5_features]
+
+    # Criar gráfico de barras
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.barh(range(len(top_5_features)), top_5_importances)
+    ax.set_yticks(range(len(top_5_features)))
+    ax.set_yticklabels(top_5_features_pt)
+    ax.set_xlabel('Importância por Permutação')
+    ax.set_title('Top 5 Variáveis Mais Importantes (OULAD)')
+    ax.invert_yaxis()  # Mostrar a feature mais importante no topo
+    fig.tight_layout()
+    st.pyplot(fig)
+    st.markdown(
+        "Histograma de importância das variáveis (método de permutação). "
+        "Valores mais altos indicam maior impacto na previsão do resultado final."
     )
-    
-    # Create a pipeline that first preprocesses the data and then trains the model
-    ml_model = Pipeline(steps=[('preprocessor', preprocessor),
-                               ('classifier', RandomForestClassifier(n_estimators=50, n_jobs=2, max_depth=4, random_state=42))])
-    
-    # Train the model
-    ml_model.fit(X_train_cleaned, y_train_cleaned)
-    return ml_model
-
-ml_model = treinar_modelo_oulad(X_train, y_train)
-
-st.markdown("Modelo treinado com sucesso!")
-st.markdown("Avaliando do modelo...")
-
-predictions = ml_model.predict(X_test)
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-
-# Drop rows with NaN in y_test
-nan_rows_test = y_test.isnull()
-X_test_cleaned = X_test[~nan_rows_test].copy()
-y_test_cleaned = y_test[~nan_rows_test].copy()
-predictions_cleaned = ml_model.predict(X_test_cleaned)
-
-# Exibir métricas do modelo
-st.markdown("### Métricas de Avaliação do Modelo")
-
-# Calcular métricas individuais
-accuracy = accuracy_score(y_test_cleaned, predictions_cleaned)
-precision = precision_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
-recall = recall_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
-f1 = f1_score(y_test_cleaned, predictions_cleaned, average='weighted', zero_division=0)
-
-# Criar tabela com as métricas
-metricas_df = pd.DataFrame({
-    'Métrica': ['Acurácia', 'Precisão (weighted)', 'Recall (weighted)', 'F1-Score (weighted)'],
-    'Valor': [accuracy, precision, recall, f1]
-})
-metricas_df['Valor'] = metricas_df['Valor'].round(4)
-st.dataframe(metricas_df, use_container_width=True, hide_index=True)
-
-from sklearn.inspection import permutation_importance
-
-result = permutation_importance(ml_model, X_test_cleaned, y_test_cleaned, n_repeats=10, random_state=42, n_jobs=2)
-sorted_idx = result.importances_mean.argsort()
-
-# Pegar apenas as top 5 features mais importantes (ordenadas da mais importante para a menos importante)
-top_5_idx = sorted_idx[-5:][::-1]  # Reverter para ter a mais importante primeiro
-top_5_features = X_test_cleaned.columns[top_5_idx]
-top_5_importances = result.importances_mean[top_5_idx]
-
-# Traduzir nomes das variáveis para exibição
-feature_translation = {
-    'date_unregistration': 'Data de cancelamento',
-    'date_registration': 'Data de registro',
-    'age_band': 'Faixa etária',
-    'studied_credits': 'Créditos cursados',
-    'studied_credits_x': 'Créditos cursados',
-    'studied_credits_y': 'Créditos cursados',
-    'score': 'Nota',
-    'score_x': 'Nota',
-    'score_y': 'Nota',
-    'activity_type': 'Tipo de atividade',
-    'clicks': 'Cliques',
-    'gender': 'Gênero',
-    'region': 'Região',
-    'disability': 'Deficiência',
-    'highest_education': 'Escolaridade',
-    'imd_band': 'Faixa IMD',
-    'num_of_prev_attempts': 'Tentativas anteriores',
-    'module_presentation_length': 'Duração do módulo',
-    'cancelou': 'Cancelou',
-}
-top_5_features_pt = [feature_translation.get(f, f) for f in top_5_features]
-
-# Criar gráfico de barras
-fig, ax = plt.subplots(figsize=(10, 6))
-ax.barh(range(len(top_5_features)), top_5_importances)
-ax.set_yticks(range(len(top_5_features)))
-ax.set_yticklabels(top_5_features_pt)
-ax.set_xlabel('Importância por Permutação')
-ax.set_title('Top 5 Variáveis Mais Importantes (OULAD)')
-ax.invert_yaxis()  # Mostrar a feature mais importante no topo
-fig.tight_layout()
-st.pyplot(fig)
-st.markdown(
-    "Histograma de importância das variáveis (método de permutação). "
-    "Valores mais altos indicam maior impacto na previsão do resultado final."
-)
-plt.clf()
+    plt.clf()
 
 st.markdown("## Conclusão")
-st.markdown("Nesta análise exploratória dos dados do OULAD, conseguimos entender melhor o perfil dos estudantes, suas atividades na plataforma e os fatores que influenciam seu desempenho acadêmico. Através da visualização dos dados, identificamos padrões interessantes, como a predominância de estudantes do gênero masculino e a distribuição etária dos participantes. Além disso, o treinamento do modelo de aprendizado de máquina nos permitiu avaliar a importância das diferentes características dos dados, destacando quais fatores têm maior impacto no resultado final dos estudantes. Essas informações são valiosas para instituições educacionais que buscam melhorar a experiência de aprendizagem e o suporte oferecido aos alunos. Futuras análises podem aprofundar ainda mais esses insights, explorando outras variáveis e utilizando técnicas avançadas de modelagem preditiva.")
-
-with open('oulad.pkl', 'wb') as f:
-    pickle.dump(ml_model, f)
-    f.close()
\ No newline at end of file
+st.markdown("Nesta análise exploratória dos dados do OULAD, conseguimos entender melhor o perfil dos estudantes, suas atividades na plataforma e os fatores que influenciam seu desempenho acadêmico. Através da visualização dos dados, identificamos padrões interessantes, como a predominância de estudantes do gênero masculino e a distribuição etária dos participantes. Além disso, o treinamento do modelo de aprendizado de máquina nos permitiu avaliar a importância das diferentes características dos dados, destacando quais fatores têm maior impacto no resultado final dos estudantes. Essas informações são valiosas para instituições educacionais que buscam melhorar a experiência de aprendizagem e o suporte oferecido aos alunos. Futuras análises podem aprofundar ainda mais esses insights, explorando outras variáveis e utilizando técnicas avançadas de modelagem preditiva.")
\ No newline at end of file
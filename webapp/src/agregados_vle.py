@@ -0,0 +1,236 @@
+"""
+Agregados parciais e combináveis do log de cliques (studentVle).
+
+O studentVle completo tem cerca de 10 milhões de linhas. Em vez de carregá-lo
+inteiro, cada bloco lido do CSV alimenta um `AgregadosCliques`, que mantém
+somas, contagens, mínimos e máximos por estudante-módulo-dia, por
+estudante-módulo-atividade e por site. Como essas estatísticas são
+associativas, estados parciais podem ser combinados em qualquer ordem
+(por bloco, por arquivo ou por processo) e o resultado final é o mesmo de
+agregar o log inteiro de uma vez.
+
+Cada bloco é agrupado sozinho e o parcial vai para uma fila; a fila só é
+reagrupada com o estado quando tem ao menos tantas linhas quanto ele (e
+`min_pendentes`). Reagrupar o estado inteiro a cada bloco faria o custo da
+leitura crescer com o quadrado do número de blocos; assim cada linha é
+reagrupada um número limitado de vezes e a fila nunca passa do tamanho do
+estado.
+
+Opcionalmente, o estado também acumula esboços HyperLogLog de estudantes
+ativos no VLE (total e por módulo, tipo de atividade e atributos do
+studentInfo), combináveis da mesma forma (ver contagem_aproximada).
+"""
+
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    from .contagem_aproximada import EsbocosDistintos
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from contagem_aproximada import EsbocosDistintos
+
+CHAVES_MATRICULA = ['code_module', 'code_presentation', 'id_student']
+
+# Grão -> (chaves, agregações das colunas de medida)
+GRAOS = {
+    'dia': (CHAVES_MATRICULA + ['date'], {'sum_click': 'sum', 'num_registros': 'sum'}),
+    'atividade': (CHAVES_MATRICULA + ['activity_type'], {'sum_click': 'sum', 'num_registros': 'sum'}),
+    'site': (['code_module', 'code_presentation', 'id_site'], {'sum_click': 'sum', 'num_registros': 'sum'}),
+}
+
+COLUNAS_CATEGORICAS = ['code_module', 'code_presentation', 'activity_type']
+
+# Atributos do studentInfo (por matrícula) com esboços de estudantes ativos por valor
+DIMENSOES_INFO = ['gender', 'age_band', 'region', 'imd_band', 'final_result']
+
+# Linhas de parciais pendentes a partir das quais um grão pode ser reagrupado com o estado
+MIN_PENDENTES = 1_000_000
+
+
+def _compactar(frames: List[pd.DataFrame], grao: str) -> pd.DataFrame:
+    """Reagrupa estados parciais de um mesmo grão em um único estado"""
+    chaves, agregacoes = GRAOS[grao]
+    df = pd.concat([f for f in frames if f is not None], ignore_index=True)
+    df = df.groupby(chaves, observed=True, sort=True).agg(agregacoes).reset_index()
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df.astype({'sum_click': 'int32', 'num_registros': 'int32'})
+
+
+class AgregadosCliques:
+    """
+    Estado de agregação do studentVle que pode ser atualizado bloco a bloco
+    e combinado com outros estados parciais.
+
+    Args:
+        df_vle: Tabela vle (id_site -> activity_type). Se informada, também
+            acumula cliques por tipo de atividade.
+        df_info: Tabela studentInfo; com erro_distintos, seus atributos
+            (DIMENSOES_INFO) ganham esboços de estudantes ativos por valor.
+        erro_distintos: Erro relativo dos esboços de estudantes distintos;
+            None (padrão) não os acumula.
+        min_pendentes: Linhas de parciais pendentes a partir das quais a fila
+            de um grão é reagrupada com o estado
+    """
+
+    def __init__(self, df_vle: Optional[pd.DataFrame] = None, df_info: Optional[pd.DataFrame] = None,
+                 erro_distintos: Optional[float] = None, min_pendentes: int = MIN_PENDENTES):
+        self.estados: Dict[str, Optional[pd.DataFrame]] = {grao: None for grao in GRAOS}
+        self.pendentes: Dict[str, List[pd.DataFrame]] = {grao: [] for grao in GRAOS}
+        self.min_pendentes = min_pendentes
+        self.linhas_processadas = 0
+        self.sites = None
+        if df_vle is not None:
+            self.sites = df_vle[['code_module', 'code_presentation', 'id_site', 'activity_type']].drop_duplicates(
+                subset=['code_module', 'code_presentation', 'id_site']
+            )
+        self.info = None
+        if df_info is not None and erro_distintos is not None:
+            dimensoes_info = [c for c in DIMENSOES_INFO if c in df_info.columns]
+            self.info = df_info[CHAVES_MATRICULA + dimensoes_info].drop_duplicates(subset=CHAVES_MATRICULA)
+        self.distintos = None
+        if erro_distintos is not None:
+            dimensoes = ['code_module']
+            dimensoes += ['activity_type'] if self.sites is not None else []
+            dimensoes += [c for c in self.info.columns if c not in CHAVES_MATRICULA] if self.info is not None else []
+            self.distintos = EsbocosDistintos(dimensoes, erro_distintos)
+
+    def _parciais_do_bloco(self, bloco: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        # sum_click é lido como int16; acumular em int32 evita estouro nos totais
+        bloco = bloco[CHAVES_MATRICULA + ['id_site', 'date', 'sum_click']].astype({'sum_click': 'int32'})
+        bloco = bloco.assign(num_registros=1)
+
+        parciais = {
+            'dia': bloco.groupby(GRAOS['dia'][0], observed=True).agg(GRAOS['dia'][1]).reset_index(),
+            'site': bloco.groupby(GRAOS['site'][0], observed=True).agg(GRAOS['site'][1]).reset_index(),
+        }
+        if self.sites is not None:
+            # vle tem grão por site, então a junção é N:1 e não multiplica linhas
+            com_atividade = pd.merge(
+                bloco, self.sites, on=['code_module', 'code_presentation', 'id_site'],
+                how='inner', validate='many_to_one'
+            )
+            parciais['atividade'] = com_atividade.groupby(GRAOS['atividade'][0], observed=True).agg(
+                GRAOS['atividade'][1]
+            ).reset_index()
+        if self.distintos is not None:
+            # Junção à esquerda: estudantes em sites fora da tabela vle também contam
+            com_atributos = bloco
+            if self.sites is not None:
+                com_atributos = pd.merge(
+                    com_atributos, self.sites, on=['code_module', 'code_presentation', 'id_site'],
+                    how='left', validate='many_to_one'
+                )
+            if self.info is not None:
+                # studentInfo tem grão por matrícula: junção N:1, sem multiplicar linhas
+                com_atributos = pd.merge(
+                    com_atributos, self.info, on=CHAVES_MATRICULA, how='left', validate='many_to_one'
+                )
+            self.distintos.atualizar(com_atributos)
+        return parciais
+
+    def _compactar_pendentes(self, grao: str, forcar: bool = False) -> None:
+        """Reagrupa a fila do grão com o estado quando ela alcança o tamanho do estado (ou sempre, com forcar)"""
+        pendentes = self.pendentes[grao]
+        if not pendentes:
+            return
+        estado = self.estados[grao]
+        linhas = sum(len(parcial) for parcial in pendentes)
+        if forcar or linhas >= max(self.min_pendentes, len(estado) if estado is not None else 0):
+            self.estados[grao] = _compactar([estado] + pendentes, grao)
+            self.pendentes[grao] = []
+
+    def _estado(self, grao: str) -> Optional[pd.DataFrame]:
+        """Estado compactado do grão, incluindo os parciais pendentes"""
+        self._compactar_pendentes(grao, forcar=True)
+        return self.estados[grao]
+
+    def atualizar(self, bloco: pd.DataFrame) -> 'AgregadosCliques':
+        """Incorpora um bloco de linhas do studentVle ao estado (e aos esboços de distintos, se houver)"""
+        for grao, parcial in self._parciais_do_bloco(bloco).items():
+            self.pendentes[grao].append(parcial)
+            self._compactar_pendentes(grao)
+        self.linhas_processadas += len(bloco)
+        return self
+
+    def combinar(self, outro: 'AgregadosCliques') -> 'AgregadosCliques':
+        """Combina dois estados parciais em um novo estado"""
+        resultado = AgregadosCliques(min_pendentes=self.min_pendentes)
+        resultado.sites = self.sites if self.sites is not None else outro.sites
+        resultado.info = self.info if self.info is not None else outro.info
+        if self.distintos is not None and outro.distintos is not None:
+            resultado.distintos = self.distintos.combinar(outro.distintos)
+        else:
+            resultado.distintos = self.distintos if self.distintos is not None else outro.distintos
+        for grao in GRAOS:
+            frames = [self.estados[grao], outro.estados[grao]] + self.pendentes[grao] + outro.pendentes[grao]
+            if any(f is not None for f in frames):
+                resultado.estados[grao] = _compactar(frames, grao)
+        resultado.linhas_processadas = self.linhas_processadas + outro.linhas_processadas
+        return resultado
+
+    def _dia(self) -> pd.DataFrame:
+        dia = self._estado('dia')
+        if dia is None:
+            chaves, agregacoes = GRAOS['dia']
+            return pd.DataFrame(columns=chaves + list(agregacoes))
+        return dia
+
+    def por_estudante_modulo(self) -> pd.DataFrame:
+        """
+        Uma linha por (code_module, code_presentation, id_student) com total de
+        cliques, registros, dias ativos, primeira/última atividade e o tipo de
+        atividade com mais cliques (se a tabela vle foi informada).
+        """
+        cliques = self._dia().groupby(CHAVES_MATRICULA, observed=True).agg(
+            sum_click=('sum_click', 'sum'),
+            num_registros_vle=('num_registros', 'sum'),
+            dias_ativos=('date', 'size'),
+            primeira_atividade=('date', 'min'),
+            ultima_atividade=('date', 'max'),
+        ).reset_index()
+
+        atividade = self._estado('atividade')
+        if atividade is not None:
+            atividade_principal = (
+                atividade.sort_values('sum_click', ascending=False, kind='mergesort')
+                .drop_duplicates(subset=CHAVES_MATRICULA)[CHAVES_MATRICULA + ['activity_type']]
+            )
+            cliques = pd.merge(cliques, atividade_principal, on=CHAVES_MATRICULA, how='left', validate='one_to_one')
+
+        return cliques
+
+    def por_estudante(self) -> pd.DataFrame:
+        """
+        Uma linha por id_student com total de cliques, número de registros e
+        primeira/última data de atividade (todas as matrículas somadas).
+        """
+        return self._dia().groupby('id_student').agg(
+            sum_click=('sum_click', 'sum'),
+            num_registros_vle=('num_registros', 'sum'),
+            primeira_atividade=('date', 'min'),
+            ultima_atividade=('date', 'max'),
+        ).reset_index()
+
+    def por_semana(self) -> pd.DataFrame:
+        """Cliques, registros e dias ativos por estudante-módulo-semana"""
+        dia = self._dia()
+        return dia.assign(semana=dia['date'] // 7).groupby(CHAVES_MATRICULA + ['semana'], observed=True).agg(
+            sum_click=('sum_click', 'sum'),
+            num_registros_vle=('num_registros', 'sum'),
+            dias_ativos=('date', 'size'),
+        ).reset_index()
+
+    def por_site(self) -> pd.DataFrame:
+        """Cliques e registros por site do VLE"""
+        return self._estado('site')
+
+    def memoria_mb(self) -> float:
+        """Memória ocupada pelo estado de agregação (com os parciais pendentes)"""
+        esbocos_mb = self.distintos.memoria_mb() if self.distintos is not None else 0.0
+        frames = [df for df in self.estados.values() if df is not None]
+        frames += [df for pendentes in self.pendentes.values() for df in pendentes]
+        return sum(df.memory_usage(deep=True).sum() for df in frames) / 1024**2 + esbocos_mb
@@ -0,0 +1,393 @@
+"""
+Armazenamento colunar dos artefatos processados (UCI, OULAD e unificado).
+
+Os DataFrames processados são gravados em Parquet com colunas categóricas
+codificadas por dicionário, permitindo que os carregadores leiam apenas as
+colunas (`colunas=[...]`) e os grupos de linhas (`filtros=...`) de que precisam.
+Também contém a migração a partir dos arquivos pickle antigos e os manifestos
+que registram de quais fontes e de qual versão do código cada artefato veio.
+"""
+
+import hashlib
+import json
+import pickle
+import platform
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .bloqueio import escrever_atomico
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from bloqueio import escrever_atomico
+
+BASE_PATH = Path(__file__).parent.parents[1]
+DIRETORIO_ARTEFATOS = BASE_PATH / "artefatos"
+
+# Colunas usadas para ordenar as linhas antes da gravação, de modo que as
+# estatísticas de cada grupo de linhas permitam descartar grupos ao filtrar
+ORDENACAO_PADRAO = {
+    'oulad': ['code_module', 'final_result'],
+    'unificado': ['origem_dado'],
+}
+
+# Pickles legados e o artefato Parquet correspondente
+PICKLES_LEGADOS = {
+    'uci_dataframe.pkl': 'uci',
+    'oulad_data.pkl': 'oulad',
+    'oulad_dataframe.pkl': 'oulad',
+    'unified_dataset.pkl': 'unificado',
+}
+
+# CSVs de origem de cada artefato
+FONTES_ARTEFATOS = {
+    'uci': [f"uci_data/{arquivo}" for arquivo in ('student-mat.csv', 'student-por.csv')],
+    'oulad': [
+        f"oulad_data/{arquivo}.csv"
+        for arquivo in ('assessments', 'courses', 'studentAssessment', 'studentInfo',
+                        'studentRegistration', 'studentVle', 'vle')
+    ],
+}
+FONTES_ARTEFATOS['unificado'] = FONTES_ARTEFATOS['uci'] + FONTES_ARTEFATOS['oulad']
+
+Filtros = Union[Dict[str, Union[object, Sequence[object]]], List[Tuple[str, str, object]]]
+
+
+def _diretorio(base_path: Optional[Path] = None) -> Path:
+    return Path(base_path) / "artefatos" if base_path is not None else DIRETORIO_ARTEFATOS
+
+
+def caminho_artefato(nome: str, base_path: Optional[Path] = None) -> Path:
+    """
+    Retorna o caminho do arquivo Parquet de um artefato.
+
+    Args:
+        nome: Nome do artefato ('uci', 'oulad', 'unificado', ...)
+        base_path: Caminho base do projeto (opcional)
+
+    Returns:
+        Caminho do arquivo .parquet
+    """
+    return _diretorio(base_path) / f"{nome}.parquet"
+
+
+def artefato_existe(nome: str, base_path: Optional[Path] = None) -> bool:
+    """Indica se o artefato Parquet já foi gerado"""
+    return caminho_artefato(nome, base_path).is_file()
+
+
+def caminho_manifesto(nome: str, base_path: Optional[Path] = None) -> Path:
+    """Retorna o caminho do manifesto JSON de um artefato"""
+    return _diretorio(base_path) / f"{nome}.manifest.json"
+
+
+def fontes_artefato(nome: str, base_path: Optional[Path] = None) -> List[Path]:
+    """Retorna os caminhos dos CSVs de origem de um artefato"""
+    base = Path(base_path) if base_path is not None else BASE_PATH
+    return [base / "datasets" / relativo for relativo in FONTES_ARTEFATOS.get(nome, [])]
+
+
+def versoes_bibliotecas() -> Dict[str, str]:
+    """Versões do Python e das bibliotecas que influenciam o conteúdo dos artefatos"""
+    import pyarrow
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pyarrow.__version__,
+    }
+
+
+def _impressao_arquivo(caminho: Path, anterior: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Calcula o SHA-256 de um arquivo de origem.
+
+    Se tamanho e data de modificação forem iguais aos do manifesto anterior, o
+    hash anterior é reaproveitado para não reler arquivos grandes a cada carga.
+    """
+    estado = caminho.stat()
+    if (anterior and anterior.get('tamanho') == estado.st_size
+            and anterior.get('mtime_ns') == estado.st_mtime_ns and anterior.get('sha256')):
+        return dict(anterior)
+
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return {'sha256': h.hexdigest(), 'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def calcular_manifesto(
+    fontes: Sequence[Path],
+    versao_transformacao: Union[int, str],
+    parametros: Optional[Dict[str, Any]] = None,
+    anterior: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Monta o manifesto esperado de um artefato a partir das fontes atuais.
+
+    Args:
+        fontes: Arquivos de origem (CSVs)
+        versao_transformacao: Versão do código que gera o artefato
+        parametros: Parâmetros que alteram o resultado (por exemplo o modo de processamento)
+        anterior: Manifesto gravado anteriormente, para reaproveitar hashes
+
+    Returns:
+        Dicionário com fontes, versão da transformação, parâmetros e versões das bibliotecas.
+        Fontes ausentes são registradas com sha256=None.
+    """
+    fontes_anteriores = (anterior or {}).get('fontes', {})
+    impressoes = {}
+    for caminho in fontes:
+        caminho = Path(caminho)
+        if caminho.is_file():
+            impressoes[caminho.name] = _impressao_arquivo(caminho, fontes_anteriores.get(caminho.name))
+        else:
+            impressoes[caminho.name] = {'sha256': None}
+
+    return {
+        'fontes': impressoes,
+        'versao_transformacao': str(versao_transformacao),
+        'parametros': parametros or {},
+        'bibliotecas': versoes_bibliotecas(),
+    }
+
+
+def ler_manifesto(nome: str, base_path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Lê o manifesto de um artefato (None se não existir ou estiver corrompido)"""
+    caminho = caminho_manifesto(nome, base_path)
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def versao_artefato(nome: str, base_path: Optional[Path] = None) -> Optional[str]:
+    """
+    Identificador curto da versão gravada de um artefato.
+
+    É o hash do manifesto gravado: muda sempre que o artefato é regenerado com
+    outras fontes, outra versão da transformação ou outros parâmetros. Serve
+    de chave para caches em memória sem recalcular os hashes das fontes.
+
+    Returns:
+        16 caracteres hexadecimais, ou None se o artefato não tiver manifesto
+    """
+    manifesto = ler_manifesto(nome, base_path)
+    if manifesto is None:
+        return None
+    conteudo = json.dumps(manifesto, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(conteudo).hexdigest()[:16]
+
+
+def fontes_disponiveis(manifesto: Dict[str, Any]) -> bool:
+    """Indica se todos os arquivos de origem do manifesto existem"""
+    return all(info.get('sha256') for info in manifesto['fontes'].values())
+
+
+def diferencas_manifesto(gravado: Optional[Dict[str, Any]], esperado: Dict[str, Any]) -> List[str]:
+    """
+    Compara o manifesto gravado com o esperado.
+
+    Returns:
+        Lista com os motivos pelos quais o artefato está desatualizado (vazia se está atualizado)
+    """
+    if gravado is None:
+        return ['sem manifesto']
+
+    motivos = []
+    fontes_gravadas = gravado.get('fontes', {})
+    for arquivo, info in esperado.get('fontes', {}).items():
+        if fontes_gravadas.get(arquivo, {}).get('sha256') != info.get('sha256'):
+            motivos.append(f"fonte alterada: {arquivo}")
+    for arquivo in set(fontes_gravadas) - set(esperado.get('fontes', {})):
+        motivos.append(f"fonte removida: {arquivo}")
+    if gravado.get('versao_transformacao') != esperado.get('versao_transformacao'):
+        motivos.append(
+            f"versão da transformação {gravado.get('versao_transformacao')} → {esperado.get('versao_transformacao')}"
+        )
+    if gravado.get('parametros', {}) != esperado.get('parametros', {}):
+        motivos.append(f"parâmetros {gravado.get('parametros')} → {esperado.get('parametros')}")
+    for biblioteca, versao in esperado.get('bibliotecas', {}).items():
+        if gravado.get('bibliotecas', {}).get(biblioteca) != versao:
+            motivos.append(f"{biblioteca} {gravado.get('bibliotecas', {}).get(biblioteca)} → {versao}")
+    return motivos
+
+
+def _normalizar_filtros(filtros: Optional[Filtros]) -> Optional[List[Tuple[str, str, object]]]:
+    """Converte {'coluna': valor ou [valores]} para o formato de filtros do pyarrow"""
+    if filtros is None or isinstance(filtros, list):
+        return filtros
+
+    normalizados = []
+    for coluna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set)):
+            normalizados.append((coluna, 'in', list(valor)))
+        else:
+            normalizados.append((coluna, '==', valor))
+    return normalizados
+
+
+def salvar_artefato(
+    df: pd.DataFrame,
+    nome: str,
+    base_path: Optional[Path] = None,
+    ordenar_por: Optional[List[str]] = None,
+    tamanho_grupo_linhas: int = 100_000,
+    manifesto: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """
+    Grava um DataFrame como artefato Parquet.
+
+    Colunas 'category' são gravadas como dicionários Arrow (e voltam como
+    'category' na leitura) e as de texto usam páginas com codificação por
+    dicionário; as linhas são ordenadas pelas colunas de filtro mais comuns para
+    que os grupos de linhas possam ser descartados na leitura. A gravação é
+    atômica (arquivo temporário renomeado sobre o destino).
+
+    Args:
+        df: DataFrame processado
+        nome: Nome do artefato
+        base_path: Caminho base do projeto (opcional)
+        ordenar_por: Colunas de ordenação (padrão: ORDENACAO_PADRAO[nome])
+        tamanho_grupo_linhas: Número de linhas por grupo de linhas do Parquet
+        manifesto: Manifesto das fontes (ver calcular_manifesto). Sem ele, o
+            manifesto antigo é removido e o artefato passa a ser considerado desatualizado
+
+    Returns:
+        Caminho do arquivo gravado
+    """
+    caminho = caminho_artefato(nome, base_path)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+
+    df_gravar = df
+    if ordenar_por is None:
+        ordenar_por = ORDENACAO_PADRAO.get(nome, [])
+    ordenar_por = [c for c in ordenar_por if c in df_gravar.columns]
+    if ordenar_por:
+        df_gravar = df_gravar.sort_values(ordenar_por, kind='mergesort')
+
+    # O manifesto antigo sai antes da troca do Parquet: um leitor que chegar no
+    # meio da gravação vê o artefato como desatualizado, nunca como válido
+    caminho_json = caminho_manifesto(nome, base_path)
+    caminho_json.unlink(missing_ok=True)
+
+    escrever_atomico(caminho, lambda temporario: df_gravar.to_parquet(
+        temporario,
+        engine='pyarrow',
+        index=False,
+        compression='zstd',
+        use_dictionary=True,
+        row_group_size=tamanho_grupo_linhas,
+    ))
+
+    if manifesto is not None:
+        def escrever_manifesto(temporario: Path) -> None:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f, indent=2, ensure_ascii=False)
+
+        escrever_atomico(caminho_json, escrever_manifesto)
+
+    tamanho_mb = caminho.stat().st_size / (1024 * 1024)
+    print(f"💾 Artefato '{nome}' salvo: {caminho} ({tamanho_mb:.2f} MB, {df_gravar.shape})")
+    return caminho
+
+
+def carregar_artefato(
+    nome: str,
+    colunas: Optional[List[str]] = None,
+    filtros: Optional[Filtros] = None,
+    base_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Lê um artefato Parquet, opcionalmente projetando colunas e filtrando linhas.
+
+    Args:
+        nome: Nome do artefato
+        colunas: Lista de colunas a ler (None = todas)
+        filtros: {'coluna': valor ou [valores]} ou lista de tuplas no formato pyarrow,
+            por exemplo {'code_module': ['AAA', 'BBB'], 'final_result': 'Pass'}
+        base_path: Caminho base do projeto (opcional)
+
+    Returns:
+        DataFrame com as colunas e linhas solicitadas
+    """
+    caminho = caminho_artefato(nome, base_path)
+    if not caminho.is_file():
+        raise FileNotFoundError(f"Artefato '{nome}' não encontrado: {caminho}")
+
+    return pd.read_parquet(
+        caminho,
+        engine='pyarrow',
+        columns=colunas,
+        filters=_normalizar_filtros(filtros),
+    )
+
+
+def aplicar_projecao(df: pd.DataFrame, colunas: Optional[List[str]] = None, filtros: Optional[Filtros] = None) -> pd.DataFrame:
+    """Aplica em memória a mesma seleção de colunas/filtros de carregar_artefato"""
+    for coluna, operador, valor in _normalizar_filtros(filtros) or []:
+        if operador == 'in':
+            df = df[df[coluna].isin(valor)]
+        elif operador == '==':
+            df = df[df[coluna] == valor]
+        else:
+            raise ValueError(f"Operador de filtro não suportado em memória: {operador}")
+    if colunas is not None:
+        df = df[colunas]
+    return df
+
+
+def migrar_pickle_para_parquet(caminho_pickle: Path, nome: str, base_path: Optional[Path] = None) -> Optional[Path]:
+    """
+    Converte um pickle legado (DataFrame) em artefato Parquet.
+
+    Args:
+        caminho_pickle: Caminho do arquivo .pkl
+        nome: Nome do artefato de destino
+        base_path: Caminho base do projeto (opcional)
+
+    Returns:
+        Caminho do artefato gerado ou None se o pickle não contiver um DataFrame
+    """
+    with open(caminho_pickle, 'rb') as f:
+        conteudo = pickle.load(f)
+    if not isinstance(conteudo, pd.DataFrame):
+        print(f"⚠️ {caminho_pickle} não contém um DataFrame; ignorado")
+        return None
+    return salvar_artefato(conteudo, nome, base_path)
+
+
+def migrar_pickles(base_path: Optional[Path] = None, sobrescrever: bool = False) -> Dict[str, Path]:
+    """
+    Migra todos os pickles legados encontrados no projeto para Parquet.
+
+    Args:
+        base_path: Caminho base do projeto (opcional)
+        sobrescrever: Regrava artefatos que já existem
+
+    Returns:
+        Dicionário {nome do artefato: caminho gerado}
+    """
+    base = Path(base_path) if base_path is not None else BASE_PATH
+    migrados = {}
+
+    for arquivo, nome in PICKLES_LEGADOS.items():
+        caminho_pickle = base / arquivo
+        if not caminho_pickle.is_file() or nome in migrados:
+            continue
+        if artefato_existe(nome, base_path) and not sobrescrever:
+            print(f"⏭️ Artefato '{nome}' já existe; {arquivo} não migrado")
+            continue
+        try:
+            caminho = migrar_pickle_para_parquet(caminho_pickle, nome, base_path)
+            if caminho is not None:
+                migrados[nome] = caminho
+        except Exception as e:
+            print(f"❌ Erro ao migrar {arquivo}: {e}")
+
+    return migrados
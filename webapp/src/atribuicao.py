@@ -0,0 +1,190 @@
+"""
+Atribuição por caminho nas árvores (contribuições de Saabas).
+
+A previsão de uma árvore é o valor da raiz mais as variações de valor ao
+longo do caminho até a folha; cada variação é creditada à feature que
+dividiu o nó pai. Numa floresta a previsão é a média das árvores, e as
+contribuições também. A decomposição é exata: viés + soma das contribuições
+reproduz `predict` (regressão) ou `predict_proba` (classificação). Não são
+valores de Shapley: a ordem das divisões no caminho influencia o crédito.
+
+`contribuicoes_caminho` calcula tudo para todas as amostras de uma vez.
+`decision_path` da floresta devolve a matriz esparsa amostra × nó de todas as
+árvores, e cada nó carrega um único par (feature, variação). O produto dessas
+duas matrizes esparsas percorre as árvores uma única vez, sem reavaliar o
+modelo como a importância por permutação. As colunas codificadas (one-hot)
+são somadas de volta à coluna original com os grupos de `importancia`.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import is_classifier
+from sklearn.pipeline import Pipeline
+from sklearn.tree import BaseDecisionTree
+from sklearn.utils import Bunch
+
+try:
+    from .floresta_compilada import FLORESTAS
+    from .importancia import _grupos_pipeline
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from floresta_compilada import FLORESTAS
+    from importancia import _grupos_pipeline
+
+
+def _arvores(estimador: Any) -> List[BaseDecisionTree]:
+    """Árvores cuja média é a previsão do estimador (ValueError se não for árvore/floresta)"""
+    if isinstance(estimador, BaseDecisionTree):
+        arvores = [estimador]
+    elif isinstance(estimador, FLORESTAS):
+        arvores = list(estimador.estimators_)
+    else:
+        raise ValueError(
+            f"Atribuição por caminho indisponível para {type(estimador).__name__}: "
+            f"use uma árvore de decisão ou uma floresta (RandomForest/ExtraTrees)"
+        )
+    if arvores[0].tree_.n_outputs != 1:
+        raise ValueError("Atribuição por caminho indisponível para modelos com várias saídas")
+    return arvores
+
+
+def _variacoes_arvore(arvore: BaseDecisionTree, classificador: bool):
+    """Valor da raiz e, para cada nó não raiz, a feature do pai e a variação de valor"""
+    estrutura = arvore.tree_
+    valores = estrutura.value[:, 0, :]
+    if classificador:
+        # predict_proba da árvore: contagens (ou frações) da folha normalizadas
+        valores = valores / valores.sum(axis=1, keepdims=True)
+
+    pais = np.full(estrutura.node_count, -1, dtype=np.intp)
+    internos = np.flatnonzero(estrutura.children_left >= 0)
+    pais[estrutura.children_left[internos]] = internos
+    pais[estrutura.children_right[internos]] = internos
+    filhos = np.flatnonzero(pais >= 0)
+    return valores[0], filhos, estrutura.feature[pais[filhos]], valores[filhos] - valores[pais[filhos]]
+
+
+def contribuicoes_caminho(modelo: Any, X: pd.DataFrame) -> Bunch:
+    """
+    Contribuição de cada coluna original na previsão de cada amostra.
+
+    Args:
+        modelo: Floresta/árvore ajustada, ou Pipeline cujo último passo é uma
+            árvore ou floresta
+        X: Amostras com as colunas originais
+
+    Returns:
+        Bunch com vies (escalar, ou um por classe), contribuicoes
+        (n_amostras × n_colunas, com um último eixo por classe na
+        classificação), colunas, classes (None na regressão) e previsao
+        (viés + soma das contribuições, igual a predict/predict_proba)
+    """
+    colunas = list(X.columns)
+    if isinstance(modelo, Pipeline) and len(modelo) > 1:
+        estimador = modelo[-1]
+        transformado = modelo[:-1].transform(X)
+        grupos = _grupos_pipeline(modelo[:-1], colunas)
+    else:
+        estimador = modelo[-1] if isinstance(modelo, Pipeline) else modelo
+        transformado = X
+        grupos = {c: np.asarray([i]) for i, c in enumerate(colunas)}
+
+    classificador = is_classifier(estimador)
+    arvores = _arvores(estimador)
+    if isinstance(estimador, BaseDecisionTree):
+        caminhos, inicio_nos = estimador.decision_path(transformado), np.asarray([0])
+    else:
+        caminhos, inicio_nos = estimador.decision_path(transformado)
+
+    # Uma linha por nó de todas as árvores, com a variação na coluna da feature do pai
+    n_features = estimador.n_features_in_
+    n_saidas = arvores[0].tree_.value.shape[2]
+    vies = np.zeros(n_saidas)
+    linhas, colunas_matriz, dados = [], [], []
+    for arvore, inicio in zip(arvores, inicio_nos):
+        raiz, filhos, features, variacoes = _variacoes_arvore(arvore, classificador)
+        vies += raiz
+        linhas.append(np.repeat(inicio + filhos, n_saidas))
+        colunas_matriz.append((features[:, None] * n_saidas + np.arange(n_saidas)).ravel())
+        dados.append(variacoes.ravel())
+    variacoes_nos = sparse.csr_matrix(
+        (np.concatenate(dados), (np.concatenate(linhas), np.concatenate(colunas_matriz))),
+        shape=(caminhos.shape[1], n_features * n_saidas),
+    )
+    por_saida = np.asarray((caminhos.astype(np.float64) @ variacoes_nos).todense())
+    por_saida = por_saida.reshape(len(X), n_features, n_saidas) / len(arvores)
+    vies /= len(arvores)
+
+    # Blocos codificados (one-hot) somados de volta à coluna original
+    contribuicoes = np.zeros((len(X), len(colunas), n_saidas))
+    for i, coluna in enumerate(colunas):
+        if len(grupos[coluna]):
+            contribuicoes[:, i] = por_saida[:, grupos[coluna]].sum(axis=1)
+
+    if not classificador:
+        vies, contribuicoes = vies[0], contribuicoes[..., 0]
+    return Bunch(
+        vies=vies,
+        contribuicoes=contribuicoes,
+        colunas=colunas,
+        classes=estimador.classes_ if classificador else None,
+        previsao=vies + contribuicoes.sum(axis=1),
+        indice=X.index,
+    )
+
+
+def importancia_atribuicao(resultado: Bunch) -> pd.DataFrame:
+    """
+    Importância global: média do valor absoluto das contribuições.
+
+    Na classificação, a média também é tomada entre as classes (escala de
+    probabilidade). Mesmo formato de `importancia_por_coluna`.
+    """
+    magnitude = np.abs(resultado.contribuicoes)
+    if magnitude.ndim == 3:
+        magnitude = magnitude.mean(axis=2)
+    return pd.DataFrame({
+        'feature': resultado.colunas,
+        'importance': magnitude.mean(axis=0),
+    }).sort_values('importance', ascending=True, ignore_index=True)
+
+
+def explicacao_por_amostra(resultado: Bunch, classe: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Contribuições de cada amostra para uma única saída do modelo.
+
+    Args:
+        resultado: Saída de contribuicoes_caminho
+        classe: Classe a explicar (classificação); None explica a classe
+            prevista de cada amostra
+
+    Returns:
+        Dicionário com contribuicoes (DataFrame amostra × coluna), base e
+        previsao (Series; probabilidade da classe explicada na
+        classificação) e classe (Series, ou None na regressão)
+    """
+    indice = resultado.indice
+    if resultado.classes is None:
+        return {
+            'contribuicoes': pd.DataFrame(resultado.contribuicoes, index=indice, columns=resultado.colunas),
+            'base': pd.Series(resultado.vies, index=indice),
+            'previsao': pd.Series(resultado.previsao, index=indice),
+            'classe': None,
+        }
+
+    if classe is None:
+        posicoes = resultado.previsao.argmax(axis=1)
+    else:
+        posicoes = np.full(len(indice), list(resultado.classes).index(classe))
+    linhas = np.arange(len(indice))
+    return {
+        'contribuicoes': pd.DataFrame(
+            resultado.contribuicoes[linhas, :, posicoes], index=indice, columns=resultado.colunas
+        ),
+        'base': pd.Series(resultado.vies[posicoes], index=indice),
+        'previsao': pd.Series(resultado.previsao[linhas, posicoes], index=indice),
+        'classe': pd.Series(resultado.classes[posicoes], index=indice),
+    }
@@ -0,0 +1,137 @@
+"""
+Coordenação entre processos para gerar artefatos em disco.
+
+Várias sessões do Streamlit (e scripts de manutenção) podem perceber ao mesmo
+tempo que um artefato está ausente ou desatualizado. `bloqueio_exclusivo`
+garante que apenas um processo reconstrua o arquivo enquanto os demais
+esperam e, ao obter o bloqueio, verificam de novo se o trabalho já foi feito.
+`escrever_atomico` grava em um arquivo temporário no mesmo diretório e o
+renomeia para o destino, então leitores nunca veem um arquivo pela metade.
+"""
+
+import os
+import pickle
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+Caminho = Union[str, Path]
+
+
+class TempoEsgotadoBloqueio(TimeoutError):
+    """O bloqueio não foi obtido dentro do tempo limite"""
+
+
+def caminho_bloqueio(caminho: Caminho) -> Path:
+    """Arquivo de bloqueio associado a um artefato"""
+    caminho = Path(caminho)
+    return caminho.with_name(caminho.name + ".lock")
+
+
+def _tentar_bloquear(arquivo) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _desbloquear(arquivo) -> None:
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    else:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def bloqueio_exclusivo(
+    caminho: Caminho,
+    timeout: Optional[float] = None,
+    intervalo: float = 0.1,
+) -> Iterator[bool]:
+    """
+    Obtém um bloqueio exclusivo entre processos para o artefato `caminho`.
+
+    O bloqueio é feito sobre `<caminho>.lock` e também exclui outras threads
+    do mesmo processo. Quem chega enquanto outro processo reconstrói o
+    artefato fica esperando; ao entrar no bloco deve verificar novamente se o
+    artefato já está pronto antes de reconstruí-lo.
+
+    Args:
+        caminho: Caminho do artefato protegido
+        timeout: Segundos máximos de espera (None = espera indefinidamente)
+        intervalo: Intervalo entre tentativas enquanto espera
+
+    Yields:
+        True se foi preciso esperar por outro processo, False caso contrário
+    """
+    arquivo_bloqueio = caminho_bloqueio(caminho)
+    arquivo_bloqueio.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(arquivo_bloqueio, 'a+') as arquivo:
+        esperou = False
+        inicio = time.monotonic()
+        while not _tentar_bloquear(arquivo):
+            if not esperou:
+                print(f"⏳ Aguardando outro processo gerar {Path(caminho).name}...")
+                esperou = True
+            if timeout is not None and time.monotonic() - inicio > timeout:
+                raise TempoEsgotadoBloqueio(f"Bloqueio de {caminho} não obtido em {timeout}s")
+            time.sleep(intervalo)
+        try:
+            yield esperou
+        finally:
+            _desbloquear(arquivo)
+
+
+def escrever_atomico(caminho: Caminho, escrever: Callable[[Path], Any]) -> Path:
+    """
+    Grava um arquivo de forma atômica.
+
+    `escrever` recebe o caminho de um arquivo temporário no mesmo diretório do
+    destino; depois que ele termina o temporário é renomeado sobre o destino
+    com os.replace. Em caso de erro o temporário é removido e o destino antigo
+    permanece intacto.
+
+    Args:
+        caminho: Caminho final do arquivo
+        escrever: Função que grava o conteúdo no caminho recebido
+
+    Returns:
+        Caminho final do arquivo
+    """
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=f".{caminho.name}.", suffix=".tmp")
+    os.close(descritor)
+    temporario = Path(temporario)
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+    return caminho
+
+
+def salvar_pickle_atomico(objeto: Any, caminho: Caminho) -> Path:
+    """Serializa `objeto` com pickle gravando de forma atômica"""
+    def escrever(temporario: Path) -> None:
+        with open(temporario, 'wb') as f:
+            pickle.dump(objeto, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    return escrever_atomico(caminho, escrever)
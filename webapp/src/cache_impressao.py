@@ -0,0 +1,161 @@
+"""
+Cache em memória chaveado por uma impressão já calculada dos dados.
+
+`st.cache_data`/`st.cache_resource` descobrem o acerto hasheando os
+argumentos: com os DataFrames de treino do OULAD isso custa segundos a cada
+rerun, só para devolver o que já estava em memória. `cache_por_impressao`
+usa como chave uma impressão barata, calculada antes (hash do manifesto do
+artefato + parâmetros de divisão e do modelo, ver `modelos.impressao_divisao`),
+e nunca olha o conteúdo dos outros argumentos: um acerto é uma consulta a um
+dicionário. O cache é do processo (compartilhado pelas sessões, como
+`st.cache_resource`), calcula cada chave uma única vez mesmo com sessões
+concorrentes e conta acertos e falhas.
+
+Os scripts das páginas são reexecutados a cada rerun, o que redefine as
+funções decoradas; o cache é localizado pelo arquivo, nome e bytecode da
+função, de modo que a nova definição reaproveita os valores e contadores da
+anterior (e uma função editada começa um cache novo).
+"""
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class CacheImpressao:
+    """
+    Valores de uma função por impressão dos dados, com contadores de acertos e falhas.
+
+    Args:
+        funcao: Função cara (treino, importância...)
+        impressao: Calcula a chave a partir dos argumentos (padrão: o primeiro argumento)
+        max_entradas: Entradas mantidas; a menos usada recentemente sai primeiro
+    """
+
+    def __init__(self, funcao: Callable[..., Any], impressao: Optional[Callable[..., Hashable]] = None,
+                 max_entradas: int = 4):
+        self.funcao = funcao
+        self.impressao = impressao
+        self.max_entradas = max_entradas
+        self.acertos = 0
+        self.falhas = 0
+        self._valores: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._travas: Dict[Hashable, threading.Lock] = {}
+        self._trava = threading.Lock()
+        functools.update_wrapper(self, funcao)
+
+    def _chave(self, args: tuple, kwargs: dict) -> Hashable:
+        if self.impressao is not None:
+            return self.impressao(*args, **kwargs)
+        if args:
+            return args[0]
+        return next(iter(kwargs.values()))
+
+    def _consultar(self, chave: Hashable):
+        """(True, valor) se a chave está no cache, contando o acerto; chamar com self._trava"""
+        if chave in self._valores:
+            self._valores.move_to_end(chave)
+            self.acertos += 1
+            return True, self._valores[chave]
+        return False, None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        chave = self._chave(args, kwargs)
+        with self._trava:
+            encontrado, valor = self._consultar(chave)
+            if encontrado:
+                return valor
+            trava_chave = self._travas.setdefault(chave, threading.Lock())
+
+        # Uma sessão calcula; as outras que pedirem a mesma chave esperam e reaproveitam
+        with trava_chave:
+            with self._trava:
+                encontrado, valor = self._consultar(chave)
+                if encontrado:
+                    return valor
+                self.falhas += 1
+            try:
+                valor = self.funcao(*args, **kwargs)
+                with self._trava:
+                    self._valores[chave] = valor
+                    while len(self._valores) > self.max_entradas:
+                        self._valores.popitem(last=False)
+            finally:
+                with self._trava:
+                    self._travas.pop(chave, None)
+        return valor
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Acertos, falhas, taxa de acerto e entradas em memória"""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'funcao': self.__qualname__,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+                'entradas': len(self._valores),
+            }
+
+    def limpar(self) -> None:
+        """Descarta os valores e zera os contadores"""
+        with self._trava:
+            self._valores.clear()
+            self.acertos = self.falhas = 0
+
+
+_caches: Dict[str, CacheImpressao] = {}
+_trava_caches = threading.Lock()
+
+
+def _assinatura_codigo(codigo: CodeType, hasher: Any) -> None:
+    """Alimenta o hash com o bytecode e as constantes (inclusive de funções internas)"""
+    hasher.update(codigo.co_code)
+    for constante in codigo.co_consts:
+        if isinstance(constante, CodeType):
+            _assinatura_codigo(constante, hasher)
+        else:
+            hasher.update(repr(constante).encode('utf-8'))
+
+
+def _identificador_funcao(funcao: Callable[..., Any]) -> str:
+    """Arquivo, nome e versão do código: estável entre reruns da página, muda se a função for editada"""
+    hasher = hashlib.sha256()
+    _assinatura_codigo(funcao.__code__, hasher)
+    return f"{funcao.__code__.co_filename}:{funcao.__qualname__}:{hasher.hexdigest()[:12]}"
+
+
+def cache_por_impressao(impressao: Optional[Callable[..., Hashable]] = None, max_entradas: int = 4):
+    """
+    Decorador: guarda o resultado da função por impressão dos dados, sem hashear os argumentos.
+
+    Args:
+        impressao: Função dos mesmos argumentos que devolve a chave (hashable);
+            por padrão a chave é o primeiro argumento, que deve ser a impressão
+        max_entradas: Entradas mantidas por função
+
+    Returns:
+        Decorador que produz um CacheImpressao (chamável como a função
+        original, com estatisticas() e limpar())
+    """
+    def decorador(funcao: Callable[..., Any]) -> CacheImpressao:
+        identificador = _identificador_funcao(funcao)
+        with _trava_caches:
+            cache = _caches.get(identificador)
+            if cache is None:
+                cache = _caches[identificador] = CacheImpressao(funcao, impressao, max_entradas)
+            else:
+                # Rerun da página: mesma função redefinida, valores e contadores preservados
+                cache.funcao, cache.impressao = funcao, impressao
+        return cache
+    return decorador
+
+
+def estatisticas_caches() -> List[Dict[str, Any]]:
+    """Estatísticas de todos os caches por impressão deste processo"""
+    with _trava_caches:
+        caches = list(_caches.values())
+    return [cache.estatisticas() for cache in caches]
@@ -0,0 +1,192 @@
+"""
+Cache que continua servindo o valor anterior enquanto o recarrega em segundo plano.
+
+Com `st.cache_resource(ttl=...)` todas as entradas vencem de uma vez e o
+próximo visitante espera pela recarga inteira (dados, modelo, importância por
+permutação). `cache_revalidado` guarda o último valor de cada chave junto
+da versão dos dados de que ele veio:
+
+- se a versão atual (ex.: hash do manifesto do artefato) é a mesma e o TTL
+  não passou, o valor é servido direto;
+- se a versão mudou ou o TTL passou, o valor anterior continua sendo servido
+  e uma única thread por chave recarrega em segundo plano; quando termina,
+  o novo valor substitui o anterior;
+- sem valor algum (primeiro acesso), a carga é feita na hora;
+- uma recarga que falha mantém o valor anterior e só é tentada de novo após
+  `espera_apos_falha` segundos (ou quando a versão mudar outra vez).
+
+A versão é consultada a cada acesso, de modo que regenerar um artefato
+dispara a recarga no próximo acesso, sem esperar o TTL.
+"""
+
+import functools
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class CacheRevalidado:
+    """
+    Último valor por chave (os argumentos), revalidado em segundo plano.
+
+    Args:
+        carregar: Função cara que produz o valor
+        versao: Função dos mesmos argumentos que devolve a versão atual dos dados
+        ttl: Idade máxima (s) antes de revalidar mesmo sem mudança de versão; None desativa
+        espera_apos_falha: Segundos antes de tentar de novo uma recarga que falhou
+    """
+
+    def __init__(self, carregar: Callable[..., Any], versao: Callable[..., Hashable],
+                 ttl: Optional[float] = None, espera_apos_falha: float = 60.0):
+        self.carregar = carregar
+        self.versao = versao
+        self.ttl = ttl
+        self.espera_apos_falha = espera_apos_falha
+        self._entradas: Dict[Hashable, Dict[str, Any]] = {}
+        self._recargas: Dict[Hashable, threading.Thread] = {}
+        self._falhas: Dict[Hashable, Dict[str, Any]] = {}
+        self._trava = threading.Lock()
+        self._trava_primeira_carga = threading.Lock()
+        self.contadores = {'frescos': 0, 'velhos': 0, 'recargas': 0, 'falhas': 0}
+        functools.update_wrapper(self, carregar)
+
+    def _vencida(self, entrada: Dict[str, Any], versao: Hashable) -> bool:
+        if entrada['versao'] != versao:
+            return True
+        return self.ttl is not None and time.monotonic() - entrada['carregado_em'] > self.ttl
+
+    def _guardar(self, chave: Hashable, valor: Any, versao: Hashable) -> None:
+        self._entradas[chave] = {'valor': valor, 'versao': versao, 'carregado_em': time.monotonic()}
+        self._falhas.pop(chave, None)
+
+    def __call__(self, *args: Any) -> Any:
+        chave = args
+        versao = self.versao(*args)
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and not self._vencida(entrada, versao):
+                self.contadores['frescos'] += 1
+                return entrada['valor']
+            if entrada is not None:
+                self.contadores['velhos'] += 1
+                self._disparar(chave, args, versao)
+                return entrada['valor']
+
+        # Nenhum valor ainda: a primeira carga é síncrona (uma sessão carrega, as outras esperam)
+        with self._trava_primeira_carga:
+            with self._trava:
+                entrada = self._entradas.get(chave)
+                if entrada is not None:
+                    self.contadores['frescos'] += 1
+                    return entrada['valor']
+            valor = self.carregar(*args)
+            with self._trava:
+                self.contadores['recargas'] += 1
+                self._guardar(chave, valor, versao)
+        return valor
+
+    def _disparar(self, chave: Hashable, args: tuple, versao: Hashable) -> None:
+        """Agenda a recarga da chave, se nenhuma estiver em andamento; chamar com self._trava"""
+        if chave in self._recargas:
+            return
+        falha = self._falhas.get(chave)
+        if falha is not None and falha['versao'] == versao \
+                and time.monotonic() - falha['momento'] < self.espera_apos_falha:
+            return
+        recarga = threading.Thread(
+            target=self._recarregar, args=(chave, args, versao),
+            name=f"revalidar-{self.__qualname__}", daemon=True,
+        )
+        self._recargas[chave] = recarga
+        recarga.start()
+
+    def _recarregar(self, chave: Hashable, args: tuple, versao: Hashable) -> None:
+        try:
+            print(f"🔄 Revalidando {self.__qualname__}{args} em segundo plano (versão {versao})")
+            valor = self.carregar(*args)
+            with self._trava:
+                self.contadores['recargas'] += 1
+                self._guardar(chave, valor, versao)
+        except Exception as e:
+            print(f"⚠️ Falha ao revalidar {self.__qualname__}{args}: {e}")
+            with self._trava:
+                self.contadores['falhas'] += 1
+                self._falhas[chave] = {
+                    'versao': versao, 'momento': time.monotonic(),
+                    'erro': f'{type(e).__name__}: {e}', 'detalhes': traceback.format_exc(),
+                }
+        finally:
+            with self._trava:
+                self._recargas.pop(chave, None)
+
+    def tem_valor(self, *args: Any) -> bool:
+        """Indica se já há um valor (fresco ou velho) para servir sem esperar"""
+        with self._trava:
+            return args in self._entradas
+
+    def revalidando(self, *args: Any) -> bool:
+        """Indica se há uma recarga em andamento para estes argumentos"""
+        with self._trava:
+            return args in self._recargas
+
+    def erro(self, *args: Any) -> Optional[str]:
+        """Erro da última recarga que falhou para estes argumentos (None se não houve)"""
+        with self._trava:
+            falha = self._falhas.get(args)
+            return falha['erro'] if falha else None
+
+    def esperar(self, timeout: Optional[float] = None) -> None:
+        """Espera as recargas em andamento terminarem"""
+        with self._trava:
+            recargas = list(self._recargas.values())
+        for recarga in recargas:
+            recarga.join(timeout)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Acessos servidos frescos ou velhos (durante a revalidação), recargas e falhas"""
+        with self._trava:
+            return {
+                'funcao': self.__qualname__,
+                **self.contadores,
+                'entradas': len(self._entradas),
+                'revalidando': len(self._recargas),
+            }
+
+    def limpar(self) -> None:
+        """Descarta os valores (as recargas em andamento terminam e guardam o resultado)"""
+        with self._trava:
+            self._entradas.clear()
+            self._falhas.clear()
+            self.contadores = dict.fromkeys(self.contadores, 0)
+
+
+_caches: List[CacheRevalidado] = []
+
+
+def cache_revalidado(versao: Callable[..., Hashable], ttl: Optional[float] = None,
+                     espera_apos_falha: float = 60.0):
+    """
+    Decorador: serve o último valor e revalida em segundo plano quando a versão muda ou o TTL passa.
+
+    Os argumentos da função decorada formam a chave (devem ser hashable e
+    baratos: nomes de dataset, tipos de tarefa...).
+
+    Args:
+        versao: Função dos mesmos argumentos que devolve a versão atual dos dados
+        ttl: Idade máxima (s) antes de revalidar mesmo sem mudança de versão
+        espera_apos_falha: Segundos antes de tentar de novo uma recarga que falhou
+
+    Returns:
+        Decorador que produz um CacheRevalidado
+    """
+    def decorador(funcao: Callable[..., Any]) -> CacheRevalidado:
+        cache = CacheRevalidado(funcao, versao, ttl, espera_apos_falha)
+        _caches.append(cache)
+        return cache
+    return decorador
+
+
+def estatisticas_revalidacao() -> List[Dict[str, Any]]:
+    """Estatísticas de todos os caches revalidados deste processo"""
+    return [cache.estatisticas() for cache in list(_caches)]
@@ -3,78 +3,241 @@ import pandas as pd
 from pathlib import Path
 import pickle
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+try:
+    from .armazenamento import (
+        artefato_existe, carregar_artefato, salvar_artefato, aplicar_projecao,
+        calcular_manifesto, caminho_artefato, diferencas_manifesto, fontes_artefato, fontes_disponiveis, ler_manifesto
+    )
+    from .agregados_vle import AgregadosCliques
+    from .bloqueio import bloqueio_exclusivo
+    from .esquema import aplicar_esquema
+    from .instrumentacao import etapa, instrumentar
+    from .contagem_aproximada import erro_distintos, gravar_esbocos, motor_distintos
+    from .cubo_estudantes import gravar_cubo
+    from .resumo_metricas import gravar_resumo
+    from .memoria_compartilhada import (
+        caminho_ipc, ler_manifesto_publicado, mapear_conjunto, memoria_compartilhada_ativa, publicar_conjunto
+    )
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import (
+        artefato_existe, carregar_artefato, salvar_artefato, aplicar_projecao,
+        calcular_manifesto, caminho_artefato, diferencas_manifesto, fontes_artefato, fontes_disponiveis, ler_manifesto
+    )
+    from agregados_vle import AgregadosCliques
+    from bloqueio import bloqueio_exclusivo
+    from esquema import aplicar_esquema
+    from instrumentacao import etapa, instrumentar
+    from contagem_aproximada import erro_distintos, gravar_esbocos, motor_distintos
+    from cubo_estudantes import gravar_cubo
+    from resumo_metricas import gravar_resumo
+    from memoria_compartilhada import (
+        caminho_ipc, ler_manifesto_publicado, mapear_conjunto, memoria_compartilhada_ativa, publicar_conjunto
+    )
 
-def carregar_uci_dados(pickle_path: str = "../uci_dataframe.pkl") -> pd.DataFrame:
-    """Carrega dados UCI processados do arquivo pickle"""
-    # Tentar diferentes caminhos para o arquivo pickle
-    possible_paths = [
-        pickle_path,
-        f"../{pickle_path}",
-        f"../../{pickle_path}",
-        Path(__file__).parent.parents[1] / "uci_dataframe.pkl"
-    ]
-    
-    df = None
-    for path in possible_paths:
-        p = Path(path)
-        if p.is_file():
-            try:
-                with p.open("rb") as f:
-                    df = pickle.load(f)
-                if isinstance(df, pd.DataFrame):
-                    break
-            except Exception as e:
-                continue
-    
-    if df is None:
-        raise FileNotFoundError(f"Arquivo uci_dataframe.pkl não encontrado em nenhum dos caminhos: {possible_paths}")
-    
-    return df
+# Incrementar sempre que o código que gera o artefato mudar o resultado
+VERSAO_TRANSFORMACAO_UCI = 2
+VERSAO_TRANSFORMACAO_OULAD = 2
 
-def carregar_oulad_dados(pickle_path: str = "../oulad_data.pkl") -> pd.DataFrame:
-    """Carrega dados OULAD - tenta carregar do pickle otimizado, se não conseguir carrega dados brutos"""
-    # Primeiro, tentar carregar dados processados do pickle otimizado
+# Modo padrão do artefato OULAD: o 'legado' lê só as primeiras linhas do studentVle (ver FILE_CONFIGS_OULAD)
+MODO_PADRAO_OULAD = 'agregado'
+
+def _ler_pickle_legado(nome_arquivo, pickle_path):
+    """Procura um pickle legado em caminhos relativos usuais e retorna o DataFrame (ou None)"""
     possible_paths = [
         pickle_path,
         f"../{pickle_path}",
         f"../../{pickle_path}",
-        Path(__file__).parent.parents[1] / "oulad_data.pkl"
+        Path(__file__).parent.parents[1] / nome_arquivo
     ]
     
-    df = None
     for path in possible_paths:
         p = Path(path)
         if p.is_file():
             try:
-                print(f"🔄 Carregando dados OULAD do pickle: {p}")
+                print(f"🔄 Carregando pickle legado: {p}")
                 with p.open("rb") as f:
                     content = pickle.load(f)
                 if isinstance(content, pd.DataFrame):
-                    df = content
-                    print(f"✅ Dados OULAD carregados: {df.shape}")
-                    break
+                    return content
             except Exception as e:
                 print(f"⚠️ Erro ao carregar pickle {p}: {e}")
-                continue
-    
-    if df is None:
+    return None
+
+def manifesto_uci():
+    """Manifesto esperado do artefato UCI para os CSVs atuais"""
+    return calcular_manifesto(fontes_artefato('uci'), VERSAO_TRANSFORMACAO_UCI, anterior=ler_manifesto('uci'))
+
+def manifesto_oulad(modo=None):
+    """
+    Manifesto esperado do artefato OULAD para os CSVs atuais
+    
+    Com modo=None vale MODO_PADRAO_OULAD: um artefato gerado no modo 'legado'
+    (studentVle truncado) é reconstruído no modo agregado quando as fontes existem.
+    """
+    anterior = ler_manifesto('oulad')
+    if modo is None:
+        modo = MODO_PADRAO_OULAD
+    return calcular_manifesto(
+        fontes_artefato('oulad'), VERSAO_TRANSFORMACAO_OULAD, parametros={'modo': modo}, anterior=anterior
+    )
+
+def _gravar_derivados(nome, df, esbocos=None):
+    """
+    Grava o resumo de métricas do painel e, no OULAD, o cubo de estudantes do
+    artefato recém-gerado (falhas não impedem o uso dos dados)
+    
+    Os esboços de estudantes ativos da leitura em blocos, se houver, são
+    gravados antes, para o resumo combiná-los.
+    """
+    derivados = [('resumo de métricas', gravar_resumo)]
+    if esbocos is not None:
+        derivados.insert(0, ('esboços de estudantes ativos', lambda nome, _: gravar_esbocos(nome, esbocos)))
+    if nome == 'oulad':
+        derivados.append(('cubo de estudantes', gravar_cubo))
+    for descricao, gravar in derivados:
+        try:
+            gravar(nome, df)
+        except Exception as e:
+            print(f"⚠️ Não foi possível gravar o {descricao} '{nome}': {e}")
+
+def construir_artefato_uci(manifesto=None):
+    """Gera o artefato UCI a partir dos CSVs e grava junto o manifesto das fontes e o resumo de métricas"""
+    manifesto = manifesto or manifesto_uci()
+    df = carregar_dados_uci_raw()
+    salvar_artefato(df, 'uci', manifesto=manifesto)
+    _gravar_derivados('uci', df)
+    return df
+
+def construir_artefato_oulad(manifesto=None):
+    """Gera o artefato OULAD a partir dos CSVs e grava junto o manifesto das fontes, o resumo de métricas e o cubo"""
+    manifesto = manifesto or manifesto_oulad()
+    modo = manifesto['parametros']['modo']
+    # Com o motor 'hll', a leitura em blocos do studentVle já acumula os esboços de estudantes ativos
+    erro = erro_distintos() if modo == 'agregado' and motor_distintos() == 'hll' else None
+    dataframes_oulad = carregar_dados_oulad_raw(streaming_vle=(modo == 'agregado'), erro_distintos=erro)
+    df = processar_dados_oulad(dataframes_oulad, modo=modo)
+    salvar_artefato(df, 'oulad', manifesto=manifesto)
+    agregados = dataframes_oulad.get('studentVle_agregado')
+    _gravar_derivados('oulad', df, esbocos=agregados.distintos if agregados is not None else None)
+    return df
+
+def _servir_compartilhado(nome, manifesto, carregar_completo, colunas, filtros):
+    """
+    Serve o conjunto publicado em Arrow IPC (mapeado sem cópia), publicando-o
+    antes com carregar_completo() se ainda não existir ou estiver desatualizado.
+    
+    carregar_completo() devolve o DataFrame e o manifesto dos dados de que ele
+    veio: se a reconstrução falhou e os dados são do artefato antigo ou do
+    pickle, eles são publicados com esse manifesto (ou nem republicados, se já
+    estiverem publicados), nunca com o manifesto novo. Assim a próxima
+    chamada ainda vê a publicação como desatualizada e tenta reconstruir.
+    """
+    if diferencas_manifesto(ler_manifesto_publicado(nome), manifesto):
+        # Apenas um processo publica; os demais esperam e mapeiam o resultado
+        with bloqueio_exclusivo(caminho_ipc(nome)):
+            publicado = ler_manifesto_publicado(nome)
+            if diferencas_manifesto(publicado, manifesto):
+                df, origem = carregar_completo()
+                if origem is not None and publicado is not None and not diferencas_manifesto(publicado, origem):
+                    # Reconstrução indisponível e os mesmos dados antigos já estão publicados
+                    print(f"⚠️ Mantendo o conjunto '{nome}' já publicado sem validação das fontes")
+                else:
+                    publicar_conjunto(df, nome, manifesto=origem)
+    
+    if filtros is None:
+        return mapear_conjunto(nome, colunas=colunas)
+    return aplicar_projecao(mapear_conjunto(nome), colunas, filtros)
+
+def _carregar_ou_reconstruir(nome, manifesto, construir, nome_pickle, pickle_path, colunas, filtros):
+    """Carrega localmente ou, com SIDA_MEMORIA_COMPARTILHADA ativo, pelo conjunto publicado"""
+    # O esquema também vale para artefatos e pickles gerados antes do registro de tipos
+    if memoria_compartilhada_ativa():
+        def carregar_completo():
+            df, origem = _carregar_local_com_origem(nome, manifesto, construir, nome_pickle, pickle_path, None, None)
+            return aplicar_esquema(df, nome, verbose=False), origem
+        return _servir_compartilhado(nome, manifesto, carregar_completo, colunas, filtros)
+    df = _carregar_local(nome, manifesto, construir, nome_pickle, pickle_path, colunas, filtros)
+    return aplicar_esquema(df, nome, verbose=False)
+
+def _carregar_local(nome, manifesto, construir, nome_pickle, pickle_path, colunas, filtros):
+    """
+    Devolve o artefato se o manifesto gravado bate com as fontes atuais; senão
+    reconstrói a partir dos CSVs sob bloqueio exclusivo. Sem as fontes, usa o
+    artefato existente ou o pickle legado, mesmo que possivelmente desatualizados.
+    """
+    return _carregar_local_com_origem(nome, manifesto, construir, nome_pickle, pickle_path, colunas, filtros)[0]
+
+def _carregar_local_com_origem(nome, manifesto, construir, nome_pickle, pickle_path, colunas, filtros):
+    """
+    Como _carregar_local, devolvendo também o manifesto dos dados carregados:
+    `manifesto` se estão atualizados, o gravado no artefato antigo ou None
+    (pickle legado) quando a reconstrução não foi possível.
+    """
+    existe = artefato_existe(nome)
+    anterior = None
+    if existe:
+        anterior = ler_manifesto(nome)
+        motivos = diferencas_manifesto(anterior, manifesto)
+        if not motivos:
+            return carregar_artefato(nome, colunas=colunas, filtros=filtros), manifesto
+        print(f"♻️ Artefato '{nome}' desatualizado: {'; '.join(motivos)}")
+    
+    if fontes_disponiveis(manifesto):
         try:
-            print("🔄 Carregando dados OULAD brutos...")
-            dataframes_oulad = carregar_dados_oulad_raw()
-            df = processar_dados_oulad(dataframes_oulad)
-            
-            # Salvar pickle otimizado para próximas execuções
-            print("💾 Salvando dados processados em pickle...")
-            pickle_path_final = Path(__file__).parent.parents[1] / "oulad_data.pkl"
-            with open(pickle_path_final, 'wb') as f:
-                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
-            print(f"✅ Dados salvos em: {pickle_path_final}")
-            
+            # Um único processo reconstrói; os demais esperam e reaproveitam o resultado
+            with bloqueio_exclusivo(caminho_artefato(nome)):
+                if artefato_existe(nome) and not diferencas_manifesto(ler_manifesto(nome), manifesto):
+                    print(f"✅ Artefato '{nome}' reconstruído por outro processo")
+                    return carregar_artefato(nome, colunas=colunas, filtros=filtros), manifesto
+                print(f"🔄 Reconstruindo artefato '{nome}' a partir dos CSVs...")
+                return aplicar_projecao(construir(manifesto), colunas, filtros), manifesto
         except Exception as e:
-            raise FileNotFoundError(f"Não foi possível carregar dados OULAD: {e}")
+            print(f"⚠️ Falha ao reconstruir '{nome}': {e}")
+    
+    if existe:
+        print(f"⚠️ Usando artefato '{nome}' existente sem validação das fontes")
+        return carregar_artefato(nome, colunas=colunas, filtros=filtros), anterior
+    
+    df = _ler_pickle_legado(nome_pickle, pickle_path)
+    if df is None:
+        raise FileNotFoundError(f"Não foi possível carregar '{nome}': sem artefato, CSVs de origem ou {nome_pickle}")
+    
+    # Migrar o pickle legado para Parquet para as próximas leituras
+    try:
+        salvar_artefato(df, nome)
+    except Exception as e:
+        print(f"⚠️ Não foi possível migrar {nome_pickle} para Parquet: {e}")
     
+    return aplicar_projecao(df, colunas, filtros), None
+
+def carregar_uci_dados(pickle_path: str = "../uci_dataframe.pkl", colunas=None, filtros=None) -> pd.DataFrame:
+    """Carrega dados UCI processados do artefato Parquet, reconstruindo-o se os CSVs mudaram"""
+    return _carregar_ou_reconstruir(
+        'uci', manifesto_uci(), construir_artefato_uci, "uci_dataframe.pkl", pickle_path, colunas, filtros
+    )
+
+def carregar_oulad_dados(pickle_path: str = "../oulad_data.pkl", colunas=None, filtros=None, modo=None) -> pd.DataFrame:
+    """Carrega dados OULAD - artefato Parquet atualizado, reconstrução a partir dos CSVs ou pickle legado"""
+    print("🔄 Carregando dados OULAD...")
+    df = _carregar_ou_reconstruir(
+        'oulad', manifesto_oulad(modo), construir_artefato_oulad, "oulad_data.pkl", pickle_path, colunas, filtros
+    )
+    print(f"✅ Dados OULAD carregados: {df.shape}")
     return df
 
+def carregar_unificado_dados(colunas=None, filtros=None) -> pd.DataFrame:
+    """Carrega o dataset unificado do artefato Parquet gerado por gerar_dataset_unificado.py"""
+    if memoria_compartilhada_ativa():
+        # A cópia publicada vale enquanto o artefato não for regravado
+        manifesto = ler_manifesto('unificado') or {}
+        return _servir_compartilhado(
+            'unificado', manifesto, lambda: (carregar_artefato('unificado'), manifesto), colunas, filtros
+        )
+    return carregar_artefato('unificado', colunas=colunas, filtros=filtros)
+
 def carregar_dados_uci_raw():
     """Carrega dados UCI brutos dos arquivos CSV"""
     datasets_path = Path(__file__).parent.parents[1] / 'datasets' / 'uci_data'
@@ -97,70 +260,154 @@ def carregar_dados_uci_raw():
     # Transformando valores e tipos de dados
     df['traveltime'] = df['traveltime'].map({1: '<15m', 2: '15-30m', 3: '30-1h', 4: '>1h'})
     df['studytime'] = df['studytime'].map({1: '<2h', 2: '2-5h', 3: '5-10h', 4: '>10h'})
-    df[['Medu','Fedu','famrel','goout','Dalc','Walc','health']] = \
-        df[['Medu','Fedu','famrel','goout','Dalc','Walc','health']].astype('object')
     
-    return df
+    # Tipos do registro de esquemas: escalas ordinais (Medu, Fedu, ...) como categorias ordenadas
+    return aplicar_esquema(df, 'uci')
 
-def carregar_dados_oulad_raw():
-    """Carrega dados OULAD brutos dos arquivos CSV com otimizações"""
-    datasets_path = Path(__file__).parent.parents[1] / 'datasets' / 'oulad_data'
+# Configurações otimizadas para cada arquivo OULAD
+FILE_CONFIGS_OULAD = {
+    'studentVle': {'nrows': 50000, 'dtype': {'id_student': 'int32', 'id_site': 'int32', 'date': 'int32', 'sum_click': 'int16'}},
+    'studentAssessment': {'dtype': {'id_student': 'int32', 'id_assessment': 'int32', 'score': 'float32', 'date_submitted': 'int32'}},
+    'studentInfo': {'dtype': {'id_student': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'gender': 'category', 'region': 'category', 'highest_education': 'category', 'imd_band': 'category', 'age_band': 'category', 'num_of_prev_attempts': 'int8', 'studied_credits': 'int16', 'disability': 'category', 'final_result': 'category'}},
+    'studentRegistration': {'dtype': {'id_student': 'int32', 'code_presentation': 'category', 'date_registration': 'float32', 'date_unregistration': 'float32'}},
+    'assessments': {'dtype': {'id_assessment': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'assessment_type': 'category', 'date': 'float32', 'weight': 'float32'}},
+    'courses': {'dtype': {'code_module': 'category', 'code_presentation': 'category', 'module_presentation_length': 'int16'}},
+    'vle': {'dtype': {'id_site': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'activity_type': 'category', 'week_from': 'float32', 'week_to': 'float32'}}
+}
+
+def agregar_student_vle_em_blocos(file_path=None, df_vle=None, tamanho_bloco=1_000_000, df_info=None,
+                                  erro_distintos=None):
+    """
+    Lê o studentVle.csv completo em blocos de tamanho fixo e devolve os agregados combináveis.
+    
+    Cada bloco usa os mesmos dtypes int32/int16 de FILE_CONFIGS_OULAD e é
+    incorporado a um AgregadosCliques, então o pico de memória é um bloco mais
+    o estado de agregação.
+    
+    Com erro_distintos, cada bloco também alimenta esboços HyperLogLog de
+    estudantes ativos (agregados.distintos), por módulo, tipo de atividade e
+    atributos de df_info, sem nunca montar o conjunto exato de estudantes.
+    """
+    if file_path is None:
+        file_path = Path(__file__).parent.parents[1] / 'datasets' / 'oulad_data' / 'studentVle.csv'
+    
+    agregados = AgregadosCliques(df_vle, df_info=df_info, erro_distintos=erro_distintos)
+    dtype = FILE_CONFIGS_OULAD['studentVle']['dtype']
+    leitor = pd.read_csv(file_path, sep=',', encoding='ISO-8859-1', dtype=dtype, chunksize=tamanho_bloco)
+    for i, bloco in enumerate(leitor, start=1):
+        agregados.atualizar(bloco)
+        print(f"🔄 studentVle bloco {i}: {agregados.linhas_processadas:,} linhas (estado: {agregados.memoria_mb():.1f} MB)")
+    
+    print(f"✅ studentVle agregado em blocos: {agregados.linhas_processadas:,} linhas")
+    if agregados.distintos is not None:
+        print(f"👥 Estudantes ativos no VLE: ~{agregados.distintos.estudantes():,} "
+              f"(HyperLogLog, erro padrão {agregados.distintos.total.erro_padrao:.1%})")
+    return agregados
+
+def _ler_csv_oulad(file_path, df_name, engine=None):
+    """Lê um CSV OULAD com os dtypes de FILE_CONFIGS_OULAD e mede o tempo de leitura"""
+    config = dict(FILE_CONFIGS_OULAD.get(df_name, {}))
+    if 'nrows' in config:
+        print(f"⚠️ ATENÇÃO: {df_name} lido apenas nas primeiras {config['nrows']:,} linhas: métricas de cliques "
+              f"e modelos ficam enviesados. Use streaming_vle=True / modo='agregado' para o arquivo completo")
+        # O leitor do Arrow não aceita nrows; arquivos truncados usam o parser C
+        if engine == 'pyarrow':
+            engine = None
+    
+    inicio = time.perf_counter()
+    df = pd.read_csv(
+        file_path, 
+        sep=',', 
+        encoding='ISO-8859-1',
+        engine=engine,
+        **config
+    )
+    df.attrs['tempo_carga_s'] = time.perf_counter() - inicio
+    return df_name, df
+
+def carregar_dados_oulad_raw(streaming_vle=False, tamanho_bloco=1_000_000, paralelo=None, max_workers=None, engine=None,
+                             datasets_path=None, erro_distintos=None):
+    """
+    Carrega dados OULAD brutos dos arquivos CSV com otimizações
+    
+    Com streaming_vle=True o studentVle.csv é lido por inteiro, em blocos, e
+    entra no dicionário apenas como agregados ('studentVle_agregado') em vez
+    das primeiras 50.000 linhas brutas; com erro_distintos, os agregados
+    trazem também esboços de estudantes ativos (ver agregar_student_vle_em_blocos).
+    
+    Com paralelo='threads' ou 'processos' os arquivos são lidos ao mesmo tempo
+    em um pool; engine='pyarrow' usa o leitor CSV multithread do Arrow. O tempo
+    de leitura de cada arquivo fica em df.attrs['tempo_carga_s'].
+    """
+    if paralelo not in (None, 'threads', 'processos'):
+        raise ValueError(f"paralelo inválido: {paralelo!r} (use None, 'threads' ou 'processos')")
+    
+    if datasets_path is None:
+        datasets_path = Path(__file__).parent.parents[1] / 'datasets' / 'oulad_data'
+    
+    arquivos = []
+    for filename in sorted(os.listdir(datasets_path)):
+        if filename.endswith('.csv'):
+            df_name = os.path.splitext(filename)[0]
+            if streaming_vle and df_name == 'studentVle':
+                continue
+            arquivos.append((filename, os.path.join(datasets_path, filename), df_name))
     
+    inicio = time.perf_counter()
     dataframes_oulad = {}
     
-    # Configurações otimizadas para cada arquivo
-    file_configs = {
-        'studentVle': {'nrows': 50000, 'dtype': {'id_student': 'int32', 'id_site': 'int32', 'date': 'int32', 'sum_click': 'int16'}},
-        'studentAssessment': {'dtype': {'id_student': 'int32', 'id_assessment': 'int32', 'score': 'float32', 'date_submitted': 'int32'}},
-        'studentInfo': {'dtype': {'id_student': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'gender': 'category', 'region': 'category', 'highest_education': 'category', 'imd_band': 'category', 'age_band': 'category', 'num_of_prev_attempts': 'int8', 'studied_credits': 'int16', 'disability': 'category', 'final_result': 'category'}},
-        'studentRegistration': {'dtype': {'id_student': 'int32', 'code_presentation': 'category', 'date_registration': 'float32', 'date_unregistration': 'float32'}},
-        'assessments': {'dtype': {'id_assessment': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'assessment_type': 'category', 'date': 'float32', 'weight': 'float32'}},
-        'courses': {'dtype': {'code_module': 'category', 'code_presentation': 'category', 'module_presentation_length': 'int16'}},
-        'vle': {'dtype': {'id_site': 'int32', 'code_module': 'category', 'code_presentation': 'category', 'activity_type': 'category', 'week_from': 'float32', 'week_to': 'float32'}}
-    }
-    
-    for filename in os.listdir(datasets_path):
-        if filename.endswith('.csv'):
-            file_path = os.path.join(datasets_path, filename)
-            df_name = os.path.splitext(filename)[0]
+    if paralelo is None:
+        for filename, file_path, df_name in arquivos:
             try:
-                config = file_configs.get(df_name, {})
-                dataframes_oulad[df_name] = pd.read_csv(
-                    file_path, 
-                    sep=',', 
-                    encoding='ISO-8859-1',
-                    **config
-                )
+                _, dataframes_oulad[df_name] = _ler_csv_oulad(file_path, df_name, engine)
                 print(f"✅ Carregado {df_name}: {dataframes_oulad[df_name].shape}")
             except Exception as e:
                 print(f"❌ Erro ao carregar o arquivo '{filename}': {e}")
+    else:
+        pool = ThreadPoolExecutor if paralelo == 'threads' else ProcessPoolExecutor
+        with pool(max_workers=max_workers or min(len(arquivos), os.cpu_count() or 1) or 1) as executor:
+            futuros = {
+                executor.submit(_ler_csv_oulad, file_path, df_name, engine): filename
+                for filename, file_path, df_name in arquivos
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    df_name, df = futuro.result()
+                    dataframes_oulad[df_name] = df
+                    print(f"✅ Carregado {df_name}: {df.shape}")
+                except Exception as e:
+                    print(f"❌ Erro ao carregar o arquivo '{futuros[futuro]}': {e}")
+        # Manter a mesma ordem de chaves da leitura sequencial
+        dataframes_oulad = {df_name: dataframes_oulad[df_name] for _, _, df_name in arquivos if df_name in dataframes_oulad}
+    
+    tempos = sorted(
+        ((nome, df.attrs.get('tempo_carga_s', 0.0)) for nome, df in dataframes_oulad.items()),
+        key=lambda item: item[1], reverse=True
+    )
+    print(f"⏱️ CSVs OULAD lidos em {time.perf_counter() - inicio:.2f}s ({paralelo or 'sequencial'}, engine={engine or 'c'})")
+    for nome, segundos in tempos:
+        print(f"   {nome}: {segundos:.2f}s")
+    
+    if streaming_vle:
+        dataframes_oulad['studentVle_agregado'] = agregar_student_vle_em_blocos(
+            os.path.join(datasets_path, 'studentVle.csv'),
+            df_vle=dataframes_oulad.get('vle'),
+            tamanho_bloco=tamanho_bloco,
+            df_info=dataframes_oulad.get('studentInfo'),
+            erro_distintos=erro_distintos
+        )
     
     return dataframes_oulad
 
-def processar_dados_oulad(dataframes_oulad):
-    """Processa os dados OULAD para análise com otimizações"""
-    print("🔄 Processando dados OULAD...")
-    
-    # Usar dados completos mas com otimizações de memória
-    df_assessments = dataframes_oulad['assessments'].copy()
-    df_courses = dataframes_oulad['courses'].copy()
-    df_vle = dataframes_oulad['vle'].copy()
-    df_studentinfo = dataframes_oulad['studentInfo'].copy()
-    df_studentregistration = dataframes_oulad['studentRegistration'].copy()
-    df_studentassessment = dataframes_oulad['studentAssessment'].copy()
-    df_studentvle = dataframes_oulad['studentVle'].copy()
-    
-    print(f"📊 Dados carregados - studentVle: {df_studentvle.shape}")
-    
-    # Processar dados de forma mais eficiente
-    new_vle = df_vle.drop(['week_from','week_to'], axis=1)
-    
-    # Imputação otimizada com os valores mais frequentes por região
+def _preparar_student_info(df_studentinfo):
+    """Imputa imd_band com a moda por região"""
     if 'imd_band' in df_studentinfo.columns:
         mode_by_region = df_studentinfo.groupby('region')['imd_band'].apply(lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown')
         df_studentinfo['imd_band'] = df_studentinfo['imd_band'].fillna(df_studentinfo['region'].map(mode_by_region))
-    
-    # Imputação otimizada de valores ausentes
+    return df_studentinfo
+
+def _preparar_registro(df_studentregistration):
+    """Cria a variável 'cancelou' e imputa as datas de registro"""
     df_student_registration_copy = df_studentregistration.copy()
     
     # Criar variável binária indicando se o estudante cancelou o registro
@@ -180,27 +427,11 @@ def processar_dados_oulad(dataframes_oulad):
     mean_date_registration = df_student_registration_copy['date_registration'].mean()
     df_student_registration_copy['date_registration'] = df_student_registration_copy['date_registration'].fillna(mean_date_registration)
     
-    print("🔄 Fazendo joins dos dados...")
-    
-    # Junção dos dados de forma mais eficiente
-    vle_activities = pd.merge(df_studentvle, new_vle, on=['code_module','code_presentation','id_site'], how='inner')
-    print(f"📊 Após merge VLE: {vle_activities.shape}")
-    
-    assessments_activities = pd.merge(df_studentassessment, df_assessments, on='id_assessment', how='inner')
-    print(f"📊 Após merge assessments: {assessments_activities.shape}")
-    
-    studentinfo_activities = pd.merge(vle_activities, df_studentinfo, on=['code_module','code_presentation','id_student'], how='inner')
-    print(f"📊 Após merge student info: {studentinfo_activities.shape}")
-    
-    merged_df = pd.merge(studentinfo_activities, assessments_activities, on=['code_module','code_presentation','id_student'], how='inner')
-    print(f"📊 Após merge assessments: {merged_df.shape}")
-    
-    # Merge com outros dataframes
-    merged_df = pd.merge(merged_df, df_courses, on=['code_presentation'], how='inner')
-    merged_df = pd.merge(merged_df, df_student_registration_copy, on=['code_presentation','id_student'], how='inner')
-    
-    print(f"📊 Dataset final: {merged_df.shape}")
-    
+    return df_student_registration_copy
+
+@instrumentar('imputar_e_otimizar')
+def _imputar_e_otimizar(merged_df):
+    """Imputa valores ausentes e aplica os tipos do registro de esquemas ao dataset final"""
     # Imputação otimizada de valores ausentes
     print("🔄 Imputando valores ausentes...")
     numeric_cols = merged_df.select_dtypes(include=['number']).columns
@@ -217,18 +448,166 @@ def processar_dados_oulad(dataframes_oulad):
     
     # Otimizar tipos de dados para economizar memória
     print("🔄 Otimizando tipos de dados...")
-    for col in merged_df.select_dtypes(include=['int64']).columns:
-        if merged_df[col].max() < 2147483647:  # int32 max
-            merged_df[col] = merged_df[col].astype('int32')
-        elif merged_df[col].max() < 32767:  # int16 max
-            merged_df[col] = merged_df[col].astype('int16')
-        elif merged_df[col].max() < 255:  # int8 max
-            merged_df[col] = merged_df[col].astype('int8')
+    return aplicar_esquema(merged_df, 'oulad')
+
+def _juntar_com_cardinalidade(esquerda, direita, chaves, validate, how, nome, relatorio):
+    """Executa um merge validado e registra a cardinalidade antes e depois da junção"""
+    with etapa(f'juncao {nome}', esquerda, linhas_direita=len(direita)) as registro:
+        resultado = registro.saida(pd.merge(esquerda, direita, on=chaves, how=how, validate=validate))
+    relatorio.append({
+        'juncao': nome,
+        'chaves': list(chaves),
+        'linhas_esquerda': len(esquerda),
+        'linhas_direita': len(direita),
+        'linhas_resultado': len(resultado),
+    })
+    print(f"📊 Junção {nome}: {len(esquerda):,} × {len(direita):,} → {len(resultado):,} linhas")
+    return resultado
+
+def agregar_cliques_por_estudante_modulo(df_studentvle, df_vle):
+    """
+    Reduz o log de cliques (uma linha por clique/dia/site) ao grão estudante-módulo.
+    
+    Retorna uma linha por (code_module, code_presentation, id_student) com totais
+    de cliques, dias ativos, primeira/última atividade e o tipo de atividade com
+    mais cliques.
+    """
+    return AgregadosCliques(df_vle).atualizar(df_studentvle).por_estudante_modulo()
+
+def agregar_avaliacoes_por_estudante_modulo(df_studentassessment, df_assessments):
+    """
+    Reduz as submissões (grão estudante-avaliação) ao grão estudante-módulo.
+    
+    Retorna uma linha por (code_module, code_presentation, id_student) com média,
+    quantidade e primeira data de submissão das avaliações.
+    """
+    chaves = ['code_module', 'code_presentation', 'id_student']
+    avaliacoes = df_assessments[['id_assessment', 'code_module', 'code_presentation', 'assessment_type', 'weight']]
+    submissoes = pd.merge(df_studentassessment, avaliacoes, on='id_assessment', how='inner', validate='many_to_one')
+    return submissoes.groupby(chaves, observed=True).agg(
+        score=('score', 'mean'),
+        num_avaliacoes=('id_assessment', 'size'),
+        date_submitted=('date_submitted', 'min'),
+    ).reset_index()
+
+def _processar_dados_oulad_agregado(dataframes_oulad):
+    """Agrega cada tabela de fatos ao seu grão natural antes de juntar pelas chaves completas"""
+    chaves = ['code_module', 'code_presentation', 'id_student']
+    relatorio = []
+    
+    with etapa('preparar tabelas', dataframes_oulad['studentInfo']) as registro:
+        df_studentinfo = registro.saida(_preparar_student_info(dataframes_oulad['studentInfo'].copy()))
+        df_registro = _preparar_registro(dataframes_oulad['studentRegistration'])
+    
+    print("🔄 Agregando fatos ao grão estudante-módulo...")
+    if 'studentVle_agregado' in dataframes_oulad:
+        # studentVle já foi agregado em blocos durante a leitura
+        agregados = dataframes_oulad['studentVle_agregado']
+        with etapa('agregar cliques', linhas_blocos=agregados.linhas_processadas) as registro:
+            cliques = registro.saida(agregados.por_estudante_modulo())
+        print(f"📊 studentVle (em blocos): {agregados.linhas_processadas:,} → {len(cliques):,} linhas")
+    else:
+        with etapa('agregar cliques', dataframes_oulad['studentVle']) as registro:
+            cliques = registro.saida(agregar_cliques_por_estudante_modulo(dataframes_oulad['studentVle'], dataframes_oulad['vle']))
+        print(f"📊 studentVle: {len(dataframes_oulad['studentVle']):,} → {len(cliques):,} linhas")
+    with etapa('agregar avaliacoes', dataframes_oulad['studentAssessment']) as registro:
+        avaliacoes = registro.saida(agregar_avaliacoes_por_estudante_modulo(dataframes_oulad['studentAssessment'], dataframes_oulad['assessments']))
+    print(f"📊 studentAssessment: {len(dataframes_oulad['studentAssessment']):,} → {len(avaliacoes):,} linhas")
     
-    for col in merged_df.select_dtypes(include=['float64']).columns:
-        merged_df[col] = merged_df[col].astype('float32')
+    print("🔄 Fazendo joins dos dados...")
+    merged_df = _juntar_com_cardinalidade(df_studentinfo, cliques, chaves, 'one_to_one', 'left', 'studentInfo+cliques', relatorio)
+    merged_df = _juntar_com_cardinalidade(merged_df, avaliacoes, chaves, 'one_to_one', 'left', '+avaliacoes', relatorio)
+    merged_df = _juntar_com_cardinalidade(merged_df, dataframes_oulad['courses'], ['code_module', 'code_presentation'], 'many_to_one', 'left', '+courses', relatorio)
+    merged_df = _juntar_com_cardinalidade(merged_df, df_registro, chaves, 'one_to_one', 'left', '+registration', relatorio)
+    
+    # Estudantes sem registro no VLE não clicaram: contagens são zero, não ausentes
+    for col in ['sum_click', 'num_registros_vle', 'dias_ativos']:
+        merged_df[col] = merged_df[col].fillna(0)
+    
+    print(f"📊 Dataset final: {merged_df.shape}")
+    
+    merged_df = _imputar_e_otimizar(merged_df)
+    merged_df.attrs['cardinalidade_juncoes'] = relatorio
+    
+    return merged_df
+
+def processar_dados_oulad(dataframes_oulad, modo=MODO_PADRAO_OULAD):
+    """
+    Processa os dados OULAD para análise com otimizações
+    
+    modo='agregado' (padrão) reduz studentVle e studentAssessment ao
+    grão estudante-módulo antes de juntar pelas chaves completas, gerando uma
+    linha por matrícula e permitindo processar o log de cliques completo.
+    modo='legado' mantém as junções originais no grão de clique (uma linha por
+    clique × avaliação), o que só cabe na memória com o studentVle truncado.
+    """
+    if modo not in ('legado', 'agregado'):
+        raise ValueError(f"Modo '{modo}' não reconhecido. Use 'legado' ou 'agregado'")
+    if modo == 'legado' and 'studentVle' not in dataframes_oulad:
+        raise ValueError("studentVle bruto não disponível (lido em blocos); use modo='agregado'")
+    
+    with etapa('processar_dados_oulad', dataframes_oulad, modo=modo) as registro:
+        if modo == 'agregado':
+            print("🔄 Processando dados OULAD (modo agregado)...")
+            merged_df = _processar_dados_oulad_agregado(dataframes_oulad)
+        else:
+            print("🔄 Processando dados OULAD (modo legado)...")
+            print(f"⚠️ ATENÇÃO: modo legado usa apenas {len(dataframes_oulad['studentVle']):,} linhas do studentVle; "
+                  f"métricas de cliques e modelos não representam o log completo")
+            merged_df = _processar_dados_oulad_legado(dataframes_oulad)
+        registro.saida(merged_df)
     
     print(f"✅ Processamento concluído! Dataset final: {merged_df.shape}")
     print(f"💾 Uso de memória: {merged_df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
     
-    return merged_df
\ No newline at end of file
+    return merged_df
+
+def _processar_dados_oulad_legado(dataframes_oulad):
+    """Junções originais no grão de clique (uma linha por clique × avaliação)"""
+    # Usar dados completos mas com otimizações de memória
+    df_assessments = dataframes_oulad['assessments'].copy()
+    df_courses = dataframes_oulad['courses'].copy()
+    df_vle = dataframes_oulad['vle'].copy()
+    df_studentinfo = dataframes_oulad['studentInfo'].copy()
+    df_studentregistration = dataframes_oulad['studentRegistration'].copy()
+    df_studentassessment = dataframes_oulad['studentAssessment'].copy()
+    df_studentvle = dataframes_oulad['studentVle'].copy()
+    
+    print(f"📊 Dados carregados - studentVle: {df_studentvle.shape}")
+    
+    # Processar dados de forma mais eficiente
+    new_vle = df_vle.drop(['week_from','week_to'], axis=1)
+    
+    # Imputação otimizada com os valores mais frequentes por região
+    df_studentinfo = _preparar_student_info(df_studentinfo)
+    
+    # Imputação otimizada de valores ausentes
+    df_student_registration_copy = _preparar_registro(df_studentregistration)
+    
+    print("🔄 Fazendo joins dos dados...")
+    
+    # Junção dos dados de forma mais eficiente
+    with etapa('merge vle', df_studentvle) as registro:
+        vle_activities = registro.saida(pd.merge(df_studentvle, new_vle, on=['code_module','code_presentation','id_site'], how='inner'))
+    print(f"📊 Após merge VLE: {vle_activities.shape}")
+    
+    with etapa('merge assessments', df_studentassessment) as registro:
+        assessments_activities = registro.saida(pd.merge(df_studentassessment, df_assessments, on='id_assessment', how='inner'))
+    print(f"📊 Após merge assessments: {assessments_activities.shape}")
+    
+    with etapa('merge student info', vle_activities) as registro:
+        studentinfo_activities = registro.saida(pd.merge(vle_activities, df_studentinfo, on=['code_module','code_presentation','id_student'], how='inner'))
+    print(f"📊 Após merge student info: {studentinfo_activities.shape}")
+    
+    with etapa('merge atividades x avaliacoes', studentinfo_activities) as registro:
+        merged_df = registro.saida(pd.merge(studentinfo_activities, assessments_activities, on=['code_module','code_presentation','id_student'], how='inner'))
+    print(f"📊 Após merge assessments: {merged_df.shape}")
+    
+    # Merge com outros dataframes
+    with etapa('merge courses e registration', merged_df) as registro:
+        merged_df = pd.merge(merged_df, df_courses, on=['code_presentation'], how='inner')
+        merged_df = registro.saida(pd.merge(merged_df, df_student_registration_copy, on=['code_presentation','id_student'], how='inner'))
+    
+    print(f"📊 Dataset final: {merged_df.shape}")
+    
+    return _imputar_e_otimizar(merged_df)
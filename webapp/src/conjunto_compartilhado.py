@@ -0,0 +1,109 @@
+"""
+DataFrames compartilhados, somente leitura, entre sessões do Streamlit.
+
+`st.cache_data` serializa o resultado e entrega uma cópia nova a cada chamada;
+com o OULAD (~300 MB) isso significa uma cópia por sessão e por rerun. Um
+`ConjuntoCompartilhado` guardado num cache do processo mantém uma única cópia
+dos dados, com os arrays marcados como somente leitura, e entrega a cada
+chamada uma visão rasa (novo índice de colunas, mesmos buffers). Escritas em
+posição (`df.loc[...] = ...`, `fillna(inplace=True)`) em colunas numéricas
+e categóricas falham em vez de corromper o dado das outras sessões; páginas
+que precisam alterar valores pedem `copia_editavel()`.
+"""
+
+import tracemalloc
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def _arrays_do_dataframe(df: pd.DataFrame) -> Iterable[np.ndarray]:
+    """Arrays numpy que guardam os dados do DataFrame (blocos e códigos de categorias)"""
+    for valores in df._mgr.arrays:
+        if isinstance(valores, np.ndarray):
+            yield valores
+        elif isinstance(valores, pd.Categorical):
+            yield valores.codes
+        else:
+            for atributo in ('_ndarray', '_data', '_mask'):
+                interno = getattr(valores, atributo, None)
+                if isinstance(interno, np.ndarray):
+                    yield interno
+
+
+def congelar_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Marca os arrays do DataFrame como somente leitura (no próprio objeto).
+
+    Arrays de objetos (texto) ficam graváveis: rotinas Cython do pandas como
+    memory_usage(deep=True) não aceitam buffers de objetos somente leitura.
+    """
+    for array in _arrays_do_dataframe(df):
+        if array.dtype != object:
+            array.flags.writeable = False
+    return df
+
+
+def memoria_exclusiva_bytes(visao: pd.DataFrame, base: pd.DataFrame) -> int:
+    """Bytes de `visao` que não são compartilhados com `base`"""
+    arrays_base = list(_arrays_do_dataframe(base))
+    total = 0
+    for array in _arrays_do_dataframe(visao):
+        if not any(np.shares_memory(array, outro) for outro in arrays_base):
+            total += array.nbytes
+    return total
+
+
+class ConjuntoCompartilhado:
+    """
+    Handle imutável para um DataFrame compartilhado entre sessões.
+
+    Args:
+        df: DataFrame carregado uma única vez (não deve ser usado diretamente depois)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = congelar_dataframe(df)
+
+    @property
+    def memoria_mb(self) -> float:
+        """Memória da cópia compartilhada"""
+        return self._df.memory_usage(deep=True).sum() / 1024**2
+
+    def visualizar(self) -> pd.DataFrame:
+        """
+        Retorna uma visão rasa e somente leitura do DataFrame compartilhado.
+
+        Adicionar, remover ou substituir colunas na visão não afeta as outras
+        sessões; alterar valores em posição levanta ValueError.
+        """
+        return self._df.copy(deep=False)
+
+    def copia_editavel(self) -> pd.DataFrame:
+        """Cópia completa e gravável, para páginas que alteram os dados em posição"""
+        return self._df.copy(deep=True)
+
+    def medir_sobrecarga_sessao(self) -> Dict[str, float]:
+        """
+        Mede o custo de memória de entregar o conjunto a uma sessão.
+
+        Returns:
+            Dicionário com a memória alocada ao criar a visão (tracemalloc), os
+            bytes da visão que não são compartilhados e o tamanho da cópia compartilhada
+        """
+        ja_rastreando = tracemalloc.is_tracing()
+        if not ja_rastreando:
+            tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        visao = self.visualizar()
+        alocado = tracemalloc.get_traced_memory()[0] - antes
+        if not ja_rastreando:
+            tracemalloc.stop()
+
+        return {
+            'alocado_kb': alocado / 1024,
+            'dados_exclusivos_kb': memoria_exclusiva_bytes(visao, self._df) / 1024,
+            'compartilhado_mb': self.memoria_mb,
+        }
+
@@ -0,0 +1,357 @@
+"""
+Contagem aproximada de estudantes distintos com HyperLogLog.
+
+Com o studentVle completo (cerca de 10 milhões de linhas), cada
+`nunique()` de estudantes fatora a coluna inteira e monta uma tabela de
+hash do tamanho dos dados; para contar por faixa etária, resultado ou
+região, o DataFrame inteiro precisa estar em memória. Um esboço
+HyperLogLog resume um conjunto de valores em 2^p registradores de um byte
+(16 KB com p=14) e estima quantos valores distintos viu, com erro relativo
+padrão de 1,04/√(2^p):
+
+- o erro desejado define a precisão p (`precisao_para_erro`);
+- esboços de mesma precisão se combinam pelo máximo de cada registrador,
+  e o resultado é idêntico ao de ver todos os valores num único esboço, por
+  isso blocos lidos em momentos, arquivos ou processos diferentes podem ser
+  resumidos separadamente e combinados depois;
+- o hash (`pandas.util.hash_array`) é o mesmo em qualquer processo.
+
+`EsbocosDistintos` mantém um esboço do total e um por valor de cada
+dimensão, atualizados bloco a bloco. O motor é opcional: `motor_distintos`
+devolve 'exato' (padrão, `nunique`) ou 'hll', escolhido pela variável de
+ambiente SIDA_MOTOR_DISTINTOS; SIDA_ERRO_DISTINTOS define o erro relativo.
+
+Os esboços acumulados na leitura do studentVle em blocos são gravados ao
+lado do artefato (`artefatos/<nome>.distintos.npz`) com a versão do
+artefato de que vieram; `ler_esbocos` devolve None se faltarem ou forem de
+outra versão.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .armazenamento import caminho_artefato, versao_artefato
+    from .bloqueio import escrever_atomico
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import caminho_artefato, versao_artefato
+    from bloqueio import escrever_atomico
+
+COLUNA_ESTUDANTE = 'id_student'
+MOTORES_DISTINTOS = ('exato', 'hll')
+VARIAVEL_MOTOR = 'SIDA_MOTOR_DISTINTOS'
+VARIAVEL_ERRO = 'SIDA_ERRO_DISTINTOS'
+ERRO_PADRAO = 0.01
+
+# Limites da precisão: 16 registradores (erro ~26%) a 262.144 (erro ~0,2%, 256 KB por esboço)
+PRECISAO_MINIMA = 4
+PRECISAO_MAXIMA = 18
+
+
+def motor_distintos(motor: Optional[str] = None) -> str:
+    """
+    Motor de contagem distinta: o informado ou o de SIDA_MOTOR_DISTINTOS (padrão 'exato').
+
+    Raises:
+        ValueError: Se o motor não existir
+    """
+    motor = motor or os.environ.get(VARIAVEL_MOTOR, 'exato')
+    if motor not in MOTORES_DISTINTOS:
+        raise ValueError(f"Motor de contagem distinta {motor!r} não reconhecido (use um de {list(MOTORES_DISTINTOS)})")
+    return motor
+
+
+def erro_distintos(erro: Optional[float] = None) -> float:
+    """Erro relativo padrão desejado: o informado ou o de SIDA_ERRO_DISTINTOS (padrão 1%)"""
+    if erro is None:
+        erro = float(os.environ.get(VARIAVEL_ERRO, ERRO_PADRAO))
+    if not 0 < erro < 1:
+        raise ValueError(f"Erro relativo deve estar entre 0 e 1: {erro}")
+    return erro
+
+
+def precisao_para_erro(erro: float) -> int:
+    """Menor precisão p cujo erro relativo padrão (1,04/√2^p) não passa de `erro`"""
+    precisao = math.ceil(math.log2((1.04 / erro) ** 2))
+    return min(max(precisao, PRECISAO_MINIMA), PRECISAO_MAXIMA)
+
+
+def _hashes(valores: Any) -> np.ndarray:
+    """Hash de 64 bits de cada valor, estável entre processos"""
+    return pd.util.hash_array(np.asarray(valores))
+
+
+def _indices_e_postos(hashes: np.ndarray, precisao: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Registrador (p bits mais altos do hash) e posto (zeros à esquerda + 1 nos
+    bits restantes) de cada hash.
+    """
+    indices = (hashes >> np.uint64(64 - precisao)).astype(np.intp)
+    restantes = hashes << np.uint64(precisao)
+    # frexp é exato para inteiros de até 32 bits: o expoente e dá floor(log2(x)) = e - 1
+    _, expoente = np.frexp((restantes >> np.uint64(32)).astype(np.float64))
+    zeros = 32 - expoente
+    # Os 32 bits altos zerados (chance de 1 em 2^32): conta nos 32 baixos
+    vazios = np.flatnonzero(expoente == 0)
+    if len(vazios):
+        _, expoente_baixo = np.frexp((restantes[vazios] & np.uint64(0xFFFFFFFF)).astype(np.float64))
+        zeros[vazios] = 64 - expoente_baixo
+    postos = np.minimum(zeros + 1, 64 - precisao + 1).astype(np.uint8)
+    return indices, postos
+
+
+def _alfa(m: int) -> float:
+    """Constante de correção do estimador para m registradores"""
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+class HyperLogLog:
+    """
+    Esboço HyperLogLog de um conjunto de valores.
+
+    Args:
+        erro: Erro relativo padrão desejado (define a precisão)
+        precisao: Número de bits do índice do registrador (tem prioridade sobre o erro)
+    """
+
+    def __init__(self, erro: float = ERRO_PADRAO, precisao: Optional[int] = None):
+        self.precisao = precisao if precisao is not None else precisao_para_erro(erro)
+        if not PRECISAO_MINIMA <= self.precisao <= PRECISAO_MAXIMA:
+            raise ValueError(f"Precisão deve estar entre {PRECISAO_MINIMA} e {PRECISAO_MAXIMA}: {self.precisao}")
+        self.registros = np.zeros(1 << self.precisao, dtype=np.uint8)
+
+    @property
+    def erro_padrao(self) -> float:
+        """Erro relativo padrão da estimativa"""
+        return 1.04 / math.sqrt(len(self.registros))
+
+    def _incorporar(self, indices: np.ndarray, postos: np.ndarray) -> None:
+        np.maximum.at(self.registros, indices, postos)
+
+    def adicionar(self, valores: Any) -> 'HyperLogLog':
+        """Incorpora um lote de valores (ausentes são ignorados)"""
+        valores = pd.Series(valores).dropna().to_numpy()
+        if len(valores):
+            self._incorporar(*_indices_e_postos(_hashes(valores), self.precisao))
+        return self
+
+    def combinar(self, outro: 'HyperLogLog') -> 'HyperLogLog':
+        """Esboço da união dos dois conjuntos"""
+        if outro.precisao != self.precisao:
+            raise ValueError(f"Esboços de precisões diferentes não se combinam: {self.precisao} e {outro.precisao}")
+        resultado = HyperLogLog(precisao=self.precisao)
+        np.maximum(self.registros, outro.registros, out=resultado.registros)
+        return resultado
+
+    def estimar(self) -> int:
+        """Número estimado de valores distintos"""
+        m = len(self.registros)
+        estimativa = _alfa(m) * m * m / np.ldexp(1.0, -self.registros.astype(np.int64)).sum()
+        vazios = int(np.count_nonzero(self.registros == 0))
+        if estimativa <= 2.5 * m and vazios:
+            # Poucos valores: contagem linear pelos registradores vazios
+            estimativa = m * math.log(m / vazios)
+        return int(round(estimativa))
+
+
+class EsbocosDistintos:
+    """
+    Esboços HyperLogLog de estudantes distintos no total e por valor de cada dimensão.
+
+    Atualizado bloco a bloco (`atualizar`) e combinável com outros estados
+    parciais de mesmas dimensões e erro (`combinar`), como o AgregadosCliques.
+
+    Args:
+        dimensoes: Colunas cujos valores ganham um esboço próprio
+        erro: Erro relativo padrão desejado; None usa erro_distintos()
+        coluna: Coluna com o identificador contado
+    """
+
+    def __init__(self, dimensoes: Iterable[str] = (), erro: Optional[float] = None,
+                 coluna: str = COLUNA_ESTUDANTE):
+        self.dimensoes = tuple(dimensoes)
+        self.erro = erro_distintos(erro)
+        self.coluna = coluna
+        self.total = HyperLogLog(self.erro)
+        self.por_valor: Dict[str, Dict[Hashable, HyperLogLog]] = {d: {} for d in self.dimensoes}
+        self.linhas_processadas = 0
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, dimensoes: Iterable[str] = (), erro: Optional[float] = None,
+                  tamanho_bloco: int = 1_000_000, coluna: str = COLUNA_ESTUDANTE) -> 'EsbocosDistintos':
+        """Esboços de um DataFrame inteiro, percorrido em blocos de `tamanho_bloco` linhas"""
+        esbocos = cls(dimensoes, erro, coluna)
+        for inicio in range(0, len(df), tamanho_bloco):
+            esbocos.atualizar(df.iloc[inicio:inicio + tamanho_bloco])
+        return esbocos
+
+    @property
+    def precisao(self) -> int:
+        return self.total.precisao
+
+    def atualizar(self, bloco: pd.DataFrame) -> 'EsbocosDistintos':
+        """Incorpora um bloco de linhas (com a coluna contada e as dimensões)"""
+        faltando = [c for c in (self.coluna,) + self.dimensoes if c not in bloco.columns]
+        if faltando:
+            raise KeyError(f"Colunas ausentes no bloco: {faltando}")
+
+        validos = bloco[self.coluna].notna()
+        if not validos.all():
+            bloco = bloco[validos]
+        indices, postos = _indices_e_postos(_hashes(bloco[self.coluna].to_numpy()), self.precisao)
+        self.total._incorporar(indices, postos)
+
+        m = len(self.total.registros)
+        for dimensao in self.dimensoes:
+            codigos, valores = pd.factorize(bloco[dimensao], sort=False)
+            presentes = codigos >= 0
+            # Um registrador por (valor, índice): todos os valores da dimensão numa única passada
+            matriz = np.zeros(len(valores) * m, dtype=np.uint8)
+            np.maximum.at(matriz, codigos[presentes] * m + indices[presentes], postos[presentes])
+            for valor, registros in zip(valores, matriz.reshape(len(valores), m)):
+                esboco = self.por_valor[dimensao].setdefault(valor, HyperLogLog(precisao=self.precisao))
+                np.maximum(esboco.registros, registros, out=esboco.registros)
+        self.linhas_processadas += len(bloco)
+        return self
+
+    def combinar(self, outro: 'EsbocosDistintos') -> 'EsbocosDistintos':
+        """Combina dois estados parciais em um novo estado"""
+        if (outro.dimensoes, outro.precisao, outro.coluna) != (self.dimensoes, self.precisao, self.coluna):
+            raise ValueError("Só se combinam esboços de mesmas dimensões, coluna e precisão")
+        resultado = EsbocosDistintos(self.dimensoes, self.erro, self.coluna)
+        resultado.total = self.total.combinar(outro.total)
+        for dimensao in self.dimensoes:
+            mesclados = dict(self.por_valor[dimensao])
+            for valor, esboco in outro.por_valor[dimensao].items():
+                mesclados[valor] = mesclados[valor].combinar(esboco) if valor in mesclados else esboco
+            resultado.por_valor[dimensao] = mesclados
+        resultado.linhas_processadas = self.linhas_processadas + outro.linhas_processadas
+        return resultado
+
+    def projetar(self, dimensoes: Sequence[str]) -> 'EsbocosDistintos':
+        """Estado com apenas algumas das dimensões (os esboços são compartilhados, não copiados)"""
+        faltando = [d for d in dimensoes if d not in self.por_valor]
+        if faltando:
+            raise KeyError(f"Dimensões sem esboços: {faltando} (disponíveis: {self.dimensoes})")
+        resultado = EsbocosDistintos((), self.erro, self.coluna)
+        resultado.dimensoes = tuple(dimensoes)
+        resultado.total = self.total
+        resultado.por_valor = {d: self.por_valor[d] for d in resultado.dimensoes}
+        resultado.linhas_processadas = self.linhas_processadas
+        return resultado
+
+    def estudantes(self, dimensao: Optional[str] = None) -> Union[int, pd.Series]:
+        """
+        Estudantes distintos estimados, no total ou por valor de uma dimensão.
+
+        Equivale (a menos do erro) a `df['id_student'].nunique()` ou a
+        `df.groupby(dimensao, observed=True)['id_student'].nunique()`.
+
+        Returns:
+            Total (int) sem dimensão, ou Series indexada pelos valores observados
+        """
+        if dimensao is None:
+            return self.total.estimar()
+        if dimensao not in self.por_valor:
+            raise KeyError(f"Dimensão sem esboços: {dimensao!r} (disponíveis: {self.dimensoes})")
+        estimativas = pd.Series(
+            {valor: esboco.estimar() for valor, esboco in self.por_valor[dimensao].items()},
+            name=self.coluna, dtype='int64',
+        )
+        return estimativas.rename_axis(dimensao).sort_index()
+
+    def memoria_mb(self) -> float:
+        """Memória ocupada pelos registradores"""
+        esbocos = 1 + sum(len(valores) for valores in self.por_valor.values())
+        return esbocos * len(self.total.registros) / 1024**2
+
+
+def _valor_json(valor: Any) -> Any:
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def caminho_esbocos(nome: str, base_path: Optional[Path] = None) -> Path:
+    """Caminho dos esboços gravados ao lado do artefato"""
+    return caminho_artefato(nome, base_path).with_name(f"{nome}.distintos.npz")
+
+
+def gravar_esbocos(nome: str, esbocos: EsbocosDistintos, base_path: Optional[Path] = None) -> Path:
+    """
+    Grava os esboços ao lado do artefato.
+
+    Deve ser chamado depois de gravar o artefato e o manifesto: os esboços
+    registram a versão atual do artefato e só valem para ela.
+
+    Args:
+        nome: Nome do artefato ('oulad')
+        esbocos: Esboços acumulados na leitura dos dados do artefato
+        base_path: Caminho base do projeto (opcional)
+
+    Returns:
+        Caminho do arquivo gravado
+    """
+    metadados = {
+        'versao_artefato': versao_artefato(nome, base_path),
+        'dimensoes': list(esbocos.dimensoes),
+        'erro': esbocos.erro,
+        'coluna': esbocos.coluna,
+        'linhas_processadas': esbocos.linhas_processadas,
+        'valores': {d: [_valor_json(v) for v in esbocos.por_valor[d]] for d in esbocos.dimensoes},
+    }
+    m = len(esbocos.total.registros)
+    # Uma matriz (valores × registradores) por dimensão, na ordem de metadados['valores']
+    matrizes = {
+        f'dimensao_{i}': np.array([e.registros for e in esbocos.por_valor[d].values()], dtype=np.uint8).reshape(-1, m)
+        for i, d in enumerate(esbocos.dimensoes)
+    }
+
+    def escrever(temporario: Path) -> None:
+        with open(temporario, 'wb') as f:
+            np.savez_compressed(f, metadados=np.array(json.dumps(metadados)), total=esbocos.total.registros,
+                                **matrizes)
+
+    caminho = caminho_esbocos(nome, base_path)
+    escrever_atomico(caminho, escrever)
+    print(f"👥 Esboços de distintos '{nome}' salvos: {caminho} ({esbocos.memoria_mb():.1f} MB em registradores)")
+    return caminho
+
+
+def ler_esbocos(nome: str, base_path: Optional[Path] = None) -> Optional[EsbocosDistintos]:
+    """
+    Lê os esboços gravados para a versão atual do artefato.
+
+    Returns:
+        EsbocosDistintos, ou None se não existirem, estiverem ilegíveis ou forem de outra versão do artefato
+    """
+    caminho = caminho_esbocos(nome, base_path)
+    if not caminho.is_file():
+        return None
+    try:
+        with np.load(caminho, allow_pickle=False) as arquivo:
+            metadados = json.loads(str(arquivo['metadados']))
+            if metadados.get('versao_artefato') != versao_artefato(nome, base_path):
+                return None
+            esbocos = EsbocosDistintos(metadados['dimensoes'], metadados['erro'], metadados['coluna'])
+            esbocos.total.registros = arquivo['total']
+            for i, dimensao in enumerate(esbocos.dimensoes):
+                for valor, registros in zip(metadados['valores'][dimensao], arquivo[f'dimensao_{i}']):
+                    esboco = HyperLogLog(precisao=esbocos.precisao)
+                    esboco.registros = registros
+                    esbocos.por_valor[dimensao][valor] = esboco
+    except (OSError, KeyError, ValueError):
+        return None
+    esbocos.linhas_processadas = metadados['linhas_processadas']
+    return esbocos
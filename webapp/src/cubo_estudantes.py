@@ -0,0 +1,332 @@
+"""
+Cubo OLAP de estudantes distintos e agregados de nota do OULAD.
+
+O DataFrame do OULAD tem uma linha por registro de atividade (ou por
+estudante × módulo × atividade no modo agregado), e cada gráfico de
+distribuição fazia seu próprio `groupby(<dimensão>)['id_student'].nunique()`
+sobre todas essas linhas. O cubo guarda uma única linha por combinação das
+dimensões (gender, age_band, region, imd_band, final_result, code_module,
+activity_type) e estudante, com as medidas aditivas já somadas: linhas,
+cliques e soma/contagem/mínimo/máximo de score.
+
+Estudantes distintos não são aditivos (o mesmo estudante aparece em vários
+módulos e atividades), por isso o cubo não guarda contagens prontas por
+célula: uma consulta combina os códigos das dimensões pedidas com o código
+do estudante e conta os pares distintos com NumPy, sobre a base já
+deduplicada (ordens de grandeza menor que os dados brutos). Cada consulta
+fica memorizada no cubo; as mais usadas pelos gráficos podem ser
+materializadas de antemão com `materializar`.
+
+O cubo é gravado ao lado do artefato (`artefatos/<nome>.cubo.parquet`) com a
+versão do artefato de que veio; `ler_cubo` devolve None se ele faltar ou for
+de outra versão.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from .armazenamento import caminho_artefato, versao_artefato
+    from .bloqueio import escrever_atomico
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import caminho_artefato, versao_artefato
+    from bloqueio import escrever_atomico
+
+DIMENSOES_OULAD = ('gender', 'age_band', 'region', 'imd_band', 'final_result', 'code_module', 'activity_type')
+COLUNA_ESTUDANTE = 'id_student'
+MEDIDAS = ('linhas', 'cliques', 'score_soma', 'score_contagem', 'score_min', 'score_max')
+
+# Fatias usadas pelos gráficos e páginas do OULAD
+CONSULTAS_FREQUENTES = (
+    ('gender',), ('age_band',), ('region',), ('final_result',), ('activity_type',), ('gender', 'final_result'),
+)
+
+# Acima de tantas posições célula × estudante, a contagem distinta ordena os pares em vez de usar um mapa de presença
+LIMITE_MAPA_PRESENCA = 1 << 26
+
+# Chave dos metadados do Parquet com a versão do artefato e as dimensões
+_CHAVE_METADADOS = b'sida_cubo'
+
+FiltrosCubo = Dict[str, Union[object, Sequence[object]]]
+
+
+class CuboEstudantes:
+    """
+    Estudantes distintos e agregados de nota por combinação de dimensões.
+
+    Use `CuboEstudantes.construir(df)` ou `ler_cubo(nome)` para criar.
+
+    Args:
+        base: Uma linha por combinação de dimensões e estudante, com as colunas
+            das dimensões (category), id_student e as medidas somadas
+        dimensoes: Dimensões presentes na base
+        versao: Versão do artefato de que o cubo veio (opcional)
+    """
+
+    def __init__(self, base: pd.DataFrame, dimensoes: Iterable[str], versao: Optional[str] = None):
+        self.base = base
+        self.dimensoes = list(dimensoes)
+        self.versao = versao
+        self._categorias = {d: base[d].cat.categories for d in self.dimensoes}
+        self._codigos = {d: base[d].cat.codes.to_numpy(dtype=np.int64) for d in self.dimensoes}
+        codigos_estudante, _ = pd.factorize(base[COLUNA_ESTUDANTE])
+        self._estudantes = codigos_estudante.astype(np.int64)
+        self._n_estudantes = int(self._estudantes.max()) + 1 if len(self._estudantes) else 0
+        self._medidas = {m: base[m].to_numpy(dtype=np.float64) for m in MEDIDAS}
+        self._consultas: Dict[Tuple, Any] = {}
+        self._trava = threading.Lock()
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, dimensoes: Iterable[str] = DIMENSOES_OULAD) -> 'CuboEstudantes':
+        """
+        Constrói o cubo a partir do DataFrame do OULAD (uma passada pelos dados brutos).
+
+        Args:
+            df: DataFrame processado do OULAD (modo legado ou agregado)
+            dimensoes: Dimensões do cubo; as ausentes no DataFrame são ignoradas
+
+        Returns:
+            CuboEstudantes
+        """
+        if COLUNA_ESTUDANTE not in df.columns:
+            raise ValueError(f"O cubo de estudantes exige a coluna '{COLUNA_ESTUDANTE}'")
+        dimensoes = [d for d in dimensoes if d in df.columns]
+        colunas = {d: df[d] if isinstance(df[d].dtype, pd.CategoricalDtype) else df[d].astype('category')
+                   for d in dimensoes}
+        colunas[COLUNA_ESTUDANTE] = df[COLUNA_ESTUDANTE]
+        coluna_cliques = next((c for c in ('sum_click', 'clicks') if c in df.columns), None)
+        colunas['cliques'] = df[coluna_cliques] if coluna_cliques else 0
+        colunas['score'] = df['score'].astype(np.float64) if 'score' in df.columns else np.nan
+        dados = pd.DataFrame(colunas, index=df.index)
+
+        base = dados.groupby(dimensoes + [COLUNA_ESTUDANTE], observed=True, dropna=False, sort=False).agg(
+            linhas=('cliques', 'size'),
+            cliques=('cliques', 'sum'),
+            score_soma=('score', 'sum'),
+            score_contagem=('score', 'count'),
+            score_min=('score', 'min'),
+            score_max=('score', 'max'),
+        ).reset_index()
+        for dimensao in dimensoes:
+            base[dimensao] = pd.Categorical(base[dimensao], categories=colunas[dimensao].cat.categories)
+        return cls(base, dimensoes)
+
+    def _n_celulas(self, dimensoes: Sequence[str]) -> int:
+        """Número de combinações possíveis das dimensões (produto das cardinalidades)"""
+        return int(np.prod([len(self._categorias[d]) for d in dimensoes], dtype=np.int64))
+
+    def _chaves(self, dimensoes: Sequence[str], filtros: Optional[FiltrosCubo]):
+        """Linhas da base que entram na consulta e a célula (código combinado) de cada uma"""
+        desconhecidas = [d for d in list(dimensoes) + list(filtros or {}) if d not in self._codigos]
+        if desconhecidas:
+            raise KeyError(f"Dimensões fora do cubo: {desconhecidas} (disponíveis: {self.dimensoes})")
+
+        # Linhas com valor ausente numa dimensão pedida ficam de fora, como no groupby
+        mascara = np.ones(len(self.base), dtype=bool)
+        for dimensao in dimensoes:
+            mascara &= self._codigos[dimensao] >= 0
+        for dimensao, valores in (filtros or {}).items():
+            valores = list(valores) if isinstance(valores, (list, tuple, set)) else [valores]
+            permitidos = self._categorias[dimensao].get_indexer(valores)
+            mascara &= np.isin(self._codigos[dimensao], permitidos[permitidos >= 0])
+        # Sem ausentes nem filtros, a consulta usa a base inteira (fatias sem cópia)
+        linhas = slice(None) if mascara.all() else np.flatnonzero(mascara)
+
+        chaves = np.zeros(int(mascara.sum()), dtype=np.int64)
+        for dimensao in dimensoes:
+            chaves = chaves * len(self._categorias[dimensao]) + self._codigos[dimensao][linhas]
+        return linhas, chaves
+
+    def _indice(self, dimensoes: Sequence[str], chaves: np.ndarray) -> pd.Index:
+        """Índice com os valores das dimensões a partir dos códigos combinados"""
+        formato = tuple(len(self._categorias[d]) for d in dimensoes)
+        codigos = np.unravel_index(chaves, formato)
+        niveis = [self._categorias[d].take(c) for d, c in zip(dimensoes, codigos)]
+        if len(dimensoes) == 1:
+            return pd.Index(niveis[0], name=dimensoes[0])
+        return pd.MultiIndex.from_arrays(niveis, names=list(dimensoes))
+
+    def _memorizar(self, chave: Tuple, calcular):
+        with self._trava:
+            if chave in self._consultas:
+                return self._consultas[chave]
+        valor = calcular()
+        with self._trava:
+            self._consultas[chave] = valor
+        return valor
+
+    @staticmethod
+    def _chave_consulta(tipo: str, dimensoes: Sequence[str], filtros: Optional[FiltrosCubo]) -> Tuple:
+        normalizados = tuple(sorted(
+            (d, tuple(sorted(v, key=repr)) if isinstance(v, (list, tuple, set)) else (v,))
+            for d, v in (filtros or {}).items()
+        ))
+        return tipo, tuple(dimensoes), normalizados
+
+    def estudantes(self, dimensoes: Sequence[str] = (), filtros: Optional[FiltrosCubo] = None) -> Union[int, pd.Series]:
+        """
+        Estudantes distintos por combinação de dimensões.
+
+        Equivale a `df.groupby(dimensoes, observed=True)['id_student'].nunique()`
+        nos dados brutos (restritos pelos filtros).
+
+        Args:
+            dimensoes: Dimensões da quebra; vazio devolve o total de estudantes
+            filtros: {'dimensao': valor ou [valores]} aplicados antes da contagem
+
+        Returns:
+            Total (int) sem dimensões, ou Series indexada pelas combinações observadas
+        """
+        dimensoes = tuple(dimensoes)
+
+        def calcular():
+            linhas, chaves = self._chaves(dimensoes, filtros)
+            n_celulas = self._n_celulas(dimensoes)
+            pares = chaves * self._n_estudantes + self._estudantes[linhas]
+            if n_celulas * self._n_estudantes <= LIMITE_MAPA_PRESENCA:
+                # Mapa de presença célula × estudante: marca os pares em O(linhas), sem ordenar
+                mapa = np.zeros(n_celulas * self._n_estudantes, dtype=bool)
+                mapa[pares] = True
+                contagens = mapa.reshape(n_celulas, self._n_estudantes).sum(axis=1)
+                celulas = np.flatnonzero(contagens)
+                contagens = contagens[celulas]
+            else:
+                # Pares (célula, estudante) distintos por ordenação
+                celulas, contagens = np.unique(np.unique(pares) // self._n_estudantes, return_counts=True)
+            if not dimensoes:
+                return int(contagens.sum())
+            return pd.Series(contagens, index=self._indice(dimensoes, celulas), name=COLUNA_ESTUDANTE)
+
+        resultado = self._memorizar(self._chave_consulta('estudantes', dimensoes, filtros), calcular)
+        return resultado.copy() if isinstance(resultado, pd.Series) else resultado
+
+    def agregados(self, dimensoes: Sequence[str] = (), filtros: Optional[FiltrosCubo] = None) -> pd.DataFrame:
+        """
+        Estudantes distintos, linhas, cliques e score por combinação de dimensões.
+
+        Args:
+            dimensoes: Dimensões da quebra; vazio devolve uma única linha com o total
+            filtros: {'dimensao': valor ou [valores]} aplicados antes da agregação
+
+        Returns:
+            DataFrame com estudantes, linhas, cliques, score_medio (média por
+            linha dos dados brutos), score_min, score_max e score_contagem
+        """
+        dimensoes = tuple(dimensoes)
+
+        def calcular():
+            linhas, chaves = self._chaves(dimensoes, filtros)
+            n_celulas = self._n_celulas(dimensoes)
+            if n_celulas > LIMITE_MAPA_PRESENCA:
+                # Muitas células possíveis: numera só as observadas
+                observadas, chaves = np.unique(chaves, return_inverse=True)
+                n_celulas = len(observadas)
+            else:
+                observadas = None
+
+            def somar(medida):
+                return np.bincount(chaves, weights=self._medidas[medida][linhas], minlength=n_celulas)
+
+            tabela = pd.DataFrame({
+                'linhas': somar('linhas').astype(np.int64),
+                'cliques': somar('cliques'),
+                'score_soma': somar('score_soma'),
+                'score_contagem': somar('score_contagem').astype(np.int64),
+            })
+            score_min = np.full(n_celulas, np.inf)
+            np.fmin.at(score_min, chaves, self._medidas['score_min'][linhas])
+            score_max = np.full(n_celulas, -np.inf)
+            np.fmax.at(score_max, chaves, self._medidas['score_max'][linhas])
+            tabela['score_min'] = np.where(np.isfinite(score_min), score_min, np.nan)
+            tabela['score_max'] = np.where(np.isfinite(score_max), score_max, np.nan)
+            tabela['score_medio'] = tabela['score_soma'] / tabela['score_contagem'].where(tabela['score_contagem'] > 0)
+
+            # Só as células com alguma linha, como no groupby dos dados brutos
+            celulas = np.flatnonzero(tabela['linhas'].to_numpy())
+            tabela = tabela.iloc[celulas]
+            estudantes = self.estudantes(dimensoes, filtros)
+            if dimensoes:
+                chaves_celulas = observadas[celulas] if observadas is not None else celulas
+                tabela.index = self._indice(dimensoes, chaves_celulas)
+                tabela.insert(0, 'estudantes', estudantes.reindex(tabela.index).to_numpy())
+            else:
+                tabela = tabela.reset_index(drop=True)
+                tabela.insert(0, 'estudantes', estudantes)
+            return tabela[['estudantes', 'linhas', 'cliques', 'score_medio', 'score_min', 'score_max',
+                           'score_contagem']]
+
+        return self._memorizar(self._chave_consulta('agregados', dimensoes, filtros), calcular).copy()
+
+    def materializar(self, consultas: Iterable[Sequence[str]] = CONSULTAS_FREQUENTES) -> None:
+        """Calcula de antemão as fatias indicadas (as que usam dimensões fora do cubo são ignoradas)"""
+        self.estudantes()
+        for dimensoes in consultas:
+            if all(d in self._codigos for d in dimensoes):
+                self.agregados(dimensoes)
+
+
+def caminho_cubo(nome: str, base_path: Optional[Path] = None) -> Path:
+    """Caminho do cubo gravado ao lado do artefato"""
+    return caminho_artefato(nome, base_path).with_name(f"{nome}.cubo.parquet")
+
+
+def gravar_cubo(nome: str, df: pd.DataFrame, base_path: Optional[Path] = None) -> CuboEstudantes:
+    """
+    Constrói o cubo e o grava ao lado do artefato.
+
+    Deve ser chamado depois de gravar o artefato e o manifesto: o cubo
+    registra a versão atual do artefato e só vale para ela.
+
+    Args:
+        nome: Nome do artefato ('oulad')
+        df: DataFrame processado completo (o mesmo gravado no artefato)
+        base_path: Caminho base do projeto (opcional)
+
+    Returns:
+        O cubo gravado
+    """
+    inicio = time.perf_counter()
+    cubo = CuboEstudantes.construir(df)
+    cubo.versao = versao_artefato(nome, base_path)
+    tabela = pa.Table.from_pandas(cubo.base, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_CHAVE_METADADOS] = json.dumps(
+        {'versao_artefato': cubo.versao, 'dimensoes': cubo.dimensoes}
+    ).encode('utf-8')
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    caminho = caminho_cubo(nome, base_path)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    escrever_atomico(caminho, lambda temporario: pq.write_table(tabela, temporario, compression='zstd'))
+    print(f"🧊 Cubo '{nome}' salvo: {caminho} ({len(cubo.base):,} células × estudante, "
+          f"{time.perf_counter() - inicio:.2f}s)")
+    return cubo
+
+
+def ler_cubo(nome: str, base_path: Optional[Path] = None) -> Optional[CuboEstudantes]:
+    """
+    Lê o cubo gravado para a versão atual do artefato.
+
+    Returns:
+        CuboEstudantes, ou None se não existir, estiver ilegível ou for de outra versão do artefato
+    """
+    caminho = caminho_cubo(nome, base_path)
+    if not caminho.is_file():
+        return None
+    try:
+        tabela = pq.read_table(caminho)
+        metadados = json.loads(tabela.schema.metadata[_CHAVE_METADADOS])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+    if metadados.get('versao_artefato') != versao_artefato(nome, base_path):
+        return None
+    return CuboEstudantes(tabela.to_pandas(), metadados['dimensoes'], versao=metadados['versao_artefato'])
@@ -0,0 +1,206 @@
+"""
+Registro central de esquemas (tipos por coluna) dos conjuntos UCI, OULAD e unificado.
+
+Cada conjunto declara o tipo mais estreito de cada coluna conhecida: inteiros
+com a menor largura que comporta os valores do conjunto completo, float32
+para medidas, 'category' para colunas de texto com poucos valores distintos
+e categorias ordenadas para escalas ordinais (que continuam aceitando
+comparações como `Dalc <= 2` e voltam a números com `.cat.codes`/`astype`).
+`aplicar_esquema` converte um DataFrame para esses tipos (conferindo antes se
+os valores cabem no tipo declarado), infere tipos para colunas não declaradas
+e informa a memória economizada por coluna.
+"""
+
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+Tipo = Union[str, pd.CategoricalDtype]
+
+
+def _escala(*niveis) -> pd.CategoricalDtype:
+    """Categoria ordenada com os níveis na ordem da escala"""
+    return pd.CategoricalDtype(list(niveis), ordered=True)
+
+
+# Escalas ordinais do UCI (níveis na ordem do questionário)
+ESCALA_EDUCACAO = _escala(0, 1, 2, 3, 4)
+ESCALA_1_5 = _escala(1, 2, 3, 4, 5)
+ESCALA_TEMPO_VIAGEM = _escala('<15m', '15-30m', '30-1h', '>1h')
+ESCALA_TEMPO_ESTUDO = _escala('<2h', '2-5h', '5-10h', '>10h')
+
+# Colunas UCI (student-mat.csv / student-por.csv + 'origem')
+ESQUEMA_UCI = {
+    'school': 'category', 'sex': 'category', 'age': 'int8', 'address': 'category',
+    'famsize': 'category', 'Pstatus': 'category',
+    # Escalas ordinais: categorias ordenadas (one-hot nos modelos, ordem e comparações preservadas)
+    'Medu': ESCALA_EDUCACAO, 'Fedu': ESCALA_EDUCACAO, 'famrel': ESCALA_1_5, 'goout': ESCALA_1_5,
+    'Dalc': ESCALA_1_5, 'Walc': ESCALA_1_5, 'health': ESCALA_1_5,
+    'Mjob': 'category', 'Fjob': 'category', 'reason': 'category', 'guardian': 'category',
+    'traveltime': ESCALA_TEMPO_VIAGEM, 'studytime': ESCALA_TEMPO_ESTUDO, 'failures': 'int8',
+    'schoolsup': 'category', 'famsup': 'category', 'paid': 'category', 'activities': 'category',
+    'nursery': 'category', 'higher': 'category', 'internet': 'category', 'romantic': 'category',
+    'freetime': 'int8', 'absences': 'int16', 'G1': 'int8', 'G2': 'int8', 'G3': 'int8',
+    'origem': 'category',
+}
+
+# Colunas do OULAD processado (modos 'legado' e 'agregado'; _x/_y vêm das junções legadas)
+ESQUEMA_OULAD = {
+    'code_module': 'category', 'code_module_x': 'category', 'code_module_y': 'category',
+    'code_presentation': 'category', 'id_student': 'int32', 'id_site': 'int32',
+    'date_x': 'int16', 'date_y': 'float32', 'sum_click': 'int32', 'activity_type': 'category',
+    'gender': 'category', 'region': 'category', 'highest_education': 'category',
+    'imd_band': 'category', 'age_band': 'category', 'num_of_prev_attempts': 'int8',
+    'studied_credits': 'int16', 'disability': 'category', 'final_result': 'category',
+    'id_assessment': 'int32', 'date_submitted': 'float32', 'is_banked': 'int8', 'score': 'float32',
+    'assessment_type': 'category', 'weight': 'float32', 'module_presentation_length': 'int16',
+    'date_registration': 'float32', 'date_unregistration': 'float32', 'cancelou': 'int8',
+    'num_registros_vle': 'int32', 'dias_ativos': 'int16', 'primeira_atividade': 'int16',
+    'ultima_atividade': 'int16', 'num_avaliacoes': 'float32',
+}
+
+# Colunas comuns do dataset unificado; as demais (uci_*, oulad_*) têm o tipo inferido
+ESQUEMA_UNIFICADO = {
+    'origem_dado': 'category', 'genero': 'category', 'regiao': 'category',
+    # idade: idade em anos (UCI) e faixa etária (OULAD), gravada como texto (ver normalizar_colunas_mistas)
+    'idade': 'category', 'faltas': 'float32', 'tentativas_anteriores': 'float32',
+    'resultado_final': 'float32',
+}
+
+ESQUEMAS: Dict[str, Dict[str, Tipo]] = {
+    'uci': ESQUEMA_UCI,
+    'oulad': ESQUEMA_OULAD,
+    'unificado': ESQUEMA_UNIFICADO,
+}
+
+# Texto não declarado vira 'category' se tiver no máximo esta fração de valores distintos
+LIMITE_CARDINALIDADE_CATEGORIA = 0.5
+
+
+def _cabe_no_tipo(serie: pd.Series, tipo: str) -> bool:
+    """Indica se os valores de uma série numérica cabem no tipo inteiro/float declarado"""
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        return False
+    if np.dtype(tipo).kind == 'f':
+        return True
+    valores = serie.dropna()
+    if len(valores) < len(serie) or (len(valores) and not np.all(np.mod(valores, 1) == 0)):
+        # Inteiros sem suporte a ausentes ou valores fracionários
+        return False
+    if valores.empty:
+        return True
+    limites = np.iinfo(tipo)
+    return limites.min <= valores.min() and valores.max() <= limites.max
+
+
+def _cabe_na_escala(serie: pd.Series, escala: pd.CategoricalDtype) -> bool:
+    """Indica se todos os valores presentes são níveis da escala (senão a conversão os perderia)"""
+    return bool(serie.dropna().isin(escala.categories).all())
+
+
+def _mesmo_tipo(serie: pd.Series, tipo: Tipo) -> bool:
+    if isinstance(tipo, pd.CategoricalDtype):
+        # Compara níveis e ordem, não só o nome 'category'
+        return serie.dtype == tipo
+    return str(serie.dtype) == tipo
+
+
+def _tipo_inferido(serie: pd.Series) -> Optional[str]:
+    """Menor tipo para uma coluna sem declaração no esquema (None = manter)"""
+    if pd.api.types.is_bool_dtype(serie) or isinstance(serie.dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_integer_dtype(serie):
+        # Do menor para o maior: o primeiro que comportar os valores
+        for tipo in ('int8', 'int16', 'int32'):
+            if _cabe_no_tipo(serie, tipo):
+                return tipo
+        return None
+    if pd.api.types.is_float_dtype(serie):
+        return 'float32' if serie.dtype == np.float64 else None
+    if serie.dtype == object and len(serie):
+        if serie.nunique(dropna=True) <= LIMITE_CARDINALIDADE_CATEGORIA * len(serie):
+            return 'category'
+    return None
+
+
+def _converter(serie: pd.Series, tipo: Tipo) -> pd.Series:
+    if isinstance(tipo, pd.CategoricalDtype):
+        # Categorias já existentes (ex.: lidas do Parquet) voltam aos valores antes de ganhar os níveis
+        valores = serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie
+        return valores.astype(tipo)
+    if tipo == 'category':
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+    if tipo == 'string[pyarrow]':
+        return serie.astype(pd.StringDtype('pyarrow'))
+    return serie.astype(tipo)
+
+
+def aplicar_esquema(df: pd.DataFrame, nome: Optional[str] = None, inferir: bool = True,
+                    verbose: bool = True) -> pd.DataFrame:
+    """
+    Converte as colunas de um DataFrame para os tipos do esquema registrado.
+
+    Colunas declaradas cujos valores não cabem no tipo (por exemplo inteiros
+    com ausentes) recebem o tipo inferido. Retorna um novo DataFrame; o
+    relatório de economia fica disponível por relatorio_memoria(antes, depois).
+
+    Args:
+        df: DataFrame a otimizar
+        nome: Nome do esquema em ESQUEMAS ('uci', 'oulad', 'unificado'); None = só inferência
+        inferir: Reduz também as colunas não declaradas no esquema
+        verbose: Imprime a economia total de memória
+
+    Returns:
+        DataFrame com os tipos otimizados
+    """
+    esquema = ESQUEMAS.get(nome, {}) if nome is not None else {}
+    conversoes = {}
+
+    for coluna in df.columns:
+        serie = df[coluna]
+        tipo = esquema.get(coluna)
+        if isinstance(tipo, pd.CategoricalDtype):
+            if not _cabe_na_escala(serie, tipo):
+                tipo = None
+        elif tipo is not None and tipo not in ('category', 'string[pyarrow]') and not _cabe_no_tipo(serie, tipo):
+            tipo = None
+        if tipo is None and inferir:
+            tipo = _tipo_inferido(serie)
+        if tipo is not None and not _mesmo_tipo(serie, tipo):
+            conversoes[coluna] = tipo
+
+    if not conversoes:
+        return df
+
+    resultado = df.copy(deep=False)
+    for coluna, tipo in conversoes.items():
+        resultado[coluna] = _converter(df[coluna], tipo)
+
+    if verbose:
+        antes = df.memory_usage(deep=True).sum() / 1024**2
+        depois = resultado.memory_usage(deep=True).sum() / 1024**2
+        print(f"🗜️ Esquema '{nome or 'inferido'}': {len(conversoes)} colunas convertidas, "
+              f"{antes:.2f} MB → {depois:.2f} MB")
+    return resultado
+
+
+def relatorio_memoria(antes: pd.DataFrame, depois: pd.DataFrame) -> pd.DataFrame:
+    """
+    Memória por coluna antes e depois da otimização de tipos.
+
+    Returns:
+        DataFrame com coluna, tipo_antes, tipo_depois, mb_antes, mb_depois e
+        mb_economizados, ordenado pela economia
+    """
+    mb_antes = antes.memory_usage(deep=True, index=False) / 1024**2
+    mb_depois = depois.memory_usage(deep=True, index=False) / 1024**2
+    relatorio = pd.DataFrame({
+        'coluna': antes.columns,
+        'tipo_antes': [str(t) for t in antes.dtypes],
+        'tipo_depois': [str(depois[c].dtype) if c in depois.columns else None for c in antes.columns],
+        'mb_antes': mb_antes.reindex(antes.columns).to_numpy(),
+        'mb_depois': mb_depois.reindex(antes.columns).to_numpy(),
+    })
+    relatorio['mb_economizados'] = relatorio['mb_antes'] - relatorio['mb_depois']
+    return relatorio.sort_values('mb_economizados', ascending=False, kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,252 @@
+"""
+Inferência de florestas compiladas em vetores planos de nós.
+
+`predict` de uma floresta do sklearn percorre cada árvore separadamente e
+junta os resultados com joblib: para lotes pequenos (o teste da UCI, cada
+repetição da importância por permutação, a turma enviada pelo usuário) o
+custo fixo por árvore domina. `compilar_floresta` concatena os nós de todas
+as árvores em vetores NumPy (feature, limiar, filhos, valor), em ordem de
+largura para que os dois filhos de um nó fiquem lado a lado, e a travessia
+avança todas as combinações amostra × árvore juntas, um nível por iteração.
+As previsões coincidem com as do sklearn (mesma conversão para float32, mesmo
+desvio de valores ausentes, mesma ordem de soma das árvores).
+"""
+
+import time
+from typing import Any, Iterable, List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin, RegressorMixin, is_classifier
+from sklearn.ensemble import (
+    ExtraTreesClassifier, ExtraTreesRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.pipeline import Pipeline
+from sklearn.tree import BaseDecisionTree
+
+# Florestas cuja previsão é a média das árvores (também usadas pela atribuição por caminho)
+FLORESTAS = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+
+# Pares amostra × árvore percorridos de uma vez: vetores de trabalho pequenos ficam no cache
+PARES_POR_LOTE = 65_536
+
+
+class FlorestaCompilada(BaseEstimator):
+    """
+    Floresta (ou árvore) já ajustada, em vetores planos de nós.
+
+    Use `compilar_floresta` para criar; o objeto só faz previsões.
+    """
+
+    def fit(self, X: Any, y: Any = None):
+        raise TypeError("Uma floresta compilada não é treinada: use compilar_floresta(estimador_ajustado)")
+
+    def _compilar(self, arvores: List[BaseDecisionTree], classificador: bool) -> 'FlorestaCompilada':
+        features, limiares, primeiros, ausentes, valores, raizes = [], [], [], [], [], []
+        inicio = 0
+        for arvore in arvores:
+            estrutura = arvore.tree_
+            ordem = _ordem_largura(estrutura)
+            posicao = np.empty(estrutura.node_count, dtype=np.intp)
+            posicao[ordem] = np.arange(estrutura.node_count) + inicio
+            esquerda = estrutura.children_left[ordem]
+            internos = esquerda >= 0
+
+            valor = estrutura.value[ordem, 0, :]
+            if classificador:
+                # Mesma normalização de DecisionTreeClassifier.predict_proba
+                soma = valor.sum(axis=1, keepdims=True)
+                valor = valor / np.where(soma == 0.0, 1.0, soma)
+            raizes.append(inicio)
+            # Folhas apontam para si mesmas: limiar +inf e ausentes à esquerda mantêm a amostra no lugar
+            features.append(np.where(internos, estrutura.feature[ordem], 0))
+            limiares.append(np.where(internos, estrutura.threshold[ordem], np.inf))
+            primeiros.append(np.where(internos, posicao[np.where(internos, esquerda, 0)], posicao[ordem]))
+            ausentes.append(np.where(internos, estrutura.missing_go_to_left[ordem].astype(bool), True))
+            valores.append(valor)
+            inicio += estrutura.node_count
+
+        self.feature_ = np.concatenate(features).astype(np.intp)
+        self.limiar_ = np.concatenate(limiares)
+        self.primeiro_filho_ = np.concatenate(primeiros).astype(np.intp)
+        self.ausente_esquerda_ = np.concatenate(ausentes)
+        self.valor_ = np.concatenate(valores)
+        self.raizes_ = np.asarray(raizes, dtype=np.intp)
+        self.profundidade_ = max(a.tree_.max_depth for a in arvores)
+        self.n_features_in_ = arvores[0].n_features_in_
+        return self
+
+    @property
+    def n_arvores(self) -> int:
+        return len(self.raizes_)
+
+    def _matriz(self, X: Any) -> np.ndarray:
+        if sparse.issparse(X):
+            X = X.toarray()
+        # O sklearn compara os limiares com as features convertidas para float32
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X tem {X.shape[-1]} features, mas a floresta espera {self.n_features_in_}")
+        return X
+
+    def _folhas(self, X: np.ndarray) -> np.ndarray:
+        """Nó folha alcançado por cada amostra em cada árvore (n_amostras × n_arvores)"""
+        n_amostras, n_features = X.shape
+        nos = np.tile(self.raizes_, n_amostras)
+        # Posição da linha de cada par amostra × árvore em X achatado
+        deslocamentos = np.repeat(np.arange(n_amostras, dtype=np.intp) * n_features, self.n_arvores)
+        X = X.ravel()
+        ativos = np.arange(len(nos), dtype=np.intp)
+        for nivel in range(self.profundidade_):
+            atuais = nos[ativos]
+            valores = X[deslocamentos[ativos] + self.feature_[atuais]]
+            direita = ~(valores <= self.limiar_[atuais])
+            ausentes = np.isnan(valores)
+            if ausentes.any():
+                direita[ausentes] = ~self.ausente_esquerda_[atuais[ausentes]]
+            # Filhos vizinhos no vetor: o da direita vem logo depois do da esquerda
+            proximos = self.primeiro_filho_[atuais] + direita
+            nos[ativos] = proximos
+            if nivel % 2:
+                # A cada dois níveis, descarta os pares que já pararam numa folha
+                ativos = ativos[self.primeiro_filho_[proximos] != proximos]
+                if len(ativos) == 0:
+                    break
+        return nos.reshape(n_amostras, self.n_arvores)
+
+    def _media_arvores(self, X: Any) -> np.ndarray:
+        """Média dos valores das folhas sobre as árvores, acumulada na ordem do sklearn"""
+        X = self._matriz(X)
+        saida = np.zeros((len(X), self.valor_.shape[1]))
+        lote = max(1, PARES_POR_LOTE // self.n_arvores)
+        for inicio in range(0, len(X), lote):
+            folhas = self._folhas(X[inicio:inicio + lote])
+            parcial = saida[inicio:inicio + lote]
+            for arvore in range(self.n_arvores):
+                parcial += self.valor_[folhas[:, arvore]]
+        saida /= self.n_arvores
+        return saida
+
+
+class FlorestaCompiladaRegressor(RegressorMixin, FlorestaCompilada):
+    """Floresta de regressão compilada (predict e score R², como o original)"""
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self._media_arvores(X)[:, 0]
+
+
+class FlorestaCompiladaClassificador(ClassifierMixin, FlorestaCompilada):
+    """Floresta de classificação compilada (predict, predict_proba e score de acurácia)"""
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self._media_arvores(X)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def _ordem_largura(estrutura: Any) -> np.ndarray:
+    """Nós em ordem de largura, com os dois filhos de cada nó lado a lado"""
+    esquerda, direita = estrutura.children_left, estrutura.children_right
+    nivel = np.asarray([0])
+    ordem = [nivel]
+    while True:
+        internos = nivel[esquerda[nivel] >= 0]
+        if len(internos) == 0:
+            return np.concatenate(ordem)
+        nivel = np.column_stack([esquerda[internos], direita[internos]]).ravel()
+        ordem.append(nivel)
+
+
+def suporta_compilacao(estimador: Any) -> bool:
+    """Indica se o estimador é uma árvore/floresta ajustada de uma saída"""
+    if not isinstance(estimador, (BaseDecisionTree,) + FLORESTAS):
+        return False
+    arvore = estimador if isinstance(estimador, BaseDecisionTree) else getattr(estimador, 'estimators_', [None])[0]
+    return getattr(arvore, 'tree_', None) is not None and arvore.tree_.n_outputs == 1
+
+
+def compilar_floresta(estimador: Any) -> FlorestaCompilada:
+    """
+    Compila uma floresta (ou árvore) ajustada em vetores planos de nós.
+
+    Args:
+        estimador: RandomForest/ExtraTrees (classificação ou regressão) ou
+            árvore de decisão, já ajustado e com uma única saída
+
+    Returns:
+        FlorestaCompiladaClassificador ou FlorestaCompiladaRegressor
+    """
+    if not suporta_compilacao(estimador):
+        raise ValueError(
+            f"Compilação indisponível para {type(estimador).__name__}: "
+            f"use uma árvore ou floresta ajustada com uma única saída"
+        )
+    arvores = [estimador] if isinstance(estimador, BaseDecisionTree) else list(estimador.estimators_)
+    if is_classifier(estimador):
+        compilada = FlorestaCompiladaClassificador()._compilar(arvores, classificador=True)
+        compilada.classes_ = estimador.classes_
+    else:
+        compilada = FlorestaCompiladaRegressor()._compilar(arvores, classificador=False)
+    return compilada
+
+
+def compilar_modelo(modelo: Any) -> Any:
+    """
+    Modelo com o estimador final compilado, ou o próprio modelo se não houver o que compilar.
+
+    Num Pipeline, os passos de pré-processamento (já ajustados) são
+    reaproveitados como estão; só o estimador final é trocado.
+    """
+    if isinstance(modelo, Pipeline):
+        if not suporta_compilacao(modelo[-1]):
+            return modelo
+        nome_final = modelo.steps[-1][0]
+        return Pipeline(modelo.steps[:-1] + [(nome_final, compilar_floresta(modelo[-1]))])
+    return compilar_floresta(modelo) if suporta_compilacao(modelo) else modelo
+
+
+def medir_inferencia(modelo: Any, X: Any, lotes: Iterable[int] = (1, 100, 10_000),
+                     repeticoes: int = 5) -> pd.DataFrame:
+    """
+    Compara o tempo de previsão do sklearn e da floresta compilada em lotes de vários tamanhos.
+
+    Args:
+        modelo: Pipeline (ou floresta) ajustado
+        X: Dados de avaliação com as colunas originais
+        lotes: Tamanhos de lote medidos (limitados ao tamanho de X)
+        repeticoes: Medições por lote (vale a mediana)
+
+    Returns:
+        Uma linha por lote: tempo_sklearn_s, tempo_compilado_s, aceleracao,
+        tempo_compilacao_s e diferenca_maxima entre as previsões
+    """
+    inicio = time.perf_counter()
+    compilado = compilar_modelo(modelo)
+    tempo_compilacao = time.perf_counter() - inicio
+    if compilado is modelo:
+        raise ValueError(f"Nada a compilar em {type(modelo).__name__}")
+    # predict_proba quando houver: compara as probabilidades, não só a classe vencedora
+    metodo = 'predict_proba' if hasattr(compilado, 'predict_proba') else 'predict'
+
+    linhas = []
+    for lote in sorted({min(lote, len(X)) for lote in lotes}):
+        amostra = X[:lote]
+        tempos = {}
+        for rotulo, candidato in (('sklearn', modelo), ('compilado', compilado)):
+            medicoes = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                previsto = getattr(candidato, metodo)(amostra)
+                medicoes.append(time.perf_counter() - inicio)
+            tempos[rotulo] = (float(np.median(medicoes)), previsto)
+        linhas.append({
+            'lote': lote,
+            'tempo_sklearn_s': round(tempos['sklearn'][0], 5),
+            'tempo_compilado_s': round(tempos['compilado'][0], 5),
+            'aceleracao': round(tempos['sklearn'][0] / tempos['compilado'][0], 2),
+            'tempo_compilacao_s': round(tempo_compilacao, 4),
+            'diferenca_maxima': float(np.max(np.abs(tempos['sklearn'][1] - tempos['compilado'][1]))),
+        })
+    return pd.DataFrame(linhas)
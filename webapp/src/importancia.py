@@ -0,0 +1,359 @@
+"""
+Importância por permutação agrupada sobre a matriz já transformada.
+
+`sklearn.inspection.permutation_importance` aplicado ao `Pipeline` inteiro
+refaz o `ColumnTransformer`/`OneHotEncoder` a cada feature × repetição. Como
+essas transformações operam linha a linha, permutar uma coluna original e
+transformar é o mesmo que transformar uma vez e permutar, com o mesmo
+embaralhamento de linhas, o bloco de colunas codificadas que saiu dela.
+`importancia_permutacao_agrupada` faz exatamente isso: transforma o teste uma
+vez, descobre o bloco de colunas de saída de cada coluna original e avalia
+apenas o estimador final. Com a mesma semente, os embaralhamentos são os do
+sklearn e o resultado coincide com o de `permutation_importance`.
+
+`importancia_permutacao_adaptativa` usa a mesma ideia, mas em rodadas: para
+de permutar cada coluna assim que o intervalo de confiança da sua importância
+a separa das vizinhas na ordenação, e respeita um orçamento de tempo.
+"""
+
+import time
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import check_scoring
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.utils import Bunch, check_random_state
+
+try:
+    from .floresta_compilada import compilar_modelo
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from floresta_compilada import compilar_modelo
+
+
+def _saidas_por_entrada(transformador: Any, n_entradas: int) -> List[int]:
+    """Número de colunas de saída geradas por cada coluna de entrada de um transformador ajustado"""
+    if transformador == 'passthrough' or transformador is None:
+        return [1] * n_entradas
+    if transformador == 'drop':
+        return [0] * n_entradas
+    if isinstance(transformador, OneHotEncoder):
+        por_coluna = getattr(transformador, '_n_features_outs', None)
+        if por_coluna is None:
+            por_coluna = [len(c) for c in transformador.categories_]
+        return [int(n) for n in por_coluna]
+    if isinstance(transformador, SimpleImputer) and not transformador.add_indicator:
+        # Colunas sem nenhum valor observado são descartadas pelo imputador
+        if transformador.keep_empty_features or transformador.strategy == 'constant':
+            return [1] * n_entradas
+        return [0 if v else 1 for v in pd.isna(transformador.statistics_)]
+
+    n_saidas = len(transformador.get_feature_names_out())
+    if n_saidas != n_entradas:
+        raise ValueError(
+            f"Não é possível agrupar as saídas de {type(transformador).__name__}: "
+            f"{n_entradas} colunas de entrada, {n_saidas} de saída"
+        )
+    return [1] * n_entradas
+
+
+def _origens_transformador(transformador: Any, n_entradas: int) -> List[int]:
+    """Para cada coluna de saída, a posição da coluna de entrada que a gerou"""
+    origens = list(range(n_entradas))
+    passos = [p for _, p in transformador.steps] if isinstance(transformador, Pipeline) else [transformador]
+    for passo in passos:
+        saidas = _saidas_por_entrada(passo, len(origens))
+        origens = [o for o, n in zip(origens, saidas) for _ in range(n)]
+    return origens
+
+
+def _nomes_selecionados(selecionadas: Any, colunas: List[str]) -> List[str]:
+    """Nomes das colunas selecionadas por um transformador (nomes, posições, fatia ou máscara)"""
+    if isinstance(selecionadas, str):
+        return [selecionadas]
+    if isinstance(selecionadas, slice):
+        return list(colunas[selecionadas])
+    selecionadas = list(selecionadas)
+    if selecionadas and isinstance(selecionadas[0], (bool, np.bool_)):
+        return [c for c, usar in zip(colunas, selecionadas) if usar]
+    if selecionadas and isinstance(selecionadas[0], (int, np.integer)):
+        return [colunas[i] for i in selecionadas]
+    return selecionadas
+
+
+def grupos_de_colunas(preprocessor: Any, colunas: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Colunas da matriz transformada que pertencem a cada coluna original.
+
+    Args:
+        preprocessor: ColumnTransformer (ou transformador simples) já ajustado
+        colunas: Colunas originais, na ordem do DataFrame de entrada
+
+    Returns:
+        Dicionário coluna original -> índices das colunas de saída (vazio se
+        a coluna foi descartada)
+    """
+    grupos = {coluna: [] for coluna in colunas}
+    if not isinstance(preprocessor, ColumnTransformer):
+        for saida, origem in enumerate(_origens_transformador(preprocessor, len(colunas))):
+            grupos[colunas[origem]].append(saida)
+        return {c: np.asarray(i, dtype=np.intp) for c, i in grupos.items()}
+
+    with warnings.catch_warnings():
+        # Aviso do sklearn 1.6 sobre o formato futuro das colunas do 'remainder' (posições ou nomes):
+        # _nomes_selecionados aceita os dois
+        warnings.simplefilter('ignore', FutureWarning)
+        transformadores = preprocessor.transformers_
+    for nome, transformador, selecionadas in transformadores:
+        if transformador == 'drop' or nome not in preprocessor.output_indices_:
+            continue
+        entradas = _nomes_selecionados(selecionadas, colunas)
+        fatia = preprocessor.output_indices_[nome]
+        origens = _origens_transformador(transformador, len(entradas))
+        if len(origens) != fatia.stop - fatia.start:
+            raise ValueError(f"Saídas do transformador '{nome}' não correspondem às colunas de entrada")
+        for saida, origem in zip(range(fatia.start, fatia.stop), origens):
+            grupos[entradas[origem]].append(saida)
+    return {c: np.asarray(i, dtype=np.intp) for c, i in grupos.items()}
+
+
+def _grupos_pipeline(preprocessamento: Pipeline, colunas: List[str]) -> Dict[str, np.ndarray]:
+    """Blocos de colunas de saída do pré-processamento (o primeiro passo define os grupos)"""
+    grupos = grupos_de_colunas(preprocessamento[0], colunas)
+    origens = np.full(sum(len(b) for b in grupos.values()), -1)
+    for posicao, bloco in enumerate(grupos.values()):
+        origens[bloco] = posicao
+    for passo in preprocessamento[1:]:
+        origens = np.asarray([origens[o] for o in _origens_transformador(passo, len(origens))])
+    return {c: np.flatnonzero(origens == i) for i, c in enumerate(colunas)}
+
+
+def _matriz_e_grupos(modelo: Pipeline, X: pd.DataFrame):
+    """Estimador final (floresta compilada, se for o caso), matriz transformada densa e blocos de colunas"""
+    # Cada repetição pontua o estimador de novo: a floresta compilada evita o custo fixo por árvore
+    estimador = compilar_modelo(modelo[-1])
+    colunas = list(X.columns)
+    if len(modelo) > 1:
+        transformado = modelo[:-1].transform(X)
+        grupos = _grupos_pipeline(modelo[:-1], colunas)
+    else:
+        transformado = X
+        grupos = {c: np.asarray([i]) for i, c in enumerate(colunas)}
+    if sparse.issparse(transformado):
+        transformado = transformado.toarray()
+    return estimador, np.asarray(transformado), grupos
+
+
+def importancia_permutacao_agrupada(
+    modelo: Pipeline,
+    X: pd.DataFrame,
+    y: Any,
+    n_repeats: int = 5,
+    random_state: Optional[int] = None,
+    scoring: Any = None,
+) -> Bunch:
+    """
+    Importância por permutação das colunas originais, permutando blocos da matriz transformada.
+
+    Mesma interface e mesmo resultado de `permutation_importance(modelo, X, y, ...)`,
+    mas o pré-processamento roda uma única vez.
+
+    Args:
+        modelo: Pipeline ajustado cujo último passo é o estimador
+        X: Dados de avaliação com as colunas originais
+        y: Alvo de avaliação
+        n_repeats: Repetições por coluna
+        random_state: Semente dos embaralhamentos
+        scoring: Métrica (padrão: score do estimador, como no sklearn)
+
+    Returns:
+        Bunch com importances_mean, importances_std e importances
+        (n_colunas × n_repeats), na ordem de X.columns
+    """
+    estimador, transformado, grupos = _matriz_e_grupos(modelo, X)
+    colunas = list(X.columns)
+    pontuar = check_scoring(estimador, scoring=scoring)
+    base = pontuar(estimador, transformado, y)
+
+    # Mesma sequência de sementes do sklearn: um RandomState novo por coluna
+    semente = check_random_state(random_state).randint(np.iinfo(np.int32).max + 1)
+    trabalho = transformado.copy()
+    pontuacoes = np.empty((len(colunas), n_repeats))
+    for i, coluna in enumerate(colunas):
+        bloco = grupos[coluna]
+        if len(bloco) == 0:
+            # Coluna descartada pelo pré-processamento: permutá-la não muda nada
+            pontuacoes[i] = base
+            continue
+        gerador = check_random_state(semente)
+        indices = np.arange(len(trabalho))
+        for r in range(n_repeats):
+            gerador.shuffle(indices)
+            # Embaralhamentos acumulados, como em _calculate_permutation_scores
+            trabalho[:, bloco] = trabalho[np.ix_(indices, bloco)]
+            pontuacoes[i, r] = pontuar(estimador, trabalho, y)
+        trabalho[:, bloco] = transformado[:, bloco]
+
+    importancias = base - pontuacoes
+    return Bunch(
+        importances_mean=importancias.mean(axis=1),
+        importances_std=importancias.std(axis=1),
+        importances=importancias,
+    )
+
+
+def _ordem_decidida(media: np.ndarray, meia_largura: np.ndarray) -> np.ndarray:
+    """Colunas cujo intervalo não se sobrepõe ao dos vizinhos na ordenação pela média"""
+    ordem = np.argsort(media, kind='stable')
+    decidida = np.ones(len(media), dtype=bool)
+    for a, b in zip(ordem[:-1], ordem[1:]):
+        separadas = media[a] + meia_largura[a] < media[b] - meia_largura[b]
+        # Duas colunas sem variância nenhuma não se separam com mais repetições
+        sem_variancia = meia_largura[a] == 0 and meia_largura[b] == 0
+        if not (separadas or sem_variancia):
+            decidida[a] = decidida[b] = False
+    return decidida
+
+
+def _meia_largura(m2: np.ndarray, repeticoes: np.ndarray, confianca: float, t_student: Any) -> np.ndarray:
+    """Meia-largura do intervalo t de Student para a média de cada coluna"""
+    n = np.maximum(repeticoes, 2)
+    desvio = np.sqrt(m2 / (n - 1))
+    return t_student.ppf((1 + confianca) / 2, n - 1) * desvio / np.sqrt(n)
+
+
+def importancia_permutacao_adaptativa(
+    modelo: Pipeline,
+    X: pd.DataFrame,
+    y: Any,
+    max_repeticoes: int = 30,
+    min_repeticoes: int = 3,
+    confianca: float = 0.95,
+    tolerancia: float = 1e-3,
+    tempo_limite: Optional[float] = None,
+    random_state: Optional[int] = None,
+    scoring: Any = None,
+) -> Bunch:
+    """
+    Importância por permutação que só repete o que ainda muda a ordenação.
+
+    As repetições são feitas em rodadas (uma por coluna ativa), mantendo média
+    e variância acumuladas de cada coluna (Welford). A partir de
+    `min_repeticoes`, uma coluna para de ser permutada quando o seu intervalo
+    de confiança (t de Student) fica separado dos intervalos das colunas
+    vizinhas na ordenação, ou quando a meia-largura do intervalo cai abaixo de
+    `tolerancia`. Cada coluna usa o mesmo gerador e os mesmos embaralhamentos
+    acumulados de `importancia_permutacao_agrupada`: com min_repeticoes =
+    max_repeticoes e tolerancia=0 o resultado é o de `permutation_importance`.
+
+    Args:
+        modelo: Pipeline ajustado cujo último passo é o estimador
+        X: Dados de avaliação com as colunas originais
+        y: Alvo de avaliação
+        max_repeticoes: Limite de repetições por coluna
+        min_repeticoes: Repetições feitas sempre, antes de qualquer parada (mínimo 2)
+        confianca: Nível dos intervalos de confiança
+        tolerancia: Meia-largura (na escala do score) abaixo da qual a coluna para
+        tempo_limite: Orçamento em segundos; esgotado após as repetições mínimas,
+            as colunas param com as repetições que já têm
+        random_state: Semente dos embaralhamentos
+        scoring: Métrica (padrão: score do estimador, como no sklearn)
+
+    Returns:
+        Bunch com importances_mean, importances_std, importances
+        (n_colunas × max_repeticoes, NaN nas repetições não feitas),
+        ic_inferior, ic_superior, repeticoes, tempo_s e interrompida_por_tempo
+    """
+    from scipy.stats import t as t_student
+
+    if not 2 <= min_repeticoes <= max_repeticoes:
+        raise ValueError("É preciso 2 <= min_repeticoes <= max_repeticoes para estimar os intervalos")
+    inicio = time.perf_counter()
+    estimador, transformado, grupos = _matriz_e_grupos(modelo, X)
+    colunas = list(X.columns)
+    n_colunas = len(colunas)
+    pontuar = check_scoring(estimador, scoring=scoring)
+    base = pontuar(estimador, transformado, y)
+
+    semente = check_random_state(random_state).randint(np.iinfo(np.int32).max + 1)
+    geradores = [check_random_state(semente) for _ in colunas]
+    indices = [np.arange(len(transformado)) for _ in colunas]
+    # Permutação acumulada de cada coluna: a r-ésima repetição vê transformado[compostas[i]]
+    compostas = [np.arange(len(transformado)) for _ in colunas]
+    importancias = np.full((n_colunas, max_repeticoes), np.nan)
+    repeticoes = np.zeros(n_colunas, dtype=int)
+    media = np.zeros(n_colunas)
+    m2 = np.zeros(n_colunas)
+    ativas = np.asarray([len(grupos[c]) > 0 for c in colunas])
+    # Coluna descartada pelo pré-processamento: importância exatamente zero
+    importancias[~ativas, :min_repeticoes] = 0.0
+    repeticoes[~ativas] = min_repeticoes
+
+    trabalho = transformado.copy()
+    interrompida = False
+    for rodada in range(max_repeticoes):
+        for i in np.flatnonzero(ativas):
+            if rodada >= min_repeticoes and tempo_limite is not None \
+                    and time.perf_counter() - inicio > tempo_limite:
+                interrompida = True
+                break
+            bloco = grupos[colunas[i]]
+            geradores[i].shuffle(indices[i])
+            compostas[i] = compostas[i][indices[i]]
+            trabalho[:, bloco] = transformado[np.ix_(compostas[i], bloco)]
+            valor = base - pontuar(estimador, trabalho, y)
+            trabalho[:, bloco] = transformado[:, bloco]
+
+            importancias[i, rodada] = valor
+            repeticoes[i] += 1
+            delta = valor - media[i]
+            media[i] += delta / repeticoes[i]
+            m2[i] += delta * (valor - media[i])
+        if interrompida:
+            break
+
+        if rodada + 1 >= min_repeticoes:
+            meia_largura = _meia_largura(m2, repeticoes, confianca, t_student)
+            paradas = _ordem_decidida(media, meia_largura) | (meia_largura <= tolerancia)
+            ativas &= ~paradas
+            if not ativas.any():
+                break
+
+    meia_largura = _meia_largura(m2, repeticoes, confianca, t_student)
+    tempo = time.perf_counter() - inicio
+    print(f"⏱️ Importância adaptativa: {int(repeticoes.sum())} permutações "
+          f"(limite {n_colunas * max_repeticoes}) em {tempo:.2f}s")
+    return Bunch(
+        importances_mean=media,
+        importances_std=np.sqrt(m2 / np.maximum(repeticoes, 1)),
+        importances=importancias,
+        ic_inferior=media - meia_largura,
+        ic_superior=media + meia_largura,
+        repeticoes=repeticoes,
+        tempo_s=tempo,
+        interrompida_por_tempo=interrompida,
+    )
+
+
+def importancia_por_coluna(resultado: Bunch, colunas: List[str]) -> pd.DataFrame:
+    """
+    DataFrame 'feature'/'importance' (crescente), no formato de criar_grafico_feature_importance_*.
+
+    Resultados de importancia_permutacao_adaptativa trazem também os intervalos
+    de confiança ('ic_inferior'/'ic_superior') e as 'repeticoes' de cada coluna.
+    """
+    tabela = pd.DataFrame({
+        'feature': colunas,
+        'importance': resultado.importances_mean,
+        'importance_std': resultado.importances_std,
+    })
+    for campo in ('ic_inferior', 'ic_superior', 'repeticoes'):
+        if campo in resultado:
+            tabela[campo] = resultado[campo]
+    return tabela.sort_values('importance', ascending=True, ignore_index=True)
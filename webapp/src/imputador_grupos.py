@@ -0,0 +1,124 @@
+"""
+Estatísticas por grupo calculadas em uma única passada para a imputação.
+
+`imputar_numerica_por_grupo` e `imputar_categorica_por_grupo` faziam um
+`groupby(...).transform(...)` por coluna, e a moda usava uma função Python
+por grupo. `ImputadorPorGrupo` fatoriza as chaves de grupo uma única vez e
+calcula, para todas as colunas pedidas de uma vez, a mediana por grupo (um
+único groupby sobre os códigos) e a moda por grupo (tabela de contagens com
+np.bincount sobre grupo × valor). Os resultados reproduzem exatamente os do
+transform: linhas com alguma chave ausente não pertencem a grupo nenhum e,
+em empates, a moda é o menor valor na ordem de `Series.mode()`.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def fatorizar_grupos(df: pd.DataFrame, grupo_cols: List[str]) -> np.ndarray:
+    """
+    Código de grupo (0..n_grupos-1) de cada linha para as chaves informadas.
+
+    Linhas com alguma chave ausente recebem -1, como o groupby com dropna=True.
+    """
+    codigos = np.zeros(len(df), dtype=np.int64)
+    valido = np.ones(len(df), dtype=bool)
+    for coluna in grupo_cols:
+        codigos_coluna, uniques = pd.factorize(df[coluna])
+        valido &= codigos_coluna >= 0
+        codigos = codigos * (len(uniques) + 1) + codigos_coluna
+    compactos = np.full(len(df), -1, dtype=np.int64)
+    compactos[valido] = pd.factorize(codigos[valido])[0]
+    return compactos
+
+
+def moda_por_codigo(codigos_grupo: np.ndarray, n_grupos: int, valores: pd.Series):
+    """
+    Moda de `valores` em cada grupo via tabela de contagens (np.bincount).
+
+    Returns:
+        Tupla (índice do valor modal em `uniques` por grupo, -1 para grupos
+        sem valores; uniques ordenados como em Series.mode())
+    """
+    codigos_valor, uniques = pd.factorize(valores, sort=True)
+    usar = (codigos_grupo >= 0) & (codigos_valor >= 0)
+    n_valores = max(len(uniques), 1)
+    contagens = np.bincount(
+        codigos_grupo[usar] * n_valores + codigos_valor[usar],
+        minlength=n_grupos * n_valores,
+    ).reshape(n_grupos, n_valores)
+    # argmax devolve o primeiro máximo: o menor valor ordenado, como mode().iloc[0]
+    modas = contagens.argmax(axis=1)
+    modas[contagens.max(axis=1, initial=0) == 0] = -1
+    return modas, uniques
+
+
+class ImputadorPorGrupo:
+    """
+    Medianas e modas por grupo de várias colunas, com as chaves fatorizadas uma vez.
+
+    As estatísticas de uma coluna são calculadas a partir dos valores que ela
+    tinha quando foi preparada; alterar as colunas de grupo invalida o
+    imputador (crie outro).
+
+    Args:
+        df: DataFrame com as colunas de grupo e as colunas a imputar
+        grupo_cols: Colunas de grupo (as ausentes do DataFrame são ignoradas)
+    """
+
+    def __init__(self, df: pd.DataFrame, grupo_cols: Iterable[str]):
+        self.df = df
+        self.grupo_cols = [c for c in grupo_cols if c in df.columns]
+        self.codigos = fatorizar_grupos(df, self.grupo_cols)
+        self.n_grupos = int(self.codigos.max()) + 1 if len(self.codigos) else 0
+        self._medianas: Dict[str, pd.Series] = {}
+        self._modas: Dict[str, pd.Series] = {}
+
+    def preparar_medianas(self, colunas: Iterable[str]) -> 'ImputadorPorGrupo':
+        """Calcula em um único groupby as medianas por grupo das colunas ainda não preparadas"""
+        colunas = [c for c in colunas if c not in self._medianas]
+        if not colunas:
+            return self
+        validos = self.codigos >= 0
+        medianas = self.df.loc[validos, colunas].groupby(self.codigos[validos]).median()
+        for coluna in colunas:
+            por_grupo = medianas[coluna].reindex(range(self.n_grupos)).to_numpy()
+            por_linha = np.full(len(self.df), np.nan, dtype=por_grupo.dtype if por_grupo.dtype.kind == 'f' else 'float64')
+            por_linha[validos] = por_grupo[self.codigos[validos]]
+            self._medianas[coluna] = pd.Series(por_linha, index=self.df.index, name=coluna)
+        return self
+
+    def preparar_modas(self, colunas: Iterable[str]) -> 'ImputadorPorGrupo':
+        """Calcula as modas por grupo das colunas ainda não preparadas"""
+        for coluna in colunas:
+            if coluna in self._modas:
+                continue
+            modas, uniques = moda_por_codigo(self.codigos, self.n_grupos, self.df[coluna])
+            valores = np.asarray(uniques, dtype=object)
+            por_linha = np.full(len(self.df), None, dtype=object)
+            validos = self.codigos >= 0
+            if len(valores):
+                indice = modas[self.codigos[validos]]
+                por_linha[np.flatnonzero(validos)[indice >= 0]] = valores[indice[indice >= 0]]
+            self._modas[coluna] = pd.Series(por_linha, index=self.df.index, name=coluna)
+        return self
+
+    def medianas(self, coluna: str) -> pd.Series:
+        """Mediana do grupo de cada linha (NaN fora de grupo), como transform('median')"""
+        return self.preparar_medianas([coluna])._medianas[coluna]
+
+    def modas(self, coluna: str) -> pd.Series:
+        """Moda do grupo de cada linha (None fora de grupo ou em grupo sem valores)"""
+        return self.preparar_modas([coluna])._modas[coluna]
+
+
+def imputador_compativel(imputador: Optional[ImputadorPorGrupo], df: pd.DataFrame,
+                         grupo_cols: List[str]) -> bool:
+    """Indica se um imputador pré-calculado vale para este DataFrame e estas chaves"""
+    return (
+        imputador is not None
+        and imputador.df.index.equals(df.index)
+        and imputador.grupo_cols == [c for c in grupo_cols if c in df.columns]
+    )
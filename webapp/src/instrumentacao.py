@@ -0,0 +1,314 @@
+"""
+Instrumentação leve das etapas dos pipelines de processamento.
+
+`etapa` (gerenciador de contexto) e `instrumentar` (decorador) medem, para
+cada etapa, o tempo de relógio, o tempo de CPU, o pico de memória alocada
+(tracemalloc, quando ativado) e o número de linhas e o formato da entrada e
+da saída. Cada medição vira uma linha JSON em `artefatos/instrumentacao.jsonl`
+(ou em `SIDA_LOG_ETAPAS`) e fica guardada em memória para `resumo_etapas`,
+usado pelos scripts de linha de comando e pelo painel de depuração. Quando
+o arquivo passa de `tamanho_maximo_mb` (SIDA_LOG_ETAPAS_MAX_MB, padrão 10 MB)
+ele é renomeado para `<arquivo>.1`, substituindo o anterior, e um novo é
+começado: o disco guarda no máximo dois arquivos.
+
+O rastreamento de memória com tracemalloc deixa alocações mais lentas e por
+isso só é ligado com `configurar_instrumentacao(memoria=True)` ou
+`SIDA_PERFIL_MEMORIA=1`; tempos e formatos são sempre registrados.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+VARIAVEL_LOG = 'SIDA_LOG_ETAPAS'
+VARIAVEL_MEMORIA = 'SIDA_PERFIL_MEMORIA'
+VARIAVEL_TAMANHO_LOG = 'SIDA_LOG_ETAPAS_MAX_MB'
+TAMANHO_MAXIMO_LOG_MB = 10.0
+CAMINHO_LOG_PADRAO = Path(__file__).parent.parents[1] / 'artefatos' / 'instrumentacao.jsonl'
+
+# Últimos registros do processo (consultados por resumo_etapas)
+MAXIMO_REGISTROS = 1000
+_registros: Deque[Dict[str, Any]] = deque(maxlen=MAXIMO_REGISTROS)
+_configuracao: Dict[str, Any] = {
+    'ativo': True,
+    'memoria': os.environ.get(VARIAVEL_MEMORIA, '').lower() in ('1', 'true', 'sim'),
+    'caminho': None,
+    'tamanho_maximo_mb': float(os.environ.get(VARIAVEL_TAMANHO_LOG, TAMANHO_MAXIMO_LOG_MB)),
+}
+_pilha = threading.local()
+_trava_arquivo = threading.Lock()
+
+
+def configurar_instrumentacao(
+    ativo: Optional[bool] = None,
+    memoria: Optional[bool] = None,
+    caminho: Optional[Path] = None,
+    tamanho_maximo_mb: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Ajusta a instrumentação do processo.
+
+    Args:
+        ativo: Liga/desliga o registro das etapas
+        memoria: Mede o pico de memória com tracemalloc
+        caminho: Arquivo JSON lines de saída (padrão: SIDA_LOG_ETAPAS ou artefatos/instrumentacao.jsonl)
+        tamanho_maximo_mb: Tamanho a partir do qual o arquivo é rotacionado
+
+    Returns:
+        Configuração em vigor
+    """
+    if ativo is not None:
+        _configuracao['ativo'] = ativo
+    if memoria is not None:
+        _configuracao['memoria'] = memoria
+    if caminho is not None:
+        _configuracao['caminho'] = Path(caminho)
+    if tamanho_maximo_mb is not None:
+        _configuracao['tamanho_maximo_mb'] = tamanho_maximo_mb
+    return dict(_configuracao)
+
+
+def caminho_log() -> Path:
+    """Arquivo JSON lines onde as etapas são registradas"""
+    if _configuracao['caminho'] is not None:
+        return _configuracao['caminho']
+    if os.environ.get(VARIAVEL_LOG):
+        return Path(os.environ[VARIAVEL_LOG])
+    return CAMINHO_LOG_PADRAO
+
+
+def descrever_dados(dados: Any) -> Optional[Dict[str, Any]]:
+    """Linhas e formato de um DataFrame/Series (ou da soma de um dicionário de DataFrames)"""
+    if isinstance(dados, (pd.DataFrame, pd.Series)):
+        return {'linhas': int(len(dados)), 'formato': list(dados.shape)}
+    if isinstance(dados, dict):
+        descricoes = [descrever_dados(v) for v in dados.values()]
+        descricoes = [d for d in descricoes if d is not None]
+        if descricoes:
+            return {'linhas': sum(d['linhas'] for d in descricoes), 'tabelas': len(descricoes)}
+    return None
+
+
+class RegistroEtapa:
+    """Medição de uma etapa em andamento; `saida(df)` informa o resultado produzido"""
+
+    def __init__(self, nome: str, entrada: Any = None, pai: Optional['RegistroEtapa'] = None):
+        self.nome = nome
+        self.pai = pai
+        self.entrada = descrever_dados(entrada)
+        self.resultado: Optional[Dict[str, Any]] = None
+        self.extras: Dict[str, Any] = {}
+        self.pico_absoluto = 0
+        self.base_memoria = 0
+
+    def saida(self, dados: Any, **extras: Any) -> Any:
+        """Registra a saída da etapa e devolve `dados` (permite `return registro.saida(df)`)"""
+        self.resultado = descrever_dados(dados)
+        self.extras.update(extras)
+        return dados
+
+    @property
+    def caminho(self) -> str:
+        """Nome completo da etapa, incluindo as etapas que a contêm"""
+        return f"{self.pai.caminho}/{self.nome}" if self.pai is not None else self.nome
+
+
+def _etapas_abertas() -> List[RegistroEtapa]:
+    if not hasattr(_pilha, 'etapas'):
+        _pilha.etapas = []
+    return _pilha.etapas
+
+
+def _gravar(registro: Dict[str, Any]) -> None:
+    _registros.append(registro)
+    caminho = caminho_log()
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        linha = json.dumps(registro, ensure_ascii=False, default=str)
+        with _trava_arquivo:
+            if caminho.is_file() and caminho.stat().st_size >= _configuracao['tamanho_maximo_mb'] * 1024**2:
+                # Rotação: o arquivo cheio vira <arquivo>.1 (o anterior é descartado)
+                os.replace(caminho, caminho.with_name(caminho.name + '.1'))
+            with open(caminho, 'a', encoding='utf-8') as f:
+                f.write(linha + '\n')
+    except OSError:
+        # Diretório somente leitura (ex.: implantação): mantém só o registro em memória
+        pass
+
+
+@contextmanager
+def etapa(nome: str, entrada: Any = None, **extras: Any) -> Iterator[RegistroEtapa]:
+    """
+    Mede uma etapa de processamento.
+
+    Etapas podem ser aninhadas; o pico de memória da etapa externa inclui o
+    das internas. Exceções são registradas (campo 'erro') e propagadas.
+
+    Args:
+        nome: Nome da etapa
+        entrada: DataFrame (ou dicionário de DataFrames) de entrada
+        **extras: Campos adicionais gravados no registro
+
+    Yields:
+        RegistroEtapa; chame `saida(df)` para registrar o resultado
+    """
+    etapas = _etapas_abertas()
+    registro = RegistroEtapa(nome, entrada, pai=etapas[-1] if etapas else None)
+    registro.extras.update(extras)
+    if not _configuracao['ativo']:
+        yield registro
+        return
+
+    medir_memoria = _configuracao['memoria']
+    iniciou_rastreamento = False
+    if medir_memoria:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            iniciou_rastreamento = True
+        atual, pico = tracemalloc.get_traced_memory()
+        if registro.pai is not None:
+            # reset_peak apaga o pico da etapa externa: guarda antes de zerar
+            registro.pai.pico_absoluto = max(registro.pai.pico_absoluto, pico)
+        tracemalloc.reset_peak()
+        registro.base_memoria = atual
+
+    etapas.append(registro)
+    erro = None
+    inicio_relogio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    try:
+        yield registro
+    except BaseException as exc:
+        erro = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        tempo_relogio = time.perf_counter() - inicio_relogio
+        tempo_cpu = time.process_time() - inicio_cpu
+        etapas.pop()
+
+        pico_mb = None
+        if medir_memoria and tracemalloc.is_tracing():
+            pico = max(registro.pico_absoluto, tracemalloc.get_traced_memory()[1])
+            pico_mb = (pico - registro.base_memoria) / 1024**2
+            if registro.pai is not None:
+                registro.pai.pico_absoluto = max(registro.pai.pico_absoluto, pico)
+            if iniciou_rastreamento:
+                tracemalloc.stop()
+
+        _gravar({
+            'momento': datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'etapa': registro.caminho,
+            'tempo_s': round(tempo_relogio, 6),
+            'cpu_s': round(tempo_cpu, 6),
+            'pico_memoria_mb': None if pico_mb is None else round(pico_mb, 3),
+            'linhas_entrada': registro.entrada['linhas'] if registro.entrada else None,
+            'linhas_saida': registro.resultado['linhas'] if registro.resultado else None,
+            'entrada': registro.entrada,
+            'saida': registro.resultado,
+            'erro': erro,
+            **registro.extras,
+        })
+
+
+def instrumentar(nome: Optional[str] = None) -> Callable:
+    """
+    Decorador que mede cada chamada da função como uma etapa.
+
+    A entrada registrada é o primeiro argumento (DataFrame ou dicionário de
+    DataFrames) e a saída é o valor retornado.
+
+    Args:
+        nome: Nome da etapa (padrão: nome da função)
+    """
+    def decorador(funcao: Callable) -> Callable:
+        nome_etapa = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            entrada = args[0] if args else next(iter(kwargs.values()), None)
+            with etapa(nome_etapa, entrada) as registro:
+                return registro.saida(funcao(*args, **kwargs))
+        return envoltorio
+    return decorador
+
+
+def registros_etapas() -> List[Dict[str, Any]]:
+    """Registros das etapas medidas neste processo (mais antigos primeiro)"""
+    return list(_registros)
+
+
+def limpar_registros() -> None:
+    """Descarta os registros em memória (o arquivo JSON lines é mantido)"""
+    _registros.clear()
+
+
+def ler_registros(caminho: Optional[Path] = None, ultimos: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lê os registros gravados no arquivo JSON lines.
+
+    Args:
+        caminho: Arquivo de log (padrão: caminho_log())
+        ultimos: Mantém apenas os N registros mais recentes
+
+    Returns:
+        Lista de registros; linhas corrompidas são ignoradas
+    """
+    caminho = Path(caminho or caminho_log())
+    if not caminho.is_file():
+        return []
+    registros = []
+    with open(caminho, encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+    return registros[-ultimos:] if ultimos else registros
+
+
+def resumo_etapas(registros: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+    """
+    Tabela-resumo das etapas medidas.
+
+    Args:
+        registros: Registros a resumir (padrão: registros deste processo)
+
+    Returns:
+        DataFrame com uma linha por etapa, na ordem em que terminaram
+    """
+    registros = registros_etapas() if registros is None else registros
+    colunas = ['etapa', 'tempo_s', 'cpu_s', 'pico_memoria_mb', 'linhas_entrada', 'linhas_saida', 'erro']
+    if not registros:
+        return pd.DataFrame(columns=colunas)
+    resumo = pd.DataFrame(registros).reindex(columns=colunas)
+    resumo['formato_saida'] = [
+        'x'.join(map(str, r['saida']['formato'])) if r.get('saida') and 'formato' in r['saida'] else None
+        for r in registros
+    ]
+    return resumo
+
+
+def imprimir_resumo_etapas(registros: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Imprime o resumo das etapas no terminal"""
+    resumo = resumo_etapas(registros)
+    if resumo.empty:
+        print("⏱️ Nenhuma etapa instrumentada")
+        return
+    if resumo['pico_memoria_mb'].isna().all():
+        resumo = resumo.drop(columns='pico_memoria_mb')
+    if resumo['erro'].isna().all():
+        resumo = resumo.drop(columns='erro')
+    print("\n⏱️ Resumo das etapas:")
+    print(resumo.to_string(index=False))
+    print(f"📝 Registro detalhado (JSON lines): {caminho_log()}")
@@ -0,0 +1,139 @@
+"""
+Publicação dos DataFrames processados como arquivos Arrow IPC mapeados em memória.
+
+Em implantações com vários processos do Streamlit, cada processo carregaria
+sua própria cópia do OULAD. Com `SIDA_MEMORIA_COMPARTILHADA=1`, o primeiro
+processo que carrega um conjunto o publica como arquivo Arrow IPC (sem
+compressão) em `/dev/shm/sida` (ou em `SIDA_DIRETORIO_COMPARTILHADO`); os
+demais mapeiam o arquivo com `pyarrow.memory_map` e convertem para pandas sem
+copiar as colunas numéricas, que passam a ser páginas do cache do sistema
+operacional compartilhadas entre todos os processos. Colunas de texto ainda
+são convertidas para objetos Python em cada processo.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from .bloqueio import escrever_atomico
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from bloqueio import escrever_atomico
+
+VARIAVEL_ATIVACAO = 'SIDA_MEMORIA_COMPARTILHADA'
+VARIAVEL_DIRETORIO = 'SIDA_DIRETORIO_COMPARTILHADO'
+
+
+def memoria_compartilhada_ativa() -> bool:
+    """Indica se o modo de memória compartilhada foi ativado pela variável de ambiente"""
+    return os.environ.get(VARIAVEL_ATIVACAO, '').lower() in ('1', 'true', 'sim')
+
+
+def diretorio_compartilhado() -> Path:
+    """Diretório dos arquivos IPC: variável de ambiente, /dev/shm/sida ou artefatos/ipc"""
+    if os.environ.get(VARIAVEL_DIRETORIO):
+        return Path(os.environ[VARIAVEL_DIRETORIO])
+    if Path('/dev/shm').is_dir():
+        return Path('/dev/shm') / 'sida'
+    return Path(__file__).parent.parents[1] / 'artefatos' / 'ipc'
+
+
+def caminho_ipc(nome: str, diretorio: Optional[Path] = None) -> Path:
+    """Caminho do arquivo Arrow IPC de um conjunto publicado"""
+    return Path(diretorio or diretorio_compartilhado()) / f"{nome}.arrow"
+
+
+def _caminho_manifesto_ipc(nome: str, diretorio: Optional[Path] = None) -> Path:
+    return Path(diretorio or diretorio_compartilhado()) / f"{nome}.manifest.json"
+
+
+def ler_manifesto_publicado(nome: str, diretorio: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Manifesto do conjunto publicado (None se não houver)"""
+    try:
+        with open(_caminho_manifesto_ipc(nome, diretorio), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publicar_conjunto(
+    df: pd.DataFrame,
+    nome: str,
+    manifesto: Optional[Dict[str, Any]] = None,
+    diretorio: Optional[Path] = None,
+) -> Path:
+    """
+    Publica um DataFrame como arquivo Arrow IPC para ser mapeado por outros processos.
+
+    A gravação é atômica; o manifesto do artefato de origem é publicado junto
+    para que os leitores saibam se a cópia ainda corresponde às fontes atuais.
+    Para evitar publicações simultâneas, quem chama deve segurar
+    bloqueio_exclusivo(caminho_ipc(nome)).
+
+    Args:
+        df: DataFrame processado
+        nome: Nome do conjunto ('uci', 'oulad', 'unificado')
+        manifesto: Manifesto do artefato de origem (ver armazenamento.calcular_manifesto)
+        diretorio: Diretório de publicação (padrão: diretorio_compartilhado())
+
+    Returns:
+        Caminho do arquivo IPC publicado
+    """
+    caminho = caminho_ipc(nome, diretorio)
+    caminho_json = _caminho_manifesto_ipc(nome, diretorio)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+    def escrever_ipc(temporario: Path) -> None:
+        with pa.OSFile(str(temporario), 'wb') as destino:
+            with pa.ipc.new_file(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+
+    def escrever_manifesto(temporario: Path) -> None:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(manifesto or {}, f, indent=2, ensure_ascii=False)
+
+    caminho_json.unlink(missing_ok=True)
+    escrever_atomico(caminho, escrever_ipc)
+    escrever_atomico(caminho_json, escrever_manifesto)
+
+    tamanho_mb = caminho.stat().st_size / (1024 * 1024)
+    print(f"📡 Conjunto '{nome}' publicado em {caminho} ({tamanho_mb:.2f} MB)")
+    return caminho
+
+
+def mapear_conjunto(
+    nome: str,
+    colunas: Optional[List[str]] = None,
+    diretorio: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Mapeia um conjunto publicado, somente leitura, sem copiar as colunas numéricas.
+
+    Args:
+        nome: Nome do conjunto
+        colunas: Colunas a converter para pandas (None = todas)
+        diretorio: Diretório de publicação (padrão: diretorio_compartilhado())
+
+    Returns:
+        DataFrame cujas colunas numéricas apontam para o arquivo mapeado
+    """
+    caminho = caminho_ipc(nome, diretorio)
+    if not caminho.is_file():
+        raise FileNotFoundError(f"Conjunto '{nome}' não publicado: {caminho}")
+
+    tabela = pa.ipc.open_file(pa.memory_map(str(caminho), 'r')).read_all()
+    if colunas is not None:
+        tabela = tabela.select(colunas)
+    # split_blocks evita consolidar colunas em blocos 2D, o que forçaria uma cópia
+    return tabela.to_pandas(split_blocks=True)
+
+
+def remover_conjunto(nome: str, diretorio: Optional[Path] = None) -> None:
+    """Remove um conjunto publicado (processos que já o mapearam continuam válidos)"""
+    caminho_ipc(nome, diretorio).unlink(missing_ok=True)
+    _caminho_manifesto_ipc(nome, diretorio).unlink(missing_ok=True)
@@ -0,0 +1,370 @@
+"""
+Especificação única dos modelos UCI e OULAD usados pelas páginas e pelo treino sob demanda.
+
+Preparação dos dados (amostragem, colunas descartadas, divisão treino/teste),
+pipelines e hiperparâmetros ficam aqui para que todos os chamadores montem
+exatamente o mesmo modelo e, portanto, a mesma chave no registro de modelos.
+
+O OULAD tem dois motores: a floresta aleatória original (one-hot, limitada a
+50 árvores de profundidade 4 sobre uma amostra de 50k linhas) e gradient
+boosting por histogramas ('hgb'), com categorias nativas e features em
+float32, treinado no conjunto completo. O motor padrão de cada dataset vem de
+`SIDA_MOTOR_<NOME>` (ex.: SIDA_MOTOR_OULAD=hgb).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .armazenamento import versao_artefato
+    from .importancia import importancia_permutacao_adaptativa, importancia_por_coluna
+    from .registro_modelos import RegistroModelos, impressao_dataframe
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import versao_artefato
+    from importancia import importancia_permutacao_adaptativa, importancia_por_coluna
+    from registro_modelos import RegistroModelos, impressao_dataframe
+
+HIPERPARAMETROS = {
+    'uci': {
+        'estimador': 'RandomForestRegressor', 'n_estimators': 100, 'random_state': 42,
+        'test_size': 0.2, 'random_state_divisao': 42,
+    },
+    'oulad': {
+        'estimador': 'RandomForestClassifier', 'n_estimators': 50, 'max_depth': 4, 'n_jobs': 2,
+        'random_state': 42, 'amostra': 50_000, 'test_size': 0.2, 'random_state_divisao': 42,
+    },
+}
+
+# Gradient boosting por histogramas: sem amostragem, categorias nativas e float32
+HIPERPARAMETROS_HGB = {
+    'oulad': {
+        'estimador': 'HistGradientBoostingClassifier', 'max_iter': 300, 'learning_rate': 0.1,
+        'max_leaf_nodes': 31, 'min_samples_leaf': 20, 'early_stopping': True, 'validation_fraction': 0.1,
+        'n_iter_no_change': 10, 'random_state': 42, 'amostra': None, 'test_size': 0.2,
+        'random_state_divisao': 42,
+    },
+}
+
+MOTORES = {'floresta': HIPERPARAMETROS, 'hgb': HIPERPARAMETROS_HGB}
+MOTOR_PADRAO = 'floresta'
+
+ALVOS = {'uci': 'G3', 'oulad': 'final_result'}
+
+# Importância por permutação adaptativa: limite de repetições por coluna e orçamento em segundos
+REPETICOES_IMPORTANCIA = {'uci': 10, 'oulad': 10}
+TEMPO_IMPORTANCIA = {'uci': 30.0, 'oulad': 120.0}
+
+# Identificadores e colunas de alta cardinalidade fora do modelo OULAD
+COLUNAS_DESCARTADAS_OULAD = [
+    'id_student', 'id_site', 'id_assessment', 'code_module', 'code_presentation', 'code_module_y', 'code_module_x'
+]
+
+Divisao = Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]
+
+
+def motor_modelo(nome: str, motor: Optional[str] = None) -> str:
+    """
+    Motor a usar para o dataset: o informado ou o de SIDA_MOTOR_<NOME> (padrão 'floresta').
+
+    Raises:
+        ValueError: Se o motor não existir para este dataset
+    """
+    motor = motor or os.environ.get(f'SIDA_MOTOR_{nome.upper()}', MOTOR_PADRAO)
+    if nome not in MOTORES.get(motor, {}):
+        disponiveis = [m for m, parametros in MOTORES.items() if nome in parametros]
+        raise ValueError(f"Motor {motor!r} indisponível para '{nome}' (use um de {disponiveis})")
+    return motor
+
+
+def hiperparametros(nome: str, motor: Optional[str] = None) -> Dict[str, Any]:
+    """Hiperparâmetros (estimador, amostragem e divisão) do motor escolhido"""
+    return MOTORES[motor_modelo(nome, motor)][nome]
+
+
+def preparar_dados(nome: str, df: pd.DataFrame, motor: Optional[str] = None) -> Divisao:
+    """
+    Separa features e alvo e divide em treino/teste como no modelo registrado.
+
+    Com a floresta, o OULAD usa uma amostra fixa de `amostra` linhas; em
+    ambos os motores as linhas sem alvo saem do treino e do teste.
+
+    Returns:
+        X_train, X_test, y_train, y_test
+    """
+    return _dividir(nome, df, hiperparametros(nome, motor))
+
+
+def _dividir(nome: str, df: pd.DataFrame, parametros: Dict[str, Any]) -> Divisao:
+    """Divisão treino/teste com os parâmetros de amostragem e divisão informados"""
+    from sklearn.model_selection import train_test_split
+
+    alvo = ALVOS[nome]
+    if parametros.get('amostra') and len(df) > parametros['amostra']:
+        df = df.sample(n=parametros['amostra'], random_state=parametros['random_state'])
+
+    y = df[alvo]
+    X = df.drop(columns=alvo)
+    if nome == 'oulad':
+        X = X.drop(columns=COLUNAS_DESCARTADAS_OULAD, errors='ignore')
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=parametros['test_size'], random_state=parametros['random_state_divisao']
+    )
+    if nome == 'uci':
+        y_train, y_test = y_train.astype(float), y_test.astype(float)
+    else:
+        X_train, y_train = X_train[y_train.notna()], y_train[y_train.notna()]
+        X_test, y_test = X_test[y_test.notna()], y_test[y_test.notna()]
+    return X_train, X_test, y_train, y_test
+
+
+def para_float32(X: Any) -> np.ndarray:
+    """Matriz float32 (valores ausentes como NaN) a partir das colunas numéricas"""
+    if isinstance(X, pd.DataFrame):
+        return X.to_numpy(dtype=np.float32, na_value=np.nan)
+    return np.asarray(X, dtype=np.float32)
+
+
+def _construir_hgb(X_train: pd.DataFrame, parametros: Dict[str, Any]):
+    """
+    Pipeline de gradient boosting por histogramas com categorias nativas.
+
+    As categóricas viram códigos ordinais (até 255 categorias, ausentes e
+    desconhecidas como NaN) e as numéricas vão em float32 sem imputação: o
+    estimador trata NaN nativamente e divide as categóricas por conjunto de
+    categorias, sem one-hot.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer, OrdinalEncoder
+
+    numericas = list(X_train.select_dtypes(include=[np.number, 'bool']).columns)
+    categoricas = [c for c in X_train.columns if c not in set(numericas)]
+    preprocessor = ColumnTransformer(transformers=[
+        ('cat', OrdinalEncoder(
+            handle_unknown='use_encoded_value', unknown_value=np.nan, encoded_missing_value=np.nan,
+            max_categories=255, dtype=np.float32), categoricas),
+        ('num', FunctionTransformer(para_float32, feature_names_out='one-to-one'), numericas),
+    ])
+    estimador = HistGradientBoostingClassifier(
+        categorical_features=[True] * len(categoricas) + [False] * len(numericas),
+        **{k: parametros[k] for k in ('max_iter', 'learning_rate', 'max_leaf_nodes', 'min_samples_leaf',
+                                      'early_stopping', 'validation_fraction', 'n_iter_no_change',
+                                      'random_state')}
+    )
+    return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', estimador)])
+
+
+def construir_modelo(nome: str, X_train: pd.DataFrame, motor: Optional[str] = None):
+    """Pipeline ainda não treinado (pré-processamento + estimador do motor)"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    parametros = hiperparametros(nome, motor)
+    if parametros['estimador'] == 'HistGradientBoostingClassifier':
+        return _construir_hgb(X_train, parametros)
+    categoricas = list(X_train.select_dtypes(include=['object', 'category']).columns)
+
+    if nome == 'uci':
+        preprocessor = ColumnTransformer(
+            transformers=[('cat', OneHotEncoder(handle_unknown='ignore'), categoricas)],
+            remainder='passthrough'
+        )
+        estimador = RandomForestRegressor(
+            n_estimators=parametros['n_estimators'], random_state=parametros['random_state']
+        )
+        return Pipeline(steps=[('preprocessor', preprocessor), ('regressor', estimador)])
+
+    numericas = list(X_train.select_dtypes(include=[np.number]).columns)
+    # Colunas que não são numéricas nem categóricas são tratadas como categóricas
+    categoricas += [c for c in X_train.columns if c not in set(categoricas) | set(numericas)]
+    transformers = []
+    if numericas:
+        transformers.append(('num', SimpleImputer(strategy='mean'), numericas))
+    if categoricas:
+        transformers.append(('cat', Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='most_frequent')),
+            ('onehot', OneHotEncoder(handle_unknown='ignore'))]), categoricas))
+    preprocessor = ColumnTransformer(transformers=transformers, remainder='passthrough')
+    estimador = RandomForestClassifier(
+        n_estimators=parametros['n_estimators'], n_jobs=parametros['n_jobs'],
+        max_depth=parametros['max_depth'], random_state=parametros['random_state']
+    )
+    return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', estimador)])
+
+
+def impressao_divisao(nome: str, motor: Optional[str] = None) -> Optional[str]:
+    """
+    Impressão da divisão treino/teste e do modelo sem ler os dados.
+
+    Combina a versão do artefato (hash do manifesto) com os hiperparâmetros,
+    que incluem amostra, test_size e sementes da divisão: serve de chave
+    para caches de `preparar_dados` + `treinar_modelo`.
+
+    Returns:
+        16 caracteres hexadecimais, ou None se o artefato não tiver manifesto
+    """
+    versao = versao_artefato(nome)
+    if versao is None:
+        return None
+    conteudo = json.dumps(
+        {'nome': nome, 'versao_dados': versao, 'hiperparametros': hiperparametros(nome, motor)},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+def impressao_dados(nome: str, X_train: pd.DataFrame, y_train: pd.Series) -> str:
+    """Versão do artefato de dados (hash do manifesto) ou, sem manifesto, hash do treino"""
+    return versao_artefato(nome) or impressao_dataframe(X_train, y_train)
+
+
+def treinar_modelo(
+    nome: str,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    registro: Optional[RegistroModelos] = None,
+    impressao: Optional[str] = None,
+    motor: Optional[str] = None,
+) -> Any:
+    """
+    Devolve o modelo registrado para estes dados/features/hiperparâmetros, treinando se preciso.
+
+    Args:
+        nome: 'uci' ou 'oulad'
+        X_train, y_train: Dados de treino de preparar_dados(nome, df)
+        registro: Registro de modelos (padrão: artefatos/modelos)
+        impressao: Impressão dos dados (padrão: impressao_dados(nome, X_train, y_train))
+        motor: 'floresta' ou 'hgb' (padrão: motor_modelo(nome))
+    """
+    registro = registro or RegistroModelos()
+    motor = motor_modelo(nome, motor)
+
+    def treinar():
+        modelo = construir_modelo(nome, X_train, motor)
+        modelo.fit(X_train, y_train)
+        return modelo
+
+    return registro.obter_ou_treinar(
+        nome, impressao or impressao_dados(nome, X_train, y_train), list(X_train.columns),
+        hiperparametros(nome, motor), treinar, metadados={'motor': motor, 'linhas_treino': int(len(X_train))}
+    )
+
+
+def chave_registrada(nome: str, registro: Optional[RegistroModelos] = None,
+                     motor: Optional[str] = None) -> Optional[str]:
+    """
+    Chave do modelo mais recente para a versão atual do artefato (lê apenas os metadados).
+
+    Returns:
+        Chave, ou None se o artefato não tiver versão ou não houver modelo compatível
+    """
+    versao = versao_artefato(nome)
+    if versao is None:
+        return None
+    registro = registro or RegistroModelos()
+    candidatos = registro.procurar(nome, impressao_dados=versao, hiperparametros=hiperparametros(nome, motor))
+    return candidatos[0]['chave'] if candidatos else None
+
+
+def modelo_registrado(nome: str, registro: Optional[RegistroModelos] = None,
+                      motor: Optional[str] = None) -> Optional[Any]:
+    """
+    Carrega (com mmap) o modelo mais recente para a versão atual do artefato, sem ler os dados.
+
+    Returns:
+        Modelo, ou None se não houver modelo compatível
+    """
+    registro = registro or RegistroModelos()
+    chave = chave_registrada(nome, registro, motor)
+    return registro.carregar(nome, chave) if chave else None
+
+
+def calcular_importancia(nome: str, modelo: Any, X_test: pd.DataFrame, y_test: pd.Series) -> pd.DataFrame:
+    """
+    Importância por permutação de cada coluna original sobre o conjunto de teste.
+
+    O teste é transformado uma única vez e cada coluna original permuta o seu
+    bloco de colunas codificadas; as repetições param por coluna assim que o
+    intervalo de confiança separa a coluna das vizinhas na ordenação
+    (importancia_permutacao_adaptativa), dentro de TEMPO_IMPORTANCIA. Modelos
+    cujo pré-processamento não pode ser agrupado usam permutation_importance.
+
+    Returns:
+        DataFrame com colunas 'feature', 'importance', 'importance_std' e, no
+        caminho adaptativo, 'ic_inferior', 'ic_superior' e 'repeticoes', em ordem crescente
+    """
+    from sklearn.inspection import permutation_importance
+
+    try:
+        resultado = importancia_permutacao_adaptativa(
+            modelo, X_test, y_test, max_repeticoes=REPETICOES_IMPORTANCIA[nome],
+            tempo_limite=TEMPO_IMPORTANCIA[nome], random_state=42
+        )
+    except ValueError as e:
+        print(f"⚠️ Importância agrupada indisponível ({e}); usando permutation_importance")
+        resultado = permutation_importance(
+            modelo, X_test, y_test, n_repeats=REPETICOES_IMPORTANCIA[nome], random_state=42
+        )
+    return importancia_por_coluna(resultado, list(X_test.columns))
+
+
+def comparar_motores(nome: str, df: pd.DataFrame, motores: Iterable[str] = ('floresta', 'hgb')) -> pd.DataFrame:
+    """
+    Treina cada motor e mede treino, inferência, tamanho e qualidade no mesmo conjunto de teste.
+
+    A divisão treino/teste é feita uma vez sobre o conjunto completo; motores
+    com `amostra` treinam em uma amostra do treino (como no modelo
+    registrado) e todos são avaliados no mesmo teste.
+
+    Returns:
+        Uma linha por motor: linhas_treino, tempo_treino_s, tempo_inferencia_s,
+        tamanho_modelo_mb, acuracia e f1_ponderado
+    """
+    from sklearn.metrics import accuracy_score, f1_score
+
+    X_train, X_test, y_train, y_test = _dividir(nome, df, dict(hiperparametros(nome, MOTOR_PADRAO), amostra=None))
+
+    linhas = []
+    for motor in motores:
+        parametros = hiperparametros(nome, motor)
+        X_motor, y_motor = X_train, y_train
+        if parametros.get('amostra') and len(X_train) > parametros['amostra']:
+            X_motor = X_train.sample(n=parametros['amostra'], random_state=parametros['random_state'])
+            y_motor = y_train.loc[X_motor.index]
+
+        modelo = construir_modelo(nome, X_motor, motor)
+        inicio = time.perf_counter()
+        modelo.fit(X_motor, y_motor)
+        tempo_treino = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        previsto = modelo.predict(X_test)
+        tempo_inferencia = time.perf_counter() - inicio
+
+        linhas.append({
+            'motor': motor,
+            'estimador': parametros['estimador'],
+            'linhas_treino': len(X_motor),
+            'linhas_teste': len(X_test),
+            'tempo_treino_s': round(tempo_treino, 3),
+            'tempo_inferencia_s': round(tempo_inferencia, 4),
+            'tamanho_modelo_mb': round(len(pickle.dumps(modelo)) / 1024**2, 2),
+            'acuracia': round(accuracy_score(y_test, previsto), 4),
+            'f1_ponderado': round(f1_score(y_test, previsto, average='weighted', zero_division=0), 4),
+        })
+        print(f"⏱️ {motor}: treino {tempo_treino:.2f}s, inferência {tempo_inferencia:.3f}s, "
+              f"acurácia {linhas[-1]['acuracia']:.4f}")
+    return pd.DataFrame(linhas)
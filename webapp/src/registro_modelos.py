@@ -0,0 +1,236 @@
+"""
+Registro versionado dos modelos treinados.
+
+Os modelos eram treinados em até três lugares (as páginas 1_UCI/2_OULAD e
+o treino sob demanda das utilidades) e gravados como `uci.pkl`/`oulad.pkl` no
+diretório corrente. O registro guarda cada modelo em
+`artefatos/modelos/<nome>/<chave>/` com uma chave derivada de:
+
+- impressão dos dados de treino (versão do artefato ou hash do DataFrame);
+- lista ordenada de features;
+- hiperparâmetros (incluindo amostragem e divisão treino/teste);
+- versão do scikit-learn.
+
+Quem pede um modelo com a mesma chave reutiliza o que já existe. Os modelos
+são gravados com joblib sem compressão, de modo que os arrays numpy grandes
+podem ser mapeados em memória (`mmap_mode='r'`) ao carregar, e a consulta
+ao registro lê apenas os metadados JSON.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import joblib
+import pandas as pd
+import sklearn
+
+try:
+    from .bloqueio import bloqueio_exclusivo, escrever_atomico
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from bloqueio import bloqueio_exclusivo, escrever_atomico
+
+DIRETORIO_MODELOS = Path(__file__).parent.parents[1] / 'artefatos' / 'modelos'
+ARQUIVO_MODELO = 'modelo.joblib'
+ARQUIVO_METADADOS = 'metadados.json'
+
+
+def impressao_dataframe(*frames: Any) -> str:
+    """
+    Hash do conteúdo de DataFrames/Series (valores, índice, colunas e tipos).
+
+    Usado como impressão dos dados de treino quando o artefato de origem não
+    tem manifesto.
+    """
+    h = hashlib.sha256()
+    for frame in frames:
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame()
+        h.update(json.dumps([[str(c), str(t)] for c, t in frame.dtypes.items()]).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def chave_modelo(nome: str, impressao_dados: str, features: Sequence[str],
+                 hiperparametros: Dict[str, Any]) -> str:
+    """
+    Chave de um modelo no registro.
+
+    Args:
+        nome: Nome do modelo ('uci', 'oulad', ...)
+        impressao_dados: Versão do artefato de dados ou impressao_dataframe(...)
+        features: Colunas de entrada, na ordem usada no treino
+        hiperparametros: Parâmetros do estimador e da preparação dos dados
+
+    Returns:
+        16 caracteres hexadecimais
+    """
+    conteudo = json.dumps({
+        'nome': nome,
+        'dados': impressao_dados,
+        'features': [str(f) for f in features],
+        'hiperparametros': hiperparametros,
+        'sklearn': sklearn.__version__,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+class RegistroModelos:
+    """
+    Armazena e recupera modelos pela chave (dados, features, hiperparâmetros, sklearn).
+
+    Args:
+        diretorio: Raiz do registro (padrão: artefatos/modelos)
+    """
+
+    def __init__(self, diretorio: Optional[Path] = None):
+        self.diretorio = Path(diretorio or DIRETORIO_MODELOS)
+
+    def caminho(self, nome: str, chave: str) -> Path:
+        """Diretório de um modelo registrado"""
+        return self.diretorio / nome / chave
+
+    def existe(self, nome: str, chave: str) -> bool:
+        """Indica se o modelo e seus metadados já foram gravados"""
+        caminho = self.caminho(nome, chave)
+        return (caminho / ARQUIVO_MODELO).is_file() and (caminho / ARQUIVO_METADADOS).is_file()
+
+    def metadados(self, nome: str, chave: str) -> Optional[Dict[str, Any]]:
+        """Metadados de um modelo registrado (None se não existir)"""
+        try:
+            with open(self.caminho(nome, chave) / ARQUIVO_METADADOS, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def salvar(self, modelo: Any, nome: str, chave: str, metadados: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        Grava um modelo de forma atômica (joblib sem compressão + metadados JSON).
+
+        Os metadados são gravados por último: um modelo só conta como
+        registrado depois que os dois arquivos existem.
+        """
+        caminho = self.caminho(nome, chave)
+        metadados = {
+            'nome': nome,
+            'chave': chave,
+            'sklearn': sklearn.__version__,
+            'criado_em': time.time(),
+            **(metadados or {}),
+        }
+
+        def escrever_modelo(temporario: Path) -> None:
+            # compress=0 mantém os arrays numpy em blocos que podem ser mapeados em memória
+            joblib.dump(modelo, temporario, compress=0)
+
+        def escrever_metadados(temporario: Path) -> None:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(metadados, f, indent=2, ensure_ascii=False, default=str)
+
+        (caminho / ARQUIVO_METADADOS).unlink(missing_ok=True)
+        escrever_atomico(caminho / ARQUIVO_MODELO, escrever_modelo)
+        escrever_atomico(caminho / ARQUIVO_METADADOS, escrever_metadados)
+        print(f"📦 Modelo '{nome}' registrado: {chave}")
+        return caminho
+
+    def salvar_anexo(self, nome: str, chave: str, arquivo: str, dados: Any) -> Path:
+        """Grava um resultado derivado do modelo (ex.: importância das features) em JSON"""
+        def escrever(temporario: Path) -> None:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, default=str)
+
+        return escrever_atomico(self.caminho(nome, chave) / arquivo, escrever)
+
+    def ler_anexo(self, nome: str, chave: str, arquivo: str) -> Optional[Any]:
+        """Resultado derivado gravado com salvar_anexo (None se não existir)"""
+        try:
+            with open(self.caminho(nome, chave) / arquivo, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def carregar(self, nome: str, chave: str, mmap_mode: Optional[str] = 'r') -> Any:
+        """
+        Carrega um modelo registrado.
+
+        Args:
+            mmap_mode: 'r' mapeia os arrays numpy do arquivo em vez de lê-los
+                (None = leitura completa)
+        """
+        caminho = self.caminho(nome, chave) / ARQUIVO_MODELO
+        if not self.existe(nome, chave):
+            raise FileNotFoundError(f"Modelo '{nome}' ({chave}) não registrado: {caminho}")
+        return joblib.load(caminho, mmap_mode=mmap_mode)
+
+    def procurar(self, nome: str, **criterios: Any) -> List[Dict[str, Any]]:
+        """
+        Metadados dos modelos de `nome` compatíveis com o sklearn instalado.
+
+        Args:
+            **criterios: Campos dos metadados que devem ser iguais
+                (ex.: impressao_dados='...', hiperparametros={...})
+
+        Returns:
+            Lista de metadados, do mais recente para o mais antigo
+        """
+        diretorio = self.diretorio / nome
+        if not diretorio.is_dir():
+            return []
+        encontrados = []
+        for pasta in diretorio.iterdir():
+            metadados = self.metadados(nome, pasta.name)
+            if metadados is None or not (pasta / ARQUIVO_MODELO).is_file():
+                continue
+            if metadados.get('sklearn') != sklearn.__version__:
+                continue
+            if all(metadados.get(campo) == valor for campo, valor in criterios.items()):
+                encontrados.append(metadados)
+        return sorted(encontrados, key=lambda m: m.get('criado_em', 0), reverse=True)
+
+    def obter_ou_treinar(
+        self,
+        nome: str,
+        impressao_dados: str,
+        features: Sequence[str],
+        hiperparametros: Dict[str, Any],
+        treinar: Callable[[], Any],
+        metadados: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Reutiliza o modelo registrado com a mesma chave ou treina e registra um novo.
+
+        O treino roda sob bloqueio exclusivo da chave: sessões e processos que
+        pedem o mesmo modelo ao mesmo tempo esperam e reutilizam o resultado.
+
+        Args:
+            nome: Nome do modelo
+            impressao_dados: Versão do artefato de dados ou impressao_dataframe(...)
+            features: Colunas de entrada
+            hiperparametros: Parâmetros que definem o modelo
+            treinar: Função sem argumentos que devolve o modelo treinado
+            metadados: Campos extras gravados junto (métricas, tamanhos...)
+
+        Returns:
+            Modelo treinado
+        """
+        chave = chave_modelo(nome, impressao_dados, features, hiperparametros)
+        if self.existe(nome, chave):
+            return self.carregar(nome, chave)
+
+        with bloqueio_exclusivo(self.caminho(nome, chave)):
+            if self.existe(nome, chave):
+                # Outra sessão treinou enquanto esta esperava
+                return self.carregar(nome, chave)
+            inicio = time.perf_counter()
+            modelo = treinar()
+            self.salvar(modelo, nome, chave, {
+                'impressao_dados': impressao_dados,
+                'features': [str(f) for f in features],
+                'hiperparametros': hiperparametros,
+                'tempo_treino_s': round(time.perf_counter() - inicio, 3),
+                **(metadados or {}),
+            })
+        return modelo
@@ -0,0 +1,328 @@
+"""
+Resumo das métricas do painel, calculado quando o artefato é gerado.
+
+Os cartões, insights e métricas consolidadas do painel recalculavam
+`nunique`, `groupby` e `corr` sobre os DataFrames completos a cada
+renderização, o que obrigava a página do painel a carregar o OULAD inteiro
+(~300 MB) só para mostrar uma dúzia de números. `gravar_resumo` calcula
+tudo numa única passada quando o artefato é gerado e grava um JSON pequeno
+ao lado do Parquet (`artefatos/<nome>.metricas.json`), junto da versão do
+artefato de que veio. `ler_resumo` devolve None se o resumo faltar ou for de
+outra versão do artefato.
+
+Com o motor de contagem distinta 'hll' (SIDA_MOTOR_DISTINTOS, ver
+contagem_aproximada), os estudantes distintos saem de esboços HyperLogLog
+montados bloco a bloco, em vez de `nunique` sobre o DataFrame inteiro. No
+OULAD, os esboços de estudantes ativos acumulados na leitura do studentVle
+em blocos (gravados por `gravar_esbocos`) são combinados a esses e dão
+também os estudantes ativos no VLE, no total e por tipo de atividade.
+"""
+
+import copy
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .armazenamento import caminho_artefato, versao_artefato
+    from .bloqueio import escrever_atomico
+    from .contagem_aproximada import EsbocosDistintos, HyperLogLog, erro_distintos, ler_esbocos, motor_distintos
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import caminho_artefato, versao_artefato
+    from bloqueio import escrever_atomico
+    from contagem_aproximada import EsbocosDistintos, HyperLogLog, erro_distintos, ler_esbocos, motor_distintos
+
+# Colunas que, juntas, identificam um estudante no UCI (não há id)
+COLUNAS_ID_UCI = ['school', 'sex', 'age', 'address', 'famsize', 'Pstatus', 'Medu', 'Fedu', 'Mjob', 'Fjob',
+                  'reason', 'guardian']
+MAPA_TEMPO_ESTUDO = {'<2h': 1, '2-5h': 2, '5-10h': 3, '>10h': 4}
+
+# Métricas principais quando o dataset está vazio ou indisponível
+METRICAS_VAZIAS = {
+    'uci': {
+        'total_estudantes': 0,
+        'media_nota_final': 0,
+        'taxa_aprovacao': 0,
+        'media_faltas': 0,
+        'distribuicao_genero': {},
+        'media_tempo_estudo': 0,
+        'correlacao_g1_g3': 0,
+        'correlacao_g2_g3': 0,
+        'estudantes_alcool_baixo': 0,
+        'estudantes_alcool_alto': 0,
+    },
+    'oulad': {
+        'total_estudantes': 0,
+        'taxa_aprovacao': 0,
+        'media_cliques': 0,
+        'distribuicao_genero': {},
+        'faixa_etaria_principal': 'N/A',
+        'atividade_mais_comum': 'N/A',
+        'regiao_principal': 'N/A',
+        'estudantes_aprovados': 0,
+        'estudantes_distincao': 0,
+        'estudantes_reprovados': 0,
+    },
+}
+
+
+def caminho_resumo(nome: str, base_path: Optional[Path] = None) -> Path:
+    """Caminho do resumo de métricas gravado ao lado do artefato"""
+    return caminho_artefato(nome, base_path).with_name(f"{nome}.metricas.json")
+
+
+def _numerica(serie: pd.Series, mapa: Optional[Dict[Any, float]] = None) -> pd.Series:
+    """
+    Valores numéricos de uma coluna em qualquer tipo do esquema (inteiros,
+    texto ou categorias, ordenadas ou não), opcionalmente traduzidos por `mapa`.
+    """
+    valores = serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie
+    if mapa is not None:
+        valores = valores.map(mapa)
+    return pd.to_numeric(valores, errors='coerce')
+
+
+def _metricas_uci(df: pd.DataFrame, motor: str = 'exato',
+                  ativos: Optional[EsbocosDistintos] = None) -> Dict[str, Dict[str, Any]]:
+    """Métricas principais (cartões e insights) e consolidadas do UCI"""
+    colunas = set(df.columns)
+    if motor == 'hll':
+        total_estudantes = HyperLogLog(erro_distintos()).adicionar(pd.util.hash_pandas_object(df[COLUNAS_ID_UCI], index=False)).estimar()
+    else:
+        total_estudantes = df[COLUNAS_ID_UCI].drop_duplicates().shape[0]
+    media_nota_final = df['G3'].mean() if 'G3' in colunas else 0
+    taxa_aprovacao = (df['G3'] >= 10).mean() * 100 if 'G3' in colunas else 0
+    media_faltas = df['absences'].mean() if 'absences' in colunas else 0
+    media_tempo_estudo = _numerica(df['studytime'], MAPA_TEMPO_ESTUDO).mean() if 'studytime' in colunas else 0
+
+    contagem_genero = df['sex'].value_counts() if 'sex' in colunas else pd.Series(dtype=float)
+    percentual_genero = contagem_genero / contagem_genero.sum() * 100 if len(contagem_genero) else contagem_genero
+
+    # Uma única matriz de correlação serve as métricas principais e as consolidadas
+    notas = [c for c in ('G1', 'G2', 'G3') if c in colunas]
+    correlacao = df[notas].corr() if notas else pd.DataFrame()
+
+    def correlacao_com_g3(coluna):
+        return correlacao.loc[coluna, 'G3'] if coluna in correlacao.index and 'G3' in correlacao.columns else 0
+
+    alcool = _numerica(df['Dalc']) if 'Dalc' in colunas else None
+    alcool_baixo = (alcool <= 2).mean() * 100 if alcool is not None else 0
+    alcool_alto = (alcool >= 4).mean() * 100 if alcool is not None else 0
+
+    principais = {
+        'total_estudantes': total_estudantes,
+        'media_nota_final': round(media_nota_final, 2),
+        'taxa_aprovacao': round(taxa_aprovacao, 1),
+        'media_faltas': round(media_faltas, 1),
+        'distribuicao_genero': {k: round(v, 1) for k, v in percentual_genero.to_dict().items()},
+        'media_tempo_estudo': round(media_tempo_estudo, 1),
+        'correlacao_g1_g3': round(correlacao_com_g3('G1'), 2),
+        'correlacao_g2_g3': round(correlacao_com_g3('G2'), 2),
+        'estudantes_alcool_baixo': round(alcool_baixo, 1),
+        'estudantes_alcool_alto': round(alcool_alto, 1),
+    }
+    consolidadas = {
+        'total_alunos': total_estudantes,
+        'media_nota_final': media_nota_final,
+        'taxa_aprovacao': taxa_aprovacao,
+        'media_faltas': media_faltas,
+        'media_tempo_estudo': media_tempo_estudo,
+        'distribuicao_genero': contagem_genero.to_dict(),
+        'correlacao_notas': correlacao.to_dict() if len(notas) == 3 else {},
+    }
+    return {'principais': principais, 'consolidadas': consolidadas}
+
+
+def _metricas_oulad(df: pd.DataFrame, motor: str = 'exato',
+                    ativos: Optional[EsbocosDistintos] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Métricas principais (cartões e insights) e consolidadas do OULAD
+
+    Args:
+        ativos: Esboços de estudantes ativos acumulados na leitura do
+            studentVle (motor 'hll'); combinados aos do DataFrame
+    """
+    colunas = set(df.columns)
+    tem_id = 'id_student' in colunas
+    esbocos = None
+    if tem_id and motor == 'hll':
+        esbocos = EsbocosDistintos.construir(df, [c for c in ('gender', 'age_band', 'region') if c in colunas])
+        if ativos is not None and ativos.precisao == esbocos.precisao and set(esbocos.dimensoes) <= set(ativos.dimensoes):
+            # União dos estudantes do artefato com os vistos no log de cliques completo
+            esbocos = esbocos.combinar(ativos.projetar(esbocos.dimensoes))
+        total_estudantes = esbocos.estudantes()
+    else:
+        total_estudantes = df['id_student'].nunique() if tem_id else len(df)
+
+    if 'clicks' in colunas:
+        media_cliques = df['clicks'].mean()
+    elif 'sum_click' in colunas:
+        media_cliques = df['sum_click'].mean()
+    else:
+        media_cliques = 0
+
+    if 'final_result' in colunas:
+        proporcoes = df['final_result'].value_counts(normalize=True, dropna=False) * 100
+        taxa_aprovacao = proporcoes.get('Pass', 0.0)
+        distincao = proporcoes.get('Distinction', 0.0)
+        reprovacao = proporcoes.get('Fail', 0.0)
+    else:
+        taxa_aprovacao = distincao = reprovacao = 0
+
+    # Estudantes distintos por grupo: calculados uma vez para as duas visões
+    def estudantes_por(coluna):
+        if coluna not in colunas or not tem_id:
+            return None
+        if esbocos is not None:
+            contagens = esbocos.estudantes(coluna)
+            if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                # Como o groupby com observed=False: categorias sem estudantes aparecem com zero
+                contagens = contagens.reindex(df[coluna].cat.categories, fill_value=0)
+            return contagens
+        return df.groupby(coluna, observed=False)['id_student'].nunique()
+
+    por_genero = estudantes_por('gender')
+    por_idade = estudantes_por('age_band')
+    por_regiao = estudantes_por('region')
+
+    def moda(coluna):
+        if coluna not in colunas:
+            return 'N/A'
+        valores = df[coluna].mode()
+        return valores.iloc[0] if not valores.empty else 'N/A'
+
+    atividade_mais_comum = moda('activity_type')
+
+    principais = {
+        'total_estudantes': total_estudantes,
+        'taxa_aprovacao': round(taxa_aprovacao, 1),
+        'media_cliques': round(media_cliques, 2),
+        'distribuicao_genero': (
+            {k: round(v, 1) for k, v in (por_genero / total_estudantes * 100).to_dict().items()}
+            if por_genero is not None else {}
+        ),
+        'faixa_etaria_principal': por_idade.idxmax() if por_idade is not None and not por_idade.empty else 'N/A',
+        'atividade_mais_comum': atividade_mais_comum,
+        'regiao_principal': por_regiao.idxmax() if por_regiao is not None and not por_regiao.empty else 'N/A',
+        'estudantes_aprovados': round(taxa_aprovacao, 1),
+        'estudantes_distincao': round(distincao, 1),
+        'estudantes_reprovados': round(reprovacao, 1),
+    }
+    consolidadas = {
+        'total_estudantes': total_estudantes,
+        'media_cliques': media_cliques,
+        'taxa_aprovacao': taxa_aprovacao,
+        'distribuicao_genero': por_genero.to_dict() if por_genero is not None else {},
+        'distribuicao_idade': por_idade.to_dict() if por_idade is not None else {},
+        'atividade_mais_comum': atividade_mais_comum,
+        'regiao_mais_comum': moda('region'),
+    }
+    if esbocos is not None and ativos is not None:
+        consolidadas['estudantes_ativos_vle'] = ativos.estudantes()
+        if 'activity_type' in ativos.dimensoes:
+            consolidadas['estudantes_ativos_por_atividade'] = ativos.estudantes('activity_type').to_dict()
+    return {'principais': principais, 'consolidadas': consolidadas}
+
+
+CALCULADORES: Dict[str, Callable[[pd.DataFrame, str, Optional[EsbocosDistintos]], Dict[str, Dict[str, Any]]]] = {
+    'uci': _metricas_uci,
+    'oulad': _metricas_oulad,
+}
+
+
+def _para_json(valor: Any) -> Any:
+    """Converte escalares NumPy/pandas e chaves não textuais para tipos do JSON"""
+    if isinstance(valor, dict):
+        return {str(k): _para_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_para_json(v) for v in valor]
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def calcular_resumo(nome: str, df: pd.DataFrame, motor: Optional[str] = None,
+                    ativos: Optional[EsbocosDistintos] = None) -> Dict[str, Any]:
+    """
+    Calcula numa única passada todas as métricas do painel para um dataset.
+
+    Args:
+        nome: 'uci' ou 'oulad'
+        df: DataFrame processado completo
+        motor: Contagem de estudantes distintos, 'exato' ou 'hll' (padrão: SIDA_MOTOR_DISTINTOS)
+        ativos: Esboços de estudantes ativos da leitura em blocos (só com o motor 'hll')
+
+    Returns:
+        Dicionário com registros, colunas, motor_distintos, principais (métricas
+        dos cartões e insights) e consolidadas (métricas de gerar_metricas_consolidadas)
+    """
+    motor = motor_distintos(motor)
+    if df.empty:
+        metricas = {'principais': copy.deepcopy(METRICAS_VAZIAS[nome]), 'consolidadas': {}}
+    else:
+        metricas = CALCULADORES[nome](df, motor, ativos)
+    return _para_json({
+        'nome': nome, 'registros': len(df), 'colunas': df.shape[1], 'motor_distintos': motor, **metricas
+    })
+
+
+def gravar_resumo(nome: str, df: pd.DataFrame, base_path: Optional[Path] = None,
+                  motor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Calcula o resumo de métricas e o grava ao lado do artefato.
+
+    Deve ser chamado depois de gravar o artefato e o manifesto: o resumo
+    registra a versão atual do artefato e só vale para ela. Com o motor
+    'hll', usa os esboços de estudantes ativos gravados para a mesma versão.
+
+    Args:
+        nome: 'uci' ou 'oulad'
+        df: DataFrame processado completo (o mesmo gravado no artefato)
+        base_path: Caminho base do projeto (opcional)
+        motor: Contagem de estudantes distintos, 'exato' ou 'hll' (padrão: SIDA_MOTOR_DISTINTOS)
+
+    Returns:
+        O resumo gravado
+    """
+    inicio = time.perf_counter()
+    motor = motor_distintos(motor)
+    ativos = ler_esbocos(nome, base_path) if motor == 'hll' else None
+    resumo = calcular_resumo(nome, df, motor, ativos)
+    resumo['versao_artefato'] = versao_artefato(nome, base_path)
+    resumo['gerado_em'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    caminho = caminho_resumo(nome, base_path)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+
+    def escrever(temporario: Path) -> None:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+
+    escrever_atomico(caminho, escrever)
+    print(f"📈 Resumo de métricas '{nome}' salvo: {caminho} ({time.perf_counter() - inicio:.2f}s)")
+    return resumo
+
+
+def ler_resumo(nome: str, base_path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lê o resumo de métricas gravado para a versão atual do artefato.
+
+    Returns:
+        Resumo, ou None se não existir, estiver ilegível, for de outra versão do
+        artefato ou tiver sido calculado com outro motor de contagem distinta
+    """
+    caminho = caminho_resumo(nome, base_path)
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            resumo = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if resumo.get('versao_artefato') != versao_artefato(nome, base_path):
+        return None
+    if resumo.get('motor_distintos', 'exato') != motor_distintos():
+        return None
+    return resumo
@@ -0,0 +1,343 @@
+"""
+Tarefas em segundo plano: treino de modelos e importância das features.
+
+Treinar o modelo (e permutar as features) dentro da thread do script do
+Streamlit congelava a página, e um segundo usuário disparava outro treino
+idêntico. `GerenciadorTarefas` mantém uma tabela de
+tarefas e um pool de processos compartilhados por todas as sessões do
+servidor:
+
+- a tarefa é identificada por (tipo, dataset, versão do artefato, parâmetros);
+  pedir de novo uma tarefa em andamento (ou já concluída) devolve a mesma;
+- o processo de trabalho publica o andamento em
+  `artefatos/tarefas/<id>.json`, que qualquer sessão pode ler;
+- o modelo treinado vai para o registro de modelos e a importância das
+  features (`importancia.json`) e as contribuições por caminho nas árvores
+  (`atribuicao.json`) são gravadas ao lado dele, de modo que as próximas
+  consultas nem precisam do pool;
+- se um processo de trabalho morre (ex.: falta de memória no treino do
+  OULAD completo), o pool inteiro quebra; o gerenciador o descarta e cria
+  outro no próximo pedido, e a tarefa que falhou pode ser pedida de novo.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .armazenamento import versao_artefato
+    from .atribuicao import contribuicoes_caminho, importancia_atribuicao
+    from .bloqueio import escrever_atomico
+    from .carregar_dados import carregar_oulad_dados, carregar_uci_dados
+    from .modelos import (
+        calcular_importancia, hiperparametros, impressao_dados, motor_modelo, preparar_dados, treinar_modelo
+    )
+    from .registro_modelos import RegistroModelos, chave_modelo
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from armazenamento import versao_artefato
+    from atribuicao import contribuicoes_caminho, importancia_atribuicao
+    from bloqueio import escrever_atomico
+    from carregar_dados import carregar_oulad_dados, carregar_uci_dados
+    from modelos import (
+        calcular_importancia, hiperparametros, impressao_dados, motor_modelo, preparar_dados, treinar_modelo
+    )
+    from registro_modelos import RegistroModelos, chave_modelo
+
+DIRETORIO_TAREFAS = Path(__file__).parent.parents[1] / 'artefatos' / 'tarefas'
+ARQUIVO_IMPORTANCIA = 'importancia.json'
+ARQUIVO_ATRIBUICAO = 'atribuicao.json'
+AMOSTRA_ATRIBUICAO = 20_000  # Linhas do teste usadas na média das contribuições
+
+CARREGADORES: Dict[str, Callable[[], Any]] = {'uci': carregar_uci_dados, 'oulad': carregar_oulad_dados}
+
+# Estados publicados no arquivo de andamento
+PENDENTE, EXECUTANDO, CONCLUIDA, ERRO = 'pendente', 'executando', 'concluida', 'erro'
+
+
+def identificador_tarefa(tipo: str, nome: str, parametros: Optional[Dict[str, Any]] = None) -> str:
+    """Identificador de uma tarefa: muda quando o artefato de dados é regenerado"""
+    conteudo = json.dumps({
+        'tipo': tipo,
+        'nome': nome,
+        'versao_dados': versao_artefato(nome),
+        'parametros': parametros or {},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+class Progresso:
+    """
+    Publica o andamento de uma tarefa em um arquivo JSON (gravação atômica).
+
+    Args:
+        caminho: Arquivo de andamento da tarefa
+        **fixos: Campos repetidos em toda publicação (tipo, nome...)
+    """
+
+    def __init__(self, caminho: Path, **fixos: Any):
+        self.caminho = Path(caminho)
+        self.fixos = fixos
+
+    def __call__(self, etapa: str, percentual: int, estado: str = EXECUTANDO, **extras: Any) -> None:
+        dados = {
+            **self.fixos,
+            'estado': estado,
+            'etapa': etapa,
+            'percentual': percentual,
+            'atualizado_em': time.time(),
+            **extras,
+        }
+
+        def escrever(temporario: Path) -> None:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, default=str)
+
+        escrever_atomico(self.caminho, escrever)
+
+
+def ler_progresso(caminho: Path) -> Optional[Dict[str, Any]]:
+    """Último andamento publicado (None se a tarefa ainda não publicou nada)"""
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _obter_modelo(nome: str, progresso: Progresso, registro: RegistroModelos, motor: Optional[str] = None):
+    """Carrega os dados e obtém o modelo do motor no registro, treinando se a chave for nova"""
+    progresso(f'Carregando dados {nome.upper()}', 10)
+    df = CARREGADORES[nome]()
+    progresso('Preparando dados', 30)
+    X_train, X_test, y_train, y_test = preparar_dados(nome, df, motor=motor)
+    del df
+
+    progresso('Treinando modelo (ou reutilizando do registro)', 50)
+    impressao = impressao_dados(nome, X_train, y_train)
+    modelo = treinar_modelo(nome, X_train, y_train, registro=registro, impressao=impressao,
+                            motor=motor)
+    chave = chave_modelo(nome, impressao, list(X_train.columns), hiperparametros(nome, motor))
+    return chave, modelo, X_test, y_test
+
+
+def executar_treino(nome: str, progresso: Progresso, registro: RegistroModelos,
+                    motor: Optional[str] = None) -> Dict[str, Any]:
+    """Tarefa 'treino': publica o modelo no registro e devolve sua chave"""
+    chave, _, _, _ = _obter_modelo(nome, progresso, registro, motor)
+    return {'nome': nome, 'chave': chave}
+
+
+def executar_importancia(nome: str, progresso: Progresso, registro: RegistroModelos,
+                         motor: Optional[str] = None) -> Dict[str, Any]:
+    """Tarefa 'importancia': calcula e publica a importância das features junto do modelo"""
+    chave, modelo, X_test, y_test = _obter_modelo(nome, progresso, registro, motor)
+    importancia = registro.ler_anexo(nome, chave, ARQUIVO_IMPORTANCIA)
+    if importancia is None:
+        progresso('Calculando importância das features', 70)
+        importancia = calcular_importancia(nome, modelo, X_test, y_test).to_dict(orient='records')
+        registro.salvar_anexo(nome, chave, ARQUIVO_IMPORTANCIA, importancia)
+    return {'nome': nome, 'chave': chave, 'importancia': importancia}
+
+
+def executar_atribuicao(nome: str, progresso: Progresso, registro: RegistroModelos,
+                        motor: Optional[str] = None) -> Dict[str, Any]:
+    """Tarefa 'atribuicao': publica a média |contribuição| por feature, calculada nos caminhos das árvores"""
+    chave, modelo, X_test, _ = _obter_modelo(nome, progresso, registro, motor)
+    atribuicao = registro.ler_anexo(nome, chave, ARQUIVO_ATRIBUICAO)
+    if atribuicao is None:
+        progresso('Calculando contribuições nos caminhos das árvores', 70)
+        if len(X_test) > AMOSTRA_ATRIBUICAO:
+            X_test = X_test.sample(AMOSTRA_ATRIBUICAO, random_state=42)
+        resultado = contribuicoes_caminho(modelo, X_test)
+        atribuicao = importancia_atribuicao(resultado).to_dict(orient='records')
+        registro.salvar_anexo(nome, chave, ARQUIVO_ATRIBUICAO, atribuicao)
+    return {'nome': nome, 'chave': chave, 'atribuicao': atribuicao}
+
+
+EXECUTORES: Dict[str, Callable[[str, Progresso, RegistroModelos, Optional[str]], Dict[str, Any]]] = {
+    'treino': executar_treino,
+    'importancia': executar_importancia,
+    'atribuicao': executar_atribuicao,
+}
+
+
+def _executar_tarefa(tipo: str, nome: str, caminho_progresso: str,
+                     diretorio_modelos: Optional[str], motor: Optional[str] = None) -> Dict[str, Any]:
+    """Ponto de entrada no processo de trabalho"""
+    progresso = Progresso(Path(caminho_progresso), tipo=tipo, nome=nome)
+    try:
+        resultado = EXECUTORES[tipo](nome, progresso, RegistroModelos(diretorio_modelos), motor)
+    except BaseException as e:
+        progresso('Falhou', 100, estado=ERRO, erro=f'{type(e).__name__}: {e}', detalhes=traceback.format_exc())
+        raise
+    progresso('Concluída', 100, estado=CONCLUIDA, chave=resultado.get('chave'))
+    return resultado
+
+
+class Tarefa:
+    """Entrada da tabela de tarefas de um GerenciadorTarefas"""
+
+    def __init__(self, identificador: str, tipo: str, nome: str, futuro: Future, caminho_progresso: Path):
+        self.identificador = identificador
+        self.tipo = tipo
+        self.nome = nome
+        self.futuro = futuro
+        self.caminho_progresso = caminho_progresso
+        self.criada_em = time.time()
+
+    def estado(self) -> Dict[str, Any]:
+        """Andamento publicado pelo processo de trabalho, consolidado com o estado do futuro"""
+        andamento = ler_progresso(self.caminho_progresso) or {
+            'estado': PENDENTE, 'etapa': 'Na fila', 'percentual': 0
+        }
+        if self.futuro.done():
+            erro = self.futuro.exception()
+            if isinstance(erro, BrokenProcessPool):
+                # O processo morreu sem publicar o erro (o andamento pode ter ficado em 'executando')
+                andamento = {'estado': ERRO, 'etapa': 'Processo de trabalho encerrado', 'percentual': 100,
+                             'erro': f'{type(erro).__name__}: {erro} (peça a tarefa de novo)'}
+            elif erro is not None and andamento.get('estado') != ERRO:
+                # Falha antes de a tarefa publicar
+                andamento = {'estado': ERRO, 'etapa': 'Falhou', 'percentual': 100,
+                             'erro': f'{type(erro).__name__}: {erro}'}
+            elif erro is None:
+                andamento = {**andamento, 'estado': CONCLUIDA, 'percentual': 100}
+        return {
+            'id': self.identificador, 'tipo': self.tipo, 'nome': self.nome,
+            'criada_em': self.criada_em, **andamento,
+        }
+
+
+class GerenciadorTarefas:
+    """
+    Tabela de tarefas com pool de processos, compartilhada por todas as sessões.
+
+    Args:
+        max_processos: Tamanho do pool (o treino do OULAD já usa 2 núcleos)
+        diretorio: Onde publicar o andamento (padrão: artefatos/tarefas)
+        registro: Registro onde as tarefas publicam os modelos
+        executor: Executor a usar no lugar do pool de processos (testes)
+    """
+
+    def __init__(self, max_processos: int = 1, diretorio: Optional[Path] = None,
+                 registro: Optional[RegistroModelos] = None, executor: Optional[Executor] = None):
+        self.max_processos = max_processos
+        self.diretorio = Path(diretorio or DIRETORIO_TAREFAS)
+        self.registro = registro or RegistroModelos()
+        self._executor = executor
+        self._tarefas: Dict[str, Tarefa] = {}
+        self._trava = threading.Lock()
+
+    def _pool(self) -> Executor:
+        """Pool atual, criado no primeiro uso ou depois que o anterior quebrou; chamar com self._trava"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_processos)
+        return self._executor
+
+    def _descartar_pool(self, executor: Executor) -> None:
+        """Descarta um pool quebrado (se ainda for o atual), para o próximo pedido criar outro"""
+        with self._trava:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print("⚠️ Pool de tarefas quebrado (processo de trabalho encerrado): será recriado no próximo pedido")
+        executor.shutdown(wait=False)
+
+    def _ao_terminar(self, executor: Executor, futuro: Future) -> None:
+        if not futuro.cancelled() and isinstance(futuro.exception(), BrokenProcessPool):
+            self._descartar_pool(executor)
+
+    def submeter(self, tipo: str, nome: str, motor: Optional[str] = None) -> str:
+        """
+        Agenda uma tarefa, reaproveitando a idêntica que já estiver na tabela.
+
+        Uma tarefa que falhou é agendada de novo; uma concluída é devolvida
+        como está (o resultado fica disponível em resultado()).
+
+        Args:
+            tipo: 'treino', 'importancia' ou 'atribuicao'
+            nome: 'uci' ou 'oulad'
+            motor: Motor do modelo; None usa o de SIDA_MOTOR_<NOME>
+
+        Returns:
+            Identificador da tarefa
+        """
+        if tipo not in EXECUTORES:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tipo!r} (use um de {sorted(EXECUTORES)})")
+        motor = motor_modelo(nome, motor)
+        identificador = identificador_tarefa(tipo, nome, {'hiperparametros': hiperparametros(nome, motor)})
+        with self._trava:
+            existente = self._tarefas.get(identificador)
+            if existente is not None and not (existente.futuro.done() and existente.futuro.exception()):
+                return identificador
+
+            caminho_progresso = self.diretorio / f'{identificador}.json'
+            caminho_progresso.unlink(missing_ok=True)
+            argumentos = (_executar_tarefa, tipo, nome, str(caminho_progresso), str(self.registro.diretorio), motor)
+            executor = self._pool()
+            try:
+                futuro = executor.submit(*argumentos)
+            except BrokenProcessPool:
+                # Quebrou antes de o aviso de término chegar: recria e agenda no pool novo
+                print("⚠️ Pool de tarefas quebrado: recriando")
+                executor.shutdown(wait=False)
+                self._executor = None
+                executor = self._pool()
+                futuro = executor.submit(*argumentos)
+            self._tarefas[identificador] = Tarefa(identificador, tipo, nome, futuro, caminho_progresso)
+            print(f"🧵 Tarefa '{tipo}' ({nome}) agendada: {identificador}")
+        # Fora da trava: se o futuro já terminou, o aviso roda na hora e usa a trava
+        futuro.add_done_callback(lambda f, executor=executor: self._ao_terminar(executor, f))
+        return identificador
+
+    def tarefa(self, identificador: str) -> Tarefa:
+        """Entrada da tabela (KeyError se a tarefa não foi submetida a este gerenciador)"""
+        try:
+            return self._tarefas[identificador]
+        except KeyError:
+            raise KeyError(f"Tarefa desconhecida: {identificador}") from None
+
+    def estado(self, identificador: str) -> Dict[str, Any]:
+        """Andamento atual (estado, etapa, percentual, erro) de uma tarefa"""
+        return self.tarefa(identificador).estado()
+
+    def concluida(self, identificador: str) -> bool:
+        """Indica se a tarefa terminou com sucesso"""
+        futuro = self.tarefa(identificador).futuro
+        return futuro.done() and futuro.exception() is None
+
+    def resultado(self, identificador: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Resultado da tarefa (espera até `timeout` segundos; relança o erro da tarefa)"""
+        return self.tarefa(identificador).futuro.result(timeout=timeout)
+
+    def tarefas(self) -> List[Dict[str, Any]]:
+        """Estado de todas as tarefas da tabela, da mais recente para a mais antiga"""
+        with self._trava:
+            tarefas = list(self._tarefas.values())
+        return sorted((t.estado() for t in tarefas), key=lambda e: e['criada_em'], reverse=True)
+
+    def encerrar(self, esperar: bool = True) -> None:
+        """Encerra o pool (as tarefas em andamento terminam se `esperar`)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=esperar)
+            self._executor = None
+
+
+_gerenciador: Optional[GerenciadorTarefas] = None
+_trava_gerenciador = threading.Lock()
+
+
+def gerenciador_tarefas() -> GerenciadorTarefas:
+    """Gerenciador único do processo (compartilhado por todas as sessões do Streamlit)"""
+    global _gerenciador
+    with _trava_gerenciador:
+        if _gerenciador is None:
+            _gerenciador = GerenciadorTarefas()
+        return _gerenciador
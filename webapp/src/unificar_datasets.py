@@ -20,6 +20,17 @@ warnings.filterwarnings('ignore')
 
 # Importar funções de carregamento existentes
 from .carregar_dados import carregar_dados_uci_raw, carregar_dados_oulad_raw
+from .armazenamento import calcular_manifesto, fontes_artefato, ler_manifesto, salvar_artefato
+from .esquema import aplicar_esquema
+from .imputador_grupos import ImputadorPorGrupo, imputador_compativel
+from .instrumentacao import etapa, instrumentar
+
+# Incrementar sempre que a unificação mudar o conteúdo do artefato
+VERSAO_TRANSFORMACAO = 2
+
+# G3 (UCI) vai de 0 a 20 e resultado_final de 0 a 10: fator usado na conversão
+# linha a linha (normalizar_target_uci) e na imputação vetorizada
+ESCALA_G3_UCI = 2.0
 
 
 # ============================================================================
@@ -38,7 +49,7 @@ def normalizar_target_uci(valor_g3: float) -> float:
     """
     if pd.isna(valor_g3):
         return np.nan
-    return valor_g3 / 2.0
+    return valor_g3 / ESCALA_G3_UCI
 
 
 def normalizar_target_oulad(final_result: str) -> float:
@@ -171,7 +182,18 @@ def agregar_oulad_por_estudante(dataframes_oulad: Dict[str, pd.DataFrame]) -> pd
         )
     
     # Agregar cliques por estudante (se disponível)
-    if 'studentVle' in dataframes_oulad and not dataframes_oulad['studentVle'].empty:
+    if 'studentVle_agregado' in dataframes_oulad:
+        # studentVle lido em blocos: usar os agregados já acumulados
+        cliques_agg = dataframes_oulad['studentVle_agregado'].por_estudante().rename(columns={
+            'sum_click': 'oulad_total_cliques',
+            'num_registros_vle': 'oulad_dias_atividade',
+            'primeira_atividade': 'oulad_primeira_atividade',
+            'ultima_atividade': 'oulad_ultima_atividade',
+        })
+        cliques_agg['oulad_media_cliques_dia'] = (
+            cliques_agg['oulad_total_cliques'] / cliques_agg['oulad_dias_atividade'].replace(0, np.nan)
+        )
+    elif 'studentVle' in dataframes_oulad and not dataframes_oulad['studentVle'].empty:
         df_studentvle = dataframes_oulad['studentVle'].copy()
         cliques_agg = df_studentvle.groupby('id_student').agg({
             'sum_click': 'sum',
@@ -304,7 +326,8 @@ def adicionar_coluna_origem(df: pd.DataFrame, origem: str) -> pd.DataFrame:
 # Funções de Tratamento de Dados Ausentes
 # ============================================================================
 
-def imputar_numerica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[str] = None) -> pd.Series:
+def imputar_numerica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[str] = None,
+                               imputador: Optional[ImputadorPorGrupo] = None) -> pd.Series:
     """
     Imputa coluna numérica usando mediana por grupo.
     
@@ -312,6 +335,7 @@ def imputar_numerica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[s
         df: DataFrame
         coluna: Nome da coluna numérica a imputar
         grupo_cols: Lista de colunas para agrupar (padrão: ['origem_dado', 'regiao', 'genero'])
+        imputador: ImputadorPorGrupo já preparado para df e grupo_cols (evita refatorar as chaves)
     
     Returns:
         Série com valores imputados
@@ -330,7 +354,9 @@ def imputar_numerica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[s
     # Tentar imputar por grupo
     if len(grupo_cols) > 0:
         # Calcular mediana por grupo
-        medianas_grupo = df.groupby(grupo_cols)[coluna].transform('median')
+        if not imputador_compativel(imputador, df, grupo_cols):
+            imputador = ImputadorPorGrupo(df, grupo_cols)
+        medianas_grupo = imputador.medianas(coluna)
         # Preencher apenas onde há NaN
         mask_nan = serie.isna()
         serie.loc[mask_nan] = medianas_grupo.loc[mask_nan]
@@ -347,7 +373,8 @@ def imputar_numerica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[s
     return serie
 
 
-def imputar_categorica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[str] = None) -> pd.Series:
+def imputar_categorica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List[str] = None,
+                                 imputador: Optional[ImputadorPorGrupo] = None) -> pd.Series:
     """
     Imputa coluna categórica usando moda por grupo.
     
@@ -355,6 +382,7 @@ def imputar_categorica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List
         df: DataFrame
         coluna: Nome da coluna categórica a imputar
         grupo_cols: Lista de colunas para agrupar (padrão: ['origem_dado', 'regiao'])
+        imputador: ImputadorPorGrupo já preparado para df e grupo_cols (evita refatorar as chaves)
     
     Returns:
         Série com valores imputados
@@ -372,11 +400,10 @@ def imputar_categorica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List
     
     # Tentar imputar por grupo
     if len(grupo_cols) > 0:
-        def get_mode(x):
-            mode_vals = x.mode()
-            return mode_vals.iloc[0] if len(mode_vals) > 0 else None
-        
-        modas_grupo = df.groupby(grupo_cols)[coluna].transform(get_mode)
+        # Moda por grupo via tabela de contagens (empate: menor valor, como mode().iloc[0])
+        if not imputador_compativel(imputador, df, grupo_cols):
+            imputador = ImputadorPorGrupo(df, grupo_cols)
+        modas_grupo = imputador.modas(coluna)
         # Preencher apenas onde há NaN
         mask_nan = serie.isna()
         serie.loc[mask_nan] = modas_grupo.loc[mask_nan]
@@ -393,13 +420,15 @@ def imputar_categorica_por_grupo(df: pd.DataFrame, coluna: str, grupo_cols: List
     return serie
 
 
-def imputar_numerica_uci(df: pd.DataFrame, coluna: str) -> pd.Series:
+def imputar_numerica_uci(df: pd.DataFrame, coluna: str,
+                          imputador: Optional[ImputadorPorGrupo] = None) -> pd.Series:
     """
     Imputa coluna numérica específica UCI.
     
     Args:
         df: DataFrame
         coluna: Nome da coluna UCI
+        imputador: ImputadorPorGrupo já preparado para df (grupos padrão)
     
     Returns:
         Série com valores imputados
@@ -415,23 +444,25 @@ def imputar_numerica_uci(df: pd.DataFrame, coluna: str) -> pd.Series:
         serie = serie.fillna(0)
     elif 'nota' in coluna.lower():
         # Notas: mediana por grupo ou zero
-        serie = imputar_numerica_por_grupo(df, coluna)
+        serie = imputar_numerica_por_grupo(df, coluna, imputador=imputador)
         if serie.isna().sum() > 0:
             serie = serie.fillna(0)
     else:
         # Outras numéricas: mediana por grupo
-        serie = imputar_numerica_por_grupo(df, coluna)
+        serie = imputar_numerica_por_grupo(df, coluna, imputador=imputador)
     
     return serie
 
 
-def imputar_numerica_oulad(df: pd.DataFrame, coluna: str) -> pd.Series:
+def imputar_numerica_oulad(df: pd.DataFrame, coluna: str,
+                          imputador: Optional[ImputadorPorGrupo] = None) -> pd.Series:
     """
     Imputa coluna numérica específica OULAD.
     
     Args:
         df: DataFrame
         coluna: Nome da coluna OULAD
+        imputador: ImputadorPorGrupo já preparado para df (grupos padrão)
     
     Returns:
         Série com valores imputados
@@ -447,10 +478,10 @@ def imputar_numerica_oulad(df: pd.DataFrame, coluna: str) -> pd.Series:
         serie = serie.fillna(0)
     elif 'score' in coluna.lower() or 'media' in coluna.lower():
         # Scores: mediana por grupo
-        serie = imputar_numerica_por_grupo(df, coluna)
+        serie = imputar_numerica_por_grupo(df, coluna, imputador=imputador)
     else:
         # Outras numéricas: mediana por grupo
-        serie = imputar_numerica_por_grupo(df, coluna)
+        serie = imputar_numerica_por_grupo(df, coluna, imputador=imputador)
     
     return serie
 
@@ -510,6 +541,67 @@ def imputar_resultado_final(row: pd.Series) -> float:
     return 5.0
 
 
+def _valores_numericos(df: pd.DataFrame, coluna: str) -> np.ndarray:
+    """Valores da coluna no dtype original (float64 com NaN se ausente ou anulável)"""
+    if coluna not in df.columns:
+        return np.full(len(df), np.nan)
+    serie = df[coluna]
+    if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'iuf':
+        return serie.to_numpy()
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def imputar_resultado_final_vetorizado(df: pd.DataFrame) -> pd.Series:
+    """
+    Versão vetorizada de `df.apply(imputar_resultado_final, axis=1)`.
+
+    Aplica as mesmas regras por origem como operações mascaradas sobre as
+    colunas inteiras (np.select), sem montar uma Series por linha. As contas
+    são feitas no dtype original das notas, como na versão por linha, para
+    que os resultados sejam idênticos.
+
+    Args:
+        df: DataFrame unificado
+
+    Returns:
+        Série float64 com resultado_final imputado (mesmo índice de df)
+    """
+    if 'resultado_final' in df.columns:
+        resultado = _valores_numericos(df, 'resultado_final').astype('float64')
+    else:
+        resultado = np.full(len(df), np.nan)
+    faltante = np.isnan(resultado)
+    if not faltante.any():
+        return pd.Series(resultado, index=df.index, name='resultado_final')
+
+    if 'origem_dado' in df.columns:
+        origem = df['origem_dado'].astype(object).to_numpy()
+    else:
+        origem = np.full(len(df), '', dtype=object)
+
+    # UCI: média de G1 e G2, ou a nota disponível, convertida para 0-10 (normalizar_target_uci)
+    g1 = _valores_numericos(df, 'uci_nota_periodo1')
+    g2 = _valores_numericos(df, 'uci_nota_periodo2')
+    tem_g1, tem_g2 = ~pd.isna(g1), ~pd.isna(g2)
+    with np.errstate(invalid='ignore', over='ignore'):
+        g3_estimado = np.select([tem_g1 & tem_g2, tem_g1, tem_g2], [(g1 + g2) / 2.0, g1, g2], default=np.nan)
+        estimativa_uci = np.where(pd.isna(g3_estimado), 5.0, g3_estimado / ESCALA_G3_UCI)
+
+    # OULAD: faixas da média de scores (Distinction, Pass, Fail, Withdrawn)
+    score = _valores_numericos(df, 'oulad_media_score')
+    with np.errstate(invalid='ignore'):
+        estimativa_oulad = np.select(
+            [score >= 85, score >= 70, score >= 50, score < 50],
+            [9.0, 7.0, 3.0, 0.0],
+            default=5.0,
+        )
+
+    imputado = np.select([origem == 'UCI', origem == 'OULAD'], [estimativa_uci, estimativa_oulad], default=5.0)
+    resultado = np.where(faltante, imputado, resultado)
+    return pd.Series(resultado, index=df.index, name='resultado_final')
+
+
+@instrumentar()
 def tratar_dados_ausentes(df_unificado: pd.DataFrame) -> pd.DataFrame:
     """
     Função principal de imputação de dados ausentes.
@@ -532,41 +624,59 @@ def tratar_dados_ausentes(df_unificado: pd.DataFrame) -> pd.DataFrame:
     # Tratar coluna target primeiro (CRÍTICO)
     if 'resultado_final' in df.columns:
         print("  ⚠️ Imputando resultado_final (crítico)...")
-        df['resultado_final'] = df.apply(imputar_resultado_final, axis=1)
+        with etapa('resultado_final', df):
+            df['resultado_final'] = imputar_resultado_final_vetorizado(df)
     
     # Tratar colunas numéricas comuns
     colunas_numericas_comuns = [c for c in colunas_comuns if df[c].dtype in [np.float64, np.float32, np.int64, np.int32]]
-    for col in colunas_numericas_comuns:
-        if df[col].isna().sum() > 0:
+    # As chaves de grupo são fatorizadas uma vez e as medianas/modas de todas as
+    # colunas com ausentes saem de uma única passada (ImputadorPorGrupo)
+    grupos_numericos = ['origem_dado', 'regiao', 'genero']
+    grupos_categoricos = ['origem_dado', 'regiao']
+    with etapa('numericas comuns', df, colunas=len(colunas_numericas_comuns)):
+        com_ausentes = [c for c in colunas_numericas_comuns if df[c].isna().any()]
+        imputador = ImputadorPorGrupo(df, grupos_numericos).preparar_medianas(com_ausentes)
+        for col in com_ausentes:
             print(f"  🔄 Imputando numérica comum: {col}")
-            df[col] = imputar_numerica_por_grupo(df, col)
+            df[col] = imputar_numerica_por_grupo(df, col, grupos_numericos, imputador=imputador)
     
     # Tratar colunas categóricas comuns
     colunas_categoricas_comuns = [c for c in colunas_comuns if df[c].dtype == 'object' or df[c].dtype.name == 'category']
-    for col in colunas_categoricas_comuns:
-        if df[col].isna().sum() > 0:
+    with etapa('categoricas comuns', df, colunas=len(colunas_categoricas_comuns)):
+        com_ausentes = [c for c in colunas_categoricas_comuns if df[c].isna().any()]
+        imputador = ImputadorPorGrupo(df, grupos_categoricos).preparar_modas(com_ausentes)
+        for col in com_ausentes:
             print(f"  🔄 Imputando categórica comum: {col}")
-            df[col] = imputar_categorica_por_grupo(df, col)
+            df[col] = imputar_categorica_por_grupo(df, col, grupos_categoricos, imputador=imputador)
+            if col in grupos_categoricos:
+                # A chave mudou: os grupos das colunas seguintes precisam ser refeitos
+                imputador = ImputadorPorGrupo(df, grupos_categoricos)
     
     # Tratar colunas UCI específicas
     colunas_numericas_uci = [c for c in colunas_uci if df[c].dtype in [np.float64, np.float32, np.int64, np.int32]]
-    for col in colunas_numericas_uci:
-        if df[col].isna().sum() > 0:
-            # Apenas para registros UCI
-            mask_uci = df['origem_dado'] == 'UCI'
-            if mask_uci.sum() > 0:
+    with etapa('numericas UCI', df, colunas=len(colunas_numericas_uci)):
+        com_ausentes = [c for c in colunas_numericas_uci if df[c].isna().any()]
+        # Apenas para registros UCI
+        mask_uci = df['origem_dado'] == 'UCI'
+        if com_ausentes and mask_uci.sum() > 0:
+            df_uci = df.loc[mask_uci]
+            imputador = ImputadorPorGrupo(df_uci, grupos_numericos).preparar_medianas(com_ausentes)
+            for col in com_ausentes:
                 print(f"  🔄 Imputando numérica UCI: {col}")
-                df.loc[mask_uci, col] = imputar_numerica_uci(df.loc[mask_uci], col)
+                df.loc[mask_uci, col] = imputar_numerica_uci(df_uci, col, imputador=imputador)
     
     # Tratar colunas OULAD específicas
     colunas_numericas_oulad = [c for c in colunas_oulad if df[c].dtype in [np.float64, np.float32, np.int64, np.int32]]
-    for col in colunas_numericas_oulad:
-        if df[col].isna().sum() > 0:
-            # Apenas para registros OULAD
-            mask_oulad = df['origem_dado'] == 'OULAD'
-            if mask_oulad.sum() > 0:
+    with etapa('numericas OULAD', df, colunas=len(colunas_numericas_oulad)):
+        com_ausentes = [c for c in colunas_numericas_oulad if df[c].isna().any()]
+        # Apenas para registros OULAD
+        mask_oulad = df['origem_dado'] == 'OULAD'
+        if com_ausentes and mask_oulad.sum() > 0:
+            df_oulad = df.loc[mask_oulad]
+            imputador = ImputadorPorGrupo(df_oulad, grupos_numericos).preparar_medianas(com_ausentes)
+            for col in com_ausentes:
                 print(f"  🔄 Imputando numérica OULAD: {col}")
-                df.loc[mask_oulad, col] = imputar_numerica_oulad(df.loc[mask_oulad], col)
+                df.loc[mask_oulad, col] = imputar_numerica_oulad(df_oulad, col, imputador=imputador)
     
     print("✅ Tratamento de dados ausentes concluído")
     
@@ -670,12 +780,14 @@ def validar_imputacao(df: pd.DataFrame) -> Dict:
 # Função Principal de Unificação
 # ============================================================================
 
-def unificar_datasets(base_path: Optional[Path] = None) -> pd.DataFrame:
+@instrumentar()
+def unificar_datasets(base_path: Optional[Path] = None, streaming_vle: bool = True) -> pd.DataFrame:
     """
     Orquestra todo o processo de unificação de datasets UCI e OULAD.
     
     Args:
         base_path: Caminho base do projeto (opcional)
+        streaming_vle: Lê o studentVle em blocos, mantendo apenas os agregados de cliques
     
     Returns:
         DataFrame unificado com dados UCI e OULAD
@@ -689,25 +801,30 @@ def unificar_datasets(base_path: Optional[Path] = None) -> pd.DataFrame:
     
     # 1. Carregar dados brutos
     print("\n📥 Etapa 1: Carregando dados brutos...")
-    df_uci_raw = carregar_dados_uci_raw()
+    with etapa('1 carregar UCI') as registro:
+        df_uci_raw = registro.saida(carregar_dados_uci_raw())
     print(f"  ✅ UCI carregado: {df_uci_raw.shape}")
     
-    dataframes_oulad_raw = carregar_dados_oulad_raw()
+    with etapa('1 carregar OULAD', streaming_vle=streaming_vle) as registro:
+        dataframes_oulad_raw = registro.saida(carregar_dados_oulad_raw(streaming_vle=streaming_vle))
     print(f"  ✅ OULAD carregado: {len(dataframes_oulad_raw)} arquivos")
     
     # 2. Mapear colunas UCI
     print("\n🔄 Etapa 2: Mapeando colunas UCI...")
-    df_uci_mapeado = mapear_colunas_uci(df_uci_raw)
+    with etapa('2 mapear UCI', df_uci_raw) as registro:
+        df_uci_mapeado = registro.saida(mapear_colunas_uci(df_uci_raw))
     print(f"  ✅ UCI mapeado: {df_uci_mapeado.shape}")
     
     # 3. Agregar OULAD
     print("\n🔄 Etapa 3: Agregando dados OULAD...")
-    df_oulad_agregado = agregar_oulad_por_estudante(dataframes_oulad_raw)
+    with etapa('3 agregar OULAD', dataframes_oulad_raw) as registro:
+        df_oulad_agregado = registro.saida(agregar_oulad_por_estudante(dataframes_oulad_raw))
     print(f"  ✅ OULAD agregado: {df_oulad_agregado.shape}")
     
     # 4. Mapear colunas OULAD
     print("\n🔄 Etapa 4: Mapeando colunas OULAD...")
-    df_oulad_mapeado = mapear_colunas_oulad(df_oulad_agregado)
+    with etapa('4 mapear OULAD', df_oulad_agregado) as registro:
+        df_oulad_mapeado = registro.saida(mapear_colunas_oulad(df_oulad_agregado))
     print(f"  ✅ OULAD mapeado: {df_oulad_mapeado.shape}")
     
     # 5. Adicionar coluna de origem
@@ -733,7 +850,8 @@ def unificar_datasets(base_path: Optional[Path] = None) -> pd.DataFrame:
     df_uci_final = df_uci_final[colunas_ordenadas]
     df_oulad_final = df_oulad_final[colunas_ordenadas]
     
-    df_unificado = pd.concat([df_uci_final, df_oulad_final], ignore_index=True)
+    with etapa('6 concatenar', df_uci_final, linhas_oulad=len(df_oulad_final)) as registro:
+        df_unificado = registro.saida(pd.concat([df_uci_final, df_oulad_final], ignore_index=True))
     print(f"  ✅ Dataset unificado: {df_unificado.shape}")
     
     # 7. Tratar dados ausentes
@@ -742,11 +860,13 @@ def unificar_datasets(base_path: Optional[Path] = None) -> pd.DataFrame:
     
     # 8. Tratar outliers
     print("\n🔄 Etapa 8: Tratando outliers...")
-    df_unificado = tratar_outliers(df_unificado)
+    with etapa('8 tratar outliers', df_unificado) as registro:
+        df_unificado = registro.saida(tratar_outliers(df_unificado))
     
     # 9. Validar imputação
     print("\n🔄 Etapa 9: Validando imputação...")
-    validacao = validar_imputacao(df_unificado)
+    with etapa('9 validar imputacao', df_unificado):
+        validacao = validar_imputacao(df_unificado)
     
     print("\n" + "=" * 70)
     print("✅ UNIFICAÇÃO CONCLUÍDA COM SUCESSO!")
@@ -760,31 +880,78 @@ def unificar_datasets(base_path: Optional[Path] = None) -> pd.DataFrame:
     return df_unificado
 
 
+def _como_texto(valor):
+    """Texto de um valor (inteiros gravados como float, ex.: 17.0, voltam a '17')"""
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def normalizar_colunas_mistas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte para texto as colunas que misturam texto e números.
+
+    A concatenação UCI + OULAD junta valores de tipos diferentes numa mesma
+    coluna (ex.: 'idade' tem 17 nas linhas UCI e '0-35' nas OULAD), que o
+    Parquet não consegue gravar. Os valores presentes viram texto e os
+    ausentes continuam ausentes.
+
+    Args:
+        df: DataFrame unificado
+
+    Returns:
+        DataFrame com as colunas mistas como texto (o próprio df se não houver nenhuma)
+    """
+    resultado = df
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.categories
+        elif serie.dtype == object:
+            valores = serie.dropna()
+        else:
+            continue
+        textos = [isinstance(valor, str) for valor in valores]
+        if any(textos) and not all(textos):
+            if resultado is df:
+                resultado = df.copy(deep=False)
+            presentes = serie.notna()
+            resultado[coluna] = serie.astype(object).where(~presentes, serie[presentes].astype(object).map(_como_texto))
+            print(f"  🔤 {coluna}: valores de tipos misturados convertidos para texto")
+    return resultado
+
+
 def salvar_dataset_unificado(df_unificado: pd.DataFrame, base_path: Optional[Path] = None) -> Tuple[Path, Path]:
     """
-    Salva dataset unificado em formato pickle e CSV.
+    Salva dataset unificado como artefato Parquet e em CSV.
     
     Args:
         df_unificado: DataFrame unificado
         base_path: Caminho base do projeto (opcional)
     
     Returns:
-        Tupla com paths dos arquivos salvos (pickle, csv)
+        Tupla com paths dos arquivos salvos (parquet, csv)
     """
     if base_path is None:
         base_path = Path(__file__).parent.parents[1]
     
     print("\n💾 Salvando dataset unificado...")
     
-    # Caminhos dos arquivos
-    pickle_path = base_path / "unified_dataset.pkl"
+    # Caminho do CSV (o Parquet fica em artefatos/unificado.parquet)
     csv_path = base_path / "unified_dataset.csv"
     
-    # Salvar em pickle
-    print(f"  📦 Salvando pickle: {pickle_path}")
-    df_unificado.to_pickle(pickle_path, protocol=4)
-    pickle_size = pickle_path.stat().st_size / (1024 * 1024)  # MB
-    print(f"    ✅ Arquivo salvo: {pickle_size:.2f} MB")
+    # Parquet não grava colunas com texto e números misturados (ex.: idade UCI × faixa etária OULAD)
+    df_unificado = normalizar_colunas_mistas(df_unificado)
+    
+    # Salvar artefato Parquet
+    print(f"  📦 Salvando artefato Parquet...")
+    manifesto = calcular_manifesto(
+        fontes_artefato('unificado', base_path), VERSAO_TRANSFORMACAO,
+        anterior=ler_manifesto('unificado', base_path)
+    )
+    parquet_path = salvar_artefato(aplicar_esquema(df_unificado, 'unificado'), 'unificado', base_path, manifesto=manifesto)
+    parquet_size = parquet_path.stat().st_size / (1024 * 1024)  # MB
+    print(f"    ✅ Arquivo salvo: {parquet_size:.2f} MB")
     
     # Salvar em CSV
     print(f"  📄 Salvando CSV: {csv_path}")
@@ -796,4 +963,4 @@ def salvar_dataset_unificado(df_unificado: pd.DataFrame, base_path: Optional[Pat
     memory_mb = df_unificado.memory_usage(deep=True).sum() / (1024 * 1024)
     print(f"\n📊 Uso de memória do DataFrame: {memory_mb:.2f} MB")
     
-    return pickle_path, csv_path
+    return parquet_path, csv_path
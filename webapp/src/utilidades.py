@@ -8,27 +8,120 @@ import pickle
 import time
 try:
     from .carregar_dados import carregar_uci_dados, carregar_oulad_dados
+    from .armazenamento import versao_artefato
+    from .cache_impressao import estatisticas_caches
+    from .cache_revalidacao import cache_revalidado, estatisticas_revalidacao
+    from .floresta_compilada import compilar_modelo
+    from .importancia import importancia_permutacao_adaptativa, importancia_por_coluna
+    from .atribuicao import contribuicoes_caminho, explicacao_por_amostra
+    from .modelos import chave_registrada, impressao_divisao, motor_modelo
+    from .registro_modelos import RegistroModelos
+    from .resumo_metricas import METRICAS_VAZIAS, calcular_resumo, gravar_resumo, ler_resumo
+    from .tarefas import ARQUIVO_ATRIBUICAO, ARQUIVO_IMPORTANCIA, gerenciador_tarefas
+    from .conjunto_compartilhado import ConjuntoCompartilhado
+    from .contagem_aproximada import motor_distintos
+    from .cubo_estudantes import CuboEstudantes, gravar_cubo, ler_cubo
+    from .instrumentacao import caminho_log, ler_registros, registros_etapas, resumo_etapas
 except ImportError:
     # Fallback para quando executado diretamente
     from carregar_dados import carregar_uci_dados, carregar_oulad_dados
+    from armazenamento import versao_artefato
+    from cache_impressao import estatisticas_caches
+    from cache_revalidacao import cache_revalidado, estatisticas_revalidacao
+    from floresta_compilada import compilar_modelo
+    from importancia import importancia_permutacao_adaptativa, importancia_por_coluna
+    from atribuicao import contribuicoes_caminho, explicacao_por_amostra
+    from modelos import chave_registrada, impressao_divisao, motor_modelo
+    from registro_modelos import RegistroModelos
+    from resumo_metricas import METRICAS_VAZIAS, calcular_resumo, gravar_resumo, ler_resumo
+    from tarefas import ARQUIVO_ATRIBUICAO, ARQUIVO_IMPORTANCIA, gerenciador_tarefas
+    from conjunto_compartilhado import ConjuntoCompartilhado
+    from contagem_aproximada import motor_distintos
+    from cubo_estudantes import CuboEstudantes, gravar_cubo, ler_cubo
+    from instrumentacao import caminho_log, ler_registros, registros_etapas, resumo_etapas
 
 def leitura_oulad_data():
     """Função para leitura dos dados OULAD - mantida para compatibilidade"""
     datasets_path = Path(__file__).parent.parents[1] / 'datasets' / 'oulad_data'
     return datasets_path
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
+# A versão (hash do manifesto gravado) é consultada a cada acesso: regenerar o artefato
+# recarrega a cópia compartilhada em segundo plano, e a anterior continua servindo até lá
+@cache_revalidado(versao=lambda: versao_artefato('uci'), ttl=3600)
+def _conjunto_uci():
+    """Dados UCI carregados uma única vez por versão do artefato como ConjuntoCompartilhado"""
+    return ConjuntoCompartilhado(carregar_uci_dados())
+
+@cache_revalidado(versao=lambda: versao_artefato('oulad'), ttl=3600)
+def _conjunto_oulad():
+    """Dados OULAD carregados uma única vez por versão do artefato como ConjuntoCompartilhado"""
+    return ConjuntoCompartilhado(carregar_oulad_dados())
+
 def carregar_dados_uci_cached():
-    """Carrega dados UCI com cache"""
-    return carregar_uci_dados()
+    """Carrega dados UCI com cache (visão somente leitura da cópia compartilhada)"""
+    return _conjunto_uci().visualizar()
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
 def carregar_dados_oulad_cached():
-    """Carrega dados OULAD com cache"""
-    return carregar_oulad_dados()
+    """Carrega dados OULAD com cache (visão somente leitura da cópia compartilhada)"""
+    return _conjunto_oulad().visualizar()
+
+def carregar_dados_uci_editavel():
+    """Cópia gravável dos dados UCI, para páginas que alteram valores em posição"""
+    return _conjunto_uci().copia_editavel()
+
+def carregar_dados_oulad_editavel():
+    """Cópia gravável dos dados OULAD, para páginas que alteram valores em posição"""
+    return _conjunto_oulad().copia_editavel()
+
+def medir_memoria_sessao():
+    """Sobrecarga de memória por sessão de cada conjunto compartilhado"""
+    return {
+        'uci': _conjunto_uci().medir_sobrecarga_sessao(),
+        'oulad': _conjunto_oulad().medir_sobrecarga_sessao(),
+    }
+
+def exibir_painel_depuracao(ultimos=200):
+    """Painel com o tempo, CPU, memória e linhas de cada etapa instrumentada dos pipelines"""
+    with st.expander("🛠️ Depuração: etapas dos pipelines", expanded=False):
+        origem = st.radio("Registros", ["Arquivo de log", "Este processo"], horizontal=True)
+        registros = ler_registros(ultimos=ultimos) if origem == "Arquivo de log" else registros_etapas()
+        if not registros:
+            st.info(f"Nenhuma etapa registrada ainda ({caminho_log()})")
+        else:
+            resumo = resumo_etapas(registros)
+            st.dataframe(resumo, use_container_width=True, hide_index=True)
+            por_etapa = resumo.groupby('etapa', sort=False)['tempo_s'].agg(['count', 'sum', 'max'])
+            st.markdown("**Tempo acumulado por etapa (s)**")
+            st.dataframe(por_etapa.sort_values('sum', ascending=False), use_container_width=True)
+            st.caption(f"Registro completo: {caminho_log()}")
+        
+        st.markdown("**Tarefas em segundo plano**")
+        tarefas = gerenciador_tarefas().tarefas()
+        if tarefas:
+            colunas = ['id', 'tipo', 'nome', 'estado', 'etapa', 'percentual', 'erro']
+            st.dataframe(pd.DataFrame(tarefas).reindex(columns=colunas), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhuma tarefa agendada neste processo")
+        
+        st.markdown("**Caches por impressão dos dados (treino e importância nas páginas)**")
+        caches = estatisticas_caches()
+        if caches:
+            st.dataframe(pd.DataFrame(caches), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhuma função em cache neste processo ainda")
+        
+        st.markdown("**Caches revalidados em segundo plano (dados, modelos e importâncias)**")
+        st.dataframe(pd.DataFrame(estatisticas_revalidacao()), use_container_width=True, hide_index=True)
+        
+        st.markdown("**Sobrecarga de memória por sessão**")
+        try:
+            st.json(medir_memoria_sessao())
+        except Exception as e:
+            st.warning(f"Não foi possível medir a memória: {e}")
 
 def carregar_dados_dashboard():
     """Carrega os dados processados para o painel analítico com cache"""
+    # A sessão guarda apenas visões rasas; os dados ficam na cópia compartilhada
     try:
         # Carregar dados UCI com cache
         df_uci = carregar_dados_uci_cached()
@@ -49,233 +142,99 @@ def carregar_dados_dashboard():
     
     return df_uci, df_oulad
 
+def _versao_resumo(nome):
+    """Versão do artefato e motor de contagem distinta: trocar SIDA_MOTOR_DISTINTOS também revalida o resumo"""
+    return versao_artefato(nome), motor_distintos()
+
+@cache_revalidado(versao=_versao_resumo)
+def _resumo_metricas(nome):
+    """
+    Resumo de métricas gravado junto do artefato (ver resumo_metricas).
+
+    Se faltar ou for de outra versão do artefato (ex.: artefato migrado de um
+    pickle) ou de outro motor de contagem distinta, é calculado uma vez a partir dos dados e gravado para os próximos acessos.
+    """
+    resumo = ler_resumo(nome)
+    if resumo is not None:
+        return resumo
+    print(f"🔄 Resumo de métricas '{nome}' ausente ou desatualizado: calculando a partir dos dados...")
+    df = (_conjunto_uci() if nome == 'uci' else _conjunto_oulad()).visualizar()
+    try:
+        return gravar_resumo(nome, df)
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o resumo de métricas '{nome}': {e}")
+        return calcular_resumo(nome, df)
+
+@cache_revalidado(versao=versao_artefato)
+def _cubo_estudantes(nome):
+    """
+    Cubo de estudantes gravado junto do artefato (ver cubo_estudantes), com as fatias dos gráficos já calculadas.
+
+    Se faltar ou for de outra versão do artefato, é construído uma vez a partir
+    dos dados e gravado para os próximos acessos.
+    """
+    cubo = ler_cubo(nome)
+    if cubo is None:
+        print(f"🔄 Cubo de estudantes '{nome}' ausente ou desatualizado: construindo a partir dos dados...")
+        df = _conjunto_oulad().visualizar()
+        try:
+            cubo = gravar_cubo(nome, df)
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar o cubo de estudantes '{nome}': {e}")
+            cubo = CuboEstudantes.construir(df)
+    cubo.materializar()
+    return cubo
+
+def obter_cubo_oulad():
+    """Cubo OLAP de estudantes distintos e agregados de score do OULAD, sem varrer os dados brutos"""
+    return _cubo_estudantes('oulad')
+
+def obter_resumo_metricas(nome):
+    """Resumo de métricas do dataset (registros, colunas, principais e consolidadas), sem carregar os dados"""
+    return _resumo_metricas(nome)
+
 def obter_metricas_principais_uci():
-    """Retorna métricas principais do dataset UCI calculadas dinamicamente"""
+    """Retorna métricas principais do dataset UCI, lidas do resumo gravado junto do artefato"""
     try:
-        df_uci = carregar_dados_uci_cached()
-        if df_uci.empty:
-            return {
-                'total_estudantes': 0,
-                'media_nota_final': 0,
-                'taxa_aprovacao': 0,
-                'media_faltas': 0,
-                'distribuicao_genero': {},
-                'media_tempo_estudo': 0,
-                'correlacao_g1_g3': 0,
-                'correlacao_g2_g3': 0,
-                'estudantes_alcool_baixo': 0,
-                'estudantes_alcool_alto': 0
-            }
-        
-        # Calcular métricas reais - contar estudantes únicos baseado em características demográficas
-        # Usar combinação de colunas que identificam unicamente cada estudante
-        colunas_id = ['school', 'sex', 'age', 'address', 'famsize', 'Pstatus', 'Medu', 'Fedu', 'Mjob', 'Fjob', 'reason', 'guardian']
-        total_estudantes = df_uci[colunas_id].drop_duplicates().shape[0]
-        media_nota_final = df_uci['G3'].mean() if 'G3' in df_uci.columns else 0
-        taxa_aprovacao = (df_uci['G3'] >= 10).mean() * 100 if 'G3' in df_uci.columns else 0
-        media_faltas = df_uci['absences'].mean() if 'absences' in df_uci.columns else 0
-        
-        # Distribuição de gênero
-        if 'sex' in df_uci.columns:
-            dist_genero = df_uci['sex'].value_counts(normalize=True) * 100
-            distribuicao_genero = {k: round(v, 1) for k, v in dist_genero.to_dict().items()}
-        else:
-            distribuicao_genero = {}
-        
-        # Tempo de estudo médio - converter strings para números
-        if 'studytime' in df_uci.columns:
-            # Mapear strings para números para calcular média
-            studytime_map = {'<2h': 1, '2-5h': 2, '5-10h': 3, '>10h': 4}
-            studytime_numeric = df_uci['studytime'].map(studytime_map)
-            media_tempo_estudo = studytime_numeric.mean()
-        else:
-            media_tempo_estudo = 0
-        
-        # Correlações
-        correlacao_g1_g3 = df_uci[['G1', 'G3']].corr().iloc[0, 1] if all(col in df_uci.columns for col in ['G1', 'G3']) else 0
-        correlacao_g2_g3 = df_uci[['G2', 'G3']].corr().iloc[0, 1] if all(col in df_uci.columns for col in ['G2', 'G3']) else 0
-        
-        # Consumo de álcool
-        if 'Dalc' in df_uci.columns:
-            alcool_baixo = (df_uci['Dalc'] <= 2).mean() * 100
-            alcool_alto = (df_uci['Dalc'] >= 4).mean() * 100
-        else:
-            alcool_baixo = 0
-            alcool_alto = 0
-        
-        return {
-            'total_estudantes': total_estudantes,
-            'media_nota_final': round(media_nota_final, 2),
-            'taxa_aprovacao': round(taxa_aprovacao, 1),
-            'media_faltas': round(media_faltas, 1),
-            'distribuicao_genero': distribuicao_genero,
-            'media_tempo_estudo': round(media_tempo_estudo, 1),
-            'correlacao_g1_g3': round(correlacao_g1_g3, 2),
-            'correlacao_g2_g3': round(correlacao_g2_g3, 2),
-            'estudantes_alcool_baixo': round(alcool_baixo, 1),
-            'estudantes_alcool_alto': round(alcool_alto, 1)
-        }
+        return dict(_resumo_metricas('uci')['principais'])
     except Exception as e:
         st.warning(f"Erro ao calcular métricas UCI: {e}")
-        return {
-            'total_estudantes': 0,
-            'media_nota_final': 0,
-            'taxa_aprovacao': 0,
-            'media_faltas': 0,
-            'distribuicao_genero': {},
-            'media_tempo_estudo': 0,
-            'correlacao_g1_g3': 0,
-            'correlacao_g2_g3': 0,
-            'estudantes_alcool_baixo': 0,
-            'estudantes_alcool_alto': 0
-        }
+        return dict(METRICAS_VAZIAS['uci'])
 
 def obter_metricas_principais_oulad():
-    """Retorna métricas principais do dataset OULAD calculadas dinamicamente"""
+    """Retorna métricas principais do dataset OULAD, lidas do resumo gravado junto do artefato"""
     try:
-        df_oulad = carregar_dados_oulad_cached()
-        if df_oulad.empty:
-            return {
-                'total_estudantes': 0,
-                'taxa_aprovacao': 0,
-                'media_cliques': 0,
-                'distribuicao_genero': {},
-                'faixa_etaria_principal': 'N/A',
-                'atividade_mais_comum': 'N/A',
-                'regiao_principal': 'N/A',
-                'estudantes_aprovados': 0,
-                'estudantes_distincao': 0,
-                'estudantes_reprovados': 0
-            }
-        
-        # Calcular métricas reais
-        # Usar nunique() para contar estudantes únicos, não registros
-        if 'id_student' in df_oulad.columns:
-            total_estudantes = df_oulad['id_student'].nunique()
-        else:
-            total_estudantes = len(df_oulad)  # Fallback se não houver coluna id_student
-        
-        # Calcular média de cliques - verificar tanto 'clicks' quanto 'sum_click'
-        if 'clicks' in df_oulad.columns:
-            media_cliques = df_oulad['clicks'].mean()
-        elif 'sum_click' in df_oulad.columns:
-            media_cliques = df_oulad['sum_click'].mean()
-        else:
-            media_cliques = 0
-        
-        # Taxa de aprovação
-        if 'final_result' in df_oulad.columns:
-            taxa_aprovacao = (df_oulad['final_result'] == 'Pass').mean() * 100
-            estudantes_aprovados = taxa_aprovacao
-            estudantes_distincao = (df_oulad['final_result'] == 'Distinction').mean() * 100
-            estudantes_reprovados = (df_oulad['final_result'] == 'Fail').mean() * 100
-        else:
-            taxa_aprovacao = 0
-            estudantes_aprovados = 0
-            estudantes_distincao = 0
-            estudantes_reprovados = 0
-        
-        # Distribuição de gênero
-        if 'gender' in df_oulad.columns and 'id_student' in df_oulad.columns:
-            dist_genero = df_oulad.groupby('gender', observed=False)['id_student'].nunique()
-            total_estudantes = df_oulad['id_student'].nunique()
-            dist_genero_pct = (dist_genero / total_estudantes * 100)
-            distribuicao_genero = {k: round(v, 1) for k, v in dist_genero_pct.to_dict().items()}
-        else:
-            distribuicao_genero = {}
-        
-        # Faixa etária principal
-        if 'age_band' in df_oulad.columns and 'id_student' in df_oulad.columns:
-            # Encontrar a faixa etária com mais estudantes únicos
-            idade_counts = df_oulad.groupby('age_band', observed=False)['id_student'].nunique()
-            faixa_etaria_principal = idade_counts.idxmax() if not idade_counts.empty else 'N/A'
-        else:
-            faixa_etaria_principal = 'N/A'
-        
-        # Atividade mais comum
-        if 'activity_type' in df_oulad.columns:
-            atividade_mais_comum = df_oulad['activity_type'].mode().iloc[0] if not df_oulad['activity_type'].mode().empty else 'N/A'
-        else:
-            atividade_mais_comum = 'N/A'
-        
-        # Região principal
-        if 'region' in df_oulad.columns and 'id_student' in df_oulad.columns:
-            # Encontrar a região com mais estudantes únicos
-            regiao_counts = df_oulad.groupby('region', observed=False)['id_student'].nunique()
-            regiao_principal = regiao_counts.idxmax() if not regiao_counts.empty else 'N/A'
-        else:
-            regiao_principal = 'N/A'
-        
-        return {
-            'total_estudantes': total_estudantes,
-            'taxa_aprovacao': round(taxa_aprovacao, 1),
-            'media_cliques': round(media_cliques, 2),
-            'distribuicao_genero': distribuicao_genero,
-            'faixa_etaria_principal': faixa_etaria_principal,
-            'atividade_mais_comum': atividade_mais_comum,
-            'regiao_principal': regiao_principal,
-            'estudantes_aprovados': round(estudantes_aprovados, 1),
-            'estudantes_distincao': round(estudantes_distincao, 1),
-            'estudantes_reprovados': round(estudantes_reprovados, 1)
-        }
+        return dict(_resumo_metricas('oulad')['principais'])
     except Exception as e:
         st.warning(f"Erro ao calcular métricas OULAD: {e}")
-        return {
-            'total_estudantes': 0,
-            'taxa_aprovacao': 0,
-            'media_cliques': 0,
-            'distribuicao_genero': {},
-            'faixa_etaria_principal': 'N/A',
-            'atividade_mais_comum': 'N/A',
-            'regiao_principal': 'N/A',
-            'estudantes_aprovados': 0,
-            'estudantes_distincao': 0,
-            'estudantes_reprovados': 0
-        }
+        return dict(METRICAS_VAZIAS['oulad'])
 
 def calcular_metricas_uci(df_uci):
     """Calcula métricas principais para o dataset UCI"""
     if df_uci.empty:
         return {}
-    
-    # Contar estudantes únicos baseado em características demográficas
-    colunas_id = ['school', 'sex', 'age', 'address', 'famsize', 'Pstatus', 'Medu', 'Fedu', 'Mjob', 'Fjob', 'reason', 'guardian']
-    total_estudantes_unicos = df_uci[colunas_id].drop_duplicates().shape[0]
-    
-    metricas = {
-        'total_alunos': total_estudantes_unicos,
-        'media_nota_final': df_uci['G3'].mean() if 'G3' in df_uci.columns else 0,
-        'taxa_aprovacao': (df_uci['G3'] >= 10).mean() * 100 if 'G3' in df_uci.columns else 0,
-        'media_faltas': df_uci['absences'].mean() if 'absences' in df_uci.columns else 0,
-        'media_tempo_estudo': df_uci['studytime'].map({'<2h': 1, '2-5h': 2, '5-10h': 3, '>10h': 4}).mean() if 'studytime' in df_uci.columns else 0,
-        'distribuicao_genero': df_uci['sex'].value_counts().to_dict() if 'sex' in df_uci.columns else {},
-        'correlacao_notas': df_uci[['G1', 'G2', 'G3']].corr().to_dict() if all(col in df_uci.columns for col in ['G1', 'G2', 'G3']) else {}
-    }
-    return metricas
+    return calcular_resumo('uci', df_uci)['consolidadas']
 
 def calcular_metricas_oulad(df_oulad):
     """Calcula métricas principais para o dataset OULAD"""
     if df_oulad.empty:
         return {}
-    
-    metricas = {
-        'total_estudantes': df_oulad['id_student'].nunique() if 'id_student' in df_oulad.columns else len(df_oulad),
-        'media_cliques': (
-            df_oulad['clicks'].mean() if 'clicks' in df_oulad.columns 
-            else (df_oulad['sum_click'].mean() if 'sum_click' in df_oulad.columns else 0)
-        ),
-        'taxa_aprovacao': (df_oulad['final_result'] == 'Pass').mean() * 100 if 'final_result' in df_oulad.columns else 0,
-        'distribuicao_genero': df_oulad.groupby('gender', observed=False)['id_student'].nunique().to_dict() if 'gender' in df_oulad.columns and 'id_student' in df_oulad.columns else {},
-        'distribuicao_idade': df_oulad.groupby('age_band', observed=False)['id_student'].nunique().to_dict() if 'age_band' in df_oulad.columns and 'id_student' in df_oulad.columns else {},
-        'atividade_mais_comum': df_oulad['activity_type'].mode().iloc[0] if 'activity_type' in df_oulad.columns else 'N/A',
-        'regiao_mais_comum': df_oulad['region'].mode().iloc[0] if 'region' in df_oulad.columns else 'N/A'
-    }
-    return metricas
+    return calcular_resumo('oulad', df_oulad)['consolidadas']
+
+def gerar_metricas_consolidadas(df_uci=None, df_oulad=None):
+    """
+    Gera métricas consolidadas para o painel analítico
 
-def gerar_metricas_consolidadas(df_uci, df_oulad):
-    """Gera métricas consolidadas para o painel analítico"""
-    metricas_uci = calcular_metricas_uci(df_uci)
-    metricas_oulad = calcular_metricas_oulad(df_oulad)
+    Sem DataFrames, usa os resumos gravados junto dos artefatos (sem carregar os dados).
+    """
+    if df_uci is None:
+        metricas_uci = _resumo_metricas('uci')['consolidadas']
+    else:
+        metricas_uci = calcular_metricas_uci(df_uci)
+    if df_oulad is None:
+        metricas_oulad = _resumo_metricas('oulad')['consolidadas']
+    else:
+        metricas_oulad = calcular_metricas_oulad(df_oulad)
     
     # Métricas consolidadas
     total_estudantes = metricas_uci.get('total_alunos', 0) + metricas_oulad.get('total_estudantes', 0)
@@ -595,652 +554,145 @@ def obter_insights_oulad():
     }
 
 # =============================================================================
-# FUNÇÕES DE TREINAMENTO SOB DEMANDA
+# MODELOS E TAREFAS EM SEGUNDO PLANO
 # =============================================================================
 
-def treinar_modelo_uci_on_demand():
-    """Treina modelo UCI sob demanda com progresso e salvamento automático"""
-    try:
-        from sklearn.ensemble import RandomForestRegressor
-        from sklearn.preprocessing import OneHotEncoder
-        from sklearn.compose import ColumnTransformer
-        from sklearn.pipeline import Pipeline
-        from sklearn.model_selection import train_test_split
-        import pickle
-        
-        # Indicador de progresso (compatível com e sem Streamlit)
-        try:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            use_streamlit = True
-        except:
-            progress_bar = None
-            status_text = None
-            use_streamlit = False
-            print("🔄 Carregando dados UCI...")
-        
-        if use_streamlit:
-            status_text.text("🔄 Carregando dados UCI...")
-            progress_bar.progress(20)
-        else:
-            print("🔄 Carregando dados UCI...")
-        
-        # Carregar dados UCI
-        df_uci = carregar_uci_dados()
-        
-        if use_streamlit:
-            status_text.text("🔄 Preparando dados...")
-            progress_bar.progress(40)
-        else:
-            print("🔄 Preparando dados...")
-        
-        # Preparar dados como na página 1_UCI.py
-        Y = df_uci['G3']
-        X = df_uci.drop('G3', axis=1)
-        
-        # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-        
-        if use_streamlit:
-            status_text.text("🔄 Treinando modelo RandomForest...")
-            progress_bar.progress(60)
-        else:
-            print("🔄 Treinando modelo RandomForest...")
-        
-        # Identificar colunas categóricas
-        categorical_features = X_train.select_dtypes(include=['object']).columns
-        
-        # Criar preprocessor
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-            ],
-            remainder='passthrough'
-        )
-        
-        # Criar pipeline
-        model = Pipeline(steps=[
-            ('preprocessor', preprocessor),
-            ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))
-        ])
-        
-        # Treinar modelo
-        y_train_encoded = y_train.astype(float)
-        model.fit(X_train, y_train_encoded)
-        
-        if use_streamlit:
-            status_text.text("🔄 Salvando modelo...")
-            progress_bar.progress(80)
-        else:
-            print("🔄 Salvando modelo...")
-        
-        # Salvar modelo
-        with open('uci.pkl', 'wb') as f:
-            pickle.dump(model, f)
-        
-        if use_streamlit:
-            status_text.text("✅ Modelo UCI treinado e salvo!")
-            progress_bar.progress(100)
-            
-            # Limpar indicadores
-            progress_bar.empty()
-            status_text.empty()
-        else:
-            print("✅ Modelo UCI treinado e salvo!")
-        
-        return model
-        
-    except Exception as e:
-        try:
-            st.error(f"Erro ao treinar modelo UCI: {e}")
-        except:
-            print(f"❌ Erro ao treinar modelo UCI: {e}")
-        return None
+def _aguardar_tarefa(tipo, nome):
+    """Agenda (ou reaproveita) a tarefa e espera o resultado; usado pelas recargas em segundo plano"""
+    gerenciador = gerenciador_tarefas()
+    return gerenciador.resultado(gerenciador.submeter(tipo, nome))
 
-def treinar_modelo_oulad_on_demand():
-    """Treina modelo OULAD sob demanda com progresso e salvamento automático"""
-    try:
-        from sklearn.ensemble import RandomForestClassifier
-        from sklearn.preprocessing import OneHotEncoder, LabelEncoder
-        from sklearn.compose import ColumnTransformer
-        from sklearn.pipeline import Pipeline
-        from sklearn.model_selection import train_test_split
-        from sklearn.impute import SimpleImputer
-        import pickle
-        import numpy as np
-        
-        # Indicador de progresso (compatível com e sem Streamlit)
-        try:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            use_streamlit = True
-        except:
-            progress_bar = None
-            status_text = None
-            use_streamlit = False
-            print("🔄 Carregando dados OULAD...")
-        
-        if use_streamlit:
-            status_text.text("🔄 Carregando dados OULAD...")
-            progress_bar.progress(10)
-        else:
-            print("🔄 Carregando dados OULAD...")
-        
-        # Carregar dados OULAD
-        df_oulad = carregar_oulad_dados()
-        
-        # Usar amostra para treinamento mais rápido
-        if len(df_oulad) > 50000:
-            df_oulad = df_oulad.sample(n=50000, random_state=42)
-            if use_streamlit:
-                st.info("📊 Usando amostra de 50k registros para treinamento mais rápido")
-            else:
-                print("📊 Usando amostra de 50k registros para treinamento mais rápido")
-        
-        if use_streamlit:
-            status_text.text("🔄 Preparando dados...")
-            progress_bar.progress(30)
-        else:
-            print("🔄 Preparando dados...")
-        
-        # Preparar dados como na página 2_OULAD.py
-        Y = df_oulad['final_result']
-        X = df_oulad.loc[:, df_oulad.columns != 'final_result']
-        
-        # Remover colunas irrelevantes
-        X = X.drop(['id_student', 'id_site', 'id_assessment', 'code_module', 'code_presentation', 'code_module_y', 'code_module_x'], axis=1, errors='ignore')
-        
-        if use_streamlit:
-            status_text.text("🔄 Dividindo dados...")
-            progress_bar.progress(50)
-        else:
-            print("🔄 Dividindo dados...")
-        
-        # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-        
-        if use_streamlit:
-            status_text.text("🔄 Limpando dados de treino...")
-            progress_bar.progress(60)
-        else:
-            print("🔄 Limpando dados de treino...")
-        
-        # Limpar dados de treino
-        nan_rows_train = y_train.isnull()
-        X_train_cleaned = X_train[~nan_rows_train].copy()
-        y_train_cleaned = y_train[~nan_rows_train].copy()
-        
-        
-        if use_streamlit:
-            status_text.text("🔄 Treinando modelo RandomForest...")
-            progress_bar.progress(70)
-        else:
-            print("🔄 Treinando modelo RandomForest...")
-        
-        # Identificar colunas categóricas e numéricas
-        categorical_cols = X_train_cleaned.select_dtypes(include='object').columns
-        numerical_cols = X_train_cleaned.select_dtypes(include=[np.number]).columns
-        
-        # Verificar se há colunas que não são nem categóricas nem numéricas
-        all_cols = set(X_train_cleaned.columns)
-        processed_cols = set(categorical_cols) | set(numerical_cols)
-        remaining_cols = all_cols - processed_cols
-        
-        if len(remaining_cols) > 0:
-            # Adicionar colunas restantes como categóricas
-            categorical_cols = list(categorical_cols) + list(remaining_cols)
-        
-        # Criar preprocessor
-        transformers = []
-        
-        # Adicionar transformador numérico apenas se houver colunas numéricas
-        if len(numerical_cols) > 0:
-            transformers.append(('num', SimpleImputer(strategy='mean'), numerical_cols))
-        
-        # Adicionar transformador categórico apenas se houver colunas categóricas
-        if len(categorical_cols) > 0:
-            transformers.append(('cat', Pipeline(steps=[
-                ('imputer', SimpleImputer(strategy='most_frequent')),
-                ('onehot', OneHotEncoder(handle_unknown='ignore'))]), categorical_cols))
-        
-        preprocessor = ColumnTransformer(
-            transformers=transformers,
-            remainder='passthrough'
-        )
-        
-        # Criar pipeline
-        model = Pipeline(steps=[
-            ('preprocessor', preprocessor),
-            ('classifier', RandomForestClassifier(n_estimators=50, n_jobs=2, max_depth=4, random_state=42))
-        ])
-        
-        # Treinar modelo
-        model.fit(X_train_cleaned, y_train_cleaned)
-        
-        if use_streamlit:
-            status_text.text("🔄 Salvando modelo...")
-            progress_bar.progress(90)
-        else:
-            print("🔄 Salvando modelo...")
-        
-        # Salvar modelo
-        with open('oulad.pkl', 'wb') as f:
-            pickle.dump(model, f)
-        
-        if use_streamlit:
-            status_text.text("✅ Modelo OULAD treinado e salvo!")
-            progress_bar.progress(100)
-            
-            # Limpar indicadores
-            progress_bar.empty()
-            status_text.empty()
-        else:
-            print("✅ Modelo OULAD treinado e salvo!")
-        
-        return model
-        
-    except Exception as e:
-        try:
-            st.error(f"Erro ao treinar modelo OULAD: {e}")
-            import traceback
-            st.error(f"Traceback: {traceback.format_exc()}")
-        except:
-            print(f"❌ Erro ao treinar modelo OULAD: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-        return None
+def _versao_modelo(nome, *_):
+    """Impressão da divisão e do modelo: muda quando o artefato ou os hiperparâmetros mudam"""
+    return impressao_divisao(nome)
+
+@cache_revalidado(versao=_versao_modelo, ttl=7200)
+def _modelo_revalidado(nome):
+    """Modelo registrado para a versão atual (mmap), esperando o treino se ele ainda não existir"""
+    chave = chave_registrada(nome) or _aguardar_tarefa('treino', nome)['chave']
+    return RegistroModelos().carregar(nome, chave)
+
+@cache_revalidado(versao=_versao_modelo, ttl=7200)
+def _anexo_revalidado(nome, tipo, arquivo):
+    """Anexo publicado junto do modelo da versão atual, esperando a tarefa `tipo` se preciso"""
+    chave = chave_registrada(nome)
+    anexo = RegistroModelos().ler_anexo(nome, chave, arquivo) if chave else None
+    if anexo is None:
+        anexo = _aguardar_tarefa(tipo, nome)[tipo]
+    return pd.DataFrame(anexo)
+
+def _avisar_revalidacao(cache, args, rotulo):
+    """Legenda quando o valor exibido é o anterior (recarga em andamento ou que falhou)"""
+    if cache.revalidando(*args):
+        st.caption(f"🔄 {rotulo} sendo atualizado em segundo plano; exibindo a versão anterior")
+    elif cache.erro(*args):
+        st.caption(f"⚠️ Falha ao atualizar {rotulo} ({cache.erro(*args)}); exibindo a versão anterior")
+
+@st.fragment(run_every=2)
+def acompanhar_tarefa(identificador):
+    """Mostra o andamento de uma tarefa em segundo plano sem bloquear o resto da página"""
+    estado = gerenciador_tarefas().estado(identificador)
+    if estado['estado'] == 'erro':
+        st.error(f"❌ Tarefa '{estado['tipo']}' ({estado['nome'].upper()}) falhou: {estado.get('erro')}")
+        return
+    if estado['estado'] == 'concluida':
+        # Rerun da página inteira para quem esperava pelo resultado
+        st.rerun()
+    st.progress(int(estado['percentual']), text=f"🔄 {estado['nome'].upper()}: {estado['etapa']}...")
+
+def _modelo_ou_tarefa(nome, rotulo):
+    """
+    Modelo para a versão atual dos dados, ou None com o treino agendado em segundo plano.
+
+    Depois do primeiro carregamento, uma versão nova (artefato regenerado,
+    hiperparâmetros trocados) é treinada e carregada em segundo plano
+    enquanto o modelo anterior continua sendo servido.
+    """
+    if not _modelo_revalidado.tem_valor(nome) and chave_registrada(nome) is None:
+        gerenciador = gerenciador_tarefas()
+        identificador = gerenciador.submeter('treino', nome)
+        if not gerenciador.concluida(identificador):
+            st.info(f"📦 Modelo {rotulo} não encontrado no registro. Treinando em segundo plano...")
+            acompanhar_tarefa(identificador)
+            return None
+    modelo = _modelo_revalidado(nome)
+    _avisar_revalidacao(_modelo_revalidado, (nome,), f"Modelo {rotulo}")
+    return modelo
 
-@st.cache_resource(ttl=7200)  # Cache por 2 horas
 def carregar_modelo_uci():
-    """Carrega o modelo UCI com cache ou treina sob demanda"""
+    """Carrega o modelo UCI do registro ou agenda o treino em segundo plano (None enquanto treina)"""
     try:
-        # Tentar diferentes caminhos para o arquivo pickle
-        possible_paths = [
-            '../uci.pkl',
-            '../../uci.pkl',
-            Path(__file__).parent.parents[1] / "uci.pkl",
-            'uci.pkl'
-        ]
-        
-        model = None
-        for path in possible_paths:
-            p = Path(path)
-            if p.is_file():
-                try:
-                    with p.open("rb") as f:
-                        model = pickle.load(f)
-                    break
-                except Exception as e:
-                    continue
-        
-        if model is None:
-            st.info("📦 Modelo UCI não encontrado. Treinando modelo automaticamente...")
-            return treinar_modelo_uci_on_demand()
-        
-        return model
+        return _modelo_ou_tarefa('uci', 'UCI')
     except Exception as e:
         st.warning(f"Erro ao carregar modelo UCI: {e}")
         return None
 
-@st.cache_resource(ttl=7200)  # Cache por 2 horas
 def carregar_modelo_oulad():
-    """Carrega o modelo OULAD com cache ou treina sob demanda"""
+    """Carrega o modelo OULAD do registro ou agenda o treino em segundo plano (None enquanto treina)"""
     try:
-        # Tentar diferentes caminhos para o arquivo pickle
-        possible_paths = [
-            '../oulad.pkl',
-            '../../oulad.pkl',
-            Path(__file__).parent.parents[1] / "oulad.pkl",
-            'oulad.pkl'
-        ]
-        
-        model = None
-        for path in possible_paths:
-            p = Path(path)
-            if p.is_file():
-                try:
-                    with p.open("rb") as f:
-                        model = pickle.load(f)
-                    break
-                except Exception as e:
-                    continue
-        
-        if model is None:
-            st.info("📦 Modelo OULAD não encontrado. Treinando modelo automaticamente (pode levar alguns minutos)...")
-            return treinar_modelo_oulad_on_demand()
-        
-        return model
+        return _modelo_ou_tarefa('oulad', 'OULAD')
     except Exception as e:
         st.warning(f"Erro ao carregar modelo OULAD: {e}")
         return None
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora (UCI é menor)
+def _anexo_ou_tarefa(nome, tipo, arquivo, aviso):
+    """Anexo publicado junto do modelo (o anterior enquanto o novo é calculado), ou DataFrame vazio com a tarefa agendada"""
+    if not _anexo_revalidado.tem_valor(nome, tipo, arquivo):
+        chave = chave_registrada(nome)
+        if chave is None or RegistroModelos().ler_anexo(nome, chave, arquivo) is None:
+            gerenciador = gerenciador_tarefas()
+            identificador = gerenciador.submeter(tipo, nome)
+            if not gerenciador.concluida(identificador):
+                st.info(aviso)
+                acompanhar_tarefa(identificador)
+                return pd.DataFrame()
+    anexo = _anexo_revalidado(nome, tipo, arquivo)
+    _avisar_revalidacao(_anexo_revalidado, (nome, tipo, arquivo), f"Resultado '{tipo}' {nome.upper()}")
+    # Cópia: os gráficos acrescentam colunas e o valor em cache é compartilhado entre sessões
+    return anexo.copy()
+
+def _importancia_ou_tarefa(nome, rotulo):
+    """Importância publicada junto do modelo, ou DataFrame vazio com o cálculo agendado em segundo plano"""
+    return _anexo_ou_tarefa(nome, 'importancia', ARQUIVO_IMPORTANCIA,
+                            f"📊 Calculando a importância das features {rotulo} em segundo plano...")
+
+def _atribuicao_ou_tarefa(nome, rotulo):
+    """
+    Média |contribuição| por feature nos caminhos das árvores (uma passada pela floresta).
+
+    Motores sem árvores de decisão (ex.: 'hgb') não têm atribuição por caminho:
+    nesse caso usa a importância por permutação.
+    """
+    if motor_modelo(nome) != 'floresta':
+        return _importancia_ou_tarefa(nome, rotulo)
+    return _anexo_ou_tarefa(nome, 'atribuicao', ARQUIVO_ATRIBUICAO,
+                            f"🌳 Calculando as contribuições das features {rotulo} em segundo plano...")
+
 def calcular_feature_importance_uci():
-    """Calcula feature importance real para UCI com otimizações"""
+    """Feature importance real para UCI, calculada em segundo plano e publicada no registro de modelos"""
     try:
-        from sklearn.inspection import permutation_importance
-        from sklearn.model_selection import train_test_split
-        
-        # Indicador de progresso
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.text("🔄 Carregando dados UCI...")
-        progress_bar.progress(20)
-        
-        # Carregar dados UCI
-        df_uci = carregar_uci_dados()
-        
-        status_text.text("🔄 Preparando dados...")
-        progress_bar.progress(40)
-        
-        # Preparar dados como nas páginas individuais
-        Y = df_uci['G3']
-        X = df_uci.drop('G3', axis=1)
-        
-        # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-        
-        status_text.text("🔄 Carregando modelo...")
-        progress_bar.progress(60)
-        
-        # Carregar modelo treinado
-        model = carregar_modelo_uci()
-        if model is None:
-            progress_bar.empty()
-            status_text.empty()
-            return pd.DataFrame()
-        
-        # Garantir que todas as colunas tenham tipos corretos
-        # Converter colunas não numéricas para object (categóricas)
-        for col in X_test.columns:
-            if X_test[col].dtype not in [np.number, 'object']:
-                # Tentar converter para numérico primeiro
-                try:
-                    X_test[col] = pd.to_numeric(X_test[col], errors='coerce')
-                    # Se ainda não for numérico, converter para string/object
-                    if X_test[col].dtype not in [np.number]:
-                        X_test[col] = X_test[col].astype(str).astype('object')
-                except:
-                    X_test[col] = X_test[col].astype(str).astype('object')
-        
-        # Garantir que colunas numéricas não tenham valores infinitos
-        numeric_cols = X_test.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            X_test[col] = pd.to_numeric(X_test[col], errors='coerce').fillna(0)
-            X_test[col] = X_test[col].replace([np.inf, -np.inf], 0)
-        
-        # Garantir que colunas categóricas sejam do tipo object
-        categorical_cols = X_test.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            X_test[col] = X_test[col].astype(str).replace('nan', np.nan).astype('object')
-        
-        status_text.text("🔄 Calculando feature importance...")
-        progress_bar.progress(80)
-        
-        # OTIMIZAÇÃO: Usar todos os cores disponíveis
-        try:
-            result = permutation_importance(
-                model, X_test, y_test, 
-                n_repeats=10,  # Manter 10 para UCI (é pequeno)
-                random_state=42, 
-                n_jobs=-1  # Usar todos os cores disponíveis
-            )
-            sorted_idx = result.importances_mean.argsort()
-            
-            status_text.text("✅ Finalizando...")
-            progress_bar.progress(95)
-            
-            # Criar DataFrame com resultados reais
-            features = X_test.columns[sorted_idx]
-            importance = result.importances_mean[sorted_idx]
-        except Exception as e:
-            # Se permutation_importance falhar, retornar DataFrame vazio
-            st.warning(f"Erro ao calcular feature importance: {e}")
-            progress_bar.empty()
-            status_text.empty()
-            return pd.DataFrame()
-        
-        df_result = pd.DataFrame({
-            'feature': features,
-            'importance': importance
-        }).sort_values('importance', ascending=True)
-        
-        # Limpar indicadores
-        progress_bar.empty()
-        status_text.empty()
-        
-        return df_result
-        
+        return _importancia_ou_tarefa('uci', 'UCI')
     except Exception as e:
         st.warning(f"Erro ao calcular feature importance UCI: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=7200)  # Cache por 2 horas (OULAD é pesado)
 def calcular_feature_importance_oulad():
-    """Calcula feature importance real para OULAD com otimizações"""
+    """Feature importance real para OULAD, calculada em segundo plano e publicada no registro de modelos"""
     try:
-        from sklearn.inspection import permutation_importance
-        from sklearn.model_selection import train_test_split
-        
-        # Indicador de progresso
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.text("🔄 Carregando dados OULAD...")
-        progress_bar.progress(10)
-        
-        # Carregar dados OULAD
-        df_oulad = carregar_oulad_dados()
-        
-        # AMOSTRAGEM: Usar apenas 50k registros para OULAD (muito mais rápido)
-        if len(df_oulad) > 50000:
-            df_oulad = df_oulad.sample(n=50000, random_state=42)
-            st.info("📊 Usando amostra de 50k registros para análise mais rápida")
-        
-        status_text.text("🔄 Preparando dados...")
-        progress_bar.progress(30)
-        
-        # Preparar dados como nas páginas individuais
-        Y = df_oulad['final_result']
-        X = df_oulad.loc[:, df_oulad.columns != 'final_result']
-        
-        # Remover colunas irrelevantes
-        X = X.drop(['id_student', 'id_site', 'id_assessment', 'code_module', 'code_presentation', 'code_module_y', 'code_module_x'], axis=1, errors='ignore')
-        
-        status_text.text("🔄 Carregando modelo...")
-        progress_bar.progress(40)
-        
-        # Carregar modelo treinado primeiro para saber quais colunas ele espera
-        model = carregar_modelo_oulad()
-        if model is None:
-            progress_bar.empty()
-            status_text.empty()
-            return pd.DataFrame()
-        
-        status_text.text("🔄 Dividindo dados...")
-        progress_bar.progress(50)
-        
-        # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-        
-        status_text.text("🔄 Limpando dados de teste...")
-        progress_bar.progress(70)
-        
-        # Limpar dados de teste
-        nan_rows_test = y_test.isnull()
-        X_test_cleaned = X_test[~nan_rows_test].copy()
-        y_test_cleaned = y_test[~nan_rows_test].copy()
-        
-        # Garantir que todas as colunas tenham tipos corretos
-        # Primeiro, identificar colunas numéricas e categóricas
-        numeric_cols = X_test_cleaned.select_dtypes(include=[np.number]).columns
-        categorical_cols = X_test_cleaned.select_dtypes(include=['object', 'category']).columns
-        
-        # Garantir que colunas numéricas não tenham valores infinitos ou NaN problemáticos
-        for col in numeric_cols:
-            X_test_cleaned[col] = pd.to_numeric(X_test_cleaned[col], errors='coerce').fillna(0)
-            X_test_cleaned[col] = X_test_cleaned[col].replace([np.inf, -np.inf], 0)
-        
-        # Garantir que TODAS as colunas categóricas sejam explicitamente convertidas para string
-        # Isso é crítico para evitar erros de conversão
-        # Especialmente importante para colunas como 'activity_type' que contêm valores como 'homepage'
-        for col in categorical_cols:
-            # Converter todos os valores para string explicitamente
-            X_test_cleaned[col] = X_test_cleaned[col].apply(
-                lambda x: str(x) if pd.notna(x) and x != '' else 'missing'
-            )
-            # Garantir que seja do tipo object (categórica)
-            X_test_cleaned[col] = X_test_cleaned[col].astype('object')
-        
-        # Garantir que colunas conhecidas como categóricas sejam explicitamente tratadas
-        known_categorical_cols = ['activity_type', 'gender', 'region', 'highest_education', 
-                                  'imd_band', 'age_band', 'disability', 'final_result',
-                                  'assessment_type', 'code_module', 'code_presentation']
-        for col in known_categorical_cols:
-            if col in X_test_cleaned.columns:
-                # Forçar conversão para string e depois object
-                X_test_cleaned[col] = X_test_cleaned[col].apply(
-                    lambda x: str(x) if pd.notna(x) and x != '' else 'missing'
-                ).astype('object')
-        
-        # Tratar colunas que não são nem numéricas nem categóricas
-        other_cols = set(X_test_cleaned.columns) - set(numeric_cols) - set(categorical_cols)
-        for col in other_cols:
-            # Tentar converter para numérico primeiro
-            try:
-                X_test_cleaned[col] = pd.to_numeric(X_test_cleaned[col], errors='coerce')
-                if X_test_cleaned[col].isna().all():
-                    # Se todas as conversões falharam, tratar como categórica
-                    X_test_cleaned[col] = X_test_cleaned[col].astype(str).astype('object')
-                else:
-                    # Preencher NaN com 0
-                    X_test_cleaned[col] = X_test_cleaned[col].fillna(0)
-            except:
-                # Se falhar, tratar como categórica
-                X_test_cleaned[col] = X_test_cleaned[col].astype(str).astype('object')
-        
-        status_text.text("🔄 Testando modelo com dados de exemplo...")
-        progress_bar.progress(80)
-        
-        # Testar se o modelo consegue processar os dados antes de calcular feature importance
-        # Identificar e remover colunas problemáticas
-        problematic_cols = []
-        test_sample = X_test_cleaned.head(1).copy()
-        
-        for col in test_sample.columns:
-            try:
-                # Tentar fazer predição apenas com esta coluna para identificar problemas
-                test_df = pd.DataFrame({col: test_sample[col]})
-                # Não vamos testar coluna por coluna, mas sim identificar tipos problemáticos
-                if test_sample[col].dtype == 'object':
-                    # Verificar se há valores que não são strings válidas
-                    non_string_values = test_sample[col].apply(lambda x: not isinstance(x, (str, type(None))))
-                    if non_string_values.any():
-                        problematic_cols.append(col)
-            except:
-                problematic_cols.append(col)
-        
-        # Remover colunas problemáticas se houver
-        if problematic_cols:
-            st.warning(f"⚠️ Removendo colunas problemáticas: {problematic_cols}")
-            X_test_cleaned = X_test_cleaned.drop(columns=problematic_cols, errors='ignore')
-        
-        # Testar se o modelo consegue processar os dados
-        try:
-            # Tentar fazer uma predição de exemplo para verificar se os dados estão corretos
-            _ = model.predict(X_test_cleaned.head(1))
-        except Exception as test_error:
-            st.warning(f"⚠️ Erro ao testar modelo com dados: {test_error}")
-            st.info("💡 Tentando ajustar tipos de dados...")
-            
-            # Tentar converter todas as colunas categóricas explicitamente
-            for col in X_test_cleaned.columns:
-                if X_test_cleaned[col].dtype == 'object':
-                    # Garantir que todos os valores sejam strings válidas
-                    X_test_cleaned[col] = X_test_cleaned[col].apply(lambda x: str(x) if pd.notna(x) else 'missing')
-                    X_test_cleaned[col] = X_test_cleaned[col].astype('object')
-            
-            # Tentar novamente
-            try:
-                _ = model.predict(X_test_cleaned.head(1))
-            except Exception as test_error2:
-                # Se ainda falhar, tentar identificar a coluna específica do erro
-                error_msg = str(test_error2)
-                if "'homepage'" in error_msg or "homepage" in error_msg:
-                    # Remover coluna 'homepage' ou similar se existir
-                    homepage_cols = [col for col in X_test_cleaned.columns if 'homepage' in col.lower() or 'activity_type' in col.lower()]
-                    if homepage_cols:
-                        st.warning(f"⚠️ Removendo colunas relacionadas a 'homepage': {homepage_cols}")
-                        X_test_cleaned = X_test_cleaned.drop(columns=homepage_cols, errors='ignore')
-                        try:
-                            _ = model.predict(X_test_cleaned.head(1))
-                        except:
-                            st.error(f"❌ Não foi possível processar os dados mesmo após remover colunas problemáticas: {test_error2}")
-                            progress_bar.empty()
-                            status_text.empty()
-                            return pd.DataFrame()
-                    else:
-                        st.error(f"❌ Não foi possível processar os dados mesmo após ajustes: {test_error2}")
-                        progress_bar.empty()
-                        status_text.empty()
-                        return pd.DataFrame()
-                else:
-                    st.error(f"❌ Não foi possível processar os dados mesmo após ajustes: {test_error2}")
-                    progress_bar.empty()
-                    status_text.empty()
-                    return pd.DataFrame()
-        
-        status_text.text("🔄 Calculando feature importance...")
-        progress_bar.progress(85)
-        
-        # OTIMIZAÇÃO: Menos repetições e mais jobs
-        # O modelo Pipeline fará o preprocessing automaticamente
-        try:
-            # Verificar se o modelo é um Pipeline antes de chamar permutation_importance
-            if hasattr(model, 'named_steps') and 'preprocessor' in model.named_steps:
-                # O modelo é um Pipeline, pode passar dados brutos
-                result = permutation_importance(
-                    model, X_test_cleaned, y_test_cleaned, 
-                    n_repeats=5,  # Reduzido de 10 para 5
-                    random_state=42, 
-                    n_jobs=-1  # Usar todos os cores disponíveis
-                )
-            else:
-                # Modelo não é Pipeline, precisa pré-processar manualmente
-                raise ValueError("Modelo não é um Pipeline com preprocessor")
-            sorted_idx = result.importances_mean.argsort()
-            
-            status_text.text("✅ Finalizando...")
-            progress_bar.progress(95)
-            
-            # Criar DataFrame com resultados reais
-            # Nota: após o preprocessing, as features podem ter mudado (OneHotEncoder cria múltiplas colunas)
-            # Vamos usar os nomes das colunas originais
-            features = X_test_cleaned.columns[sorted_idx]
-            importance = result.importances_mean[sorted_idx]
-        except Exception as e:
-            # Se permutation_importance falhar, retornar DataFrame vazio
-            st.warning(f"Erro ao calcular feature importance: {e}")
-            progress_bar.empty()
-            status_text.empty()
-            return pd.DataFrame()
-        
-        df_result = pd.DataFrame({
-            'feature': features,
-            'importance': importance
-        }).sort_values('importance', ascending=True)
-        
-        # Limpar indicadores
-        progress_bar.empty()
-        status_text.empty()
-        
-        return df_result
-        
+        return _importancia_ou_tarefa('oulad', 'OULAD')
     except Exception as e:
         st.warning(f"Erro ao calcular feature importance OULAD: {e}")
         return pd.DataFrame()
 
+def _intervalos_importancia(df_importance):
+    """Barras de erro (xerr) a partir dos intervalos de confiança, quando a importância os traz"""
+    if not {'ic_inferior', 'ic_superior'} <= set(df_importance.columns):
+        return None
+    return np.vstack([
+        df_importance['importance'] - df_importance['ic_inferior'],
+        df_importance['ic_superior'] - df_importance['importance'],
+    ])
+
 def criar_grafico_feature_importance_uci():
     """Cria gráfico de feature importance para UCI"""
     df_importance = calcular_feature_importance_uci()
@@ -1248,7 +700,8 @@ def criar_grafico_feature_importance_uci():
         return None
     
     fig, ax = plt.subplots(figsize=(10, 8))
-    bars = ax.barh(df_importance['feature'], df_importance['importance'], color='skyblue')
+    bars = ax.barh(df_importance['feature'], df_importance['importance'], color='skyblue',
+                   xerr=_intervalos_importancia(df_importance), capsize=3)
     ax.set_title('Importância das Features - Dataset UCI', fontsize=14, fontweight='bold')
     ax.set_xlabel('Importância')
     ax.set_ylabel('Features')
@@ -1292,7 +745,8 @@ def criar_grafico_feature_importance_oulad():
     df_importance['feature_pt'] = df_importance['feature'].map(feature_translation).fillna(df_importance['feature'])
     
     fig, ax = plt.subplots(figsize=(10, 8))
-    bars = ax.barh(df_importance['feature_pt'], df_importance['importance'], color='lightcoral')
+    bars = ax.barh(df_importance['feature_pt'], df_importance['importance'], color='lightcoral',
+                   xerr=_intervalos_importancia(df_importance), capsize=3)
     ax.set_title('Importância das Features - Dataset OULAD', fontsize=14, fontweight='bold')
     ax.set_xlabel('Importância')
     ax.set_ylabel('Variáveis')
@@ -1450,14 +904,14 @@ def traduzir_nome_feature(feature: str, dataset_origem: str) -> str:
     return traducoes.get(feature, feature.lower().replace('_', '_'))
 
 def gerar_template_unificado() -> pd.DataFrame:
-    """Gera template unificado com TOP 2 features de UCI e OULAD"""
+    """Gera template unificado com TOP 2 features de UCI e OULAD (contribuições nos caminhos das árvores)"""
     try:
         # Get TOP 2 features from UCI (não 3!)
-        df_importance_uci = calcular_feature_importance_uci()
+        df_importance_uci = _atribuicao_ou_tarefa('uci', 'UCI')
         top_features_uci = df_importance_uci.nlargest(2, 'importance')['feature'].tolist() if not df_importance_uci.empty else []
         
         # Get TOP features from OULAD, excluding temporal features
-        df_importance_oulad = calcular_feature_importance_oulad()
+        df_importance_oulad = _atribuicao_ou_tarefa('oulad', 'OULAD')
         if not df_importance_oulad.empty:
             # Exclude temporal features that don't make sense for regular school periods
             temporal_features = ['date_registration', 'date_unregistration']
@@ -1642,7 +1096,6 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
         from sklearn.pipeline import Pipeline
         from sklearn.model_selection import train_test_split
         from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, accuracy_score, classification_report
-        from sklearn.inspection import permutation_importance
         import numpy as np
         
         # Preparar dados - remover nome_aluno se existir
@@ -1658,7 +1111,7 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
         # Preparar preprocessamento
-        categorical_features = X_train.select_dtypes(include=['object']).columns
+        categorical_features = X_train.select_dtypes(include=['object', 'category']).columns
         numerical_features = X_train.select_dtypes(include=[np.number]).columns
         
         # Criar preprocessor
@@ -1694,8 +1147,8 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
         # Treinar modelo
         model.fit(X_train, y_train_encoded)
         
-        # Fazer predições
-        predictions = model.predict(X_test)
+        # Fazer predições (floresta compilada: mesmas previsões, sem o custo fixo por árvore)
+        predictions = compilar_modelo(model).predict(X_test)
         
         # Calcular métricas
         if is_regression:
@@ -1718,16 +1171,16 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
         
         # Calcular feature importance
         try:
-            # Usar permutation importance
-            result = permutation_importance(
-                model, X_test, y_test_encoded, 
-                n_repeats=5, random_state=42, n_jobs=-1
+            # Permutation importance adaptativa: para cada feature assim que o intervalo
+            # de confiança decide a sua posição no ranking (no máximo 10 s)
+            result = importancia_permutacao_adaptativa(
+                model, X_test, y_test_encoded,
+                max_repeticoes=10, tempo_limite=10.0, random_state=42
             )
             
-            feature_importance = pd.DataFrame({
-                'feature': X_test.columns,
-                'importance': result.importances_mean
-            }).sort_values('importance', ascending=False)
+            feature_importance = importancia_por_coluna(result, list(X_test.columns)).sort_values(
+                'importance', ascending=False
+            )
         except:
             # Fallback para feature_importances_ do modelo
             if hasattr(model.named_steps[list(model.named_steps.keys())[-1]], 'feature_importances_'):
@@ -1738,6 +1191,16 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
             else:
                 feature_importance = pd.DataFrame()
         
+        # Explicação individual: contribuição de cada feature na previsão de cada aluno,
+        # lida dos caminhos nas árvores da floresta (uma passada, todos os alunos de uma vez)
+        try:
+            explicacoes = explicacao_por_amostra(contribuicoes_caminho(model, X))
+            if not is_regression and not pd.api.types.is_numeric_dtype(y_train):
+                explicacoes['classe'] = pd.Series(le.inverse_transform(explicacoes['classe']), index=X.index)
+        except Exception as e:
+            print(f"⚠️ Explicações individuais indisponíveis: {e}")
+            explicacoes = {}
+        
         # Estatísticas descritivas
         stats = {
             'shape': df_usuario.shape,
@@ -1751,6 +1214,7 @@ def realizar_eda_automatica(df_usuario: pd.DataFrame) -> dict:
             'model': model,
             'metrics': metrics,
             'feature_importance': feature_importance,
+            'explicacoes': explicacoes,
             'predictions': predictions,
             'y_test': y_test_encoded,
             'stats': stats,
@@ -1943,6 +1407,40 @@ def criar_grafico_radar_aluno(df_usuario: pd.DataFrame, nome_aluno: str = None)
         st.error(f"Erro ao criar gráfico radar: {e}")
         return {}
 
+def criar_grafico_contribuicoes_aluno(explicacoes: dict, df_usuario: pd.DataFrame, nome_aluno: str):
+    """Gráfico de barras com a contribuição de cada feature na previsão do modelo para um aluno"""
+    try:
+        linhas = df_usuario.index[df_usuario['nome_aluno'] == nome_aluno]
+        if not explicacoes or len(linhas) == 0:
+            return None
+        indice = linhas[0]
+        contribuicoes = explicacoes['contribuicoes'].loc[indice]
+        contribuicoes = contribuicoes.reindex(contribuicoes.abs().sort_values().index)
+        
+        fig, ax = plt.subplots(figsize=(10, max(3, 0.6 * len(contribuicoes))))
+        cores = ['#2E86AB' if v >= 0 else '#A23B72' for v in contribuicoes]
+        ax.barh([c.replace('_', ' ').title() for c in contribuicoes.index], contribuicoes, color=cores)
+        ax.axvline(0, color='gray', linewidth=1)
+        
+        base, previsao = explicacoes['base'].loc[indice], explicacoes['previsao'].loc[indice]
+        if explicacoes['classe'] is None:
+            subtitulo = f"Média do modelo: {base:.2f} → previsão: {previsao:.2f}"
+        else:
+            classe = explicacoes['classe'].loc[indice]
+            subtitulo = f"Probabilidade de '{classe}': {base:.0%} na média → {previsao:.0%} para o aluno"
+        ax.set_title(f'Por que o modelo prevê isso para {nome_aluno}?\n{subtitulo}', fontsize=13, fontweight='bold')
+        ax.set_xlabel('Contribuição para a previsão')
+        
+        for i, valor in enumerate(contribuicoes):
+            ax.text(valor, i, f' {valor:+.2f} ', va='center', ha='left' if valor >= 0 else 'right', fontsize=10)
+        
+        plt.tight_layout()
+        return fig
+        
+    except Exception as e:
+        st.warning(f"Erro ao criar gráfico de contribuições: {e}")
+        return None
+
 def exibir_resultados_com_ia(resultados: dict, df_usuario: pd.DataFrame):
     """Exibe resultados com interpretação via OpenAI"""
     
@@ -2266,6 +1764,16 @@ def exibir_resultados_com_ia(resultados: dict, df_usuario: pd.DataFrame):
                 st.info(f"💡 **Interpretação**: {interpretacao}")
         else:
             st.warning("Não foi possível criar o gráfico radar para este aluno.")
+        
+        # Explicação individual do modelo treinado sobre os dados da turma
+        explicacoes = resultados.get('eda', {}).get('explicacoes', {})
+        grafico_contribuicoes = criar_grafico_contribuicoes_aluno(explicacoes, df_usuario, nome_selecionado)
+        if grafico_contribuicoes is not None:
+            st.markdown("#### 🌳 Explicação da Previsão do Modelo")
+            st.pyplot(grafico_contribuicoes)
+            st.info("""💡 **Interpretação**: Cada barra mostra quanto a feature empurrou a previsão deste aluno
+            para cima (azul) ou para baixo (rosa) em relação à média do modelo. As contribuições
+            vêm dos caminhos percorridos nas árvores da floresta e somam exatamente a previsão.""")
     else:
         st.warning("Coluna 'nome_aluno' não encontrada nos dados.")
     
@@ -4,6 +4,38 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+try:
+    from .contagem_aproximada import EsbocosDistintos, motor_distintos
+    from .cubo_estudantes import CuboEstudantes
+except ImportError:
+    # Fallback para quando executado com webapp/src no sys.path
+    from contagem_aproximada import EsbocosDistintos, motor_distintos
+    from cubo_estudantes import CuboEstudantes
+
+def _tem_colunas(dados, *colunas):
+    """Indica se o DataFrame (ou o cubo/os esboços de estudantes) tem linhas e todas as colunas indicadas"""
+    if isinstance(dados, CuboEstudantes):
+        return len(dados.base) > 0 and all(c in dados.dimensoes or c == 'id_student' for c in colunas)
+    if isinstance(dados, EsbocosDistintos):
+        return dados.linhas_processadas > 0 and all(c in dados.dimensoes or c == dados.coluna for c in colunas)
+    return not dados.empty and all(c in dados.columns for c in colunas)
+
+def _estudantes_por(dados, dimensoes):
+    """
+    Estudantes únicos por combinação de dimensões: fatia do cubo, estimativa
+    dos esboços HyperLogLog (uma dimensão) ou, com um DataFrame, groupby nos
+    dados brutos; com SIDA_MOTOR_DISTINTOS=hll, quebras de uma dimensão
+    sobre um DataFrame também são estimadas por esboços, bloco a bloco.
+    """
+    if isinstance(dados, CuboEstudantes):
+        return dados.estudantes(dimensoes)
+    if len(dimensoes) == 1 and not isinstance(dados, EsbocosDistintos) and motor_distintos() == 'hll':
+        dados = EsbocosDistintos.construir(dados, dimensoes)
+    if isinstance(dados, EsbocosDistintos):
+        if len(dimensoes) != 1:
+            raise ValueError(f"Esboços de distintos contam uma dimensão por vez, não {list(dimensoes)}")
+        return dados.estudantes(dimensoes[0])
+    return dados.groupby(dimensoes, observed=True)['id_student'].nunique()
 
 def traduzir_tipo_atividade(activity_type):
     """Traduz tipos de atividades do OULAD de inglês para português"""
@@ -66,16 +98,15 @@ def criar_grafico_desempenho_por_genero_uci(df_uci):
     return fig
 
 def criar_grafico_desempenho_por_genero_oulad(df_oulad):
-    """Cria gráfico de desempenho por gênero para OULAD"""
-    if df_oulad.empty or 'gender' not in df_oulad.columns or 'final_result' not in df_oulad.columns:
+    """Cria gráfico de desempenho por gênero para OULAD (aceita o DataFrame ou o cubo de estudantes)"""
+    if not _tem_colunas(df_oulad, 'gender', 'final_result'):
         return None
     
     fig, ax = plt.subplots(figsize=(8, 6))
     # Contar estudantes únicos por gênero e resultado final
-    if 'id_student' in df_oulad.columns:
-        genero_resultado = df_oulad.groupby(['gender', 'final_result'])['id_student'].nunique().reset_index()
+    if _tem_colunas(df_oulad, 'id_student'):
+        genero_resultado = _estudantes_por(df_oulad, ['gender', 'final_result']).reset_index()
         genero_resultado.columns = ['gender', 'final_result', 'count']
-        import seaborn as sns
         sns.barplot(data=genero_resultado, x='gender', y='count', hue='final_result', ax=ax)
         ax.set_ylabel("Número de Estudantes Únicos")
     else:
@@ -107,17 +138,20 @@ def criar_grafico_correlacao_uci(df_uci):
     return fig
 
 def criar_grafico_atividades_oulad(df_oulad):
-    """Cria gráfico de distribuição de atividades para OULAD"""
-    if df_oulad.empty or 'activity_type' not in df_oulad.columns:
+    """Cria gráfico de distribuição de atividades para OULAD (aceita o DataFrame ou o cubo de estudantes)"""
+    if not _tem_colunas(df_oulad, 'activity_type'):
         return None
     
-    # Criar cópia do dataframe para traduzir os tipos de atividades
-    df_traduzido = df_oulad.copy()
-    df_traduzido['activity_type'] = df_traduzido['activity_type'].apply(traduzir_tipo_atividade)
+    # Registros por tipo de atividade (no cubo, a soma de linhas já agregada)
+    if isinstance(df_oulad, CuboEstudantes):
+        contagens = df_oulad.agregados(['activity_type'])['linhas']
+    else:
+        contagens = df_oulad['activity_type'].value_counts()
+    contagens = contagens.sort_values(ascending=False)
+    atividades = [traduzir_tipo_atividade(atividade) for atividade in contagens.index]
     
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.countplot(data=df_traduzido, x='activity_type', 
-                  order=df_traduzido['activity_type'].value_counts().index, ax=ax)
+    sns.barplot(x=atividades, y=contagens.to_numpy(), order=atividades, ax=ax)
     ax.set_title("Distribuição de Atividades por Tipo (OULAD)")
     ax.set_xlabel("Tipo de Atividade")
     ax.set_ylabel("Contagem")
@@ -155,14 +189,14 @@ def criar_grafico_tempo_estudo_vs_desempenho(df_uci):
     return fig
 
 def criar_grafico_distribuicao_idade_oulad(df_oulad):
-    """Cria gráfico de distribuição de idade para OULAD"""
-    if df_oulad.empty or 'age_band' not in df_oulad.columns:
+    """Cria gráfico de distribuição de idade para OULAD (aceita o DataFrame, o cubo ou os esboços de estudantes)"""
+    if not _tem_colunas(df_oulad, 'age_band'):
         return None
     
     fig, ax = plt.subplots(figsize=(10, 6))
     # Contar estudantes únicos por faixa etária
-    if 'id_student' in df_oulad.columns:
-        idade_counts = df_oulad.groupby('age_band')['id_student'].nunique()
+    if _tem_colunas(df_oulad, 'id_student'):
+        idade_counts = _estudantes_por(df_oulad, ['age_band'])
         sns.barplot(x=idade_counts.index, y=idade_counts.values, ax=ax)
         ax.set_ylabel("Número de Estudantes Únicos")
     else:
@@ -173,14 +207,14 @@ def criar_grafico_distribuicao_idade_oulad(df_oulad):
     return fig
 
 def criar_grafico_resultado_final_oulad(df_oulad):
-    """Cria gráfico de distribuição de resultado final para OULAD"""
-    if df_oulad.empty or 'final_result' not in df_oulad.columns:
+    """Cria gráfico de distribuição de resultado final para OULAD (aceita o DataFrame, o cubo ou os esboços de estudantes)"""
+    if not _tem_colunas(df_oulad, 'final_result'):
         return None
     
     fig, ax = plt.subplots(figsize=(8, 6))
     # Contar estudantes únicos por resultado final
-    if 'id_student' in df_oulad.columns:
-        resultado_counts = df_oulad.groupby('final_result')['id_student'].nunique().sort_values(ascending=False)
+    if _tem_colunas(df_oulad, 'id_student'):
+        resultado_counts = _estudantes_por(df_oulad, ['final_result']).sort_values(ascending=False)
         sns.barplot(x=resultado_counts.index, y=resultado_counts.values, ax=ax)
         ax.set_ylabel("Número de Estudantes Únicos")
     else:
@@ -345,20 +379,21 @@ def criar_grafico_sugerido_uci():
 def criar_grafico_sugerido_oulad():
     """Cria gráfico sugerido para OULAD baseado em dados reais"""
     try:
-        from .utilidades import carregar_dados_oulad_cached
-        df_oulad = carregar_dados_oulad_cached()
+        from .utilidades import obter_cubo_oulad
+        # Contagens por fatias do cubo de estudantes, sem varrer o DataFrame completo
+        cubo = obter_cubo_oulad()
         
-        if df_oulad.empty:
+        if not _tem_colunas(cubo):
             return None
+        total_estudantes = cubo.estudantes()
         
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         
         # 1. Distribuição de resultados finais
-        if 'final_result' in df_oulad.columns and 'id_student' in df_oulad.columns:
+        if _tem_colunas(cubo, 'final_result'):
             # Contar estudantes únicos por resultado final
-            resultados_counts = df_oulad.groupby('final_result')['id_student'].nunique()
+            resultados_counts = cubo.estudantes(['final_result'])
             resultados = resultados_counts.index.tolist()
-            total_estudantes = df_oulad['id_student'].nunique()
             percentuais = (resultados_counts / total_estudantes * 100).tolist()
             cores = ['lightgreen', 'gold', 'lightcoral', 'lightgray']
             
@@ -369,11 +404,10 @@ def criar_grafico_sugerido_oulad():
             axes[0, 0].set_title('Distribuição de Resultados Finais (OULAD)')
         
         # 2. Distribuição por gênero
-        if 'gender' in df_oulad.columns and 'id_student' in df_oulad.columns:
+        if _tem_colunas(cubo, 'gender'):
             # Contar estudantes únicos por gênero
-            genero_counts = df_oulad.groupby('gender')['id_student'].nunique()
+            genero_counts = cubo.estudantes(['gender'])
             generos = genero_counts.index.tolist()
-            total_estudantes = df_oulad['id_student'].nunique()
             percentuais_gen = (genero_counts / total_estudantes * 100).tolist()
             cores_gen = ['lightblue', 'pink']
             
@@ -388,8 +422,8 @@ def criar_grafico_sugerido_oulad():
             axes[0, 1].set_title('Distribuição por Gênero')
         
         # 3. Distribuição de atividades
-        if 'activity_type' in df_oulad.columns:
-            atividades_counts = df_oulad['activity_type'].value_counts().head(6)  # Top 6 atividades
+        if _tem_colunas(cubo, 'activity_type'):
+            atividades_counts = cubo.agregados(['activity_type'])['linhas'].sort_values(ascending=False).head(6)  # Top 6 atividades
             # Traduzir os tipos de atividades
             atividades = [traduzir_tipo_atividade(atividade) for atividade in atividades_counts.index.tolist()]
             cliques = atividades_counts.values.tolist()
@@ -402,11 +436,10 @@ def criar_grafico_sugerido_oulad():
             axes[1, 0].set_title('Distribuição de Atividades por Tipo')
         
         # 4. Distribuição por faixa etária
-        if 'age_band' in df_oulad.columns and 'id_student' in df_oulad.columns:
+        if _tem_colunas(cubo, 'age_band'):
             # Contar estudantes únicos por faixa etária
-            idade_counts = df_oulad.groupby('age_band')['id_student'].nunique()
+            idade_counts = cubo.estudantes(['age_band'])
             faixas_etarias = idade_counts.index.tolist()
-            total_estudantes = df_oulad['id_student'].nunique()
             percentuais_idade = (idade_counts / total_estudantes * 100).tolist()
             cores_idade = ['lightgreen', 'gold', 'lightcoral']
             
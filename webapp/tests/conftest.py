@@ -0,0 +1,151 @@
+# tests/conftest.py
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def gerar_dados_oulad_sinteticos(n_estudantes=60, n_cliques=3000, seed=0):
+    """Gera as sete tabelas OULAD em miniatura, com os mesmos nomes de colunas dos CSVs"""
+    rng = np.random.default_rng(seed)
+    modulos = [('AAA', '2013J'), ('BBB', '2014B')]
+    regioes = ['London Region', 'Scotland', 'Wales']
+
+    courses = pd.DataFrame({
+        'code_module': [m for m, _ in modulos],
+        'code_presentation': [p for _, p in modulos],
+        'module_presentation_length': np.array([268, 240], dtype='int16'),
+    })
+
+    matriculas = [(m, p, 1000 + i) for i in range(n_estudantes) for (m, p) in [modulos[i % 2]]]
+    # Alguns estudantes matriculados nos dois módulos
+    matriculas += [(modulos[1][0], modulos[1][1], 1000 + i) for i in range(0, n_estudantes, 6)]
+    student_info = pd.DataFrame(matriculas, columns=['code_module', 'code_presentation', 'id_student'])
+    n = len(student_info)
+    student_info['gender'] = rng.choice(['M', 'F'], n)
+    student_info['region'] = rng.choice(regioes, n)
+    student_info['highest_education'] = rng.choice(['A Level or Equivalent', 'HE Qualification'], n)
+    imd = rng.choice(['0-10%', '10-20', '20-30%'], n).astype(object)
+    imd[rng.random(n) < 0.1] = np.nan
+    student_info['imd_band'] = imd
+    student_info['age_band'] = rng.choice(['0-35', '35-55', '55<='], n)
+    student_info['num_of_prev_attempts'] = rng.integers(0, 3, n).astype('int8')
+    student_info['studied_credits'] = rng.choice([60, 120], n).astype('int16')
+    student_info['disability'] = rng.choice(['N', 'Y'], n)
+    student_info['final_result'] = rng.choice(['Pass', 'Fail', 'Withdrawn', 'Distinction'], n)
+    student_info['id_student'] = student_info['id_student'].astype('int32')
+
+    registration = student_info[['code_module', 'code_presentation', 'id_student']].copy()
+    registration['date_registration'] = rng.integers(-100, 0, n).astype('float32')
+    cancel = np.where(rng.random(n) < 0.2, rng.integers(0, 200, n), np.nan)
+    registration['date_unregistration'] = cancel.astype('float32')
+
+    vle = pd.DataFrame({
+        'id_site': np.arange(1, 21, dtype='int32'),
+        'code_module': [modulos[i % 2][0] for i in range(20)],
+        'code_presentation': [modulos[i % 2][1] for i in range(20)],
+        'activity_type': rng.choice(['resource', 'forumng', 'quiz', 'homepage'], 20),
+        'week_from': np.nan,
+        'week_to': np.nan,
+    })
+
+    idx = rng.integers(0, n, n_cliques)
+    student_vle = student_info.iloc[idx][['code_module', 'code_presentation', 'id_student']].reset_index(drop=True)
+    sites_por_modulo = {m: vle.loc[vle['code_module'] == m, 'id_site'].to_numpy() for m, _ in modulos}
+    student_vle['id_site'] = [rng.choice(sites_por_modulo[m]) for m in student_vle['code_module']]
+    student_vle['id_site'] = student_vle['id_site'].astype('int32')
+    student_vle['date'] = rng.integers(-10, 250, n_cliques).astype('int32')
+    student_vle['sum_click'] = rng.integers(1, 20, n_cliques).astype('int16')
+
+    assessments = pd.DataFrame({
+        'code_module': [modulos[i % 2][0] for i in range(6)],
+        'code_presentation': [modulos[i % 2][1] for i in range(6)],
+        'id_assessment': np.arange(1, 7, dtype='int32'),
+        'assessment_type': rng.choice(['TMA', 'CMA', 'Exam'], 6),
+        'date': rng.integers(10, 250, 6).astype('float32'),
+        'weight': np.full(6, 10.0, dtype='float32'),
+    })
+    linhas = []
+    for _, row in student_info.iterrows():
+        for id_assessment in assessments.loc[assessments['code_module'] == row['code_module'], 'id_assessment']:
+            if rng.random() < 0.8:
+                linhas.append((id_assessment, row['id_student'], int(rng.integers(0, 250)), 0, float(rng.integers(0, 101))))
+    student_assessment = pd.DataFrame(linhas, columns=['id_assessment', 'id_student', 'date_submitted', 'is_banked', 'score'])
+    student_assessment['score'] = student_assessment['score'].astype('float32')
+
+    return {
+        'assessments': assessments,
+        'courses': courses,
+        'vle': vle,
+        'studentInfo': student_info,
+        'studentRegistration': registration,
+        'studentAssessment': student_assessment,
+        'studentVle': student_vle,
+    }
+
+
+def gerar_dados_uci_sinteticos(n_estudantes=80, seed=0):
+    """Gera um DataFrame no formato de carregar_dados_uci_raw (mat + por concatenados)"""
+    rng = np.random.default_rng(seed)
+    n = n_estudantes
+    df = pd.DataFrame({
+        'school': rng.choice(['GP', 'MS'], n),
+        'sex': rng.choice(['F', 'M'], n),
+        'age': rng.integers(15, 22, n),
+        'address': rng.choice(['U', 'R'], n),
+        'famsize': rng.choice(['GT3', 'LE3'], n),
+        'Pstatus': rng.choice(['A', 'T'], n),
+        'Medu': rng.integers(0, 5, n),
+        'Fedu': rng.integers(0, 5, n),
+        'Mjob': rng.choice(['at_home', 'health', 'other', 'services', 'teacher'], n),
+        'Fjob': rng.choice(['at_home', 'health', 'other', 'services', 'teacher'], n),
+        'reason': rng.choice(['course', 'home', 'reputation', 'other'], n),
+        'guardian': rng.choice(['mother', 'father', 'other'], n),
+        'traveltime': rng.choice(['<15m', '15-30m', '30-1h', '>1h'], n),
+        'studytime': rng.choice(['<2h', '2-5h', '5-10h', '>10h'], n),
+        'failures': rng.integers(0, 4, n),
+    })
+    for col in ['schoolsup', 'famsup', 'paid', 'activities', 'nursery', 'higher', 'internet', 'romantic']:
+        df[col] = rng.choice(['yes', 'no'], n)
+    for col in ['famrel', 'freetime', 'goout', 'Dalc', 'Walc', 'health']:
+        df[col] = rng.integers(1, 6, n)
+    df['absences'] = rng.integers(0, 30, n)
+    df['G1'] = rng.integers(0, 21, n)
+    df['G2'] = rng.integers(0, 21, n)
+    df['G3'] = rng.integers(0, 21, n)
+    df['origem'] = rng.choice(['mat', 'por'], n)
+    return df
+
+
+@pytest.fixture
+def dados_uci_sinteticos():
+    return gerar_dados_uci_sinteticos()
+
+
+@pytest.fixture
+def dados_oulad_sinteticos():
+    return gerar_dados_oulad_sinteticos()
+
+
+@pytest.fixture(scope='session')
+def oulad_processado():
+    """OULAD sintético já processado (modo agregado), com alguns ausentes em 'gender'"""
+    from src import instrumentacao
+    from src.carregar_dados import processar_dados_oulad
+
+    with pytest.MonkeyPatch.context() as mp:
+        # Fixture de sessão: roda antes de log_etapas, então não registra etapas
+        mp.setitem(instrumentacao._configuracao, 'ativo', False)
+        df = processar_dados_oulad(gerar_dados_oulad_sinteticos(n_estudantes=600, n_cliques=12000), modo='agregado')
+    df.loc[df.index[:20], 'gender'] = np.nan
+    return df
+
+
+@pytest.fixture(autouse=True)
+def log_etapas(tmp_path, monkeypatch):
+    """Grava as etapas instrumentadas em um arquivo temporário, sem tracemalloc"""
+    from src import instrumentacao
+    caminho = tmp_path / 'etapas.jsonl'
+    monkeypatch.setitem(instrumentacao._configuracao, 'caminho', caminho)
+    monkeypatch.setitem(instrumentacao._configuracao, 'memoria', False)
+    instrumentacao.limpar_registros()
+    return caminho
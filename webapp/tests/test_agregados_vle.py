@@ -0,0 +1,66 @@
+# tests/test_agregados_vle.py
+import pandas as pd
+
+from src.agregados_vle import AgregadosCliques
+from src.carregar_dados import agregar_student_vle_em_blocos
+from src.unificar_datasets import agregar_oulad_por_estudante
+
+
+def test_blocos_combinados_igualam_passagem_unica(dados_oulad_sinteticos):
+    vle = dados_oulad_sinteticos['vle']
+    student_vle = dados_oulad_sinteticos['studentVle']
+
+    unico = AgregadosCliques(vle).atualizar(student_vle)
+    metade = len(student_vle) // 2
+    parte_a = AgregadosCliques(vle)
+    for inicio in range(0, metade, 700):
+        parte_a.atualizar(student_vle.iloc[inicio:min(inicio + 700, metade)])
+    parte_b = AgregadosCliques(vle).atualizar(student_vle.iloc[metade:])
+    combinado = parte_a.combinar(parte_b)
+
+    assert combinado.linhas_processadas == len(student_vle)
+    pd.testing.assert_frame_equal(combinado.por_estudante_modulo(), unico.por_estudante_modulo())
+    pd.testing.assert_frame_equal(combinado.por_estudante(), unico.por_estudante())
+    pd.testing.assert_frame_equal(combinado.por_site(), unico.por_site())
+
+
+def test_parciais_pendentes_compactados_sem_reagrupar_a_cada_bloco(dados_oulad_sinteticos, monkeypatch):
+    from src import agregados_vle
+
+    vle = dados_oulad_sinteticos['vle']
+    student_vle = dados_oulad_sinteticos['studentVle']
+    compactacoes = []
+    compactar = agregados_vle._compactar
+    monkeypatch.setattr(agregados_vle, '_compactar',
+                        lambda frames, grao: compactacoes.append(grao) or compactar(frames, grao))
+
+    agregados = AgregadosCliques(vle, min_pendentes=1_000)
+    blocos = range(0, len(student_vle), 100)
+    for inicio in blocos:
+        agregados.atualizar(student_vle.iloc[inicio:inicio + 100])
+        # A fila nunca passa do tamanho do estado (nem do mínimo, mais um parcial)
+        for grao, pendentes in agregados.pendentes.items():
+            estado = agregados.estados[grao]
+            assert sum(map(len, pendentes)) < max(1_000, len(estado) if estado is not None else 0) + 100
+    assert compactacoes.count('dia') < len(blocos) / 2
+
+    unico = AgregadosCliques(vle).atualizar(student_vle)
+    pd.testing.assert_frame_equal(agregados.por_estudante_modulo(), unico.por_estudante_modulo())
+    pd.testing.assert_frame_equal(agregados.por_semana(), unico.por_semana())
+    pd.testing.assert_frame_equal(agregados.por_site(), unico.por_site())
+
+
+def test_leitura_em_blocos_alimenta_agregacao_por_estudante(tmp_path, dados_oulad_sinteticos):
+    caminho = tmp_path / 'studentVle.csv'
+    dados_oulad_sinteticos['studentVle'].to_csv(caminho, index=False)
+
+    agregados = agregar_student_vle_em_blocos(caminho, df_vle=dados_oulad_sinteticos['vle'], tamanho_bloco=500)
+    esperado = agregar_oulad_por_estudante(dados_oulad_sinteticos)
+
+    dados_streaming = {k: v for k, v in dados_oulad_sinteticos.items() if k != 'studentVle'}
+    dados_streaming['studentVle_agregado'] = agregados
+    resultado = agregar_oulad_por_estudante(dados_streaming)
+
+    colunas = ['id_student', 'oulad_total_cliques', 'oulad_dias_atividade',
+               'oulad_primeira_atividade', 'oulad_ultima_atividade', 'oulad_media_cliques_dia']
+    pd.testing.assert_frame_equal(resultado[colunas], esperado[colunas], check_dtype=False)
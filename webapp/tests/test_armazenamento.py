@@ -0,0 +1,65 @@
+# tests/test_armazenamento.py
+import pickle
+
+import pandas as pd
+
+from src.armazenamento import (
+    calcular_manifesto, carregar_artefato, diferencas_manifesto, ler_manifesto, migrar_pickles, salvar_artefato,
+    versao_artefato
+)
+
+
+def test_projecao_e_filtros_do_artefato(tmp_path, dados_oulad_sinteticos):
+    df = dados_oulad_sinteticos['studentInfo'].astype({'code_module': 'category', 'final_result': 'category'})
+    salvar_artefato(df, 'oulad', base_path=tmp_path, tamanho_grupo_linhas=10)
+
+    lido = carregar_artefato('oulad', colunas=['id_student', 'final_result'],
+                             filtros={'code_module': 'AAA', 'final_result': ['Pass', 'Fail']},
+                             base_path=tmp_path)
+
+    esperado = df[(df['code_module'] == 'AAA') & df['final_result'].isin(['Pass', 'Fail'])]
+    assert list(lido.columns) == ['id_student', 'final_result']
+    assert sorted(lido['id_student']) == sorted(esperado['id_student'])
+    assert isinstance(lido['final_result'].dtype, pd.CategoricalDtype)
+
+
+def test_migrar_pickles_legados(tmp_path):
+    df = pd.DataFrame({'G3': [10, 12], 'sex': ['F', 'M']})
+    with open(tmp_path / 'uci_dataframe.pkl', 'wb') as f:
+        pickle.dump(df, f)
+
+    migrados = migrar_pickles(base_path=tmp_path)
+
+    assert set(migrados) == {'uci'}
+    pd.testing.assert_frame_equal(carregar_artefato('uci', base_path=tmp_path), df)
+
+
+def test_manifesto_detecta_fonte_alterada(tmp_path):
+    fonte = tmp_path / 'courses.csv'
+    fonte.write_text('code_module,code_presentation\nAAA,2013J\n')
+    manifesto = calcular_manifesto([fonte], versao_transformacao=1, parametros={'modo': 'legado'})
+    salvar_artefato(pd.DataFrame({'a': [1]}), 'oulad', base_path=tmp_path, manifesto=manifesto)
+
+    gravado = ler_manifesto('oulad', base_path=tmp_path)
+    assert diferencas_manifesto(gravado, calcular_manifesto([fonte], 1, {'modo': 'legado'}, anterior=gravado)) == []
+    assert diferencas_manifesto(gravado, calcular_manifesto([fonte], 2, {'modo': 'legado'})) != []
+    assert diferencas_manifesto(gravado, calcular_manifesto([fonte], 1, {'modo': 'agregado'})) != []
+
+    fonte.write_text('code_module,code_presentation\nBBB,2014B\nCCC,2014J\n')
+    motivos = diferencas_manifesto(gravado, calcular_manifesto([fonte], 1, {'modo': 'legado'}, anterior=gravado))
+    assert motivos == ['fonte alterada: courses.csv']
+
+
+def test_versao_artefato_muda_ao_regenerar(tmp_path):
+    assert versao_artefato('uci', base_path=tmp_path) is None
+
+    fonte = tmp_path / 'student-mat.csv'
+    fonte.write_text('G3\n10\n')
+    df = pd.DataFrame({'G3': [10]})
+    salvar_artefato(df, 'uci', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 1))
+    versao = versao_artefato('uci', base_path=tmp_path)
+    assert versao is not None and len(versao) == 16
+    assert versao_artefato('uci', base_path=tmp_path) == versao
+
+    salvar_artefato(df, 'uci', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 2))
+    assert versao_artefato('uci', base_path=tmp_path) != versao
@@ -0,0 +1,44 @@
+# tests/test_atribuicao.py
+import numpy as np
+import pytest
+
+from src import modelos
+from src.atribuicao import contribuicoes_caminho, explicacao_por_amostra, importancia_atribuicao
+from test_registro_modelos import gerar_dados_uci
+
+
+def test_contribuicoes_reproduzem_predict_uci():
+    X_train, X_test, y_train, _ = modelos.preparar_dados('uci', gerar_dados_uci(n=300))
+    modelo = modelos.construir_modelo('uci', X_train).fit(X_train, y_train)
+
+    resultado = contribuicoes_caminho(modelo, X_test)
+    assert resultado.contribuicoes.shape == (len(X_test), X_test.shape[1])
+    np.testing.assert_allclose(resultado.previsao, modelo.predict(X_test))
+
+    # sex vira duas colunas one-hot, somadas de volta numa só
+    importancia = importancia_atribuicao(resultado)
+    assert set(importancia['feature']) == set(X_test.columns)
+    assert importancia['importance'].is_monotonic_increasing
+
+
+def test_contribuicoes_reproduzem_predict_proba_oulad(oulad_processado):
+    X_train, X_test, y_train, _ = modelos.preparar_dados('oulad', oulad_processado)
+    modelo = modelos.construir_modelo('oulad', X_train).fit(X_train, y_train)
+
+    resultado = contribuicoes_caminho(modelo, X_test)
+    probabilidades = modelo.predict_proba(X_test)
+    np.testing.assert_allclose(resultado.previsao, probabilidades, atol=1e-10)
+    np.testing.assert_allclose(resultado.vies.sum(), 1.0)
+
+    explicacao = explicacao_por_amostra(resultado)
+    assert list(explicacao['classe']) == list(modelo.predict(X_test))
+    np.testing.assert_allclose(
+        explicacao['base'] + explicacao['contribuicoes'].sum(axis=1), probabilidades.max(axis=1)
+    )
+
+
+def test_modelo_sem_arvores_rejeitado(oulad_processado):
+    X_train, X_test, y_train, _ = modelos.preparar_dados('oulad', oulad_processado, motor='hgb')
+    modelo = modelos.construir_modelo('oulad', X_train, 'hgb').fit(X_train, y_train)
+    with pytest.raises(ValueError, match='indisponível'):
+        contribuicoes_caminho(modelo, X_test.head())
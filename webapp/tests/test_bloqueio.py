@@ -0,0 +1,64 @@
+# tests/test_bloqueio.py
+import threading
+
+import pytest
+
+from src.bloqueio import bloqueio_exclusivo, escrever_atomico, TempoEsgotadoBloqueio
+
+
+def test_escrita_atomica_preserva_destino_em_caso_de_erro(tmp_path):
+    destino = tmp_path / 'oulad.parquet'
+    destino.write_text('versao antiga')
+
+    def escrever_com_falha(temporario):
+        temporario.write_text('pela metade')
+        raise RuntimeError('falha no meio da gravação')
+
+    with pytest.raises(RuntimeError):
+        escrever_atomico(destino, escrever_com_falha)
+
+    assert destino.read_text() == 'versao antiga'
+    assert [p.name for p in tmp_path.iterdir()] == ['oulad.parquet']
+
+    escrever_atomico(destino, lambda temporario: temporario.write_text('versao nova'))
+    assert destino.read_text() == 'versao nova'
+
+
+def test_um_construtor_e_varios_aguardando(tmp_path):
+    destino = tmp_path / 'oulad.parquet'
+    construcoes = []
+
+    def sessao():
+        with bloqueio_exclusivo(destino, intervalo=0.01):
+            if destino.exists():
+                return
+            construcoes.append(threading.get_ident())
+            escrever_atomico(destino, lambda temporario: temporario.write_text('pronto'))
+
+    threads = [threading.Thread(target=sessao) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(construcoes) == 1
+    assert destino.read_text() == 'pronto'
+
+
+def test_bloqueio_respeita_timeout(tmp_path):
+    destino = tmp_path / 'uci.pkl'
+    with bloqueio_exclusivo(destino):
+        resultado = []
+
+        def tentar():
+            try:
+                with bloqueio_exclusivo(destino, timeout=0.05, intervalo=0.01):
+                    resultado.append('obtido')
+            except TempoEsgotadoBloqueio:
+                resultado.append('timeout')
+
+        t = threading.Thread(target=tentar)
+        t.start()
+        t.join()
+
+    assert resultado == ['timeout']
@@ -0,0 +1,83 @@
+# tests/test_cache_impressao.py
+import threading
+import time
+
+import pandas as pd
+
+from src import modelos
+from src.cache_impressao import cache_por_impressao, estatisticas_caches
+
+
+def test_acerto_nao_olha_os_argumentos():
+    chamadas = []
+
+    @cache_por_impressao(max_entradas=2)
+    def treinar(impressao, df):
+        chamadas.append(impressao)
+        return len(df)
+
+    treinar.limpar()
+    df = pd.DataFrame({'a': range(10)})
+    assert treinar('v1', df) == 10
+    # DataFrame diferente com a mesma impressão: acerto, sem recalcular nem hashear o conteúdo
+    assert treinar('v1', df.head(3)) == 10
+    assert treinar('v2', df.head(3)) == 3
+    treinar('v3', df)
+    assert treinar('v1', df) == 10  # despejada pela capacidade: recalcula
+
+    assert chamadas == ['v1', 'v2', 'v3', 'v1']
+    assert treinar.estatisticas() == {
+        'funcao': 'test_acerto_nao_olha_os_argumentos.<locals>.treinar',
+        'acertos': 1, 'falhas': 4, 'taxa_acerto': 0.2, 'entradas': 2,
+    }
+
+
+def test_redefinicao_reaproveita_o_cache():
+    def definir():
+        @cache_por_impressao(impressao=lambda nome, df: nome)
+        def pagina(nome, df):
+            return object()
+        return pagina
+
+    primeira = definir()
+    primeira.limpar()
+    valor = primeira('uci', None)
+    # Rerun do script da página: a função é redefinida, o valor e os contadores continuam
+    segunda = definir()
+    assert segunda('uci', None) is valor
+    assert segunda.estatisticas()['acertos'] == 1
+    assert segunda.estatisticas() in estatisticas_caches()
+
+
+def test_mesma_chave_calculada_uma_vez_entre_sessoes():
+    chamadas = []
+
+    @cache_por_impressao()
+    def lento(impressao):
+        chamadas.append(impressao)
+        time.sleep(0.1)
+        return impressao.upper()
+
+    lento.limpar()
+    resultados = []
+    sessoes = [threading.Thread(target=lambda: resultados.append(lento('k'))) for _ in range(5)]
+    for sessao in sessoes:
+        sessao.start()
+    for sessao in sessoes:
+        sessao.join()
+
+    assert resultados == ['K'] * 5
+    assert chamadas == ['k']
+    assert lento.estatisticas()['acertos'] == 4
+
+
+def test_impressao_divisao_sem_ler_os_dados(monkeypatch):
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: None)
+    assert modelos.impressao_divisao('oulad') is None
+
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: 'abc')
+    floresta = modelos.impressao_divisao('oulad', 'floresta')
+    assert floresta == modelos.impressao_divisao('oulad', 'floresta')
+    assert floresta != modelos.impressao_divisao('oulad', 'hgb')
+    monkeypatch.setitem(modelos.HIPERPARAMETROS['oulad'], 'test_size', 0.3)
+    assert floresta != modelos.impressao_divisao('oulad', 'floresta')
@@ -0,0 +1,67 @@
+# tests/test_cache_revalidacao.py
+import threading
+
+from src.cache_revalidacao import cache_revalidado, estatisticas_revalidacao
+
+
+def test_valor_anterior_servido_durante_a_recarga():
+    versao = {'atual': 'v1'}
+    liberar = threading.Event()
+    chamadas = []
+
+    @cache_revalidado(versao=lambda nome: versao['atual'])
+    def carregar(nome):
+        chamadas.append(versao['atual'])
+        if len(chamadas) > 1:
+            liberar.wait(5)
+        return f"{nome}-{versao['atual']}"
+
+    assert carregar('uci') == 'uci-v1'  # primeira carga síncrona
+    assert carregar('uci') == 'uci-v1'
+
+    # Artefato regenerado: o valor anterior continua servindo, com uma única recarga por chave
+    versao['atual'] = 'v2'
+    assert carregar('uci') == 'uci-v1'
+    assert carregar('uci') == 'uci-v1'
+    assert carregar.revalidando('uci')
+    liberar.set()
+    carregar.esperar(5)
+
+    assert carregar('uci') == 'uci-v2'
+    assert chamadas == ['v1', 'v2']
+    estatisticas = carregar.estatisticas()
+    assert (estatisticas['frescos'], estatisticas['velhos'], estatisticas['recargas']) == (2, 2, 2)
+    assert estatisticas in estatisticas_revalidacao()
+
+
+def test_ttl_vencido_dispara_recarga():
+    chamadas = []
+
+    @cache_revalidado(versao=lambda: None, ttl=0.0)
+    def carregar():
+        chamadas.append(1)
+        return len(chamadas)
+
+    assert carregar() == 1
+    assert carregar() == 1  # velho: a recarga roda em segundo plano
+    carregar.esperar(5)
+    assert carregar() == 2
+
+
+def test_falha_na_recarga_mantem_o_valor_anterior():
+    versao = {'atual': 'v1'}
+
+    @cache_revalidado(versao=lambda: versao['atual'], espera_apos_falha=3600)
+    def carregar():
+        if versao['atual'] != 'v1':
+            raise RuntimeError('artefato corrompido')
+        return 'ok'
+
+    assert carregar() == 'ok'
+    versao['atual'] = 'v2'
+    assert carregar() == 'ok'
+    carregar.esperar(5)
+    assert carregar() == 'ok'
+    assert not carregar.revalidando()  # não tenta de novo antes de espera_apos_falha
+    assert carregar.erro() == 'RuntimeError: artefato corrompido'
+    assert carregar.estatisticas()['falhas'] == 1
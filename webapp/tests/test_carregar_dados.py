@@ -1,6 +1,7 @@
 # tests/test_carregar_dados.py
 import pytest
-from src.carregar_dados import carregar_uci_dados, carregar_oulad_dados
+import pandas as pd
+from src.carregar_dados import carregar_uci_dados, carregar_oulad_dados, carregar_dados_oulad_raw, processar_dados_oulad
 
 def test_carregar_uci_dados():
     df = carregar_uci_dados()
@@ -10,4 +11,39 @@ def test_carregar_uci_dados():
 def test_carregar_oulad_dados():
     df = carregar_oulad_dados()
     assert isinstance(df, pd.DataFrame), "O retorno não é um DataFrame"
-    # Adicione mais asserções conforme necessário para validar o conteúdo do DataFrame
\ No newline at end of file
+    # Adicione mais asserções conforme necessário para validar o conteúdo do DataFrame
+
+def test_processar_dados_oulad_agregado_uma_linha_por_matricula(dados_oulad_sinteticos):
+    df = processar_dados_oulad(dados_oulad_sinteticos, modo='agregado')
+    info = dados_oulad_sinteticos['studentInfo']
+    chaves = ['code_module', 'code_presentation', 'id_student']
+    assert len(df) == len(info), "O modo agregado deve manter o grão estudante-módulo"
+    assert not df.duplicated(subset=chaves).any()
+    assert df['sum_click'].sum() == dados_oulad_sinteticos['studentVle']['sum_click'].sum()
+    relatorio = df.attrs['cardinalidade_juncoes']
+    assert all(j['linhas_resultado'] == j['linhas_esquerda'] for j in relatorio)
+
+
+
+def test_modo_padrao_le_o_student_vle_completo(monkeypatch):
+    from src import carregar_dados
+
+    assert carregar_dados.MODO_PADRAO_OULAD == 'agregado'
+    # Um artefato antigo no modo legado (studentVle truncado) fica desatualizado e é reconstruído
+    monkeypatch.setattr(carregar_dados, 'ler_manifesto', lambda nome: {'parametros': {'modo': 'legado'}})
+    monkeypatch.setattr(carregar_dados, 'fontes_artefato', lambda nome: [])
+    assert carregar_dados.manifesto_oulad()['parametros'] == {'modo': 'agregado'}
+
+
+@pytest.mark.parametrize("paralelo,engine", [('threads', None), ('threads', 'pyarrow'), ('processos', None)])
+def test_carregar_dados_oulad_raw_paralelo_igual_sequencial(tmp_path, dados_oulad_sinteticos, paralelo, engine):
+    for nome, df in dados_oulad_sinteticos.items():
+        df.to_csv(tmp_path / f"{nome}.csv", index=False)
+
+    sequencial = carregar_dados_oulad_raw(datasets_path=tmp_path)
+    concorrente = carregar_dados_oulad_raw(datasets_path=tmp_path, paralelo=paralelo, engine=engine)
+
+    assert list(concorrente) == list(sequencial)
+    for nome, df in sequencial.items():
+        pd.testing.assert_frame_equal(concorrente[nome], df)
+        assert concorrente[nome].attrs['tempo_carga_s'] >= 0
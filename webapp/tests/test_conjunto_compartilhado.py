@@ -0,0 +1,29 @@
+# tests/test_conjunto_compartilhado.py
+import pandas as pd
+import pytest
+
+from src.conjunto_compartilhado import ConjuntoCompartilhado
+
+
+def test_visoes_compartilham_dados_e_protegem_a_copia(dados_oulad_sinteticos):
+    original = dados_oulad_sinteticos['studentInfo'].astype({'final_result': 'category'})
+    conjunto = ConjuntoCompartilhado(original.copy())
+
+    visao = conjunto.visualizar()
+    visao['nova_coluna'] = 1
+    visao['studied_credits'] = visao['studied_credits'] * 2
+    with pytest.raises(ValueError):
+        visao.loc[visao.index[:5], 'num_of_prev_attempts'] = 9
+
+    pd.testing.assert_frame_equal(conjunto.visualizar(), original)
+
+    editavel = conjunto.copia_editavel()
+    editavel.loc[editavel.index[:5], 'num_of_prev_attempts'] = 9
+    pd.testing.assert_frame_equal(conjunto.visualizar(), original)
+
+
+def test_sobrecarga_por_sessao_nao_duplica_os_dados(dados_oulad_sinteticos):
+    conjunto = ConjuntoCompartilhado(dados_oulad_sinteticos['studentVle'].copy())
+    medida = conjunto.medir_sobrecarga_sessao()
+    assert medida['dados_exclusivos_kb'] == 0
+    assert medida['alocado_kb'] < medida['compartilhado_mb'] * 1024
@@ -0,0 +1,112 @@
+# tests/test_contagem_aproximada.py
+import numpy as np
+import pytest
+
+from src.agregados_vle import AgregadosCliques
+from src.armazenamento import calcular_manifesto, salvar_artefato
+from src.contagem_aproximada import (
+    EsbocosDistintos, HyperLogLog, gravar_esbocos, ler_esbocos, motor_distintos, precisao_para_erro
+)
+from src.resumo_metricas import calcular_resumo, gravar_resumo
+
+
+def test_hyperloglog_respeita_erro_e_combina_sem_perda():
+    valores = np.random.default_rng(0).choice(10**9, size=200_000, replace=False)
+    for erro in (0.01, 0.02, 0.05):
+        esboco = HyperLogLog(erro).adicionar(valores)
+        assert esboco.precisao == precisao_para_erro(erro) and esboco.erro_padrao <= erro
+        # Três erros padrão de tolerância
+        assert esboco.estimar() == pytest.approx(len(valores), rel=3 * esboco.erro_padrao)
+
+    # Combinar partes (com repetições entre elas) é idêntico a ver tudo num único esboço
+    unico = HyperLogLog(0.02).adicionar(valores)
+    combinado = HyperLogLog(0.02).adicionar(valores[:120_000]).combinar(HyperLogLog(0.02).adicionar(valores[80_000:]))
+    assert np.array_equal(combinado.registros, unico.registros)
+
+    # Poucos valores: contagem linear, praticamente exata
+    assert HyperLogLog().adicionar([1, 2, 3, 3, None, 2]).estimar() == 3
+    with pytest.raises(ValueError):
+        HyperLogLog(precisao=10).combinar(HyperLogLog(precisao=12))
+
+
+def test_esbocos_por_dimensao_e_motor_do_resumo(oulad_processado, monkeypatch):
+    df = oulad_processado
+    esbocos = EsbocosDistintos.construir(df, ['gender', 'age_band', 'final_result'], erro=0.01, tamanho_bloco=150)
+
+    assert esbocos.estudantes() == pytest.approx(df['id_student'].nunique(), rel=0.03)
+    for dimensao in esbocos.dimensoes:
+        exato = df.groupby(dimensao, observed=True)['id_student'].nunique()
+        estimado = esbocos.estudantes(dimensao)
+        assert list(estimado.index) == sorted(exato.index)
+        assert estimado.to_numpy() == pytest.approx(exato.sort_index().to_numpy(), rel=0.03)
+
+    # Blocos combinados em qualquer divisão dão os mesmos registradores
+    metade = len(df) // 2
+    partes = EsbocosDistintos(esbocos.dimensoes, 0.01).atualizar(df.iloc[metade:]).combinar(
+        EsbocosDistintos(esbocos.dimensoes, 0.01).atualizar(df.iloc[:metade]))
+    assert partes.linhas_processadas == len(df)
+    for valor, esboco in esbocos.por_valor['age_band'].items():
+        assert np.array_equal(partes.por_valor['age_band'][valor].registros, esboco.registros)
+
+    monkeypatch.setenv('SIDA_MOTOR_DISTINTOS', 'hll')
+    aproximado = calcular_resumo('oulad', df)
+    exato = calcular_resumo('oulad', df, motor='exato')
+    assert aproximado['motor_distintos'] == 'hll' and exato['motor_distintos'] == 'exato'
+    assert aproximado['principais']['total_estudantes'] == pytest.approx(exato['principais']['total_estudantes'], rel=0.03)
+    assert aproximado['principais']['faixa_etaria_principal'] in df['age_band'].unique()
+
+    monkeypatch.setenv('SIDA_MOTOR_DISTINTOS', 'exatissimo')
+    with pytest.raises(ValueError):
+        motor_distintos()
+
+
+def test_esbocos_acumulados_na_leitura_em_blocos(dados_oulad_sinteticos):
+    vle, info = dados_oulad_sinteticos['vle'], dados_oulad_sinteticos['studentInfo']
+    student_vle = dados_oulad_sinteticos['studentVle']
+
+    unico = AgregadosCliques(vle, df_info=info, erro_distintos=0.01).atualizar(student_vle)
+    metade = len(student_vle) // 2
+    parte_a = AgregadosCliques(vle, df_info=info, erro_distintos=0.01)
+    for inicio in range(0, metade, 700):
+        parte_a.atualizar(student_vle.iloc[inicio:min(inicio + 700, metade)])
+    parte_b = AgregadosCliques(vle, df_info=info, erro_distintos=0.01).atualizar(student_vle.iloc[metade:])
+    combinado = parte_a.combinar(parte_b)
+
+    assert np.array_equal(combinado.distintos.total.registros, unico.distintos.total.registros)
+    assert combinado.distintos.estudantes() == pytest.approx(student_vle['id_student'].nunique(), rel=0.03)
+
+    ativos = student_vle.merge(info, on=['code_module', 'code_presentation', 'id_student'])
+    exato = ativos.groupby('final_result', observed=True)['id_student'].nunique()
+    estimado = combinado.distintos.estudantes('final_result')
+    assert estimado.reindex(exato.index).to_numpy() == pytest.approx(exato.to_numpy(), rel=0.03)
+
+
+def test_esbocos_da_leitura_gravados_e_combinados_no_resumo(tmp_path, monkeypatch, dados_oulad_sinteticos,
+                                                            oulad_processado):
+    vle, info = dados_oulad_sinteticos['vle'], dados_oulad_sinteticos['studentInfo']
+    student_vle = dados_oulad_sinteticos['studentVle']
+    ativos = AgregadosCliques(vle, df_info=info, erro_distintos=0.01).atualizar(student_vle).distintos
+
+    fonte = tmp_path / 'studentInfo.csv'
+    fonte.write_text('id_student\n1\n')
+    salvar_artefato(oulad_processado, 'oulad', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 1))
+    gravar_esbocos('oulad', ativos, base_path=tmp_path)
+    lidos = ler_esbocos('oulad', base_path=tmp_path)
+    assert lidos.dimensoes == ativos.dimensoes and lidos.linhas_processadas == ativos.linhas_processadas
+    assert np.array_equal(lidos.total.registros, ativos.total.registros)
+    assert lidos.estudantes('activity_type').to_dict() == ativos.estudantes('activity_type').to_dict()
+
+    monkeypatch.setenv('SIDA_MOTOR_DISTINTOS', 'hll')
+    monkeypatch.setenv('SIDA_ERRO_DISTINTOS', '0.01')
+    resumo = gravar_resumo('oulad', oulad_processado, base_path=tmp_path)
+    consolidadas = resumo['consolidadas']
+    assert consolidadas['estudantes_ativos_vle'] == ativos.estudantes()
+    assert consolidadas['estudantes_ativos_por_atividade'] == ativos.estudantes('activity_type').to_dict()
+    # União dos estudantes do artefato com os ativos no log de cliques
+    uniao = set(oulad_processado['id_student']) | set(student_vle['id_student'])
+    assert consolidadas['total_estudantes'] == pytest.approx(len(uniao), rel=0.03)
+
+    # Artefato regenerado: os esboços antigos deixam de valer e o resumo não os usa
+    salvar_artefato(oulad_processado, 'oulad', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 2))
+    assert ler_esbocos('oulad', base_path=tmp_path) is None
+    assert 'estudantes_ativos_vle' not in gravar_resumo('oulad', oulad_processado, base_path=tmp_path)['consolidadas']
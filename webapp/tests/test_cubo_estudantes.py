@@ -0,0 +1,58 @@
+# tests/test_cubo_estudantes.py
+import pytest
+
+from src.armazenamento import calcular_manifesto, salvar_artefato
+from src.cubo_estudantes import CuboEstudantes, caminho_cubo, gravar_cubo, ler_cubo
+
+
+def test_estudantes_igual_ao_groupby(oulad_processado):
+    df = oulad_processado
+    cubo = CuboEstudantes.construir(df)
+
+    assert cubo.estudantes() == df['id_student'].nunique()
+    for dimensoes in (['gender'], ['age_band'], ['gender', 'final_result'], ['region', 'imd_band', 'code_module']):
+        esperado = df.groupby(dimensoes, observed=True)['id_student'].nunique()
+        obtido = cubo.estudantes(dimensoes)
+        assert obtido.to_dict() == esperado[esperado > 0].to_dict()
+
+    # Filtros restringem as linhas antes da contagem
+    filtrado = df[df['final_result'].isin(['Pass', 'Distinction'])]
+    esperado = filtrado.groupby('age_band', observed=True)['id_student'].nunique()
+    obtido = cubo.estudantes(['age_band'], filtros={'final_result': ['Pass', 'Distinction']})
+    assert obtido.to_dict() == esperado[esperado > 0].to_dict()
+
+    # Consulta repetida (filtros em outra ordem) sai da memória, como cópia
+    repetida = cubo.estudantes(['age_band'], filtros={'final_result': ['Distinction', 'Pass']})
+    assert repetida.equals(obtido) and repetida is not obtido
+    assert len(cubo._consultas) == 6
+    with pytest.raises(KeyError):
+        cubo.estudantes(['inexistente'])
+
+
+def test_agregados_de_score(oulad_processado):
+    df = oulad_processado
+    cubo = CuboEstudantes.construir(df)
+    agregados = cubo.agregados(['code_module'])
+    grupos = df.groupby('code_module', observed=True)
+
+    assert agregados['linhas'].to_dict() == grupos.size().to_dict()
+    assert agregados['score_medio'].to_dict() == pytest.approx(grupos['score'].mean().to_dict())
+    assert agregados['score_min'].to_dict() == pytest.approx(grupos['score'].min().to_dict())
+    assert agregados['estudantes'].to_dict() == grupos['id_student'].nunique().to_dict()
+
+
+def test_cubo_vale_apenas_para_a_versao_gravada(tmp_path, oulad_processado):
+    fonte = tmp_path / 'studentInfo.csv'
+    fonte.write_text('id_student\n1\n')
+    salvar_artefato(oulad_processado, 'oulad', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 1))
+    assert ler_cubo('oulad', base_path=tmp_path) is None
+
+    gravado = gravar_cubo('oulad', oulad_processado, base_path=tmp_path)
+    assert caminho_cubo('oulad', base_path=tmp_path).is_file()
+    lido = ler_cubo('oulad', base_path=tmp_path)
+    assert lido.dimensoes == gravado.dimensoes
+    assert lido.estudantes(['gender']).to_dict() == gravado.estudantes(['gender']).to_dict()
+
+    # Artefato regenerado: o cubo antigo deixa de valer até ser gravado de novo
+    salvar_artefato(oulad_processado, 'oulad', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 2))
+    assert ler_cubo('oulad', base_path=tmp_path) is None
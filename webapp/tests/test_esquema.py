@@ -0,0 +1,50 @@
+# tests/test_esquema.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.esquema import aplicar_esquema, relatorio_memoria
+
+
+def test_esquema_oulad_reduz_tipos_e_preserva_valores(dados_oulad_sinteticos):
+    df = dados_oulad_sinteticos['studentInfo'].astype({'id_student': 'int64', 'studied_credits': 'int64'})
+    otimizado = aplicar_esquema(df, 'oulad')
+
+    assert otimizado['id_student'].dtype == 'int32'
+    assert otimizado['studied_credits'].dtype == 'int16'
+    assert isinstance(otimizado['region'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(otimizado.astype(df.dtypes.to_dict()), df)
+
+    relatorio = relatorio_memoria(df, otimizado)
+    assert (relatorio['mb_economizados'] >= 0).all()
+    assert relatorio['mb_depois'].sum() < relatorio['mb_antes'].sum()
+
+
+def test_inferencia_escolhe_o_menor_inteiro_e_respeita_limites():
+    df = pd.DataFrame({
+        'pequeno': np.arange(100, dtype='int64'),
+        'medio': np.arange(100, dtype='int64') * 1000,
+        # Declarado como int16 no esquema OULAD, mas com ausentes: não pode virar inteiro
+        'dias_ativos': [np.nan] + [1.0] * 99,
+        'texto_unico': [f"aluno {i}" for i in range(100)],
+    })
+    otimizado = aplicar_esquema(df, 'oulad')
+
+    assert otimizado['pequeno'].dtype == 'int8'
+    assert otimizado['medio'].dtype == 'int32'
+    assert otimizado['dias_ativos'].dtype == 'float32'
+    assert otimizado['texto_unico'].dtype == object
+
+
+def test_esquema_uci_mantem_escalas_ordinais_como_categorias(dados_uci_sinteticos):
+    otimizado = aplicar_esquema(dados_uci_sinteticos, 'uci')
+    for coluna in ['Medu', 'Fedu', 'famrel', 'goout', 'Dalc', 'Walc', 'health', 'traveltime', 'studytime']:
+        assert isinstance(otimizado[coluna].dtype, pd.CategoricalDtype) and otimizado[coluna].cat.ordered
+    assert otimizado['G3'].dtype == 'int8'
+    # Escalas ordenadas: comparações e médias sobre os valores continuam funcionando
+    assert ((otimizado['Dalc'] <= 2) == (dados_uci_sinteticos['Dalc'] <= 2)).all()
+    assert otimizado['Medu'].astype(int).mean() == pytest.approx(dados_uci_sinteticos['Medu'].mean())
+    assert list(otimizado['studytime'].cat.categories) == ['<2h', '2-5h', '5-10h', '>10h']
+    # Reaplicar (ex.: após ler do Parquet) não converte de novo
+    assert aplicar_esquema(otimizado, 'uci') is otimizado
+    assert otimizado.memory_usage(deep=True).sum() < dados_uci_sinteticos.memory_usage(deep=True).sum()
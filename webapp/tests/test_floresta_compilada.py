@@ -0,0 +1,49 @@
+# tests/test_floresta_compilada.py
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from src import modelos
+from src.floresta_compilada import compilar_floresta, compilar_modelo, medir_inferencia
+from test_registro_modelos import gerar_dados_uci
+
+
+def test_previsoes_iguais_ao_sklearn_uci():
+    X_train, X_test, y_train, _ = modelos.preparar_dados('uci', gerar_dados_uci(n=300))
+    modelo = modelos.construir_modelo('uci', X_train).fit(X_train, y_train)
+
+    compilado = compilar_modelo(modelo)
+    np.testing.assert_allclose(compilado.predict(X_test), modelo.predict(X_test))
+    assert compilado.score(X_test, modelo.predict(X_test)) == pytest.approx(1.0)
+
+
+def test_probabilidades_iguais_ao_sklearn_oulad(oulad_processado):
+    X_train, X_test, y_train, _ = modelos.preparar_dados('oulad', oulad_processado)
+    modelo = modelos.construir_modelo('oulad', X_train).fit(X_train, y_train)
+
+    compilado = compilar_modelo(modelo)
+    np.testing.assert_allclose(compilado.predict_proba(X_test), modelo.predict_proba(X_test), atol=1e-12)
+    assert (compilado.predict(X_test) == modelo.predict(X_test)).all()
+
+    tempos = medir_inferencia(modelo, X_test, lotes=(1, 10_000), repeticoes=1)
+    assert tempos['lote'].tolist() == [1, len(X_test)]
+    assert (tempos['diferenca_maxima'] < 1e-12).all()
+
+
+def test_valores_ausentes_seguem_o_lado_aprendido():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 3))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    X[rng.random(X.shape) < 0.2] = np.nan
+    floresta = RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+
+    np.testing.assert_allclose(compilar_floresta(floresta).predict_proba(X), floresta.predict_proba(X))
+    with pytest.raises(TypeError, match='não é treinada'):
+        compilar_floresta(floresta).fit(X, y)
+
+
+def test_estimador_sem_arvores_nao_e_compilado():
+    modelo = HistGradientBoostingClassifier(max_iter=5).fit(np.eye(4), [0, 1, 0, 1])
+    assert compilar_modelo(modelo) is modelo
+    with pytest.raises(ValueError, match='indisponível'):
+        compilar_floresta(modelo)
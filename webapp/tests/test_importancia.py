@@ -0,0 +1,115 @@
+# tests/test_importancia.py
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.pipeline import make_pipeline
+
+from src import modelos
+from src.importancia import (
+    grupos_de_colunas, importancia_permutacao_adaptativa, importancia_permutacao_agrupada,
+    importancia_por_coluna
+)
+from test_registro_modelos import gerar_dados_uci
+
+
+@pytest.fixture
+def oulad_com_coluna_vazia(oulad_processado):
+    df = oulad_processado.copy()
+    # Descartada pelo SimpleImputer: o grupo fica vazio e a importância é zero
+    df['vazia'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('motor', ['floresta', 'hgb'])
+def test_agrupada_igual_a_permutation_importance_oulad(oulad_com_coluna_vazia, motor):
+    X_train, X_test, y_train, y_test = modelos.preparar_dados('oulad', oulad_com_coluna_vazia, motor=motor)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        modelo = modelos.construir_modelo('oulad', X_train, motor).fit(X_train, y_train)
+        esperado = permutation_importance(modelo, X_test, y_test, n_repeats=3, random_state=42)
+        resultado = importancia_permutacao_agrupada(modelo, X_test, y_test, n_repeats=3, random_state=42)
+
+    np.testing.assert_allclose(resultado.importances, esperado.importances)
+    assert resultado.importances[list(X_test.columns).index('vazia')].tolist() == [0.0] * 3
+
+
+def test_agrupada_igual_a_permutation_importance_uci(monkeypatch):
+    X_train, X_test, y_train, y_test = modelos.preparar_dados('uci', gerar_dados_uci(n=300))
+    modelo = modelos.construir_modelo('uci', X_train).fit(X_train, y_train)
+
+    transformacoes = []
+    transformar = ColumnTransformer.transform
+    monkeypatch.setattr(ColumnTransformer, 'transform',
+                        lambda self, X, **kw: transformacoes.append(1) or transformar(self, X, **kw))
+    resultado = importancia_permutacao_agrupada(modelo, X_test, y_test, n_repeats=4, random_state=0)
+    assert len(transformacoes) == 1
+    monkeypatch.undo()
+
+    esperado = permutation_importance(modelo, X_test, y_test, n_repeats=4, random_state=0)
+    np.testing.assert_allclose(resultado.importances_mean, esperado.importances_mean)
+    np.testing.assert_allclose(resultado.importances_std, esperado.importances_std)
+
+
+def test_grupos_de_colunas_do_one_hot():
+    X_train, _, y_train, _ = modelos.preparar_dados('uci', gerar_dados_uci(n=300))
+    modelo = modelos.construir_modelo('uci', X_train).fit(X_train, y_train)
+
+    grupos = grupos_de_colunas(modelo[0], list(X_train.columns))
+    nomes = modelo[0].get_feature_names_out()
+
+    assert [nomes[i] for i in grupos['sex']] == ['cat__sex_F', 'cat__sex_M']
+    assert len(grupos['studytime']) == 3
+    assert [nomes[i] for i in grupos['G1']] == ['remainder__G1']
+    assert sorted(np.concatenate(list(grupos.values()))) == list(range(len(nomes)))
+
+
+def test_adaptativa_sem_parada_igual_a_permutation_importance():
+    X_train, X_test, y_train, y_test = modelos.preparar_dados('uci', gerar_dados_uci(n=300))
+    modelo = modelos.construir_modelo('uci', X_train).fit(X_train, y_train)
+
+    resultado = importancia_permutacao_adaptativa(
+        modelo, X_test, y_test, max_repeticoes=4, min_repeticoes=4, tolerancia=0, random_state=0
+    )
+    esperado = permutation_importance(modelo, X_test, y_test, n_repeats=4, random_state=0)
+    np.testing.assert_allclose(resultado.importances, esperado.importances)
+    np.testing.assert_allclose(resultado.importances_std, esperado.importances_std, atol=1e-12)
+    assert (resultado.ic_inferior <= resultado.importances_mean).all()
+
+
+@pytest.fixture
+def modelo_sinal_forte():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 4)), columns=['forte', 'medio', 'ruido_1', 'ruido_2'])
+    y = 5 * X['forte'] + X['medio'] + rng.normal(scale=0.1, size=400)
+    # Ajustado sem nomes de coluna: o pipeline de um passo só avalia a matriz numpy
+    modelo = RandomForestRegressor(n_estimators=20, random_state=0).fit(X.to_numpy(), y)
+    return modelo, X, y
+
+
+def test_adaptativa_para_colunas_ja_ordenadas(modelo_sinal_forte):
+    modelo, X, y = modelo_sinal_forte
+
+    resultado = importancia_permutacao_adaptativa(make_pipeline(modelo), X, y, max_repeticoes=20, random_state=0)
+    tabela = importancia_por_coluna(resultado, list(X.columns)).set_index('feature')
+
+    assert tabela['importance'].idxmax() == 'forte'
+    assert tabela.loc['forte', 'repeticoes'] < 20
+    assert tabela.loc['forte', 'ic_inferior'] > tabela.loc['medio', 'ic_superior']
+    assert not resultado.interrompida_por_tempo
+
+
+def test_adaptativa_respeita_orcamento_de_tempo(modelo_sinal_forte):
+    modelo, X, y = modelo_sinal_forte
+
+    resultado = importancia_permutacao_adaptativa(
+        make_pipeline(modelo), X, y, max_repeticoes=50, min_repeticoes=2, tolerancia=0,
+        tempo_limite=0, random_state=0
+    )
+    assert resultado.interrompida_por_tempo
+    assert resultado.repeticoes.tolist() == [2, 2, 2, 2]
+    assert np.isnan(resultado.importances[:, 2:]).all()
@@ -0,0 +1,75 @@
+# tests/test_instrumentacao.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import instrumentacao
+from src.carregar_dados import processar_dados_oulad
+from src.instrumentacao import etapa, instrumentar, ler_registros, registros_etapas, resumo_etapas
+
+
+def test_etapas_aninhadas_gravam_json_lines(log_etapas):
+    instrumentacao.configurar_instrumentacao(memoria=True)
+    df = pd.DataFrame({'a': np.arange(1000)})
+
+    @instrumentar('duplicar')
+    def duplicar(dados):
+        return pd.concat([dados, dados])
+
+    with etapa('externa', df, origem='teste') as registro:
+        with etapa('alocar'):
+            bloco = np.ones(2_000_000)  # ~15 MB
+            del bloco
+        registro.saida(duplicar(df))
+
+    gravados = ler_registros(log_etapas)
+    assert [r['etapa'] for r in gravados] == ['externa/alocar', 'externa/duplicar', 'externa']
+    assert gravados == json.loads(json.dumps(registros_etapas()))
+
+    externa = gravados[-1]
+    assert externa['linhas_entrada'] == 1000 and externa['linhas_saida'] == 2000
+    assert externa['saida']['formato'] == [2000, 1]
+    assert externa['origem'] == 'teste'
+    assert externa['tempo_s'] >= 0 and externa['cpu_s'] >= 0
+    # O pico da etapa interna entra no pico da externa
+    assert gravados[0]['pico_memoria_mb'] >= 14
+    assert externa['pico_memoria_mb'] >= gravados[0]['pico_memoria_mb']
+
+
+def test_erro_e_registrado_e_propagado(log_etapas):
+    with pytest.raises(KeyError):
+        with etapa('falha'):
+            raise KeyError('coluna')
+
+    registro = registros_etapas()[-1]
+    assert registro['etapa'] == 'falha'
+    assert registro['erro'].startswith('KeyError')
+    assert registro['pico_memoria_mb'] is None or registro['pico_memoria_mb'] >= 0
+
+
+def test_log_rotacionado_ao_passar_do_tamanho_maximo(log_etapas, monkeypatch):
+    monkeypatch.setitem(instrumentacao._configuracao, 'tamanho_maximo_mb', 2 / 1024)
+    for i in range(100):
+        with etapa(f'etapa {i}'):
+            pass
+
+    anterior = log_etapas.with_name(log_etapas.name + '.1')
+    assert anterior.is_file()
+    # Cada arquivo passa do limite em no máximo uma linha; as anteriores a .1 foram descartadas
+    for arquivo in (log_etapas, anterior):
+        assert arquivo.stat().st_size < 2048 + 1024
+    assert ler_registros()[-1]['etapa'] == 'etapa 99'
+    assert len(ler_registros(anterior)) + len(ler_registros()) < 100
+
+
+def test_processamento_oulad_registra_etapas(log_etapas, dados_oulad_sinteticos):
+    processar_dados_oulad(dados_oulad_sinteticos, modo='agregado')
+
+    resumo = resumo_etapas()
+    assert resumo['etapa'].iloc[-1] == 'processar_dados_oulad'
+    assert 'processar_dados_oulad/imputar_e_otimizar' in set(resumo['etapa'])
+    assert 'processar_dados_oulad/agregar cliques' in set(resumo['etapa'])
+    linhas = resumo.set_index('etapa')['linhas_entrada']
+    assert linhas['processar_dados_oulad/agregar cliques'] == len(dados_oulad_sinteticos['studentVle'])
@@ -0,0 +1,72 @@
+# tests/test_memoria_compartilhada.py
+import pandas as pd
+
+from src.memoria_compartilhada import ler_manifesto_publicado, mapear_conjunto, publicar_conjunto
+
+
+def test_conjunto_publicado_e_mapeado_sem_copia(tmp_path, dados_oulad_sinteticos):
+    df = dados_oulad_sinteticos['studentVle'].astype({'code_module': 'category'})
+    publicar_conjunto(df, 'oulad', manifesto={'versao_transformacao': '1'}, diretorio=tmp_path)
+
+    mapeado = mapear_conjunto('oulad', diretorio=tmp_path)
+    pd.testing.assert_frame_equal(mapeado, df)
+    assert ler_manifesto_publicado('oulad', diretorio=tmp_path) == {'versao_transformacao': '1'}
+
+    # Colunas numéricas apontam para o arquivo mapeado (somente leitura), não para cópias
+    for coluna in ['id_student', 'id_site', 'date', 'sum_click']:
+        assert not mapeado[coluna].to_numpy().flags.writeable
+
+    projetado = mapear_conjunto('oulad', colunas=['id_student', 'sum_click'], diretorio=tmp_path)
+    assert list(projetado.columns) == ['id_student', 'sum_click']
+
+
+def test_dados_antigos_nao_publicados_com_o_manifesto_novo(tmp_path, monkeypatch, dados_oulad_sinteticos):
+    from src.carregar_dados import _servir_compartilhado
+
+    monkeypatch.setenv('SIDA_DIRETORIO_COMPARTILHADO', str(tmp_path))
+    df = dados_oulad_sinteticos['studentInfo']
+    antigo, novo = {'versao_transformacao': 1}, {'versao_transformacao': 2}
+    cargas = []
+
+    def reconstrucao_falhou():
+        # Como _carregar_local_com_origem quando só sobra o artefato antigo
+        cargas.append(1)
+        return df, antigo
+
+    servido = _servir_compartilhado('oulad', novo, reconstrucao_falhou, None, None)
+    assert len(servido) == len(df)
+    assert ler_manifesto_publicado('oulad') == antigo
+
+    # Continua desatualizado: tenta de novo, mas não republica os mesmos dados antigos
+    publicado_em = (tmp_path / 'oulad.arrow').stat().st_mtime_ns
+    _servir_compartilhado('oulad', novo, reconstrucao_falhou, None, None)
+    assert len(cargas) == 2
+    assert (tmp_path / 'oulad.arrow').stat().st_mtime_ns == publicado_em
+
+    # Reconstrução bem-sucedida: publicado com o manifesto novo e não carregado de novo
+    _servir_compartilhado('oulad', novo, lambda: (df, novo), None, None)
+    assert ler_manifesto_publicado('oulad') == novo
+    _servir_compartilhado('oulad', novo, reconstrucao_falhou, None, None)
+    assert len(cargas) == 2
+
+
+def test_unificado_servido_pelo_conjunto_publicado(tmp_path, monkeypatch):
+    from src import armazenamento
+    from src.armazenamento import calcular_manifesto, salvar_artefato
+    from src.carregar_dados import carregar_unificado_dados
+
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_ARTEFATOS', tmp_path / 'artefatos')
+    monkeypatch.setenv('SIDA_MEMORIA_COMPARTILHADA', '1')
+    monkeypatch.setenv('SIDA_DIRETORIO_COMPARTILHADO', str(tmp_path / 'ipc'))
+    fonte = tmp_path / 'fonte.csv'
+    fonte.write_text('x\n1\n')
+    df = pd.DataFrame({'origem_dado': ['OULAD', 'UCI', 'UCI'], 'nota': [1.0, 2.0, 3.0]})
+    manifesto = calcular_manifesto([fonte], 1)
+    salvar_artefato(df, 'unificado', base_path=tmp_path, manifesto=manifesto)
+
+    servido = carregar_unificado_dados(colunas=['nota'])
+    assert list(servido.columns) == ['nota']
+    assert sorted(servido['nota']) == [1.0, 2.0, 3.0]
+    assert ler_manifesto_publicado('unificado') == manifesto
+    filtrado = carregar_unificado_dados(filtros={'origem_dado': 'UCI'})
+    assert len(filtrado) == 2
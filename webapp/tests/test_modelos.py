@@ -0,0 +1,41 @@
+# tests/test_modelos.py
+import numpy as np
+import pytest
+
+from src import modelos
+
+
+def test_motor_escolhido_pela_variavel_de_ambiente(monkeypatch):
+    monkeypatch.delenv('SIDA_MOTOR_OULAD', raising=False)
+    assert modelos.motor_modelo('oulad') == 'floresta'
+    monkeypatch.setenv('SIDA_MOTOR_OULAD', 'hgb')
+    assert modelos.hiperparametros('oulad')['estimador'] == 'HistGradientBoostingClassifier'
+    with pytest.raises(ValueError, match='indisponível'):
+        modelos.motor_modelo('uci', 'hgb')
+
+
+def test_hgb_usa_categorias_nativas_e_float32(oulad_processado):
+    X_train, X_test, y_train, y_test = modelos.preparar_dados('oulad', oulad_processado, motor='hgb')
+    modelo = modelos.construir_modelo('oulad', X_train, 'hgb').fit(X_train, y_train)
+
+    matriz = modelo[:-1].transform(X_test)
+    assert matriz.dtype == np.float32
+    categoricas = X_train.select_dtypes(include=['category', 'object']).columns
+    assert modelo[-1].is_categorical_.sum() == len(categoricas)
+
+    # Categoria nunca vista no treino não quebra a previsão
+    novo = X_test.head(5).copy()
+    novo['region'] = novo['region'].cat.add_categories(['Atlantis'])
+    novo['region'] = 'Atlantis'
+    assert len(modelo.predict(novo)) == 5
+
+
+def test_comparacao_de_motores_no_mesmo_teste(oulad_processado, monkeypatch):
+    monkeypatch.setitem(modelos.HIPERPARAMETROS['oulad'], 'amostra', 200)
+    comparacao = modelos.comparar_motores('oulad', oulad_processado).set_index('motor')
+
+    assert list(comparacao.index) == ['floresta', 'hgb']
+    assert comparacao.loc['floresta', 'linhas_treino'] == 200
+    assert comparacao.loc['hgb', 'linhas_treino'] > 200
+    assert comparacao['linhas_teste'].nunique() == 1
+    assert comparacao['acuracia'].between(0, 1).all()
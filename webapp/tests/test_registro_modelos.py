@@ -0,0 +1,68 @@
+# tests/test_registro_modelos.py
+import numpy as np
+import pandas as pd
+
+from src import modelos
+from src.registro_modelos import RegistroModelos, chave_modelo, impressao_dataframe
+
+
+def gerar_dados_uci(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sex': rng.choice(['F', 'M'], n),
+        'studytime': rng.choice(['<2h', '2-5h', '5-10h'], n),
+        'absences': rng.integers(0, 30, n),
+        'G1': rng.integers(0, 21, n),
+        'G2': rng.integers(0, 21, n),
+        'G3': rng.integers(0, 21, n),
+    })
+
+
+def test_modelo_reutilizado_com_a_mesma_chave(tmp_path, monkeypatch):
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: None)
+    registro = RegistroModelos(tmp_path)
+    X_train, X_test, y_train, _ = modelos.preparar_dados('uci', gerar_dados_uci())
+
+    treinos = []
+    construir = modelos.construir_modelo
+    monkeypatch.setattr(modelos, 'construir_modelo', lambda *a: treinos.append(a) or construir(*a))
+
+    primeiro = modelos.treinar_modelo('uci', X_train, y_train, registro=registro)
+    segundo = modelos.treinar_modelo('uci', X_train, y_train, registro=registro)
+
+    assert len(treinos) == 1
+    np.testing.assert_array_equal(primeiro.predict(X_test), segundo.predict(X_test))
+    [metadados] = registro.procurar('uci')
+    assert metadados['features'] == list(X_train.columns)
+    assert metadados['impressao_dados'] == impressao_dataframe(X_train, y_train)
+
+
+def test_chave_muda_com_dados_features_e_hiperparametros():
+    hiper = dict(modelos.HIPERPARAMETROS['uci'])
+    base = chave_modelo('uci', 'abc', ['G1', 'G2'], hiper)
+
+    assert chave_modelo('uci', 'abc', ['G1', 'G2'], dict(hiper)) == base
+    assert chave_modelo('uci', 'abd', ['G1', 'G2'], hiper) != base
+    assert chave_modelo('uci', 'abc', ['G2', 'G1'], hiper) != base
+    assert chave_modelo('uci', 'abc', ['G1', 'G2'], {**hiper, 'n_estimators': 10}) != base
+
+    df = gerar_dados_uci()
+    alterado = df.copy()
+    alterado.loc[0, 'G3'] += 1
+    assert impressao_dataframe(df) != impressao_dataframe(alterado)
+
+
+def test_modelo_registrado_carrega_com_mmap_pela_versao_do_artefato(tmp_path, monkeypatch):
+    registro = RegistroModelos(tmp_path)
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: 'v1')
+    assert modelos.modelo_registrado('uci', registro=registro) is None
+
+    X_train, X_test, y_train, _ = modelos.preparar_dados('uci', gerar_dados_uci())
+    treinado = modelos.treinar_modelo('uci', X_train, y_train, registro=registro)
+
+    carregado = modelos.modelo_registrado('uci', registro=registro)
+    np.testing.assert_array_equal(carregado.predict(X_test), treinado.predict(X_test))
+
+    # Artefato regenerado: o modelo antigo não vale mais
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: 'v2')
+    assert modelos.modelo_registrado('uci', registro=registro) is None
@@ -0,0 +1,53 @@
+# tests/test_resumo_metricas.py
+import pytest
+
+from src.armazenamento import calcular_manifesto, salvar_artefato
+from src.esquema import aplicar_esquema
+from src.resumo_metricas import calcular_resumo, caminho_resumo, gravar_resumo, ler_resumo
+
+
+def test_resumo_oulad_igual_ao_calculo_direto(oulad_processado):
+    df = oulad_processado
+    principais = calcular_resumo('oulad', df)['principais']
+
+    total = df['id_student'].nunique()
+    assert principais['total_estudantes'] == total
+    assert principais['taxa_aprovacao'] == round((df['final_result'] == 'Pass').mean() * 100, 1)
+    assert principais['estudantes_reprovados'] == round((df['final_result'] == 'Fail').mean() * 100, 1)
+    por_genero = df.groupby('gender', observed=False)['id_student'].nunique() / total * 100
+    assert principais['distribuicao_genero'] == {k: round(v, 1) for k, v in por_genero.items()}
+    assert principais['regiao_principal'] == df.groupby('region', observed=False)['id_student'].nunique().idxmax()
+
+
+def test_resumo_uci_correlacoes(dados_uci_sinteticos):
+    df = dados_uci_sinteticos
+    resumo = calcular_resumo('uci', df)
+
+    assert resumo['registros'] == len(df) and resumo['colunas'] == df.shape[1]
+    assert resumo['principais']['correlacao_g1_g3'] == round(df['G1'].corr(df['G3']), 2)
+    assert resumo['consolidadas']['correlacao_notas']['G2']['G3'] == pytest.approx(df['G2'].corr(df['G3']))
+
+
+def test_resumo_uci_com_tipos_do_esquema(dados_uci_sinteticos):
+    # O artefato real é tipado pelo esquema: escalas ordinais viram categorias ordenadas
+    bruto = calcular_resumo('uci', dados_uci_sinteticos)
+    tipado = calcular_resumo('uci', aplicar_esquema(dados_uci_sinteticos, 'uci', verbose=False))
+
+    assert tipado['principais'] == bruto['principais']
+    assert tipado['principais']['media_tempo_estudo'] > 0
+    assert tipado['principais']['estudantes_alcool_baixo'] == round((dados_uci_sinteticos['Dalc'] <= 2).mean() * 100, 1)
+
+
+def test_resumo_vale_apenas_para_a_versao_gravada(tmp_path, dados_uci_sinteticos):
+    fonte = tmp_path / 'student-mat.csv'
+    fonte.write_text('G3\n10\n')
+    salvar_artefato(dados_uci_sinteticos, 'uci', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 1))
+    assert ler_resumo('uci', base_path=tmp_path) is None
+
+    gravado = gravar_resumo('uci', dados_uci_sinteticos, base_path=tmp_path)
+    assert caminho_resumo('uci', base_path=tmp_path).is_file()
+    assert ler_resumo('uci', base_path=tmp_path) == gravado
+
+    # Artefato regenerado: o resumo antigo deixa de valer até ser gravado de novo
+    salvar_artefato(dados_uci_sinteticos, 'uci', base_path=tmp_path, manifesto=calcular_manifesto([fonte], 2))
+    assert ler_resumo('uci', base_path=tmp_path) is None
@@ -0,0 +1,132 @@
+# tests/test_tarefas.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import modelos, tarefas
+from src.registro_modelos import RegistroModelos
+from test_registro_modelos import gerar_dados_uci
+
+
+@pytest.fixture
+def gerenciador(tmp_path, monkeypatch):
+    monkeypatch.setattr(modelos, 'versao_artefato', lambda nome: None)
+    monkeypatch.setattr(tarefas, 'versao_artefato', lambda nome: None)
+    executor = ThreadPoolExecutor(max_workers=2)
+    gerenciador = tarefas.GerenciadorTarefas(
+        diretorio=tmp_path / 'tarefas', registro=RegistroModelos(tmp_path / 'modelos'), executor=executor
+    )
+    yield gerenciador
+    gerenciador.encerrar()
+
+
+def test_tarefas_identicas_em_andamento_sao_deduplicadas(gerenciador, monkeypatch):
+    liberar = threading.Event()
+    cargas = []
+
+    def carregar_lento():
+        cargas.append(1)
+        liberar.wait(10)
+        return gerar_dados_uci()
+
+    monkeypatch.setitem(tarefas.CARREGADORES, 'uci', carregar_lento)
+
+    primeira = gerenciador.submeter('treino', 'uci')
+    segunda = gerenciador.submeter('treino', 'uci')
+    assert primeira == segunda
+    assert gerenciador.estado(primeira)['estado'] in (tarefas.PENDENTE, tarefas.EXECUTANDO)
+
+    liberar.set()
+    resultado = gerenciador.resultado(primeira, timeout=30)
+    assert len(cargas) == 1
+    assert gerenciador.estado(primeira)['estado'] == tarefas.CONCLUIDA
+    assert gerenciador.registro.existe('uci', resultado['chave'])
+    # Concluída: pedir de novo devolve a mesma tarefa sem rodar outra vez
+    assert gerenciador.submeter('treino', 'uci') == primeira
+    assert len(cargas) == 1
+
+
+def test_motor_escolhido_chega_ao_executor(gerenciador, monkeypatch):
+    motores = []
+
+    def registrar_motor(nome, progresso, registro, motor=None):
+        motores.append(motor)
+        return {'nome': nome, 'chave': motor}
+
+    monkeypatch.setitem(tarefas.EXECUTORES, 'treino', registrar_motor)
+    floresta = gerenciador.submeter('treino', 'oulad', motor='floresta')
+    hgb = gerenciador.submeter('treino', 'oulad', motor='hgb')
+
+    assert floresta != hgb
+    assert gerenciador.resultado(hgb, timeout=10)['chave'] == 'hgb'
+    assert gerenciador.resultado(floresta, timeout=10)['chave'] == 'floresta'
+    assert sorted(motores) == ['floresta', 'hgb']
+
+
+def test_importancia_publicada_junto_do_modelo(gerenciador, monkeypatch):
+    monkeypatch.setitem(tarefas.CARREGADORES, 'uci', gerar_dados_uci)
+
+    identificador = gerenciador.submeter('importancia', 'uci')
+    resultado = gerenciador.resultado(identificador, timeout=60)
+
+    publicada = gerenciador.registro.ler_anexo('uci', resultado['chave'], tarefas.ARQUIVO_IMPORTANCIA)
+    assert publicada == resultado['importancia']
+    assert {linha['feature'] for linha in publicada} == {'sex', 'studytime', 'absences', 'G1', 'G2'}
+
+
+def test_falha_publicada_e_tarefa_reagendada(gerenciador, monkeypatch):
+    def carregar_com_erro():
+        raise FileNotFoundError('dataset ausente')
+
+    monkeypatch.setitem(tarefas.CARREGADORES, 'uci', carregar_com_erro)
+    identificador = gerenciador.submeter('treino', 'uci')
+    with pytest.raises(FileNotFoundError):
+        gerenciador.resultado(identificador, timeout=10)
+
+    estado = gerenciador.estado(identificador)
+    assert estado['estado'] == tarefas.ERRO
+    assert 'dataset ausente' in estado['erro']
+
+    monkeypatch.setitem(tarefas.CARREGADORES, 'uci', gerar_dados_uci)
+    assert gerenciador.submeter('treino', 'uci') == identificador
+    assert 'chave' in gerenciador.resultado(identificador, timeout=30)
+
+
+def test_atribuicao_publicada_junto_do_modelo(gerenciador, monkeypatch):
+    monkeypatch.setitem(tarefas.CARREGADORES, 'uci', gerar_dados_uci)
+
+    resultado = gerenciador.resultado(gerenciador.submeter('atribuicao', 'uci'), timeout=60)
+
+    publicada = gerenciador.registro.ler_anexo('uci', resultado['chave'], tarefas.ARQUIVO_ATRIBUICAO)
+    assert publicada == resultado['atribuicao']
+    assert {linha['feature'] for linha in publicada} == {'sex', 'studytime', 'absences', 'G1', 'G2'}
+
+
+def test_pool_quebrado_e_recriado(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.setattr(tarefas, 'versao_artefato', lambda nome: None)
+    marcador = tmp_path / 'ja_morreu'
+
+    def morrer_na_primeira(nome, progresso, registro, motor=None):
+        # Roda no processo de trabalho: a primeira execução derruba o processo (como um OOM)
+        if not marcador.exists():
+            marcador.touch()
+            os._exit(1)
+        return {'nome': nome, 'chave': 'recuperada'}
+
+    monkeypatch.setitem(tarefas.EXECUTORES, 'treino', morrer_na_primeira)
+    gerenciador = tarefas.GerenciadorTarefas(diretorio=tmp_path / 'tarefas', registro=RegistroModelos(tmp_path / 'modelos'))
+    try:
+        identificador = gerenciador.submeter('treino', 'uci')
+        with pytest.raises(tarefas.BrokenProcessPool):
+            gerenciador.resultado(identificador, timeout=60)
+        assert gerenciador.estado(identificador)['estado'] == tarefas.ERRO
+
+        # O pool quebrado não impede novos pedidos: a tarefa é reagendada num pool novo
+        assert gerenciador.submeter('treino', 'uci') == identificador
+        assert gerenciador.resultado(identificador, timeout=60)['chave'] == 'recuperada'
+        assert gerenciador.estado(identificador)['estado'] == tarefas.CONCLUIDA
+    finally:
+        gerenciador.encerrar()
@@ -0,0 +1,182 @@
+# tests/test_unificar_datasets.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import unificar_datasets
+from src.unificar_datasets import imputar_resultado_final, imputar_resultado_final_vetorizado
+
+
+def gerar_unificado_com_ausentes(n=2000, seed=0, tipo_notas='float64'):
+    """Frame no formato do unificado com ausentes em todas as combinações relevantes"""
+    rng = np.random.default_rng(seed)
+    origem = rng.choice(['UCI', 'OULAD', 'OUTRA'], size=n, p=[0.45, 0.45, 0.1])
+
+    def com_ausentes(valores, fracao):
+        valores = valores.astype('float64')
+        valores[rng.random(n) < fracao] = np.nan
+        return valores
+
+    df = pd.DataFrame({
+        'origem_dado': origem,
+        'resultado_final': com_ausentes(rng.integers(0, 11, n), 0.6),
+        'uci_nota_periodo1': com_ausentes(rng.integers(0, 21, n), 0.4),
+        'uci_nota_periodo2': com_ausentes(rng.integers(0, 21, n), 0.4),
+        # Inclui as fronteiras das faixas (50, 70, 85)
+        'oulad_media_score': com_ausentes(rng.choice([0, 49.9, 50, 69.99, 70, 84.5, 85, 100], n), 0.3),
+        'genero': rng.choice(['Feminino', 'Masculino'], n),
+    })
+    df[['uci_nota_periodo1', 'uci_nota_periodo2']] = df[['uci_nota_periodo1', 'uci_nota_periodo2']].astype(tipo_notas)
+    return df
+
+
+@pytest.mark.parametrize('tipo_notas', ['float64', 'float32'])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_imputacao_vetorizada_igual_a_por_linha(seed, tipo_notas):
+    df = gerar_unificado_com_ausentes(seed=seed, tipo_notas=tipo_notas)
+
+    esperado = df.apply(imputar_resultado_final, axis=1)
+    resultado = imputar_resultado_final_vetorizado(df)
+
+    np.testing.assert_array_equal(resultado.to_numpy(), esperado.to_numpy(dtype='float64'))
+    assert resultado.index.equals(df.index)
+
+
+@pytest.mark.parametrize('variacao', ['categoria', 'sem_score', 'sem_notas', 'sem_target'])
+def test_imputacao_vetorizada_com_tipos_e_colunas_ausentes(variacao):
+    df = gerar_unificado_com_ausentes(n=500, seed=3)
+    df.index = df.index * 3 + 7
+    if variacao == 'categoria':
+        df['origem_dado'] = df['origem_dado'].astype('category')
+    elif variacao == 'sem_score':
+        df = df.drop(columns='oulad_media_score')
+    elif variacao == 'sem_notas':
+        df = df.drop(columns=['uci_nota_periodo1', 'uci_nota_periodo2'])
+    else:
+        df = df.drop(columns='resultado_final')
+
+    esperado = df.apply(imputar_resultado_final, axis=1)
+    resultado = imputar_resultado_final_vetorizado(df)
+
+    pd.testing.assert_series_equal(resultado, esperado.astype('float64'), check_names=False)
+
+
+def test_imputacao_usa_a_escala_g3_nos_dois_caminhos(monkeypatch):
+    monkeypatch.setattr(unificar_datasets, 'ESCALA_G3_UCI', 4.0)
+    df = pd.DataFrame({
+        'origem_dado': ['UCI', 'UCI', 'UCI'],
+        'resultado_final': [np.nan, np.nan, np.nan],
+        'uci_nota_periodo1': [12.0, 16.0, np.nan],
+        'uci_nota_periodo2': [20.0, np.nan, 8.0],
+    })
+
+    esperado = df.apply(imputar_resultado_final, axis=1)
+    resultado = imputar_resultado_final_vetorizado(df)
+
+    np.testing.assert_array_equal(resultado.to_numpy(), [4.0, 4.0, 2.0])
+    np.testing.assert_array_equal(esperado.to_numpy(dtype='float64'), [4.0, 4.0, 2.0])
+
+
+def _mediana_por_grupo_referencia(df, coluna, grupo_cols):
+    return df.groupby(grupo_cols, observed=False)[coluna].transform('median')
+
+
+def _moda_por_grupo_referencia(df, coluna, grupo_cols):
+    def get_mode(x):
+        mode_vals = x.mode()
+        return mode_vals.iloc[0] if len(mode_vals) > 0 else None
+    return df.groupby(grupo_cols, observed=False)[coluna].transform(get_mode)
+
+
+def gerar_frame_grupos(n=3000, seed=0, categorico=False):
+    rng = np.random.default_rng(seed)
+
+    def com_ausentes(valores, fracao):
+        valores = pd.Series(valores, dtype=object)
+        valores[rng.random(n) < fracao] = None
+        return valores
+
+    df = pd.DataFrame({
+        'origem_dado': rng.choice(['UCI', 'OULAD'], n),
+        'regiao': com_ausentes(rng.choice(['Urbana', 'Rural', 'Scotland', 'Wales'], n), 0.05),
+        'genero': com_ausentes(rng.choice(['Feminino', 'Masculino'], n), 0.05),
+        # Poucos valores distintos: força empates na moda
+        'escolaridade': com_ausentes(rng.choice(['A', 'B', 'C'], n), 0.3),
+        'idade': np.where(rng.random(n) < 0.2, np.nan, rng.integers(15, 60, n)).astype('float32'),
+        'faltas': np.where(rng.random(n) < 0.5, np.nan, rng.integers(0, 30, n)),
+    })
+    # Um grupo inteiro sem valores de 'faltas' e de 'escolaridade'
+    vazio = (df['origem_dado'] == 'UCI') & (df['regiao'] == 'Wales')
+    df.loc[vazio, 'faltas'] = np.nan
+    df.loc[vazio, 'escolaridade'] = None
+    if categorico:
+        for coluna in ['origem_dado', 'regiao', 'genero', 'escolaridade']:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+@pytest.mark.parametrize('categorico', [False, True])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_imputador_por_grupo_igual_ao_transform(seed, categorico):
+    from src.imputador_grupos import ImputadorPorGrupo
+
+    df = gerar_frame_grupos(seed=seed, categorico=categorico)
+    grupos = ['origem_dado', 'regiao', 'genero']
+    imputador = ImputadorPorGrupo(df, grupos).preparar_medianas(['idade', 'faltas'])
+
+    for coluna in ['idade', 'faltas']:
+        pd.testing.assert_series_equal(
+            imputador.medianas(coluna), _mediana_por_grupo_referencia(df, coluna, grupos), check_dtype=False
+        )
+    for coluna in ['escolaridade', 'genero']:
+        esperado = _moda_por_grupo_referencia(df, coluna, ['origem_dado', 'regiao']).astype(object)
+        resultado = ImputadorPorGrupo(df, ['origem_dado', 'regiao']).modas(coluna)
+        pd.testing.assert_series_equal(resultado.fillna(np.nan), esperado.fillna(np.nan), check_names=False)
+
+
+@pytest.mark.parametrize('categorico', [False, True])
+def test_tratar_dados_ausentes_igual_a_imputacao_coluna_a_coluna(categorico):
+    from src.unificar_datasets import (
+        imputar_categorica_por_grupo, imputar_numerica_por_grupo, tratar_dados_ausentes
+    )
+
+    df = gerar_frame_grupos(seed=2, categorico=categorico)
+    df['resultado_final'] = 5.0
+
+    # Referência: uma chamada independente por coluna, na ordem das colunas
+    esperado = df.copy()
+    for coluna in ['idade', 'faltas']:
+        esperado[coluna] = imputar_numerica_por_grupo(esperado, coluna)
+    # 'regiao' é chave de grupo: imputá-la antes muda os grupos das seguintes
+    for coluna in ['regiao', 'genero', 'escolaridade']:
+        esperado[coluna] = imputar_categorica_por_grupo(esperado, coluna)
+
+    resultado = tratar_dados_ausentes(df)
+    pd.testing.assert_frame_equal(resultado[esperado.columns], esperado)
+    assert not resultado.isna().any().any()
+
+
+def test_salvar_unificado_com_as_duas_fontes(tmp_path, dados_uci_sinteticos, dados_oulad_sinteticos):
+    from src.armazenamento import carregar_artefato, fontes_artefato
+    from src.unificar_datasets import (adicionar_coluna_origem, agregar_oulad_por_estudante, mapear_colunas_oulad,
+                                       mapear_colunas_uci, salvar_dataset_unificado)
+
+    for fonte in fontes_artefato('unificado', tmp_path):
+        fonte.parent.mkdir(parents=True, exist_ok=True)
+        fonte.write_text('x\n1\n')
+
+    uci = adicionar_coluna_origem(mapear_colunas_uci(dados_uci_sinteticos), 'UCI')
+    oulad = adicionar_coluna_origem(mapear_colunas_oulad(agregar_oulad_por_estudante(dados_oulad_sinteticos)), 'OULAD')
+    unificado = pd.concat([uci, oulad], ignore_index=True)
+    # idade mistura inteiros (UCI) e faixas etárias em texto (OULAD)
+    assert unificado['idade'].map(type).nunique() > 1
+
+    parquet_path, csv_path = salvar_dataset_unificado(unificado, base_path=tmp_path)
+
+    assert parquet_path.is_file() and csv_path.is_file()
+    lido = carregar_artefato('unificado', base_path=tmp_path)
+    assert len(lido) == len(unificado)
+    assert isinstance(lido['idade'].dtype, pd.CategoricalDtype)
+    idades = lido.set_index(lido['origem_dado'].astype(str))['idade'].astype(str)
+    assert set(idades.loc['UCI']) == {str(v) for v in dados_uci_sinteticos['age']}
+    assert set(idades.loc['OULAD']) <= set(dados_oulad_sinteticos['studentInfo']['age_band'].astype(str))